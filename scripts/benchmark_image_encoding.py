@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+圖片編碼基準測試
+================
+
+比較回饋返回路徑在「每個環節各自編碼 base64」（舊流程）與
+「ImageRecord 共享單一編碼」（新流程）下的耗時與峰值 RSS。
+
+每種模式都在獨立子進程中執行，確保峰值 RSS 互不影響。
+
+使用方式：
+  python scripts/benchmark_image_encoding.py                  # 預設 8 張 4MB 圖片
+  python scripts/benchmark_image_encoding.py --images 10 --size-mb 5
+  python scripts/benchmark_image_encoding.py --rounds 5       # 每種模式重複 5 輪
+"""
+
+import argparse
+import base64
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+MODES = ("legacy", "shared")
+
+
+def peak_rss_mb() -> float:
+    """取得當前進程的峰值 RSS（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 回傳 bytes，Linux 回傳 KB
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def legacy_return_path(images: list[dict], file_path: str) -> int:
+    """舊流程：儲存、文字摘要、MCP 圖片各自編碼一次"""
+    # save_feedback_to_file
+    json_images = []
+    for img in images:
+        processed = img.copy()
+        processed["data"] = base64.b64encode(img["data"]).decode("utf-8")
+        processed["data_type"] = "base64"
+        json_images.append(processed)
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump({"images": json_images}, f, ensure_ascii=False, indent=2)
+
+    # create_feedback_text：為了 50 字元預覽編碼整張圖片
+    text_parts = []
+    for img in images:
+        img_base64 = base64.b64encode(img["data"]).decode("utf-8")
+        text_parts.append(f"{img_base64[:50]}... {len(img_base64)}")
+
+    # fastmcp Image.to_image_content
+    encoded_total = 0
+    for img in images:
+        encoded_total += len(base64.b64encode(img["data"]).decode())
+    return encoded_total
+
+
+def shared_return_path(images: list[dict], file_path: str) -> int:
+    """新流程：ImageRecord 共享單一編碼"""
+    from mcp_feedback_enhanced.models import ImageRecord
+    from mcp_feedback_enhanced.server import (
+        create_feedback_text,
+        process_images,
+        save_feedback_to_file,
+    )
+
+    feedback = {"interactive_feedback": "", "images": ImageRecord.from_list(images)}
+    create_feedback_text(feedback)
+    save_feedback_to_file(feedback, file_path)
+    return sum(len(content.data) for content in process_images(feedback["images"]))
+
+
+def run_mode(mode: str, image_count: int, size_mb: float, rounds: int) -> dict:
+    """在當前進程中執行單一模式並回報結果"""
+    # 預先導入模組，讓兩種模式的基準 RSS 相同
+    import mcp_feedback_enhanced.server  # noqa: F401
+
+    images = [
+        {"name": f"screenshot_{i}.png", "data": os.urandom(int(size_mb * 1024 * 1024))}
+        for i in range(image_count)
+    ]
+    workload = legacy_return_path if mode == "legacy" else shared_return_path
+
+    baseline_rss = peak_rss_mb()
+    durations = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "feedback.json")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            workload(images, file_path)
+            durations.append(time.perf_counter() - start)
+
+    return {
+        "mode": mode,
+        "wall_time_ms": round(min(durations) * 1000, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "peak_rss_growth_mb": round(peak_rss_mb() - baseline_rss, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回饋返回路徑圖片編碼基準測試")
+    parser.add_argument("--images", type=int, default=8, help="圖片數量")
+    parser.add_argument("--size-mb", type=float, default=4.0, help="每張圖片大小 (MB)")
+    parser.add_argument("--rounds", type=int, default=3, help="每種模式重複次數")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        # 子進程模式：輸出 JSON 結果
+        print(json.dumps(run_mode(args.mode, args.images, args.size_mb, args.rounds)))
+        return
+
+    print(
+        f"📊 {args.images} 張 {args.size_mb}MB 圖片，每種模式 {args.rounds} 輪（取最快一輪）"
+    )
+    results = {}
+    for mode in MODES:
+        output = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--mode",
+                mode,
+                "--images",
+                str(args.images),
+                "--size-mb",
+                str(args.size_mb),
+                "--rounds",
+                str(args.rounds),
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        results[mode] = json.loads(output.stdout.strip().splitlines()[-1])
+        result = results[mode]
+        print(
+            f"  {mode:<8} 耗時: {result['wall_time_ms']:>8.1f} ms   "
+            f"峰值 RSS: {result['peak_rss_mb']:>7.1f} MB   "
+            f"(增長 {result['peak_rss_growth_mb']:.1f} MB)"
+        )
+
+    legacy, shared = results["legacy"], results["shared"]
+    if shared["wall_time_ms"] > 0:
+        print(f"⚡ 加速: {legacy['wall_time_ms'] / shared['wall_time_ms']:.2f}x")
+    print(
+        f"💾 峰值 RSS 增長減少: "
+        f"{legacy['peak_rss_growth_mb'] - shared['peak_rss_growth_mb']:.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+會話清理基準測試
+================
+
+比較一次清理週期在「掃描並排序全部會話」（舊流程）與
+「會話淘汰索引」（新流程）下的耗時。
+
+每輪模擬一個清理週期：部分會話更新活動時間，接著找出已過期的會話，
+並依容量上限選出需要淘汰的會話。預設以 10,000 個合成會話執行。
+
+使用方式：
+  python scripts/benchmark_session_cleanup.py                    # 預設 10000 個會話
+  python scripts/benchmark_session_cleanup.py --sessions 50000
+  python scripts/benchmark_session_cleanup.py --rounds 50 --touches 500
+"""
+
+import argparse
+import random
+import time
+
+from mcp_feedback_enhanced.web.models.feedback_session import SessionStatus
+from mcp_feedback_enhanced.web.utils.session_index import SessionEvictionIndex
+
+
+STATUSES = (
+    SessionStatus.WAITING,
+    SessionStatus.ACTIVE,
+    SessionStatus.FEEDBACK_SUBMITTED,
+    SessionStatus.COMPLETED,
+    SessionStatus.ERROR,
+)
+
+
+class SyntheticSession:
+    """只包含清理流程所需欄位的合成會話"""
+
+    def __init__(self, session_id: str, now: float, rng: random.Random):
+        self.session_id = session_id
+        self.created_at = now - rng.uniform(0, 7200)
+        self.last_activity = max(self.created_at, now - rng.uniform(0, 3600))
+        self.max_idle_time = 1800
+        self.status = rng.choice(STATUSES)
+
+    def is_expired(self) -> bool:
+        now = time.time()
+        if now - self.last_activity > self.max_idle_time:
+            return True
+        if self.status == SessionStatus.EXPIRED:
+            return True
+        if self.status in (SessionStatus.ERROR, SessionStatus.TIMEOUT):
+            return now - self.last_activity > 300
+        return False
+
+    def get_age(self) -> float:
+        return time.time() - self.created_at
+
+    def get_idle_time(self) -> float:
+        return time.time() - self.last_activity
+
+
+def legacy_cycle(sessions: dict, max_sessions: int) -> tuple[list, list]:
+    """舊流程：掃描全部會話找出過期者，並為容量淘汰計分排序"""
+    expired = [s for s in sessions.values() if s.is_expired()]
+
+    priorities = []
+    for session in sessions.values():
+        score = 0.0
+        if session.status in (
+            SessionStatus.COMPLETED,
+            SessionStatus.ERROR,
+            SessionStatus.TIMEOUT,
+        ):
+            score += 100
+        elif session.status == SessionStatus.FEEDBACK_SUBMITTED:
+            score += 50
+        score += session.get_age() / 60 + session.get_idle_time() / 30
+        priorities.append((score, session))
+    priorities.sort(key=lambda item: item[0], reverse=True)
+    excess = max(0, len(sessions) - max_sessions)
+    return expired, [session for _, session in priorities[:excess]]
+
+
+def indexed_cycle(
+    index: SessionEvictionIndex, sessions: dict, max_sessions: int
+) -> tuple[list, list]:
+    """新流程：從淘汰索引的堆頂取出過期與需淘汰的會話"""
+    expired = index.pop_expired(time.time())
+    excess = max(0, len(sessions) - max_sessions)
+    return expired, index.pop_evictable(excess)
+
+
+def run(session_count: int, rounds: int, touches: int, excess: int, seed: int):
+    rng = random.Random(seed)  # noqa: S311
+    now = time.time()
+    sessions = {
+        f"s{i}": SyntheticSession(f"s{i}", now, rng) for i in range(session_count)
+    }
+    ids = list(sessions)
+    max_sessions = session_count - excess
+
+    index = SessionEvictionIndex()
+    start = time.perf_counter()
+    for session in sessions.values():
+        index.add(session)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    legacy_times, indexed_times, touch_times = [], [], []
+    cleaned = 0
+    for round_number in range(rounds):
+        touched = rng.sample(ids, min(touches, len(ids)))
+        start = time.perf_counter()
+        for session_id in touched:
+            session = sessions[session_id]
+            session.last_activity = time.time()
+            index.touch(session)
+        touch_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        legacy_cycle(sessions, max_sessions)
+        legacy_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        expired, evicted = indexed_cycle(index, sessions, max_sessions)
+        indexed_times.append(time.perf_counter() - start)
+
+        # 移除清理掉的會話，並以新會話補足，讓每輪的會話數量一致
+        removed = {session.session_id for session in (*expired, *evicted)}
+        cleaned += len(removed)
+        for session_id in removed:
+            del sessions[session_id]
+            index.remove(session_id)
+        for i in range(len(removed)):
+            session = SyntheticSession(f"r{round_number}-{i}", time.time(), rng)
+            session.created_at = session.last_activity = time.time()
+            sessions[session.session_id] = session
+            index.add(session)
+        ids = list(sessions)
+
+    return {
+        "build_ms": build_ms,
+        "legacy_ms": min(legacy_times) * 1000,
+        "indexed_ms": min(indexed_times) * 1000,
+        "touch_us": min(touch_times) / max(1, touches) * 1_000_000,
+        "cleaned": cleaned,
+        "index": index.get_stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="會話清理週期基準測試")
+    parser.add_argument("--sessions", type=int, default=10000, help="會話數量")
+    parser.add_argument("--rounds", type=int, default=20, help="清理週期輪數")
+    parser.add_argument("--touches", type=int, default=200, help="每輪更新活動的會話數")
+    parser.add_argument("--excess", type=int, default=50, help="超出容量上限的會話數")
+    parser.add_argument("--seed", type=int, default=0, help="隨機種子")
+    args = parser.parse_args()
+
+    print(
+        f"📊 {args.sessions} 個會話，{args.rounds} 輪清理週期"
+        f"（每輪 {args.touches} 次活動更新，超出容量 {args.excess}，取最快一輪）"
+    )
+    result = run(args.sessions, args.rounds, args.touches, args.excess, args.seed)
+    print(f"  建立索引:      {result['build_ms']:>8.2f} ms")
+    print(f"  legacy  週期:  {result['legacy_ms']:>8.2f} ms")
+    print(f"  indexed 週期:  {result['indexed_ms']:>8.2f} ms")
+    print(f"  清理會話總數:  {result['cleaned']:>8}")
+    print(f"  索引更新成本:  {result['touch_us']:>8.2f} µs/次")
+    if result["indexed_ms"] > 0:
+        print(f"⚡ 加速: {result['legacy_ms'] / result['indexed_ms']:.1f}x")
+    print(f"🗂️ 索引統計: {result['index']}")
+
+
+if __name__ == "__main__":
+    main()
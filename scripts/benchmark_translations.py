@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+翻譯 API 基準測試
+=================
+
+比較 /api/translations 在「每次請求讀取並解析翻譯檔案」（舊流程）與
+「內存翻譯快取」（新流程）下每秒可處理的請求數。
+
+舊流程每次請求打開並 json.load 三個翻譯檔案、重新序列化，
+客戶端接受 gzip 時再由 GZipMiddleware 壓縮（compresslevel=9）；
+新流程只檢查檔案的修改時間與大小，直接送出快取中的內容。
+測量的是路由處理函數本身，不含 HTTP 傳輸。
+
+使用方式：
+  python scripts/benchmark_translations.py                  # 預設 2 秒
+  python scripts/benchmark_translations.py --seconds 5
+  python scripts/benchmark_translations.py --no-gzip         # 客戶端不接受 gzip
+"""
+
+import argparse
+import gzip
+import json
+import time
+from collections.abc import Callable
+
+from starlette.requests import Request
+
+from mcp_feedback_enhanced.web.utils.http_cache import (
+    conditional_bytes,
+    conditional_json,
+    file_version,
+)
+from mcp_feedback_enhanced.web.utils.translation_cache import (
+    SUPPORTED_LANGUAGES,
+    TranslationCache,
+)
+
+
+def make_request(path: str, accept_gzip: bool) -> Request:
+    headers = [(b"accept-encoding", b"gzip, deflate, br")] if accept_gzip else []
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "query_string": b"",
+            "headers": headers,
+        }
+    )
+
+
+def legacy_handler(cache: TranslationCache, request: Request, accept_gzip: bool):
+    """舊流程：每次請求都讀取並解析全部翻譯檔案"""
+    translation_files = {
+        language: cache.translation_file(language) for language in cache.languages
+    }
+
+    def load_translations() -> dict:
+        translations = {}
+        for language, translation_file in translation_files.items():
+            with open(translation_file, encoding="utf-8") as f:
+                translations[language] = json.load(f)
+        return translations
+
+    response = conditional_json(
+        request, load_translations, version=file_version(translation_files.values())
+    )
+    if accept_gzip:
+        # GZipMiddleware 對未壓縮響應所做的工作
+        gzip.compress(response.body, compresslevel=9)
+    return response
+
+
+def measure(handler: Callable[[], object], seconds: float) -> float:
+    """在指定時間內重複調用，返回每秒請求數"""
+    handler()
+    count = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(10):
+            handler()
+        count += 10
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="翻譯 API 基準測試")
+    parser.add_argument("--seconds", type=float, default=2.0, help="每個情境的測量秒數")
+    parser.add_argument("--no-gzip", action="store_true", help="客戶端不接受 gzip")
+    args = parser.parse_args()
+    accept_gzip = not args.no_gzip
+
+    cache = TranslationCache()
+    all_request = make_request("/api/translations", accept_gzip)
+    language = SUPPORTED_LANGUAGES[0]
+    language_request = make_request(f"/api/translations/{language}", accept_gzip)
+
+    def cached_all():
+        bundle = cache.get_all()
+        return conditional_bytes(
+            all_request, bundle.etag, bundle.body, bundle.gzip_body
+        )
+
+    def cached_language():
+        bundle = cache.get_language(language)
+        return conditional_bytes(
+            language_request, bundle.etag, bundle.body, bundle.gzip_body
+        )
+
+    scenarios = [
+        ("legacy  全部語言", lambda: legacy_handler(cache, all_request, accept_gzip)),
+        ("cached  全部語言", cached_all),
+        (f"cached  {language}", cached_language),
+    ]
+
+    print(
+        f"📊 /api/translations 處理函數，每個情境 {args.seconds:g} 秒"
+        f"（{'接受' if accept_gzip else '不接受'} gzip）"
+    )
+    results = {}
+    for name, handler in scenarios:
+        response = handler()
+        results[name] = measure(handler, args.seconds)
+        print(
+            f"  {name:<16} {results[name]:>10,.0f} req/s  "
+            f"響應 {len(response.body):>7,} B"
+        )
+
+    legacy, cached = results[scenarios[0][0]], results[scenarios[1][0]]
+    print(f"⚡ 加速: {cached / legacy:.1f}x")
+    print(f"🗂️ 快取統計: {cache.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
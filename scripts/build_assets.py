@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+靜態資源建置
+============
+
+將 Web UI 的 JS / CSS 合併、壓縮並以內容雜湊命名，同時產生 .gz
+（以及安裝 brotli 時的 .br）變體，寫入 web/static/dist。
+Web UI 啟動時若 dist 與原始檔一致就直接載入，否則在內存中重新建置。
+
+使用方式：
+  python scripts/build_assets.py                 # 寫入 web/static/dist
+  python scripts/build_assets.py --out build/assets
+  python scripts/build_assets.py --no-brotli     # 不產生 .br
+  python scripts/build_assets.py --check         # 只檢查 dist 是否為最新
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from mcp_feedback_enhanced.web.utils.asset_pipeline import (
+    MANIFEST_NAME,
+    AssetPipeline,
+    get_asset_pipeline,
+)
+
+
+def check(pipeline: AssetPipeline) -> int:
+    manifest_path = pipeline.dist_dir / MANIFEST_NAME
+    if not manifest_path.exists():
+        print(f"❌ 找不到 {manifest_path}")
+        return 1
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    if manifest.get("fingerprint") != pipeline.fingerprint():
+        print("❌ dist 已過期，請重新執行 scripts/build_assets.py")
+        return 1
+    print("✅ dist 為最新")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="建置 Web UI 靜態資源包")
+    parser.add_argument("--out", default=None, help="輸出目錄（預設 web/static/dist）")
+    parser.add_argument("--no-brotli", action="store_true", help="不產生 .br 變體")
+    parser.add_argument("--check", action="store_true", help="只檢查 dist 是否為最新")
+    args = parser.parse_args()
+
+    default = get_asset_pipeline()
+    pipeline = AssetPipeline(default.static_dir, use_brotli=not args.no_brotli)
+    if args.check:
+        sys.exit(check(pipeline))
+
+    start = time.perf_counter()
+    manifest_path = pipeline.write(args.out)
+    elapsed = time.perf_counter() - start
+
+    print(f"📦 已寫入 {manifest_path.parent}（{elapsed * 1000:.0f} ms）")
+    for name, asset in pipeline.assets.items():
+        original = sum(
+            (pipeline.static_dir / source).stat().st_size for source in asset.sources
+        )
+        brotli = (
+            f"，br {len(asset.brotli_content):>7,} B"
+            if asset.brotli_content is not None
+            else ""
+        )
+        print(
+            f"  {asset.filename:<28} {len(asset.sources):>2} 個檔案 "
+            f"{original:>9,} B → {len(asset.content):>9,} B，"
+            f"gzip {len(asset.gzip_content):>7,} B{brotli}"
+        )
+
+
+if __name__ == "__main__":
+    main()
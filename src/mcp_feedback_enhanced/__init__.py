@@ -26,23 +26,42 @@ __version__ = "2.5.0"
 __author__ = "Minidoracat"
 __email__ = "minidora0702@gmail.com"
 
-import os
+import importlib
 
-from .server import main as run_server
 
-# 導入 Web UI 模組
-from .web import WebUIManager, get_web_ui_manager, launch_web_feedback_ui, stop_web_ui
+# 延遲導入：Web UI（fastapi/uvicorn/jinja2）與 GUI（PySide6）只在首次使用時載入，
+# 避免 MCP 伺服器啟動時拖慢第一次工具列表
+_LAZY_EXPORTS = {
+    "run_server": (".server", "main"),
+    "WebUIManager": (".web", "WebUIManager"),
+    "get_web_ui_manager": (".web", "get_web_ui_manager"),
+    "launch_web_feedback_ui": (".web", "launch_web_feedback_ui"),
+    "stop_web_ui": (".web", "stop_web_ui"),
+    "gui_feedback_ui": (".gui", "feedback_ui"),
+    # 保持向後兼容性
+    "feedback_ui": (".gui", "feedback_ui"),
+}
 
-# 嘗試導入 GUI 模組（可選依賴）
-try:
-    from .gui import feedback_ui as gui_feedback_ui
-    GUI_AVAILABLE = True
-except ImportError:
-    gui_feedback_ui = None
-    GUI_AVAILABLE = False
 
-# 保持向後兼容性
-feedback_ui = gui_feedback_ui
+def __getattr__(name):
+    """按需導入重量級子模組的導出"""
+    if name == "GUI_AVAILABLE":
+        return __getattr__("gui_feedback_ui") is not None
+
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module_name, attr = _LAZY_EXPORTS[name]
+    try:
+        value = getattr(importlib.import_module(module_name, __name__), attr)
+    except ImportError:
+        # GUI 為可選依賴
+        if module_name != ".gui":
+            raise
+        value = None
+    globals()[name] = value
+    return value
+
 
 # 主要導出介面
 __all__ = [
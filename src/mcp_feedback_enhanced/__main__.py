@@ -8,6 +8,7 @@ MCP Interactive Feedback Enhanced - 主程式入口
 使用方法:
   python -m mcp_feedback_enhanced        # 啟動 MCP 伺服器
   python -m mcp_feedback_enhanced test   # 執行測試
+  python -m mcp_feedback_enhanced profile status   # 查看內存分配分析器
 """
 
 import argparse
@@ -40,7 +41,12 @@ def main():
     subparsers = parser.add_subparsers(dest="command", help="可用命令")
 
     # 伺服器命令（預設）
-    subparsers.add_parser("server", help="啟動 MCP 伺服器（預設）")
+    server_parser = subparsers.add_parser("server", help="啟動 MCP 伺服器（預設）")
+    server_parser.add_argument(
+        "--prewarm-web",
+        action="store_true",
+        help="啟動時在背景預熱 Web UI（等同 MCP_WEB_PREWARM=true）",
+    )
 
     # 測試命令
     test_parser = subparsers.add_parser("test", help="執行測試")
@@ -57,6 +63,36 @@ def main():
         "--timeout", type=int, default=60, help="測試超時時間 (秒)"
     )
 
+    # 內存分配分析命令（透過運行中 Web UI 的 /api/debug/alloc）
+    profile_parser = subparsers.add_parser(
+        "profile", help="控制運行中 Web UI 的內存分配分析器（需 MCP_ALLOC_PROFILER）"
+    )
+    profile_parser.add_argument(
+        "action",
+        choices=("status", "start", "stop", "snapshot", "top", "diff"),
+        help="status/start/stop/snapshot 控制分析器，top 列出分配位置，diff 比較快照",
+    )
+    profile_parser.add_argument(
+        "--url",
+        default=None,
+        help="Web UI 位址（預設 http://127.0.0.1:$MCP_WEB_PORT，未設定時為 8765）",
+    )
+    profile_parser.add_argument("--snapshot", type=int, help="top 使用的快照 ID")
+    profile_parser.add_argument("--old", type=int, help="diff 的舊快照 ID")
+    profile_parser.add_argument(
+        "--new", type=int, help="diff 的新快照 ID（預設為當前狀態）"
+    )
+    profile_parser.add_argument(
+        "--group-by",
+        choices=("filename", "lineno", "traceback"),
+        default="lineno",
+        help="分組方式",
+    )
+    profile_parser.add_argument("--limit", type=int, default=20, help="列出的數量")
+    profile_parser.add_argument("--frames", type=int, help="start 的調用堆疊深度")
+    profile_parser.add_argument("--label", default="", help="snapshot 的標籤")
+    profile_parser.add_argument("--json", action="store_true", help="輸出原始 JSON")
+
     # 版本命令
     subparsers.add_parser("version", help="顯示版本資訊")
 
@@ -66,7 +102,11 @@ def main():
         run_tests(args)
     elif args.command == "version":
         show_version()
+    elif args.command == "profile":
+        sys.exit(run_profile(args))
     elif args.command == "server" or args.command is None:
+        if getattr(args, "prewarm_web", False):
+            os.environ["MCP_WEB_PREWARM"] = "true"
         run_server()
     else:
         # 不應該到達這裡
@@ -324,6 +364,124 @@ async def wait_for_process(process):
         print(f"等待進程時出錯: {e}")
 
 
+def _format_bytes(size: int) -> str:
+    """將位元組數格式化為易讀的單位"""
+    value = float(size)
+    for unit in ("B", "KiB", "MiB"):
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
+
+
+def run_profile(args) -> int:
+    """
+    透過 HTTP 控制運行中 Web UI 的分配分析器
+
+    Returns:
+        int: 退出碼
+    """
+    import json
+    import urllib.error
+    import urllib.parse
+    import urllib.request
+
+    base_url = args.url or f"http://127.0.0.1:{os.getenv('MCP_WEB_PORT', '8765')}"
+    parsed = urllib.parse.urlsplit(base_url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        print(f"❌ Web UI 地址必須是 http(s) URL: {base_url}")
+        return 2
+    base_url = base_url.rstrip("/") + "/api/debug/alloc"
+
+    method = "GET"
+    params: dict[str, object] = {}
+    if args.action == "status":
+        path = ""
+    elif args.action in ("start", "stop", "snapshot"):
+        method = "POST"
+        path = f"/{args.action}"
+        if args.action == "start" and args.frames:
+            params["frames"] = args.frames
+        if args.action == "snapshot" and args.label:
+            params["label"] = args.label
+    else:
+        path = f"/{args.action}"
+        params.update(group_by=args.group_by, limit=args.limit)
+        if args.action == "top" and args.snapshot is not None:
+            params["snapshot"] = args.snapshot
+        if args.action == "diff":
+            if args.old is None:
+                print("❌ diff 需要 --old 快照 ID")
+                return 2
+            params["old"] = args.old
+            if args.new is not None:
+                params["new"] = args.new
+
+    url = base_url + path
+    if params:
+        url += "?" + urllib.parse.urlencode(params)
+
+    try:
+        # 地址已在上方限制為 http(s)
+        request = urllib.request.Request(url, method=method)  # noqa: S310
+        with urllib.request.urlopen(request, timeout=120) as response:  # noqa: S310
+            data = json.loads(response.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.loads(e.read().decode("utf-8")).get("error", e.reason)
+        except ValueError:
+            message = e.reason
+        print(f"❌ {message}")
+        return 1
+    except urllib.error.URLError as e:
+        print(f"❌ 無法連接 Web UI ({base_url}): {e.reason}")
+        return 1
+
+    if args.json:
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+        return 0
+
+    if "stats" in data:
+        diff = args.action == "diff"
+        for stat in data["stats"]:
+            size = _format_bytes(stat["size"])
+            if diff:
+                change = ("+" if stat["size_diff"] >= 0 else "-") + _format_bytes(
+                    abs(stat["size_diff"])
+                )
+                print(
+                    f"{change:>14} {size:>12} "
+                    f"{stat['count_diff']:+9d} 個  {stat['location']}"
+                )
+            else:
+                print(f"{size:>12} {stat['count']:>9d} 個  {stat['location']}")
+            for frame in stat.get("traceback", [])[:-1]:
+                print(f"{'':>24}↳ {frame}")
+        return 0
+
+    snapshots = data.get("snapshots")
+    if snapshots is None:
+        # snapshot 返回單一快照資訊
+        snapshots = [data]
+    else:
+        print(
+            f"追蹤中: {'是' if data['running'] else '否'}（模式 {data['mode']}，"
+            f"堆疊深度 {data['frames']}）"
+        )
+        print(
+            f"追蹤內存: {_format_bytes(data['traced_bytes'])}，"
+            f"峰值 {_format_bytes(data['peak_bytes'])}，"
+            f"分析器開銷 {_format_bytes(data['overhead_bytes'])}"
+        )
+    for info in snapshots:
+        print(
+            f"快照 #{info['id']}  {info['taken_at']}  "
+            f"{_format_bytes(info['traced_bytes'])}  {info['reason']}"
+            + (f"  {info['label']}" if info["label"] else "")
+        )
+    return 0
+
+
 def show_version():
     """顯示版本資訊"""
     from . import __author__, __version__
@@ -10,6 +10,7 @@
 import os
 import uuid
 import time
+import weakref
 from typing import Dict, List
 from pathlib import Path
 
@@ -26,8 +27,13 @@ from PySide6.QtWidgets import QSizePolicy
 from ...i18n import t
 from ...debug import gui_debug_log as debug_log
 from ...utils.resource_manager import get_resource_manager, create_temp_file
+from ...utils.image_pipeline import get_image_normalizer
+from ...utils.image_store import get_image_store
 from .image_preview import ImagePreviewWidget
 
+# 提交時在 GUI 線程等待單張圖片正規化的最長時間（秒），逾時使用原圖
+NORMALIZE_WAIT_TIMEOUT = 2.0
+
 
 class ImageUploadWidget(QWidget):
     """圖片上傳元件"""
@@ -37,6 +43,9 @@ class ImageUploadWidget(QWidget):
         super().__init__(parent)
         self.images: Dict[str, Dict[str, str]] = {}
         self.config_manager = config_manager
+        # 圖片存儲中持有引用的內容鍵，元件銷毀時自動釋放
+        self._stored_keys: List[str] = []
+        weakref.finalize(self, get_image_store().release_all, self._stored_keys)
         self._last_paste_time = 0  # 添加最後貼上時間記錄
         self.resource_manager = get_resource_manager()  # 獲取資源管理器
         self._setup_ui()
@@ -401,6 +410,8 @@ class ImageUploadWidget(QWidget):
                             debug_log(f"刪除臨時文件失敗: {e}")
                 
                 # 清除內存中的圖片數據
+                for image_info in self.images.values():
+                    self._release_stored_image(image_info)
                 self.images.clear()
                 self._refresh_preview()
                 self._update_status()
@@ -482,13 +493,20 @@ class ImageUploadWidget(QWidget):
                         )
                         continue
                 
+                # 存入共享圖片存儲，重複貼上的相同圖片只保留一份
+                entry = get_image_store().put(raw_data)
+                self._stored_keys.append(entry.key)
+
                 image_id = str(uuid.uuid4())
                 self.images[image_id] = {
                     "path": file_path,
-                    "data": raw_data,  # 直接保存原始二進制數據
+                    "data": entry.data,  # 直接保存原始二進制數據
                     "name": os.path.basename(file_path),
-                    "size": file_size
+                    "size": file_size,
+                    "sha256": entry.key
                 }
+                # 上傳時即在背景正規化，提交時直接取用快取結果
+                get_image_normalizer().submit(entry.data, key=entry.key)
                 added_count += 1
                 debug_log(f"圖片添加成功: {os.path.basename(file_path)}")
                 
@@ -558,12 +576,20 @@ class ImageUploadWidget(QWidget):
                     debug_log(f"刪除臨時文件失敗: {e}")
             
             # 從內存中移除圖片數據
+            self._release_stored_image(image_info)
             del self.images[image_id]
             self._refresh_preview()
             self._update_status()
             self.images_changed.emit()
             debug_log(f"已移除圖片: {image_info['name']}")
     
+    def _release_stored_image(self, image_info: dict) -> None:
+        """釋放圖片在共享存儲中的引用"""
+        key = image_info.get("sha256")
+        if key and key in self._stored_keys:
+            self._stored_keys.remove(key)
+            get_image_store().release(key)
+
     def _update_status(self) -> None:
         """更新狀態標籤"""
         count = len(self.images)
@@ -586,10 +612,26 @@ class ImageUploadWidget(QWidget):
             debug_log(f"圖片狀態: {count} 張圖片，總大小: {size_str}")
             
     def get_images_data(self) -> List[dict]:
-        """獲取所有圖片的數據列表"""
+        """獲取所有圖片的數據列表（使用背景正規化後的數據）"""
+        normalizer = get_image_normalizer()
         images_data = []
         for image_info in self.images.values():
-            images_data.append(image_info)
+            image_data = image_info
+            if isinstance(image_info.get("data"), bytes):
+                # 上傳時已提交背景處理，這裡通常直接命中快取；逾時則使用原圖，避免凍結界面
+                normalized = normalizer.normalize(
+                    image_info["data"],
+                    timeout=NORMALIZE_WAIT_TIMEOUT,
+                    key=image_info.get("sha256"),
+                )
+                if normalized.transcoded:
+                    image_data = {
+                        **image_info,
+                        "data": normalized.data,
+                        "name": normalized.rename(image_info.get("name", "image.png")),
+                        "size": normalized.size,
+                    }
+            images_data.append(image_data)
         return images_data
     
     def add_image_data(self, image_data: dict) -> None:
@@ -604,7 +646,13 @@ class ImageUploadWidget(QWidget):
             image_id = str(uuid.uuid4())
             
             # 復制圖片數據
-            self.images[image_id] = image_data.copy()
+            image_info = image_data.copy()
+            if isinstance(image_info["data"], bytes):
+                entry = get_image_store().put(image_info["data"])
+                self._stored_keys.append(entry.key)
+                image_info["data"] = entry.data
+                image_info["sha256"] = entry.key
+            self.images[image_id] = image_info
             
             # 刷新預覽
             self._refresh_preview()
@@ -11,6 +11,7 @@
 版本: v2.5.0
 """
 
+import importlib.util
 import os
 import sys
 import platform
@@ -129,12 +130,8 @@ class ModeSelector:
     def _check_gui_availability(self) -> bool:
         """检查 GUI 是否可用"""
         try:
-            # 检查是否安装了 PySide6
-            try:
-                import PySide6
-                gui_installed = True
-            except ImportError:
-                gui_installed = False
+            # 检查是否安装了 PySide6（只查找模块，不实际导入）
+            gui_installed = importlib.util.find_spec("PySide6") is not None
             
             if not gui_installed:
                 return False
@@ -10,10 +10,174 @@
 版本: v2.5.0
 """
 
-from typing import List, Dict, Any, Optional, Union
+import base64
+from typing import List, Dict, Any, Optional, Union, Iterable
 from dataclasses import dataclass, field
 
 
+# 根据文件扩展名推断 MIME 类型
+_EXTENSION_MIME_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+}
+
+# 图片文件头魔数（magic bytes）与 MIME 类型
+_MAGIC_MIME_TYPES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+
+def detect_image_mime_type(data: bytes) -> Optional[str]:
+    """根据文件头魔数检测图片 MIME 类型，无法识别时返回 None"""
+    if len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    for magic, mime_type in _MAGIC_MIME_TYPES:
+        if data.startswith(magic):
+            return mime_type
+    return None
+
+
+@dataclass
+class ImageRecord:
+    """
+    图片记录
+
+    原始字节只保存一份，base64 编码在首次使用时计算并缓存，
+    保存文件、生成文字摘要和构建 MCP 图片内容时共享同一份编码结果。
+    """
+
+    name: str = "image.png"
+    """图片文件名"""
+
+    data: bytes = b""
+    """原始图片字节"""
+
+    size: int = 0
+    """图片大小（字节），为 0 时使用原始字节长度"""
+
+    path: Optional[str] = None
+    """图片来源路径（GUI 上传时提供）"""
+
+    _base64: Optional[str] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        if not self.size:
+            self.size = len(self.data)
+
+    @classmethod
+    def from_any(cls, img: Any) -> Optional['ImageRecord']:
+        """从图片字典（bytes 或 base64 数据）或 ImageRecord 创建记录"""
+        if isinstance(img, cls):
+            return img
+        if not isinstance(img, dict):
+            return None
+
+        raw = img.get("data")
+        encoded = None
+        if isinstance(raw, (bytes, bytearray, memoryview)):
+            data = bytes(raw)
+        elif isinstance(raw, str) and raw:
+            data = base64.b64decode(raw)
+            # 输入本身就是标准 base64 时直接复用，避免重复编码
+            if len(raw) == cls._encoded_length(len(data)):
+                encoded = raw
+        else:
+            data = b""
+
+        return cls(
+            name=img.get("name") or img.get("filename") or "image.png",
+            data=data,
+            size=img.get("size") or len(data),
+            path=img.get("path"),
+            _base64=encoded,
+        )
+
+    @classmethod
+    def from_list(cls, images: Optional[Iterable[Any]]) -> List['ImageRecord']:
+        """批量转换图片列表，忽略无法识别的项目"""
+        records = []
+        for img in images or []:
+            record = cls.from_any(img)
+            if record is not None:
+                records.append(record)
+        return records
+
+    @staticmethod
+    def _encoded_length(byte_count: int) -> int:
+        """计算 base64 编码后的长度（含填充）"""
+        return 4 * ((byte_count + 2) // 3)
+
+    @property
+    def base64(self) -> str:
+        """完整 base64 编码（首次访问时计算并缓存）"""
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.data).decode("ascii")
+        return self._base64
+
+    @property
+    def base64_length(self) -> int:
+        """完整 base64 编码长度，无需实际编码"""
+        if self._base64 is not None:
+            return len(self._base64)
+        return self._encoded_length(len(self.data))
+
+    def base64_preview(self, length: int = 50) -> str:
+        """base64 编码前 length 个字符，只编码所需的前缀字节"""
+        if self._base64 is not None:
+            return self._base64[:length]
+        # 每 3 个字节对应 4 个字符，前缀字节编码结果即完整编码的前缀
+        prefix_bytes = (length // 4 + 1) * 3
+        return base64.b64encode(self.data[:prefix_bytes]).decode("ascii")[:length]
+
+    @property
+    def mime_type(self) -> str:
+        """MIME 类型：优先按文件头魔数检测，其次按文件名推断，默认 image/png"""
+        detected = detect_image_mime_type(self.data)
+        if detected:
+            return detected
+        lower_name = self.name.lower()
+        for extension, mime_type in _EXTENSION_MIME_TYPES.items():
+            if lower_name.endswith(extension):
+                return mime_type
+        return "image/png"
+
+    @property
+    def image_format(self) -> str:
+        """图片格式（png、jpeg、gif、webp）"""
+        return self.mime_type.split("/", 1)[1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可 JSON 序列化的字典（数据为 base64）"""
+        result: Dict[str, Any] = {
+            "name": self.name,
+            "size": self.size,
+            "data": self.base64,
+            "data_type": "base64",
+        }
+        if self.path:
+            result["path"] = self.path
+        return result
+
+    # 向后兼容：支持旧代码以字典方式读取图片字段
+    def __getitem__(self, key: str) -> Any:
+        if key in ("name", "data", "size", "path"):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+
 @dataclass
 class FeedbackResult:
     """统一的反馈结果数据模型"""
@@ -24,12 +188,15 @@ class FeedbackResult:
     command_logs: str = ""
     """命令执行日志"""
     
-    images: List[Dict[str, Any]] = field(default_factory=list)
-    """上传的图片列表"""
+    images: List[ImageRecord] = field(default_factory=list)
+    """上传的图片列表（接受图片字典，统一转换为 ImageRecord）"""
     
     metadata: Dict[str, Any] = field(default_factory=dict)
     """元数据，包含界面模式、时间戳等信息"""
     
+    def __post_init__(self):
+        self.images = ImageRecord.from_list(self.images)
+    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'FeedbackResult':
         """从字典创建 FeedbackResult 对象"""
@@ -23,7 +23,6 @@ MCP Feedback Enhanced 伺服器主要模組
 重構: 模塊化設計
 """
 
-import base64
 import io
 import json
 import os
@@ -31,17 +30,20 @@ import sys
 from typing import Annotated, Any
 
 from fastmcp import FastMCP
-from fastmcp.utilities.types import Image as MCPImage
-from mcp.types import TextContent
+from mcp.types import ImageContent, TextContent
 from pydantic import Field
 
 # 導入統一的調試功能
 from .debug import server_debug_log as debug_log
+from .models import ImageRecord
 
 # 導入多語系支援
 # 導入錯誤處理框架
 from .utils.error_handler import ErrorHandler, ErrorType
 
+# 導入回饋歸檔
+from .utils.feedback_archive import archive_feedback
+
 # 導入資源管理器
 from .utils.resource_manager import create_temp_file
 
@@ -220,6 +222,9 @@ def save_feedback_to_file(feedback_data: dict, file_path: str | None = None) ->
     """
     將回饋資料儲存到 JSON 文件
 
+    MCP 工具的返回路徑已改用回饋歸檔（utils.feedback_archive），
+    此函數保留用於手動匯出單筆回饋。
+
     Args:
         feedback_data: 回饋資料字典
         file_path: 儲存路徑，若為 None 則自動產生臨時文件
@@ -239,22 +244,11 @@ def save_feedback_to_file(feedback_data: dict, file_path: str | None = None) ->
     # 複製數據以避免修改原始數據
     json_data = feedback_data.copy()
 
-    # 處理圖片數據：將 bytes 轉換為 base64 字符串以便 JSON 序列化
+    # 處理圖片數據：使用 ImageRecord 共享的 base64 編碼以便 JSON 序列化
     if "images" in json_data and isinstance(json_data["images"], list):
-        processed_images = []
-        for img in json_data["images"]:
-            if isinstance(img, dict) and "data" in img:
-                processed_img = img.copy()
-                # 如果 data 是 bytes，轉換為 base64 字符串
-                if isinstance(img["data"], bytes):
-                    processed_img["data"] = base64.b64encode(img["data"]).decode(
-                        "utf-8"
-                    )
-                    processed_img["data_type"] = "base64"
-                processed_images.append(processed_img)
-            else:
-                processed_images.append(img)
-        json_data["images"] = processed_images
+        json_data["images"] = [
+            record.to_dict() for record in ImageRecord.from_list(json_data["images"])
+        ]
 
     # 儲存資料
     with open(file_path, "w", encoding="utf-8") as f:
@@ -286,12 +280,16 @@ def create_feedback_text(feedback_data: dict) -> str:
 
     # 圖片附件概要
     if feedback_data.get("images"):
-        images = feedback_data["images"]
+        images = ImageRecord.from_list(feedback_data["images"])
         text_parts.append(f"=== 圖片附件概要 ===\n用戶提供了 {len(images)} 張圖片：")
 
+        # 檢查是否啟用 Base64 詳細模式（從 UI 設定中獲取）
+        include_full_base64 = feedback_data.get("settings", {}).get(
+            "enable_base64_detail", False
+        )
+
         for i, img in enumerate(images, 1):
-            size = img.get("size", 0)
-            name = img.get("name", "unknown")
+            size = img.size
 
             # 智能單位顯示
             if size < 1024:
@@ -303,49 +301,23 @@ def create_feedback_text(feedback_data: dict) -> str:
                 size_mb = size / (1024 * 1024)
                 size_str = f"{size_mb:.1f} MB"
 
-            img_info = f"  {i}. {name} ({size_str})"
+            img_info = f"  {i}. {img.name} ({size_str})"
 
-            # 為提高兼容性，添加 base64 預覽信息
-            if img.get("data"):
+            # 為提高兼容性，添加 base64 預覽信息（僅編碼預覽所需的前綴）
+            if img.data:
                 try:
-                    if isinstance(img["data"], bytes):
-                        img_base64 = base64.b64encode(img["data"]).decode("utf-8")
-                    elif isinstance(img["data"], str):
-                        img_base64 = img["data"]
-                    else:
-                        img_base64 = None
-
-                    if img_base64:
-                        # 只顯示前50個字符的預覽
-                        preview = (
-                            img_base64[:50] + "..."
-                            if len(img_base64) > 50
-                            else img_base64
-                        )
-                        img_info += f"\n     Base64 預覽: {preview}"
-                        img_info += f"\n     完整 Base64 長度: {len(img_base64)} 字符"
-
-                        # 如果 AI 助手不支援 MCP 圖片，可以提供完整 base64
-                        debug_log(f"圖片 {i} Base64 已準備，長度: {len(img_base64)}")
-
-                        # 檢查是否啟用 Base64 詳細模式（從 UI 設定中獲取）
-                        include_full_base64 = feedback_data.get("settings", {}).get(
-                            "enable_base64_detail", False
-                        )
-
-                        if include_full_base64:
-                            # 根據檔案名推斷 MIME 類型
-                            file_name = img.get("name", "image.png")
-                            if file_name.lower().endswith((".jpg", ".jpeg")):
-                                mime_type = "image/jpeg"
-                            elif file_name.lower().endswith(".gif"):
-                                mime_type = "image/gif"
-                            elif file_name.lower().endswith(".webp"):
-                                mime_type = "image/webp"
-                            else:
-                                mime_type = "image/png"
-
-                            img_info += f"\n     完整 Base64: data:{mime_type};base64,{img_base64}"
+                    base64_length = img.base64_length
+                    preview = img.base64_preview(50)
+                    if base64_length > 50:
+                        preview += "..."
+                    img_info += f"\n     Base64 預覽: {preview}"
+                    img_info += f"\n     完整 Base64 長度: {base64_length} 字符"
+
+                    # 如果 AI 助手不支援 MCP 圖片，可以提供完整 base64
+                    debug_log(f"圖片 {i} Base64 已準備，長度: {base64_length}")
+
+                    if include_full_base64:
+                        img_info += f"\n     完整 Base64: data:{img.mime_type};base64,{img.base64}"
 
                 except Exception as e:
                     debug_log(f"圖片 {i} Base64 處理失敗: {e}")
@@ -360,57 +332,41 @@ def create_feedback_text(feedback_data: dict) -> str:
     return "\n\n".join(text_parts) if text_parts else "用戶未提供任何回饋內容。"
 
 
-def process_images(images_data: list[dict]) -> list[MCPImage]:
+def process_images(images_data: list) -> list[ImageContent]:
     """
-    處理圖片資料，轉換為 MCP 圖片對象
+    處理圖片資料，轉換為 MCP 圖片內容
+
+    圖片以 ImageRecord 表示，直接使用其快取的 base64 編碼，
+    避免與回饋文字、回饋文件重複編碼同一份圖片。
 
     Args:
-        images_data: 圖片資料列表
+        images_data: 圖片資料列表（ImageRecord 或圖片字典）
 
     Returns:
-        List[MCPImage]: MCP 圖片對象列表
+        List[ImageContent]: MCP 圖片內容列表
     """
     mcp_images = []
 
     for i, img in enumerate(images_data, 1):
         try:
-            if not img.get("data"):
-                debug_log(f"圖片 {i} 沒有資料，跳過")
+            record = ImageRecord.from_any(img)
+            if record is None:
+                debug_log(f"圖片 {i} 數據類型不支援: {type(img)}")
                 continue
 
-            # 檢查數據類型並相應處理
-            if isinstance(img["data"], bytes):
-                # 如果是原始 bytes 數據，直接使用
-                image_bytes = img["data"]
-                debug_log(
-                    f"圖片 {i} 使用原始 bytes 數據，大小: {len(image_bytes)} bytes"
-                )
-            elif isinstance(img["data"], str):
-                # 如果是 base64 字符串，進行解碼
-                image_bytes = base64.b64decode(img["data"])
-                debug_log(f"圖片 {i} 從 base64 解碼，大小: {len(image_bytes)} bytes")
-            else:
-                debug_log(f"圖片 {i} 數據類型不支援: {type(img['data'])}")
-                continue
-
-            if len(image_bytes) == 0:
-                debug_log(f"圖片 {i} 數據為空，跳過")
+            if not record.data:
+                debug_log(f"圖片 {i} 沒有資料，跳過")
                 continue
 
-            # 根據文件名推斷格式
-            file_name = img.get("name", "image.png")
-            if file_name.lower().endswith((".jpg", ".jpeg")):
-                image_format = "jpeg"
-            elif file_name.lower().endswith(".gif"):
-                image_format = "gif"
-            else:
-                image_format = "png"  # 默認使用 PNG
-
-            # 創建 MCPImage 對象
-            mcp_image = MCPImage(data=image_bytes, format=image_format)
+            mcp_image = ImageContent(
+                type="image", data=record.base64, mimeType=record.mime_type
+            )
             mcp_images.append(mcp_image)
 
-            debug_log(f"圖片 {i} ({file_name}) 處理成功，格式: {image_format}")
+            debug_log(
+                f"圖片 {i} ({record.name}) 處理成功，格式: {record.image_format}，"
+                f"大小: {len(record.data)} bytes"
+            )
 
         except Exception as e:
             # 使用統一錯誤處理（不影響 JSON RPC）
@@ -460,7 +416,7 @@ async def interactive_feedback(
         timeout: 等待用戶回饋的超時時間（秒），預設為 600 秒（10 分鐘）
 
     Returns:
-        List: 包含 TextContent 和 MCPImage 對象的列表
+        List: 包含 TextContent 和 ImageContent 對象的列表
     """
     # 環境偵測和模式選擇
     try:
@@ -505,7 +461,7 @@ async def interactive_feedback(
             result_dict = {
                 "interactive_feedback": result.feedback_text or "",
                 "command_logs": getattr(result, 'command_logs', ""),
-                "images": result.images or [],
+                "images": ImageRecord.from_list(result.images),
                 "metadata": getattr(result, 'metadata', {})
             }
             debug_log(f"使用界面模式: {result_dict.get('metadata', {}).get('ui_mode', 'unknown')}")
@@ -513,8 +469,8 @@ async def interactive_feedback(
             # 舊的字典格式
             result_dict = result
 
-        # 儲存詳細結果
-        save_feedback_to_file(result_dict)
+        # 歸檔詳細結果（背景批次寫入，不阻塞回應）
+        archive_feedback(result_dict, project_directory)
 
         # 建立回饋項目列表
         feedback_items = []
@@ -554,7 +510,9 @@ async def interactive_feedback(
             if not result:
                 return [TextContent(type="text", text="用戶取消了回饋。")]
 
-            save_feedback_to_file(result)
+            # 圖片只轉換一次，後續儲存、文字摘要與 MCP 圖片共享編碼結果
+            result["images"] = ImageRecord.from_list(result.get("images"))
+            archive_feedback(result, project_directory)
             feedback_items = []
 
             if (
@@ -677,12 +635,51 @@ def get_system_info() -> str:
             "WSLENV": os.getenv("WSLENV"),
             "MCP_UI_MODE": os.getenv("MCP_UI_MODE"),
             "MCP_FORCE_UI_MODE": os.getenv("MCP_FORCE_UI_MODE"),
+            "MCP_WEB_PREWARM": os.getenv("MCP_WEB_PREWARM"),
+            "MCP_WEB_SINGLE_LOOP": os.getenv("MCP_WEB_SINGLE_LOOP"),
+            "MCP_WEB_SESSION_MODE": os.getenv("MCP_WEB_SESSION_MODE"),
+            "MCP_METRICS_FILE": os.getenv("MCP_METRICS_FILE"),
+            "MCP_ALLOC_PROFILER": os.getenv("MCP_ALLOC_PROFILER"),
         },
     }
 
+    # Web UI 啟動指標（預熱模式下包含節省的時間）
+    from .web.prewarm import get_startup_metrics
+
+    system_info["Web UI 啟動指標"] = get_startup_metrics()
+
     return json.dumps(system_info, ensure_ascii=False, indent=2)
 
 
+def start_web_prewarm_if_enabled() -> bool:
+    """
+    預熱模式下在背景預先啟動 Web UI（僅當選擇的界面模式為 Web 時）
+
+    Returns:
+        bool: 是否已啟動預熱
+    """
+    from .web.prewarm import is_prewarm_enabled, start_prewarm
+
+    if not is_prewarm_enabled():
+        return False
+
+    try:
+        from .mode_selector import select_ui_mode
+
+        selected_mode = select_ui_mode(
+            os.getenv("MCP_UI_MODE", "auto"), os.getenv("MCP_FORCE_UI_MODE") or None
+        )
+        if selected_mode != "web":
+            debug_log(f"界面模式為 {selected_mode}，跳過 Web UI 預熱")
+            return False
+
+        start_prewarm()
+        return True
+    except Exception as e:
+        debug_log(f"啟動 Web UI 預熱失敗: {e}")
+        return False
+
+
 # ===== 主程式入口 =====
 def main():
     """主要入口點，用於套件執行"""
@@ -712,6 +709,24 @@ def main():
         debug_log("準備啟動 MCP 伺服器...")
         debug_log("調用 mcp.run()...")
 
+    # 可選：MCP_ALLOC_PROFILER=true 時盡早開始追蹤內存分配
+    from .utils.allocation_profiler import get_allocation_profiler, is_profiler_enabled
+
+    if is_profiler_enabled():
+        get_allocation_profiler()
+
+    # 可選：在背景預熱 Web UI，讓第一次回饋調用只需建立會話
+    start_web_prewarm_if_enabled()
+
+    # 可選：定期將運行指標寫入 MCP_METRICS_FILE（未啟動 Web UI 時也可抓取）
+    from .utils.metrics import start_metrics_file_export
+
+    if start_metrics_file_export():
+        # 確保內存監控與資源管理器已發佈指標
+        from .utils.resource_manager import get_resource_manager
+
+        get_resource_manager()
+
     try:
         # 使用正確的 FastMCP API
         mcp.run()
@@ -6,6 +6,20 @@ MCP Feedback Enhanced 工具模組
 """
 
 from .error_handler import ErrorHandler, ErrorType
+from .feedback_archive import (
+    ArchivePolicy,
+    FeedbackArchive,
+    archive_feedback,
+    get_feedback_archive,
+)
+from .image_pipeline import (
+    ImageNormalizer,
+    ImagePipelineConfig,
+    NormalizedImage,
+    get_image_normalizer,
+    normalize_image,
+)
+from .image_store import ImageStore, StoredImage, get_image_store
 from .resource_manager import (
     ResourceManager,
     cleanup_all_resources,
@@ -17,12 +31,24 @@ from .resource_manager import (
 
 
 __all__ = [
+    "ArchivePolicy",
     "ErrorHandler",
     "ErrorType",
+    "FeedbackArchive",
+    "ImageNormalizer",
+    "ImagePipelineConfig",
+    "ImageStore",
+    "NormalizedImage",
     "ResourceManager",
+    "StoredImage",
+    "archive_feedback",
     "cleanup_all_resources",
     "create_temp_dir",
     "create_temp_file",
+    "get_feedback_archive",
+    "get_image_normalizer",
+    "get_image_store",
     "get_resource_manager",
+    "normalize_image",
     "register_process",
 ]
@@ -0,0 +1,272 @@
+"""
+內存分配分析器
+==============
+
+以 tracemalloc 追蹤內存分配來源，回答「內存增長在哪裡」：
+- 開始/停止追蹤，保留最近幾個快照
+- 按檔案、行號或調用堆疊列出分配最多的位置
+- 比較兩個快照的差異，找出持續增長的分配位置
+- 內存監控發出增長或高壓警告時自動拍攝快照
+
+需透過 MCP_ALLOC_PROFILER 啟用：true 在啟動時開始追蹤，
+manual 只開放控制接口，由 /api/debug/alloc 或 CLI 手動開始。
+"""
+
+import itertools
+import os
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any
+
+from ..debug import debug_log
+from .error_handler import ErrorHandler, ErrorType
+from .memory_monitor import get_memory_monitor
+
+
+# 追蹤的調用堆疊深度，可透過 MCP_ALLOC_PROFILER_FRAMES 覆蓋
+DEFAULT_FRAMES = 10
+# 保留的快照數量（每個快照會保存所有追蹤中的分配）
+DEFAULT_MAX_SNAPSHOTS = 4
+# 兩次自動快照的最小間隔（秒）
+AUTO_SNAPSHOT_INTERVAL = 300.0
+# 觸發自動快照的內存警告級別
+AUTO_SNAPSHOT_ALERT_LEVELS = ("growth", "critical", "emergency")
+
+GROUP_BY_CHOICES = ("filename", "lineno", "traceback")
+
+_TRUE_VALUES = ("true", "1", "yes", "on")
+
+# 分析器自身與導入機制的分配不列入統計
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def get_profiler_mode() -> str:
+    """獲取分析器模式（MCP_ALLOC_PROFILER）：on、manual 或 off"""
+    value = os.getenv("MCP_ALLOC_PROFILER", "").strip().lower()
+    if value in _TRUE_VALUES:
+        return "on"
+    if value == "manual":
+        return "manual"
+    return "off"
+
+
+def is_profiler_enabled() -> bool:
+    """是否開放分配分析器的控制接口"""
+    return get_profiler_mode() != "off"
+
+
+def _get_default_frames() -> int:
+    try:
+        return max(1, int(os.getenv("MCP_ALLOC_PROFILER_FRAMES", str(DEFAULT_FRAMES))))
+    except ValueError:
+        return DEFAULT_FRAMES
+
+
+def _describe_traceback(traceback: tracemalloc.Traceback, group_by: str) -> dict:
+    frame = traceback[0]
+    if group_by == "filename":
+        return {"location": frame.filename}
+    if group_by == "lineno":
+        return {"location": f"{frame.filename}:{frame.lineno}"}
+    frames = [f"{f.filename}:{f.lineno}" for f in traceback]
+    return {"location": frames[-1], "traceback": frames}
+
+
+class AllocationProfiler:
+    """基於 tracemalloc 的內存分配分析器"""
+
+    def __init__(self, max_snapshots: int = DEFAULT_MAX_SNAPSHOTS):
+        self.max_snapshots = max(1, max_snapshots)
+        self.frames = _get_default_frames()
+        self._snapshots: OrderedDict[int, dict[str, Any]] = OrderedDict()
+        self._ids = itertools.count(1)
+        self._started_here = False
+        self._last_auto_snapshot = 0.0
+        self._lock = threading.RLock()
+
+    # ===== 控制 =====
+
+    def is_running(self) -> bool:
+        """是否正在追蹤分配"""
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int | None = None) -> dict[str, Any]:
+        """開始追蹤（已在追蹤時不重新開始）"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                self.frames = max(1, frames or self.frames)
+                tracemalloc.start(self.frames)
+                self._started_here = True
+                debug_log(f"分配分析器已開始追蹤（堆疊深度 {self.frames}）")
+            return self.get_status()
+
+    def stop(self) -> dict[str, Any]:
+        """停止追蹤並釋放快照"""
+        with self._lock:
+            if tracemalloc.is_tracing() and self._started_here:
+                tracemalloc.stop()
+                debug_log("分配分析器已停止追蹤")
+            self._started_here = False
+            self._snapshots.clear()
+            return self.get_status()
+
+    def take_snapshot(self, label: str = "", reason: str = "manual") -> dict[str, Any]:
+        """
+        拍攝快照（保留最近 max_snapshots 個）
+
+        Returns:
+            dict: 快照的摘要資訊
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("分配分析器未在追蹤，請先開始追蹤")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            snapshot_id = next(self._ids)
+            self._snapshots[snapshot_id] = {
+                "snapshot": snapshot,
+                "info": {
+                    "id": snapshot_id,
+                    "label": label,
+                    "reason": reason,
+                    "taken_at": datetime.now().isoformat(),
+                    "traced_bytes": current,
+                    "peak_bytes": peak,
+                    "allocations": len(snapshot.traces),
+                },
+            }
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        debug_log(f"分配快照 #{snapshot_id} 已拍攝（{reason}）")
+        return self._snapshots[snapshot_id]["info"]
+
+    # ===== 查詢 =====
+
+    def list_snapshots(self) -> list[dict[str, Any]]:
+        """列出保留中的快照"""
+        with self._lock:
+            return [entry["info"] for entry in self._snapshots.values()]
+
+    def _get_snapshot(self, snapshot_id: int | None) -> tracemalloc.Snapshot:
+        if snapshot_id is None:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("分配分析器未在追蹤，請先開始追蹤")
+            return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        with self._lock:
+            entry = self._snapshots.get(snapshot_id)
+        if entry is None:
+            raise KeyError(f"快照 #{snapshot_id} 不存在")
+        return entry["snapshot"]
+
+    def top(
+        self,
+        snapshot_id: int | None = None,
+        group_by: str = "lineno",
+        limit: int = 20,
+    ) -> list[dict[str, Any]]:
+        """列出分配最多的位置（snapshot_id 為 None 時使用當前狀態）"""
+        if group_by not in GROUP_BY_CHOICES:
+            raise ValueError(f"group_by 必須為 {', '.join(GROUP_BY_CHOICES)}")
+        stats = self._get_snapshot(snapshot_id).statistics(group_by)
+        return [
+            {
+                **_describe_traceback(stat.traceback, group_by),
+                "size": stat.size,
+                "count": stat.count,
+            }
+            for stat in stats[: max(1, limit)]
+        ]
+
+    def diff(
+        self,
+        old_id: int,
+        new_id: int | None = None,
+        group_by: str = "lineno",
+        limit: int = 20,
+    ) -> list[dict[str, Any]]:
+        """比較兩個快照，按增長量列出分配位置（new_id 為 None 時與當前狀態比較）"""
+        if group_by not in GROUP_BY_CHOICES:
+            raise ValueError(f"group_by 必須為 {', '.join(GROUP_BY_CHOICES)}")
+        old = self._get_snapshot(old_id)
+        new = self._get_snapshot(new_id)
+        stats = new.compare_to(old, group_by)
+        return [
+            {
+                **_describe_traceback(stat.traceback, group_by),
+                "size": stat.size,
+                "size_diff": stat.size_diff,
+                "count": stat.count,
+                "count_diff": stat.count_diff,
+            }
+            for stat in stats[: max(1, limit)]
+        ]
+
+    def get_status(self) -> dict[str, Any]:
+        """獲取分析器狀態"""
+        running = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if running else (0, 0)
+        return {
+            "mode": get_profiler_mode(),
+            "running": running,
+            "frames": tracemalloc.get_traceback_limit() if running else self.frames,
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            "snapshots": self.list_snapshots(),
+            "max_snapshots": self.max_snapshots,
+        }
+
+    # ===== 內存警告 =====
+
+    def on_memory_alert(self, alert):
+        """內存警告回調：追蹤中時自動拍攝快照（限制頻率）"""
+        if alert.level not in AUTO_SNAPSHOT_ALERT_LEVELS or not self.is_running():
+            return
+        now = time.monotonic()
+        with self._lock:
+            if (
+                self._last_auto_snapshot
+                and now - self._last_auto_snapshot < AUTO_SNAPSHOT_INTERVAL
+            ):
+                return
+            self._last_auto_snapshot = now
+        try:
+            self.take_snapshot(label=alert.message, reason=f"alert:{alert.level}")
+        except Exception as e:
+            error_id = ErrorHandler.log_error_with_context(
+                e,
+                context={"operation": "內存警告自動快照", "level": alert.level},
+                error_type=ErrorType.SYSTEM,
+            )
+            debug_log(f"內存警告自動快照失敗 [錯誤ID: {error_id}]: {e}")
+
+
+_allocation_profiler: AllocationProfiler | None = None
+_profiler_lock = threading.Lock()
+
+
+def get_allocation_profiler() -> AllocationProfiler:
+    """
+    獲取全域分配分析器實例
+
+    首次調用時連接內存監控的警告回調；MCP_ALLOC_PROFILER=true 時開始追蹤。
+    """
+    global _allocation_profiler
+    if _allocation_profiler is None:
+        with _profiler_lock:
+            if _allocation_profiler is None:
+                profiler = AllocationProfiler()
+                get_memory_monitor().add_alert_callback(profiler.on_memory_alert)
+                if get_profiler_mode() == "on":
+                    profiler.start()
+                _allocation_profiler = profiler
+    return _allocation_profiler
@@ -0,0 +1,250 @@
+"""
+命令日誌緩衝區
+==============
+
+每個會話一個命令日誌緩衝區，限制常駐內存：
+- 內存中以環形緩衝保留最近的輸出行，總位元組數不超過上限
+- 超過上限時建立暫存檔並寫入全部內容，之後新的輸出直接寫入檔案，
+  內存只保留尾部；暫存檔即為完整日誌
+- 依位元組統計內存、磁碟與總量，提供 head/tail/grep 檢視
+- 回饋結果只包含有界的尾部；截斷時附上完整日誌檔案的路徑（尚未溢寫則先寫出），
+  該檔案交由資源管理器追蹤，超過保留時間後自動刪除
+- 命令輸出以任意位置切分的批次到達，LogLineWriter 保留未完成的尾行，
+  只把完整的行寫入緩衝區，命令結束時再寫入剩餘部分
+"""
+
+import os
+import re
+import tempfile
+import threading
+from collections import deque
+from collections.abc import Iterator
+from typing import Any
+
+from ..debug import debug_log
+from .resource_manager import get_resource_manager
+
+
+# 內存中保留的日誌位元組上限（KB），可透過 MCP_COMMAND_LOG_MEMORY_KB 覆蓋
+DEFAULT_MEMORY_LIMIT_KB = 512
+# 回饋結果中包含的日誌尾部位元組上限
+RESULT_TAIL_BYTES = 16 * 1024
+# grep 預設最多返回的結果數
+DEFAULT_GREP_LIMIT = 200
+
+
+def _line_size(line: str) -> int:
+    return len(line.encode("utf-8", errors="replace")) + 1
+
+
+class CommandLogBuffer:
+    """命令日誌環形緩衝區 - 超出內存上限時溢寫到暫存檔"""
+
+    def __init__(self, name: str = "session", memory_limit: int | None = None):
+        if memory_limit is None:
+            memory_limit = (
+                int(
+                    os.getenv("MCP_COMMAND_LOG_MEMORY_KB", str(DEFAULT_MEMORY_LIMIT_KB))
+                )
+                * 1024
+            )
+        self.name = name
+        self.memory_limit = max(1024, memory_limit)
+        self._lines: deque[str] = deque()
+        self._memory_bytes = 0
+        self._total_lines = 0
+        self._total_bytes = 0
+        self._file = None
+        self._path: str | None = None
+        self._keep_file = False
+        self._lock = threading.Lock()
+
+    # ===== 寫入 =====
+
+    def append(self, line: str):
+        """添加一行日誌"""
+        self.extend((line,))
+
+    def extend(self, lines):
+        """添加多行日誌"""
+        with self._lock:
+            for line in lines:
+                size = _line_size(line)
+                self._lines.append(line)
+                self._memory_bytes += size
+                self._total_lines += 1
+                self._total_bytes += size
+                if self._file is not None:
+                    self._file.write(line + "\n")
+
+            if self._memory_bytes > self.memory_limit:
+                if self._file is None:
+                    self._open_file_locked()
+                self._trim_locked()
+
+    def _open_file_locked(self):
+        """建立暫存檔並寫入目前內存中的全部日誌"""
+        fd, self._path = tempfile.mkstemp(
+            prefix=f"mcp-command-log-{self.name}-", suffix=".log"
+        )
+        self._file = os.fdopen(fd, "w", encoding="utf-8", errors="replace")
+        for line in self._lines:
+            self._file.write(line + "\n")
+        debug_log(f"命令日誌寫入暫存檔 {self._path}")
+
+    def _trim_locked(self):
+        """內存只保留尾部（降到上限的一半，減少頻繁修剪）"""
+        target = self.memory_limit // 2
+        while self._lines and self._memory_bytes > target:
+            self._memory_bytes -= _line_size(self._lines.popleft())
+
+    # ===== 檢視 =====
+
+    def _iter_all_locked(self) -> Iterator[str]:
+        if self._file is not None:
+            self._file.flush()
+            with open(self._path, encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    yield line.rstrip("\n")
+        else:
+            yield from self._lines
+
+    def head(self, count: int = 100) -> list[str]:
+        """獲取最前面的 count 行"""
+        with self._lock:
+            result = []
+            for line in self._iter_all_locked():
+                if len(result) >= count:
+                    break
+                result.append(line)
+            return result
+
+    def tail(self, count: int = 100) -> list[str]:
+        """獲取最後的 count 行"""
+        if count <= 0:
+            return []
+        with self._lock:
+            if count <= len(self._lines) or self._file is None:
+                return list(self._lines)[-count:]
+            return list(deque(self._iter_all_locked(), maxlen=count))
+
+    def grep(self, pattern: str, limit: int = DEFAULT_GREP_LIMIT) -> list[dict]:
+        """
+        搜尋符合正則表達式的行
+
+        Returns:
+            list[dict]: {"line": 行號（從 1 開始）, "text": 內容}
+        """
+        regex = re.compile(pattern)
+        matches: list[dict] = []
+        with self._lock:
+            for number, line in enumerate(self._iter_all_locked(), start=1):
+                if regex.search(line):
+                    matches.append({"line": number, "text": line})
+                    if len(matches) >= limit:
+                        break
+        return matches
+
+    def get_result_text(self, max_bytes: int = RESULT_TAIL_BYTES) -> str:
+        """
+        獲取回饋結果用的日誌文字（有界尾部，截斷時附完整日誌路徑）
+
+        被引用的日誌檔案不隨會話清理刪除，改由資源管理器按保留時間清理。
+        """
+        with self._lock:
+            if self._total_bytes <= max_bytes:
+                return "\n".join(self._iter_all_locked())
+
+            tail: list[str] = []
+            size = 0
+            for line in reversed(self._lines):
+                size += _line_size(line)
+                if size > max_bytes and tail:
+                    break
+                tail.append(line)
+            tail.reverse()
+
+            omitted = self._total_lines - len(tail)
+            header = (
+                f"[日誌已截斷：省略前 {omitted} 行，"
+                f"共 {self._total_lines} 行 / {self._total_bytes} bytes"
+            )
+            if self._file is None:
+                # 未超過內存上限的日誌也會被截斷，此時內存中即為完整日誌，寫入檔案
+                self._open_file_locked()
+            self._file.flush()
+            if not self._keep_file:
+                self._keep_file = True
+                get_resource_manager().register_temp_file(self._path)
+            header += f"，完整日誌: {self._path}"
+            return "\n".join([f"{header}]", *tail])
+
+    @property
+    def log_path(self) -> str | None:
+        """完整日誌檔案路徑（尚未溢寫時為 None）"""
+        return self._path
+
+    def __len__(self) -> int:
+        return self._total_lines
+
+    def __bool__(self) -> bool:
+        return self._total_lines > 0
+
+    # ===== 清理 =====
+
+    def clear(self):
+        """清空日誌並刪除暫存檔（已在回饋結果中引用的檔案交由資源管理器清理）"""
+        with self._lock:
+            self._lines.clear()
+            self._memory_bytes = 0
+            self._total_lines = 0
+            self._total_bytes = 0
+            if self._file is not None:
+                try:
+                    self._file.close()
+                    if not self._keep_file:
+                        os.unlink(self._path)
+                except OSError as e:
+                    debug_log(f"刪除命令日誌暫存檔失敗: {e}")
+                self._file = None
+                self._path = None
+                self._keep_file = False
+
+    def get_stats(self) -> dict[str, Any]:
+        """獲取位元組統計"""
+        with self._lock:
+            return {
+                "total_lines": self._total_lines,
+                "total_bytes": self._total_bytes,
+                "memory_lines": len(self._lines),
+                "memory_bytes": self._memory_bytes,
+                "memory_limit": self.memory_limit,
+                "spilled": self._file is not None,
+                "disk_bytes": self._total_bytes if self._file is not None else 0,
+                "log_path": self._path,
+            }
+
+
+class LogLineWriter:
+    """將任意切分的命令輸出組合為完整行後寫入日誌緩衝區（每個命令一個）"""
+
+    def __init__(self, buffer: CommandLogBuffer):
+        self.buffer = buffer
+        self._partial = ""
+
+    def write(self, text: str):
+        """寫入一批輸出，最後一行未以換行結尾時保留到下一批"""
+        lines = (self._partial + text).splitlines(keepends=True)
+        # 結尾的 "\r" 可能是被切開的 "\r\n"，同樣視為未完成
+        if lines and not lines[-1].endswith("\n"):
+            self._partial = lines.pop()
+        else:
+            self._partial = ""
+        if lines:
+            self.buffer.extend(line.rstrip("\r\n") for line in lines)
+
+    def close(self):
+        """命令結束：寫入沒有換行結尾的剩餘輸出"""
+        if self._partial:
+            self.buffer.append(self._partial.rstrip("\r\n"))
+            self._partial = ""
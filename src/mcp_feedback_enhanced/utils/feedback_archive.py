@@ -0,0 +1,628 @@
+"""
+回饋歸檔系統
+============
+
+以僅追加 (append-only) 的 SQLite 資料庫保存每次互動回饋，取代每次調用
+都產生一個 JSON 臨時文件的做法，包括：
+- 圖片以 SHA-256 內容定址的 blob 保存，相同圖片只存一份
+- 依時間戳、專案目錄與界面模式建立索引
+- 背景寫入線程批次提交，不阻塞 MCP 回應
+- 保留策略與壓縮（刪除過期記錄與孤立 blob）
+- 簡單的 Python 查詢 API
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from ..debug import debug_log
+from .error_handler import ErrorHandler, ErrorType
+
+
+# 預設歸檔目錄，可透過 MCP_FEEDBACK_ARCHIVE_DIR 覆蓋
+DEFAULT_ARCHIVE_DIR = Path.home() / ".cache" / "mcp-feedback-enhanced" / "archive"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp REAL NOT NULL,
+    project_directory TEXT NOT NULL DEFAULT '',
+    ui_mode TEXT NOT NULL DEFAULT 'unknown',
+    feedback_text TEXT NOT NULL DEFAULT '',
+    command_logs TEXT NOT NULL DEFAULT '',
+    metadata TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_feedback_timestamp ON feedback (timestamp);
+CREATE INDEX IF NOT EXISTS idx_feedback_project ON feedback (project_directory, timestamp);
+CREATE INDEX IF NOT EXISTS idx_feedback_ui_mode ON feedback (ui_mode, timestamp);
+
+CREATE TABLE IF NOT EXISTS image_blobs (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS feedback_images (
+    feedback_id INTEGER NOT NULL REFERENCES feedback (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    size INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (feedback_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_feedback_images_sha256 ON feedback_images (sha256);
+"""
+
+
+@dataclass
+class ArchivePolicy:
+    """歸檔保留策略配置"""
+
+    max_age_days: float = 30.0  # 記錄最長保留天數（0 表示不限）
+    max_records: int = 5000  # 最多保留記錄數（0 表示不限）
+    batch_size: int = 32  # 單次事務最多寫入的記錄數
+    flush_interval: float = 1.0  # 批次等待時間（秒）
+    compaction_interval: int = 3600  # 自動壓縮間隔（秒）
+
+
+@dataclass
+class ArchivedImage:
+    """歸檔圖片引用"""
+
+    sha256: str
+    name: str
+    size: int
+
+
+@dataclass
+class ArchivedFeedback:
+    """歸檔回饋記錄"""
+
+    id: int
+    timestamp: float
+    project_directory: str
+    ui_mode: str
+    feedback_text: str
+    command_logs: str
+    metadata: dict[str, Any] = field(default_factory=dict)
+    images: list[ArchivedImage] = field(default_factory=list)
+
+
+class FeedbackArchive:
+    """回饋歸檔器 - 背景批次寫入的僅追加存儲"""
+
+    def __init__(
+        self, archive_dir: str | Path | None = None, policy: ArchivePolicy | None = None
+    ):
+        """
+        初始化回饋歸檔器
+
+        Args:
+            archive_dir: 歸檔目錄，None 使用環境變數或預設目錄
+            policy: 保留策略配置
+        """
+        if archive_dir is None:
+            archive_dir = os.getenv("MCP_FEEDBACK_ARCHIVE_DIR") or DEFAULT_ARCHIVE_DIR
+        self.archive_dir = Path(archive_dir)
+        self.db_path = self.archive_dir / "feedback.db"
+        self.policy = policy or ArchivePolicy()
+
+        # 寫入佇列與背景線程
+        self._queue: queue.Queue = queue.Queue()
+        self._writer_thread: threading.Thread | None = None
+        self._writer_lock = threading.Lock()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._closed = False
+        self._last_compaction = 0.0
+
+        # 統計數據
+        self.stats: dict[str, int | float] = {
+            "records_submitted": 0,
+            "records_written": 0,
+            "batches_written": 0,
+            "images_written": 0,
+            "image_blobs_deduplicated": 0,
+            "write_errors": 0,
+            "compactions": 0,
+            "records_compacted": 0,
+            "blobs_compacted": 0,
+        }
+
+        # 目錄與資料表在首次連接時（通常是背景寫入線程）才建立，
+        # 首次提交回饋不必等待磁碟操作
+        atexit.register(self.close)
+        debug_log(f"FeedbackArchive 初始化完成: {self.db_path}")
+
+    def _ensure_schema(self) -> None:
+        """建立歸檔目錄與資料表（只執行一次）"""
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            try:
+                conn.executescript(_SCHEMA)
+            finally:
+                conn.close()
+            self._schema_ready = True
+
+    def _connect(self) -> sqlite3.Connection:
+        """建立資料庫連接（WAL 模式允許讀寫並行）"""
+        self._ensure_schema()
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    # ===== 寫入 =====
+
+    def submit(
+        self,
+        feedback_data: dict[str, Any],
+        project_directory: str = "",
+        ui_mode: str | None = None,
+    ) -> None:
+        """
+        提交回饋到歸檔佇列（非阻塞）
+
+        Args:
+            feedback_data: 回饋資料字典（interactive_feedback、command_logs、images、metadata）
+            project_directory: 專案目錄
+            ui_mode: 界面模式，None 時從 metadata 讀取
+        """
+        if self._closed:
+            debug_log("FeedbackArchive 已關閉，忽略提交")
+            return
+
+        metadata = dict(feedback_data.get("metadata") or {})
+        record = {
+            "timestamp": time.time(),
+            "project_directory": project_directory,
+            "ui_mode": ui_mode or metadata.get("ui_mode") or "unknown",
+            "feedback_text": feedback_data.get("interactive_feedback") or "",
+            "command_logs": feedback_data.get("command_logs")
+            or feedback_data.get("logs")
+            or "",
+            "metadata": metadata,
+            "images": list(feedback_data.get("images") or []),
+        }
+
+        self._queue.put(record)
+        self.stats["records_submitted"] += 1
+        self._ensure_writer()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        等待佇列中的記錄全部寫入
+
+        Args:
+            timeout: 最長等待時間（秒），None 表示不限
+
+        Returns:
+            bool: 是否在時限內完成
+        """
+        done = threading.Event()
+        self._queue.put(done)
+        self._ensure_writer()
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """寫入剩餘記錄並停止背景線程"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer_thread and self._writer_thread.is_alive():
+            self._queue.put(None)
+            self._writer_thread.join(timeout=10)
+        debug_log("FeedbackArchive 已關閉")
+
+    def _ensure_writer(self) -> None:
+        """按需啟動背景寫入線程"""
+        if self._writer_thread and self._writer_thread.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer_thread and self._writer_thread.is_alive():
+                return
+            self._writer_thread = threading.Thread(
+                target=self._writer_loop, name="FeedbackArchive-Writer", daemon=True
+            )
+            self._writer_thread.start()
+
+    def _fail_pending(self) -> None:
+        """無法開啟資料庫時丟棄佇列中的記錄，並喚醒等待 flush 的調用者"""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is not None:
+                self.stats["write_errors"] += 1
+
+    def _writer_loop(self) -> None:
+        """背景寫入主循環：收集一批記錄後在單一事務中寫入"""
+        try:
+            conn = self._connect()
+        except Exception as e:
+            error_id = ErrorHandler.log_error_with_context(
+                e, context={"operation": "開啟回饋歸檔"}, error_type=ErrorType.FILE_IO
+            )
+            debug_log(f"開啟回饋歸檔失敗 [錯誤ID: {error_id}]: {e}")
+            self._fail_pending()
+            return
+        try:
+            # 啟動時先套用保留策略，短生命週期的進程也能定期壓縮
+            self._maybe_compact(conn)
+
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.policy.compaction_interval)
+                except queue.Empty:
+                    self._maybe_compact(conn)
+                    continue
+
+                batch: list[dict[str, Any]] = []
+                waiters: list[threading.Event] = []
+                stop = False
+                deadline = time.monotonic() + self.policy.flush_interval
+
+                while True:
+                    if item is None:
+                        stop = True
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        batch.append(item)
+
+                    # 收到 flush/停止請求時立即寫入，不再等待更多記錄
+                    if stop or waiters or len(batch) >= self.policy.batch_size:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+
+                if batch:
+                    self._write_batch(conn, batch)
+                self._maybe_compact(conn)
+
+                for waiter in waiters:
+                    waiter.set()
+                if stop:
+                    break
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: list[dict]) -> None:
+        """在單一事務中寫入一批記錄"""
+        try:
+            with conn:
+                for record in batch:
+                    cursor = conn.execute(
+                        "INSERT INTO feedback (timestamp, project_directory, ui_mode, "
+                        "feedback_text, command_logs, metadata) VALUES (?, ?, ?, ?, ?, ?)",
+                        (
+                            record["timestamp"],
+                            record["project_directory"],
+                            record["ui_mode"],
+                            record["feedback_text"],
+                            record["command_logs"],
+                            json.dumps(
+                                record["metadata"], ensure_ascii=False, default=str
+                            ),
+                        ),
+                    )
+                    feedback_id = cursor.lastrowid
+                    for position, image in enumerate(record["images"]):
+                        self._write_image(conn, feedback_id, position, image)
+
+            self.stats["records_written"] += len(batch)
+            self.stats["batches_written"] += 1
+            debug_log(f"歸檔寫入 {len(batch)} 筆回饋記錄")
+
+        except Exception as e:
+            self.stats["write_errors"] += 1
+            error_id = ErrorHandler.log_error_with_context(
+                e,
+                context={"operation": "回饋歸檔寫入", "batch_size": len(batch)},
+                error_type=ErrorType.FILE_IO,
+            )
+            debug_log(f"回饋歸檔寫入失敗 [錯誤ID: {error_id}]: {e}")
+
+    def _write_image(
+        self, conn: sqlite3.Connection, feedback_id: int, position: int, image: Any
+    ) -> None:
+        """以內容定址方式寫入圖片 blob 與引用"""
+        from ..models import ImageRecord
+
+        record = ImageRecord.from_any(image)
+        if record is None or not record.data:
+            return
+
+        digest = hashlib.sha256(record.data).hexdigest()
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO image_blobs (sha256, size, data) VALUES (?, ?, ?)",
+            (digest, len(record.data), record.data),
+        )
+        if cursor.rowcount == 0:
+            self.stats["image_blobs_deduplicated"] += 1
+        conn.execute(
+            "INSERT INTO feedback_images (feedback_id, position, sha256, name, size) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (feedback_id, position, digest, record.name, record.size),
+        )
+        self.stats["images_written"] += 1
+
+    # ===== 保留策略與壓縮 =====
+
+    def _maybe_compact(self, conn: sqlite3.Connection) -> None:
+        """按壓縮間隔執行保留策略"""
+        now = time.time()
+        if now - self._last_compaction >= self.policy.compaction_interval:
+            self._compact(conn)
+
+    def compact(self) -> dict[str, int]:
+        """
+        立即執行保留策略：刪除過期或超量記錄並清除孤立 blob
+
+        Returns:
+            Dict[str, int]: 刪除的記錄與 blob 數量
+        """
+        self.flush(timeout=30)
+        conn = self._connect()
+        try:
+            return self._compact(conn)
+        finally:
+            conn.close()
+
+    def _compact(self, conn: sqlite3.Connection) -> dict[str, int]:
+        """執行保留策略"""
+        self._last_compaction = time.time()
+        result = {"records": 0, "blobs": 0}
+
+        try:
+            with conn:
+                if self.policy.max_age_days > 0:
+                    cutoff = time.time() - self.policy.max_age_days * 86400
+                    result["records"] += conn.execute(
+                        "DELETE FROM feedback WHERE timestamp < ?", (cutoff,)
+                    ).rowcount
+
+                if self.policy.max_records > 0:
+                    result["records"] += conn.execute(
+                        "DELETE FROM feedback WHERE id NOT IN "
+                        "(SELECT id FROM feedback ORDER BY id DESC LIMIT ?)",
+                        (self.policy.max_records,),
+                    ).rowcount
+
+                result["blobs"] = conn.execute(
+                    "DELETE FROM image_blobs WHERE sha256 NOT IN "
+                    "(SELECT DISTINCT sha256 FROM feedback_images)"
+                ).rowcount
+
+            if result["records"] or result["blobs"]:
+                # 釋放已刪除 blob 佔用的空間
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                conn.execute("VACUUM")
+
+            self.stats["compactions"] += 1
+            self.stats["records_compacted"] += result["records"]
+            self.stats["blobs_compacted"] += result["blobs"]
+            debug_log(
+                f"歸檔壓縮完成，刪除記錄: {result['records']}，刪除 blob: {result['blobs']}"
+            )
+
+        except Exception as e:
+            error_id = ErrorHandler.log_error_with_context(
+                e, context={"operation": "回饋歸檔壓縮"}, error_type=ErrorType.FILE_IO
+            )
+            debug_log(f"回饋歸檔壓縮失敗 [錯誤ID: {error_id}]: {e}")
+
+        return result
+
+    # ===== 查詢 API =====
+
+    def query(
+        self,
+        project_directory: str | None = None,
+        ui_mode: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        limit: int = 50,
+    ) -> list[ArchivedFeedback]:
+        """
+        查詢歸檔回饋（按時間倒序）
+
+        Args:
+            project_directory: 專案目錄過濾
+            ui_mode: 界面模式過濾
+            since: 起始時間戳（含）
+            until: 結束時間戳（不含）
+            limit: 最多返回數量
+
+        Returns:
+            List[ArchivedFeedback]: 回饋記錄列表
+        """
+        conditions = []
+        params: list[Any] = []
+        if project_directory is not None:
+            conditions.append("project_directory = ?")
+            params.append(project_directory)
+        if ui_mode is not None:
+            conditions.append("ui_mode = ?")
+            params.append(ui_mode)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until)
+
+        sql = (
+            "SELECT id, timestamp, project_directory, ui_mode, feedback_text, "
+            "command_logs, metadata FROM feedback"
+        )
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+            records = [
+                ArchivedFeedback(
+                    id=row[0],
+                    timestamp=row[1],
+                    project_directory=row[2],
+                    ui_mode=row[3],
+                    feedback_text=row[4],
+                    command_logs=row[5],
+                    metadata=json.loads(row[6] or "{}"),
+                )
+                for row in rows
+            ]
+            self._attach_images(conn, records)
+            return records
+        finally:
+            conn.close()
+
+    def get(self, feedback_id: int) -> ArchivedFeedback | None:
+        """根據 ID 獲取單筆歸檔回饋"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT id, timestamp, project_directory, ui_mode, feedback_text, "
+                "command_logs, metadata FROM feedback WHERE id = ?",
+                (feedback_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            record = ArchivedFeedback(
+                id=row[0],
+                timestamp=row[1],
+                project_directory=row[2],
+                ui_mode=row[3],
+                feedback_text=row[4],
+                command_logs=row[5],
+                metadata=json.loads(row[6] or "{}"),
+            )
+            self._attach_images(conn, [record])
+            return record
+        finally:
+            conn.close()
+
+    def get_image_data(self, sha256: str) -> bytes | None:
+        """根據內容雜湊獲取圖片原始數據"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT data FROM image_blobs WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+            return bytes(row[0]) if row else None
+        finally:
+            conn.close()
+
+    def _attach_images(
+        self, conn: sqlite3.Connection, records: list[ArchivedFeedback]
+    ) -> None:
+        """批次載入回饋記錄的圖片引用"""
+        if not records:
+            return
+        by_id = {record.id: record for record in records}
+        # 以 JSON 陣列傳入 ID 列表，查詢語句保持固定
+        rows = conn.execute(
+            "SELECT feedback_id, sha256, name, size FROM feedback_images "
+            "WHERE feedback_id IN (SELECT value FROM json_each(?)) "
+            "ORDER BY feedback_id, position",
+            (json.dumps(list(by_id)),),
+        ).fetchall()
+        for feedback_id, sha256, name, size in rows:
+            by_id[feedback_id].images.append(ArchivedImage(sha256, name, size))
+
+    def get_archive_stats(self) -> dict[str, Any]:
+        """獲取歸檔統計信息"""
+        stats: dict[str, Any] = dict(self.stats)
+        stats["pending_records"] = self._queue.qsize()
+        try:
+            conn = self._connect()
+            try:
+                stats["total_records"] = conn.execute(
+                    "SELECT COUNT(*) FROM feedback"
+                ).fetchone()[0]
+                blob_count, blob_bytes = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM image_blobs"
+                ).fetchone()
+                stats["image_blobs"] = blob_count
+                stats["image_blob_bytes"] = blob_bytes
+            finally:
+                conn.close()
+            stats["database_size"] = (
+                self.db_path.stat().st_size if self.db_path.exists() else 0
+            )
+        except Exception as e:
+            debug_log(f"獲取歸檔統計失敗: {e}")
+        return stats
+
+
+# 全域歸檔器實例
+_feedback_archive: FeedbackArchive | None = None
+_archive_lock = threading.Lock()
+
+
+def is_archive_enabled() -> bool:
+    """檢查是否啟用回饋歸檔（MCP_FEEDBACK_ARCHIVE=false 可關閉）"""
+    return os.getenv("MCP_FEEDBACK_ARCHIVE", "true").lower() not in (
+        "false",
+        "0",
+        "no",
+        "off",
+    )
+
+
+def get_feedback_archive() -> FeedbackArchive:
+    """獲取全域回饋歸檔器實例"""
+    global _feedback_archive
+    if _feedback_archive is None:
+        with _archive_lock:
+            if _feedback_archive is None:
+                _feedback_archive = FeedbackArchive()
+    return _feedback_archive
+
+
+def archive_feedback(
+    feedback_data: dict[str, Any], project_directory: str = ""
+) -> bool:
+    """
+    歸檔回饋的便捷函數（非阻塞，失敗不影響 MCP 回應）
+
+    Returns:
+        bool: 是否已提交到歸檔佇列
+    """
+    if not is_archive_enabled():
+        return False
+    try:
+        get_feedback_archive().submit(feedback_data, project_directory)
+        return True
+    except Exception as e:
+        error_id = ErrorHandler.log_error_with_context(
+            e, context={"operation": "提交回饋歸檔"}, error_type=ErrorType.FILE_IO
+        )
+        debug_log(f"提交回饋歸檔失敗 [錯誤ID: {error_id}]: {e}")
+        return False
@@ -0,0 +1,566 @@
+"""
+圖片正規化管線
+==============
+
+在圖片上傳時（而非提交時）於背景工作池中預先處理圖片：
+- 依文件頭魔數檢測格式，不再依賴副檔名
+- 去除 EXIF、PNG 文字區塊等元數據（保留 EXIF 方向並套用到像素）
+- 預設無損：PNG 重新編碼，未能變小時只在容器層去除元數據；
+  JPEG / WebP 不轉為 PNG，只在容器層去除元數據，輸出不會大於原圖
+- 可選（MCP_IMAGE_MAX_DIMENSION）將長邊縮放到設定的最大尺寸
+- 可選（MCP_IMAGE_FORMAT=auto/jpeg/webp）有損重新編碼
+  （auto 時不透明圖片在 JPEG 與 PNG 中取較小者，有透明通道保持 PNG）
+
+處理結果以內容 SHA-256 為鍵快取，提交時直接取用，不需要等待轉碼；
+快取依位元組預算（MCP_IMAGE_CACHE_MB）淘汰，並向內存監控器回報統計、
+在記憶體壓力時清理。
+圖片處理使用 PySide6 的 QImage，可在無顯示環境（offscreen）下運行；
+PySide6 不可用或解碼失敗時原樣返回圖片。
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from ..debug import debug_log
+from ..models import ImageRecord, detect_image_mime_type
+from .error_handler import ErrorHandler, ErrorType
+from .image_store import content_key
+
+
+# 輸出格式與 MIME 類型、副檔名對照
+_FORMAT_MIME_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
+_MIME_EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/bmp": ".bmp",
+}
+# 無損輸出格式：預設只使用這些格式，不會降低圖片品質
+_LOSSLESS_FORMATS = frozenset({"png"})
+# 有損來源格式：無損模式下不解碼轉為 PNG（只會變大）
+_LOSSY_SOURCE_FORMATS = frozenset({"jpeg", "webp"})
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# PNG 中去除的元數據區塊
+_PNG_METADATA_CHUNKS = frozenset({b"tEXt", b"zTXt", b"iTXt", b"tIME", b"eXIf"})
+
+
+@dataclass
+class ImagePipelineConfig:
+    """圖片正規化配置"""
+
+    enabled: bool = True
+    max_dimension: int = 0  # 長邊最大像素（0 表示不縮放）
+    output_format: str = "png"  # png（無損）/ auto / jpeg / webp
+    jpeg_quality: int = 85  # JPEG / WebP 編碼品質
+    max_workers: int = 2  # 背景工作線程數
+    cache_budget_bytes: int = 32 * 1024 * 1024  # 快取處理結果的位元組上限
+
+    @classmethod
+    def from_env(cls) -> "ImagePipelineConfig":
+        """從環境變數創建配置"""
+        output_format = os.getenv("MCP_IMAGE_FORMAT", "png").lower()
+        if output_format == "jpg":
+            output_format = "jpeg"
+        if output_format != "auto" and output_format not in _FORMAT_MIME_TYPES:
+            output_format = "png"
+        return cls(
+            enabled=os.getenv("MCP_IMAGE_NORMALIZE", "true").lower()
+            not in ("false", "0", "no", "off"),
+            max_dimension=int(os.getenv("MCP_IMAGE_MAX_DIMENSION", "0")),
+            output_format=output_format,
+            jpeg_quality=int(os.getenv("MCP_IMAGE_QUALITY", "85")),
+            max_workers=int(os.getenv("MCP_IMAGE_WORKERS", "2")),
+            cache_budget_bytes=int(os.getenv("MCP_IMAGE_CACHE_MB", "32")) * 1024 * 1024,
+        )
+
+
+@dataclass
+class NormalizedImage:
+    """正規化後的圖片"""
+
+    data: bytes
+    mime_type: str
+    width: int = 0
+    height: int = 0
+    original_size: int = 0
+    original_mime_type: str | None = None
+    resized: bool = False
+    transcoded: bool = False
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    def rename(self, name: str) -> str:
+        """依輸出格式調整檔名副檔名"""
+        extension = _MIME_EXTENSIONS.get(self.mime_type)
+        if (
+            not self.transcoded
+            or not extension
+            or self.mime_type == self.original_mime_type
+        ):
+            return name
+        stem, _ = os.path.splitext(name)
+        return f"{stem or 'image'}{extension}"
+
+
+def _passthrough(data: bytes) -> NormalizedImage:
+    """不處理，原樣返回"""
+    mime_type = detect_image_mime_type(data)
+    return NormalizedImage(
+        data=data,
+        mime_type=mime_type or "image/png",
+        original_size=len(data),
+        original_mime_type=mime_type,
+    )
+
+
+def _strip_png_metadata(data: bytes, keep_exif: bool) -> bytes | None:
+    """去除 PNG 的文字、時間與 EXIF 區塊，像素資料原樣保留"""
+    if not data.startswith(_PNG_SIGNATURE):
+        return None
+    output = bytearray(_PNG_SIGNATURE)
+    pos = len(_PNG_SIGNATURE)
+    while pos + 12 <= len(data):
+        length = int.from_bytes(data[pos : pos + 4], "big")
+        chunk_type = data[pos + 4 : pos + 8]
+        end = pos + 12 + length
+        if end > len(data):
+            return None
+        if chunk_type not in _PNG_METADATA_CHUNKS or (
+            keep_exif and chunk_type == b"eXIf"
+        ):
+            output += data[pos:end]
+        pos = end
+        if chunk_type == b"IEND":
+            return bytes(output)
+    return None
+
+
+def _keep_jpeg_segment(marker: int, segment: bytes, keep_exif: bool) -> bool:
+    """判斷 JPEG 標記段是否保留（解碼所需的段與色彩設定檔）"""
+    if marker == 0xFE:  # COM 註釋
+        return False
+    if marker == 0xE1:  # APP1：EXIF / XMP
+        return keep_exif and segment[4:10] == b"Exif\x00\x00"
+    if marker == 0xE2:  # APP2：只保留 ICC 色彩設定檔
+        return segment[4:16] == b"ICC_PROFILE\x00"
+    # APP0（JFIF）與 APP14（Adobe 色彩轉換）影響解碼，其他 APPn 為元數據
+    return not (0xE3 <= marker <= 0xED or marker == 0xEF)
+
+
+def _strip_jpeg_metadata(data: bytes, keep_exif: bool) -> bytes | None:
+    """去除 JPEG 的 EXIF、XMP、IPTC 與註釋段，壓縮資料原樣保留"""
+    if not data.startswith(b"\xff\xd8"):
+        return None
+    output = bytearray(b"\xff\xd8")
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # 填充位元組
+            pos += 1
+            continue
+        if marker == 0xDA:  # SOS：之後為壓縮資料
+            output += data[pos:]
+            return bytes(output)
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # 無長度的標記
+            output += data[pos : pos + 2]
+            pos += 2
+            continue
+        end = pos + 2 + int.from_bytes(data[pos + 2 : pos + 4], "big")
+        if end > len(data):
+            return None
+        segment = data[pos:end]
+        if _keep_jpeg_segment(marker, segment, keep_exif):
+            output += segment
+        pos = end
+    return None
+
+
+def strip_image_metadata(
+    data: bytes, mime_type: str | None, keep_exif: bool = False
+) -> bytes | None:
+    """
+    在容器層去除元數據，不重新編碼像素（無損）
+
+    Args:
+        data: 原始圖片字節
+        mime_type: 圖片 MIME 類型
+        keep_exif: 是否保留 EXIF（圖片依賴 EXIF 方向時需要保留）
+
+    Returns:
+        bytes | None: 去除元數據後的圖片；不支援的格式或解析失敗時為 None
+    """
+    if mime_type == "image/png":
+        return _strip_png_metadata(data, keep_exif)
+    if mime_type == "image/jpeg":
+        return _strip_jpeg_metadata(data, keep_exif)
+    return None
+
+
+def _stripped_original(
+    data: bytes, mime_type: str | None, stripped: bytes | None, width: int, height: int
+) -> NormalizedImage:
+    """無損模式下保留原格式，只去除元數據（無法去除時原樣返回）"""
+    if stripped is None or len(stripped) >= len(data):
+        normalized = _passthrough(data)
+        normalized.width, normalized.height = width, height
+        return normalized
+    return NormalizedImage(
+        data=stripped,
+        mime_type=mime_type or "image/png",
+        width=width,
+        height=height,
+        original_size=len(data),
+        original_mime_type=mime_type,
+        transcoded=True,
+    )
+
+
+def _load_qt_image_classes():
+    """延遲導入 QImage 相關類別，PySide6 不可用時返回 None"""
+    try:
+        from PySide6.QtCore import QBuffer, QByteArray, QIODevice, Qt
+        from PySide6.QtGui import QImage, QImageIOHandler, QImageReader
+
+        return QBuffer, QByteArray, QIODevice, Qt, QImage, QImageIOHandler, QImageReader
+    except ImportError:
+        return None
+
+
+def normalize_image(
+    data: bytes, config: ImagePipelineConfig | None = None
+) -> NormalizedImage:
+    """
+    正規化單張圖片（同步執行，可在工作線程中調用）
+
+    Args:
+        data: 原始圖片字節
+        config: 正規化配置
+
+    Returns:
+        NormalizedImage: 處理結果；無法處理時為原樣返回的圖片
+    """
+    config = config or ImagePipelineConfig()
+    original_mime_type = detect_image_mime_type(data)
+
+    if not config.enabled or not data:
+        return _passthrough(data)
+
+    qt_classes = _load_qt_image_classes()
+    if qt_classes is None:
+        return _passthrough(data)
+    QBuffer, QByteArray, QIODevice, Qt, QImage, QImageIOHandler, QImageReader = (
+        qt_classes
+    )
+
+    source = QByteArray(data)
+    source_buffer = QBuffer(source)
+    source_buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+    reader = QImageReader(source_buffer)
+    # 套用 EXIF 方向，之後元數據會被丟棄
+    reader.setAutoTransform(True)
+
+    # 動畫 GIF 轉碼會只剩第一幀，保持原樣
+    if reader.supportsAnimation() and reader.imageCount() > 1:
+        return _passthrough(data)
+
+    source_format = (original_mime_type or "").split("/")[-1]
+    lossless = config.output_format in _LOSSLESS_FORMATS
+    source_size = reader.size()
+    needs_resize = config.max_dimension > 0 and (
+        max(source_size.width(), source_size.height()) > config.max_dimension
+    )
+    # 保留原格式時，依賴 EXIF 方向的圖片必須保留 EXIF 才能正確顯示
+    keep_exif = (
+        reader.transformation() != QImageIOHandler.Transformation.TransformationNone
+    )
+
+    if lossless and not needs_resize and source_format in _LOSSY_SOURCE_FORMATS:
+        # 有損來源轉為 PNG 只會變大，無損模式只在容器層去除元數據
+        source_buffer.close()
+        return _stripped_original(
+            data,
+            original_mime_type,
+            strip_image_metadata(data, original_mime_type, keep_exif),
+            source_size.width(),
+            source_size.height(),
+        )
+
+    image = reader.read()
+    source_buffer.close()
+    if image.isNull():
+        debug_log(f"圖片解碼失敗，保持原樣: {reader.errorString()}")
+        return _passthrough(data)
+
+    resized = False
+    if config.max_dimension > 0 and (
+        max(image.width(), image.height()) > config.max_dimension
+    ):
+        image = image.scaled(
+            config.max_dimension,
+            config.max_dimension,
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation,
+        )
+        resized = True
+
+    # 以像素重建圖片，丟棄 QImage 保留的文字元數據
+    image = QImage(
+        image.constBits(),
+        image.width(),
+        image.height(),
+        image.bytesPerLine(),
+        image.format(),
+    ).copy()
+
+    def encode(image_format: str) -> bytes:
+        output = QByteArray()
+        buffer = QBuffer(output)
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        quality = -1 if image_format == "png" else config.jpeg_quality
+        ok = image.save(buffer, image_format.upper(), quality)
+        buffer.close()
+        return bytes(output.data()) if ok else b""
+
+    output_format = config.output_format
+    if output_format == "auto":
+        output_format = "png" if image.hasAlphaChannel() else "jpeg"
+    if output_format == "jpeg" and image.hasAlphaChannel():
+        image = image.convertToFormat(QImage.Format.Format_RGB32)
+
+    encoded = encode(output_format)
+
+    # auto 模式同時嘗試無損 PNG（截圖常比 JPEG 更小）；未縮放且未能變小時嘗試原格式，取最小者
+    # 無損模式下只在原格式同樣無損時才嘗試原格式；縮放已改變像素，有損來源可用原格式
+    alternatives = []
+    if config.output_format == "auto":
+        alternatives.append("png")
+    if source_format in _FORMAT_MIME_TYPES and (
+        (resized and source_format in _LOSSY_SOURCE_FORMATS)
+        or (
+            not resized
+            and len(encoded) >= len(data)
+            and (not lossless or source_format in _LOSSLESS_FORMATS)
+        )
+    ):
+        alternatives.append(source_format)
+    for alternative in dict.fromkeys(alternatives):
+        if alternative == output_format:
+            continue
+        candidate = encode(alternative)
+        if candidate and (not encoded or len(candidate) < len(encoded)):
+            encoded, output_format = candidate, alternative
+
+    if lossless and not resized:
+        # 重新編碼未能變小時保留原檔，只去除元數據
+        stripped = strip_image_metadata(data, original_mime_type, keep_exif)
+        if (
+            not encoded
+            or len(encoded) >= len(data)
+            or (stripped is not None and len(stripped) <= len(encoded))
+        ):
+            return _stripped_original(
+                data, original_mime_type, stripped, image.width(), image.height()
+            )
+
+    if not encoded:
+        debug_log(f"圖片重新編碼為 {output_format} 失敗，保持原樣")
+        return _passthrough(data)
+
+    return NormalizedImage(
+        data=encoded,
+        mime_type=_FORMAT_MIME_TYPES[output_format],
+        width=image.width(),
+        height=image.height(),
+        original_size=len(data),
+        original_mime_type=original_mime_type,
+        resized=resized,
+        transcoded=True,
+    )
+
+
+class ImageNormalizer:
+    """圖片正規化器 - 背景工作池 + 內容雜湊快取（位元組預算 LRU）"""
+
+    def __init__(self, config: ImagePipelineConfig | None = None):
+        self.config = config or ImagePipelineConfig.from_env()
+        self._executor: ThreadPoolExecutor | None = None
+        self._cache: OrderedDict[str, Future] = OrderedDict()
+        # 已完成結果佔用的位元組（與原圖共用數據的結果不計）
+        self._cache_sizes: dict[str, int] = {}
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "cache_hits": 0,
+            "processed": 0,
+            "failed": 0,
+            "bytes_in": 0,
+            "bytes_out": 0,
+            "cache_evictions": 0,
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, self.config.max_workers),
+                thread_name_prefix="ImageNormalizer",
+            )
+        return self._executor
+
+    def submit(self, data: bytes, key: str | None = None) -> "Future[NormalizedImage]":
+        """
+        提交圖片到背景工作池（相同內容只處理一次）
+
+        Args:
+            data: 原始圖片字節
+            key: 已計算的內容鍵（可選，避免重複雜湊）
+
+        Returns:
+            Future[NormalizedImage]: 處理結果，永不拋出異常
+        """
+        key = key or content_key(data)
+        with self._lock:
+            future = self._cache.get(key)
+            if future is not None:
+                self._cache.move_to_end(key)
+                self._stats["cache_hits"] += 1
+                return future
+
+            self._stats["submitted"] += 1
+            future = self._get_executor().submit(self._process, data, key)
+            self._cache[key] = future
+        return future
+
+    def normalize(
+        self, data: bytes, timeout: float | None = None, key: str | None = None
+    ) -> NormalizedImage:
+        """同步取得正規化結果，已預先提交的圖片直接命中快取"""
+        try:
+            return self.submit(data, key).result(timeout=timeout)
+        except Exception as e:
+            debug_log(f"等待圖片正規化失敗，使用原圖: {e}")
+            return _passthrough(data)
+
+    def normalize_record(
+        self, record: ImageRecord, timeout: float | None = None
+    ) -> ImageRecord:
+        """正規化 ImageRecord，返回新記錄"""
+        normalized = self.normalize(record.data, timeout)
+        if not normalized.transcoded:
+            return record
+        return ImageRecord(
+            name=normalized.rename(record.name),
+            data=normalized.data,
+            path=record.path,
+        )
+
+    def _process(self, data: bytes, key: str) -> NormalizedImage:
+        """工作線程中處理圖片"""
+        try:
+            normalized = normalize_image(data, self.config)
+            with self._lock:
+                self._stats["processed"] += 1
+                self._stats["bytes_in"] += len(data)
+                self._stats["bytes_out"] += normalized.size
+                if key in self._cache and normalized.data is not data:
+                    self._cache_sizes[key] = normalized.size
+                    self._cache_bytes += normalized.size
+                    self._evict_cache(self.config.cache_budget_bytes)
+            if normalized.transcoded:
+                debug_log(
+                    f"圖片正規化完成: {normalized.original_mime_type} "
+                    f"{len(data)} bytes -> {normalized.mime_type} "
+                    f"{normalized.size} bytes ({normalized.width}x{normalized.height})"
+                )
+            return normalized
+        except Exception as e:
+            with self._lock:
+                self._stats["failed"] += 1
+            error_id = ErrorHandler.log_error_with_context(
+                e, context={"operation": "圖片正規化"}, error_type=ErrorType.SYSTEM
+            )
+            debug_log(f"圖片正規化失敗 [錯誤ID: {error_id}]: {e}")
+            return _passthrough(data)
+
+    def _evict_cache(self, target: int) -> int:
+        """淘汰最舊的快取結果直到不超過目標位元組數（需持有鎖）"""
+        freed = 0
+        while self._cache_bytes > target and self._cache:
+            key, _ = self._cache.popitem(last=False)
+            size = self._cache_sizes.pop(key, 0)
+            self._cache_bytes -= size
+            freed += size
+            self._stats["cache_evictions"] += 1
+        return freed
+
+    def trim(self, force: bool = False) -> int:
+        """
+        記憶體壓力時的清理回調：快取降到預算的一半（force 時全部清空）
+
+        Returns:
+            int: 釋放的位元組數
+        """
+        with self._lock:
+            target = 0 if force else self.config.cache_budget_bytes // 2
+            freed = self._evict_cache(target)
+        if freed:
+            debug_log(f"圖片正規化快取已釋放 {freed} bytes")
+        return freed
+
+    def get_stats(self) -> dict[str, Any]:
+        """獲取處理與快取統計"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached"] = len(self._cache)
+            stats["cache_bytes"] = self._cache_bytes
+        stats["cache_budget_bytes"] = self.config.cache_budget_bytes
+        stats["bytes_saved"] = stats["bytes_in"] - stats["bytes_out"]
+        return stats
+
+    def shutdown(self, wait: bool = False):
+        """關閉工作池並清空快取"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._cache.clear()
+            self._cache_sizes.clear()
+            self._cache_bytes = 0
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# 全域正規化器實例
+_image_normalizer: ImageNormalizer | None = None
+_normalizer_lock = threading.Lock()
+
+
+def get_image_normalizer() -> ImageNormalizer:
+    """獲取全域圖片正規化器實例（並向內存監控器註冊統計與清理回調）"""
+    global _image_normalizer
+    if _image_normalizer is None:
+        with _normalizer_lock:
+            if _image_normalizer is None:
+                normalizer = ImageNormalizer()
+                try:
+                    from .memory_monitor import get_memory_monitor
+
+                    monitor = get_memory_monitor()
+                    monitor.add_stats_provider("image_normalizer", normalizer.get_stats)
+                    monitor.add_cleanup_callback(normalizer.trim)
+                except Exception as e:
+                    debug_log(f"圖片正規化器註冊內存監控失敗: {e}")
+                _image_normalizer = normalizer
+    return _image_normalizer
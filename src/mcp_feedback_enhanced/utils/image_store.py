@@ -0,0 +1,215 @@
+"""
+內容定址圖片存儲
+================
+
+進程內共享的圖片存儲，以 SHA-256 內容雜湊為鍵：
+- 相同圖片（重複附加的截圖、重複貼上的剪貼板圖片）只保存一份
+- 引用計數：Web 會話與 GUI 上傳元件持有引用，釋放後才可被淘汰
+- 位元組預算 LRU：未被引用的圖片在超出預算時依最近使用順序淘汰
+- 去重命中率等統計透過內存監控器的組件統計回報
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from ..debug import debug_log
+
+
+# 預設位元組預算（MB），可透過 MCP_IMAGE_STORE_BUDGET_MB 覆蓋
+DEFAULT_BUDGET_MB = 256
+
+
+def content_key(data: bytes) -> str:
+    """計算圖片內容鍵（SHA-256 十六進位）"""
+    return hashlib.sha256(data).hexdigest()
+
+
+@dataclass
+class StoredImage:
+    """存儲中的圖片條目"""
+
+    key: str
+    data: bytes
+    refcount: int = 0
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+class ImageStore:
+    """內容定址圖片存儲 - 引用計數 + 位元組預算 LRU"""
+
+    def __init__(self, budget_bytes: int | None = None):
+        if budget_bytes is None:
+            budget_bytes = (
+                int(os.getenv("MCP_IMAGE_STORE_BUDGET_MB", str(DEFAULT_BUDGET_MB)))
+                * 1024
+                * 1024
+            )
+        self.budget_bytes = budget_bytes
+        self._entries: dict[str, StoredImage] = {}
+        # 未被引用、可淘汰的條目，依最近使用順序排列
+        self._evictable: OrderedDict[str, StoredImage] = OrderedDict()
+        self._bytes_stored = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "puts": 0,
+            "hits": 0,
+            "misses": 0,
+            "bytes_deduplicated": 0,
+            "evictions": 0,
+            "bytes_evicted": 0,
+        }
+
+    def put(
+        self, data: bytes, key: str | None = None, retain: bool = True
+    ) -> StoredImage:
+        """
+        存入圖片，相同內容返回既有條目
+
+        Args:
+            data: 圖片字節
+            key: 已計算的內容鍵（可選，避免重複雜湊）
+            retain: 是否增加引用計數（之後需調用 release）
+
+        Returns:
+            StoredImage: 共享的圖片條目，其 data 應取代調用方持有的副本
+        """
+        key = key or content_key(data)
+        with self._lock:
+            self._stats["puts"] += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._stats["hits"] += 1
+                self._stats["bytes_deduplicated"] += entry.size
+            else:
+                self._stats["misses"] += 1
+                entry = StoredImage(key=key, data=bytes(data))
+                self._entries[key] = entry
+                self._bytes_stored += entry.size
+
+            if retain:
+                entry.refcount += 1
+                self._evictable.pop(key, None)
+            elif entry.refcount == 0:
+                self._evictable[key] = entry
+                self._evictable.move_to_end(key)
+
+            self._evict_over_budget()
+            return entry
+
+    def get(self, key: str) -> bytes | None:
+        """依內容鍵讀取圖片"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if key in self._evictable:
+                self._evictable.move_to_end(key)
+            return entry.data
+
+    def retain(self, key: str) -> bool:
+        """增加引用計數"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            entry.refcount += 1
+            self._evictable.pop(key, None)
+            return True
+
+    def release(self, key: str):
+        """釋放一個引用，引用歸零後可被淘汰"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.refcount == 0:
+                return
+            entry.refcount -= 1
+            if entry.refcount == 0:
+                self._evictable[key] = entry
+                self._evict_over_budget()
+
+    def release_all(self, keys: list[str]):
+        """批次釋放引用"""
+        for key in keys:
+            self.release(key)
+
+    def _evict_over_budget(self):
+        """淘汰未被引用的最舊條目直到不超出預算（需持有鎖）"""
+        while self._bytes_stored > self.budget_bytes and self._evictable:
+            self._evict_oldest()
+
+    def _evict_oldest(self) -> int:
+        """淘汰一個最舊的未引用條目（需持有鎖）"""
+        key, entry = self._evictable.popitem(last=False)
+        del self._entries[key]
+        self._bytes_stored -= entry.size
+        self._stats["evictions"] += 1
+        self._stats["bytes_evicted"] += entry.size
+        return entry.size
+
+    def trim(self, force: bool = False) -> int:
+        """
+        記憶體壓力時的清理回調：淘汰超出預算（force 時全部）的未引用條目
+
+        Returns:
+            int: 釋放的位元組數
+        """
+        freed = 0
+        with self._lock:
+            target = 0 if force else self.budget_bytes // 2
+            while self._bytes_stored > target and self._evictable:
+                freed += self._evict_oldest()
+        if freed:
+            debug_log(f"圖片存儲已釋放 {freed} bytes")
+        return freed
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get_stats(self) -> dict[str, Any]:
+        """獲取存儲與去重統計"""
+        with self._lock:
+            stats: dict[str, Any] = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["referenced_entries"] = len(self._entries) - len(self._evictable)
+            stats["bytes_stored"] = self._bytes_stored
+        stats["budget_bytes"] = self.budget_bytes
+        stats["hit_rate"] = (
+            round(stats["hits"] / stats["puts"], 4) if stats["puts"] else 0.0
+        )
+        return stats
+
+
+# 全域圖片存儲實例
+_image_store: ImageStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_image_store() -> ImageStore:
+    """獲取全域圖片存儲實例（並向內存監控器註冊統計與清理回調）"""
+    global _image_store
+    if _image_store is None:
+        with _store_lock:
+            if _image_store is None:
+                store = ImageStore()
+                try:
+                    from .memory_monitor import get_memory_monitor
+
+                    monitor = get_memory_monitor()
+                    monitor.add_stats_provider("image_store", store.get_stats)
+                    monitor.add_cleanup_callback(store.trim)
+                except Exception as e:
+                    debug_log(f"圖片存儲註冊內存監控失敗: {e}")
+                _image_store = store
+    return _image_store
@@ -8,10 +8,19 @@
 - 智能清理觸發機制
 - 內存洩漏檢測和趨勢分析
 - 性能優化建議
+
+採樣分為兩層：
+- 快速路徑（每次監控）：gc.get_count()、一次 /proc/self/statm 讀取、
+  一次系統內存讀取，進程內存百分比以快取的系統總量計算
+- 對象普查（len(gc.get_objects())，需遍歷整個 GC 堆）：只在觸發警告
+  或按需查詢時執行
+監控間隔依內存趨勢與壓力自適應調整，並統計監控本身的耗時。
 """
 
 import gc
+import os
 import threading
+import time
 from collections import deque
 from collections.abc import Callable
 from dataclasses import dataclass
@@ -22,6 +31,7 @@ import psutil
 
 from ..debug import debug_log
 from .error_handler import ErrorHandler, ErrorType
+from .metrics import MetricsRegistry, get_metrics_registry
 
 
 @dataclass
@@ -36,14 +46,16 @@ class MemorySnapshot:
     process_rss: int  # 進程常駐內存 (bytes)
     process_vms: int  # 進程虛擬內存 (bytes)
     process_percent: float  # 進程內存使用率 (%)
-    gc_objects: int  # Python 垃圾回收對象數量
+    gc_objects: int  # Python 垃圾回收對象數量（快速採樣時為最近一次普查的結果）
+    gc_counts: tuple[int, int, int] = (0, 0, 0)  # 各代的 gc 計數
+    census: bool = True  # 是否包含對象普查
 
 
 @dataclass
 class MemoryAlert:
     """內存警告數據類"""
 
-    level: str  # warning, critical, emergency
+    level: str  # warning, critical, emergency, growth（進程內存持續增長）
     message: str
     timestamp: datetime
     memory_percent: float
@@ -65,6 +77,38 @@ class MemoryStats:
     memory_trend: str  # 內存趨勢 (stable, increasing, decreasing)
 
 
+_metrics = get_metrics_registry()
+MEMORY_ALERTS = _metrics.counter("mcp_memory_alerts", "內存警告次數", ("level",))
+MEMORY_CLEANUP_TRIGGERS = _metrics.counter(
+    "mcp_memory_cleanup_triggers", "內存監控觸發清理的次數"
+)
+MEMORY_SAMPLE_SECONDS = _metrics.histogram(
+    "mcp_memory_monitor_sample_seconds",
+    "內存監控單次採樣耗時（tier 為 fast 或 census）",
+    ("tier",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0),
+)
+
+# 持續警告時兩次對象普查的最小間隔（秒）
+CENSUS_MIN_INTERVAL = 60.0
+# 內存穩定時監控間隔的增長倍數
+INTERVAL_GROWTH = 1.5
+# 進程內存增長檢測：最近 GROWTH_WINDOW 個快照的後半段平均 RSS
+# 比前半段高出 GROWTH_RATIO 以上時發出 growth 警告
+GROWTH_WINDOW = 10
+GROWTH_RATIO = 0.1
+
+
+def _read_statm(page_size: int) -> tuple[int, int] | None:
+    """從 /proc/self/statm 讀取 (rss, vms) 位元組數，不支援時返回 None"""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            fields = f.read().split()
+        return int(fields[1]) * page_size, int(fields[0]) * page_size
+    except (OSError, IndexError, ValueError):
+        return None
+
+
 class MemoryMonitor:
     """集成式內存監控器"""
 
@@ -75,6 +119,10 @@ class MemoryMonitor:
         emergency_threshold: float = 0.95,
         monitoring_interval: int = 30,
         max_snapshots: int = 1000,
+        *,
+        adaptive_interval: bool = True,
+        min_interval: float | None = None,
+        max_interval: float | None = None,
     ):
         """
         初始化內存監控器
@@ -85,12 +133,25 @@ class MemoryMonitor:
             emergency_threshold: 緊急閾值 (0.0-1.0)
             monitoring_interval: 監控間隔 (秒)
             max_snapshots: 最大快照數量
+            adaptive_interval: 是否依內存趨勢與壓力調整監控間隔
+            min_interval: 內存壓力或上升時的監控間隔（預設為間隔的 1/6，至少 1 秒）
+            max_interval: 內存穩定時的最長監控間隔（預設為間隔的 4 倍）
         """
         self.warning_threshold = warning_threshold
         self.critical_threshold = critical_threshold
         self.emergency_threshold = emergency_threshold
         self.monitoring_interval = monitoring_interval
         self.max_snapshots = max_snapshots
+        self.adaptive_interval = adaptive_interval
+        self.min_interval = (
+            min_interval
+            if min_interval is not None
+            else max(1.0, monitoring_interval / 6)
+        )
+        self.max_interval = (
+            max_interval if max_interval is not None else monitoring_interval * 4
+        )
+        self.current_interval = float(monitoring_interval)
 
         # 監控狀態
         self.is_monitoring = False
@@ -105,6 +166,8 @@ class MemoryMonitor:
         # 回調函數
         self.cleanup_callbacks: list[Callable] = []
         self.alert_callbacks: list[Callable[[MemoryAlert], None]] = []
+        # 組件統計提供者（如圖片存儲的去重命中率）
+        self.stats_providers: dict[str, Callable[[], dict[str, Any]]] = {}
 
         # 統計數據
         self.start_time: datetime | None = None
@@ -112,6 +175,23 @@ class MemoryMonitor:
 
         # 進程信息
         self.process = psutil.Process()
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 0
+        self._statm_supported = self._page_size > 0 and os.path.exists(
+            "/proc/self/statm"
+        )
+        self._system_total = 0  # 快取的系統總內存
+
+        # 採樣成本統計
+        self._last_census_objects = 0
+        self._growth_alerted = False
+        self._last_census_time = 0.0
+        self.sampling_stats: dict[str, float] = {
+            "fast_samples": 0,
+            "fast_seconds": 0.0,
+            "census_samples": 0,
+            "census_seconds": 0.0,
+            "last_census_ms": 0.0,
+        }
 
         debug_log("MemoryMonitor 初始化完成")
 
@@ -129,6 +209,7 @@ class MemoryMonitor:
         try:
             self.is_monitoring = True
             self.start_time = datetime.now()
+            self.current_interval = float(self.monitoring_interval)
             self._stop_event.clear()
 
             self.monitor_thread = threading.Thread(
@@ -181,15 +262,21 @@ class MemoryMonitor:
 
         while not self._stop_event.is_set():
             try:
-                # 收集內存快照
-                snapshot = self._collect_memory_snapshot()
+                # 快速採樣；只在內存壓力下補做對象普查
+                snapshot = self._collect_fast_snapshot()
+                status = self._get_memory_status(snapshot.system_percent / 100.0)
+                if status != "normal" and self._census_due():
+                    snapshot.gc_objects = self._run_census()
+                    snapshot.census = True
                 self.snapshots.append(snapshot)
 
-                # 檢查內存使用情況
+                # 檢查內存使用情況與進程內存增長
                 self._check_memory_usage(snapshot)
+                self._check_process_growth()
 
                 # 等待下次監控
-                if self._stop_event.wait(self.monitoring_interval):
+                self.current_interval = self._next_interval(status)
+                if self._stop_event.wait(self.current_interval):
                     break
 
             except Exception as e:
@@ -206,8 +293,72 @@ class MemoryMonitor:
 
         debug_log("內存監控循環結束")
 
+    def _collect_fast_snapshot(self) -> MemorySnapshot:
+        """快速採樣：不遍歷 GC 堆，進程內存只讀取一次 statm"""
+        started = time.perf_counter()
+        try:
+            system_memory = psutil.virtual_memory()
+            self._system_total = system_memory.total
+
+            process_memory = (
+                _read_statm(self._page_size) if self._statm_supported else None
+            )
+            if process_memory is None:
+                info = self.process.memory_info()
+                process_memory = (info.rss, info.vms)
+            rss, vms = process_memory
+
+            return MemorySnapshot(
+                timestamp=datetime.now(),
+                system_total=system_memory.total,
+                system_available=system_memory.available,
+                system_used=system_memory.used,
+                system_percent=system_memory.percent,
+                process_rss=rss,
+                process_vms=vms,
+                process_percent=rss / self._system_total * 100
+                if self._system_total
+                else 0.0,
+                gc_objects=self._last_census_objects,
+                gc_counts=gc.get_count(),
+                census=False,
+            )
+        finally:
+            elapsed = time.perf_counter() - started
+            self.sampling_stats["fast_samples"] += 1
+            self.sampling_stats["fast_seconds"] += elapsed
+            MEMORY_SAMPLE_SECONDS.labels("fast").observe(elapsed)
+
+    def _census_due(self) -> bool:
+        """持續警告時限制對象普查的頻率"""
+        return time.monotonic() - self._last_census_time >= CENSUS_MIN_INTERVAL
+
+    def _run_census(self) -> int:
+        """對象普查：遍歷整個 GC 堆計算對象數量"""
+        started = time.perf_counter()
+        gc_objects = len(gc.get_objects())
+        elapsed = time.perf_counter() - started
+        self._last_census_objects = gc_objects
+        self._last_census_time = time.monotonic()
+        self.sampling_stats["census_samples"] += 1
+        self.sampling_stats["census_seconds"] += elapsed
+        self.sampling_stats["last_census_ms"] = round(elapsed * 1000, 3)
+        MEMORY_SAMPLE_SECONDS.labels("census").observe(elapsed)
+        return gc_objects
+
+    def _next_interval(self, status: str) -> float:
+        """依內存壓力與趨勢計算下次監控間隔"""
+        if not self.adaptive_interval:
+            return self.monitoring_interval
+        trend = self._analyze_memory_trend()
+        if status != "normal" or trend == "increasing":
+            return self.min_interval
+        if trend == "stable":
+            return min(self.max_interval, self.current_interval * INTERVAL_GROWTH)
+        return float(self.monitoring_interval)
+
     def _collect_memory_snapshot(self) -> MemorySnapshot:
-        """收集內存快照"""
+        """收集完整內存快照（包含對象普查，用於按需查詢）"""
         try:
             # 系統內存信息
             system_memory = psutil.virtual_memory()
@@ -217,7 +368,7 @@ class MemoryMonitor:
             process_percent = self.process.memory_percent()
 
             # Python 垃圾回收信息
-            gc_objects = len(gc.get_objects())
+            gc_objects = self._run_census()
 
             return MemorySnapshot(
                 timestamp=datetime.now(),
@@ -229,6 +380,7 @@ class MemoryMonitor:
                 process_vms=process_memory.vms,
                 process_percent=process_percent,
                 gc_objects=gc_objects,
+                gc_counts=gc.get_count(),
             )
 
         except Exception as e:
@@ -277,10 +429,37 @@ class MemoryMonitor:
             )
             self._handle_alert(alert)
 
+    def _check_process_growth(self):
+        """進程內存持續增長時發出 growth 警告（增長停止前只發出一次）"""
+        if len(self.snapshots) < GROWTH_WINDOW:
+            return
+        recent = list(self.snapshots)[-GROWTH_WINDOW:]
+        half = GROWTH_WINDOW // 2
+        first = sum(s.process_rss for s in recent[:half]) / half
+        second = sum(s.process_rss for s in recent[half:]) / (GROWTH_WINDOW - half)
+        growing = first > 0 and second >= first * (1 + GROWTH_RATIO)
+
+        if growing and not self._growth_alerted:
+            latest = recent[-1]
+            self._handle_alert(
+                MemoryAlert(
+                    level="growth",
+                    message=(
+                        f"進程內存持續增長: {first / 1024**2:.1f}MB → "
+                        f"{second / 1024**2:.1f}MB"
+                    ),
+                    timestamp=latest.timestamp,
+                    memory_percent=latest.process_percent,
+                    recommended_action="使用分配分析器比較快照，找出增長的分配位置",
+                )
+            )
+        self._growth_alerted = growing
+
     def _handle_alert(self, alert: MemoryAlert):
         """處理內存警告"""
         # 添加到警告列表
         self.alerts.append(alert)
+        MEMORY_ALERTS.labels(alert.level).inc()
 
         # 限制警告數量
         if len(self.alerts) > self.max_alerts:
@@ -298,6 +477,7 @@ class MemoryMonitor:
     def _trigger_cleanup(self):
         """觸發清理操作"""
         self.cleanup_triggers_count += 1
+        MEMORY_CLEANUP_TRIGGERS.inc()
         debug_log("觸發內存清理操作")
 
         # 執行 Python 垃圾回收
@@ -359,6 +539,26 @@ class MemoryMonitor:
             self.alert_callbacks.remove(callback)
             debug_log("移除警告回調函數")
 
+    def add_stats_provider(self, name: str, provider: Callable[[], dict[str, Any]]):
+        """註冊組件統計提供者，其結果會出現在導出的內存數據中"""
+        self.stats_providers[name] = provider
+        debug_log(f"添加組件統計提供者: {name}")
+
+    def remove_stats_provider(self, name: str):
+        """移除組件統計提供者"""
+        if self.stats_providers.pop(name, None) is not None:
+            debug_log(f"移除組件統計提供者: {name}")
+
+    def get_component_stats(self) -> dict[str, dict[str, Any]]:
+        """獲取所有已註冊組件的統計"""
+        component_stats = {}
+        for name, provider in list(self.stats_providers.items()):
+            try:
+                component_stats[name] = provider()
+            except Exception as e:
+                debug_log(f"獲取組件統計失敗 ({name}): {e}")
+        return component_stats
+
     def get_current_memory_info(self) -> dict[str, Any]:
         """獲取當前內存信息"""
         try:
@@ -388,6 +588,68 @@ class MemoryMonitor:
             debug_log(f"獲取內存信息失敗 [錯誤ID: {error_id}]: {e}")
             return {}
 
+    def get_sampling_stats(self) -> dict[str, Any]:
+        """獲取監控本身的採樣成本統計"""
+        stats = self.sampling_stats
+        fast_samples = int(stats["fast_samples"])
+        census_samples = int(stats["census_samples"])
+        total_seconds = stats["fast_seconds"] + stats["census_seconds"]
+        duration = (
+            (datetime.now() - self.start_time).total_seconds()
+            if self.start_time
+            else 0.0
+        )
+        return {
+            "adaptive_interval": self.adaptive_interval,
+            "current_interval": round(self.current_interval, 2),
+            "min_interval": self.min_interval,
+            "max_interval": self.max_interval,
+            "fast_samples": fast_samples,
+            "avg_fast_us": round(stats["fast_seconds"] / fast_samples * 1e6, 1)
+            if fast_samples
+            else 0.0,
+            "census_samples": census_samples,
+            "avg_census_ms": round(stats["census_seconds"] / census_samples * 1000, 3)
+            if census_samples
+            else 0.0,
+            "last_census_ms": stats["last_census_ms"],
+            "last_census_objects": self._last_census_objects,
+            "total_sampling_ms": round(total_seconds * 1000, 3),
+            "overhead_percent": round(total_seconds / duration * 100, 4)
+            if duration > 0
+            else 0.0,
+        }
+
+    def publish_metrics(self, registry: MetricsRegistry):
+        """指標收集器：沿用最近一次快照，不額外觸發對象普查"""
+        snapshot = self.snapshots[-1] if self.snapshots else None
+        if snapshot is None:
+            snapshot = self._collect_fast_snapshot()
+
+        registry.gauge("mcp_process_resident_memory_bytes", "進程常駐內存位元組數").set(
+            snapshot.process_rss
+        )
+        registry.gauge("mcp_process_virtual_memory_bytes", "進程虛擬內存位元組數").set(
+            snapshot.process_vms
+        )
+        registry.gauge("mcp_system_memory_usage_percent", "系統內存使用率").set(
+            snapshot.system_percent
+        )
+        registry.gauge("mcp_process_memory_usage_percent", "進程內存使用率").set(
+            snapshot.process_percent
+        )
+        registry.gauge("mcp_python_gc_objects", "最近一次對象普查的對象數量").set(
+            snapshot.gc_objects
+        )
+        gc_pending = registry.gauge(
+            "mcp_python_gc_pending", "各代待回收的 gc 計數", ("generation",)
+        )
+        for generation, count in enumerate(snapshot.gc_counts):
+            gc_pending.labels(generation).set(count)
+        registry.gauge("mcp_memory_monitor_interval_seconds", "目前的內存監控間隔").set(
+            self.current_interval
+        )
+
     def get_memory_stats(self) -> MemoryStats:
         """獲取內存統計數據"""
         if not self.snapshots:
@@ -488,8 +750,10 @@ class MemoryMonitor:
                 "emergency_threshold": self.emergency_threshold,
                 "monitoring_interval": self.monitoring_interval,
             },
+            "sampling": self.get_sampling_stats(),
             "current_info": self.get_current_memory_info(),
             "stats": self.get_memory_stats().__dict__,
+            "components": self.get_component_stats(),
             "recent_alerts": [
                 {
                     "level": alert.level,
@@ -516,4 +780,7 @@ def get_memory_monitor() -> MemoryMonitor:
         with _monitor_lock:
             if _memory_monitor is None:
                 _memory_monitor = MemoryMonitor()
+                get_metrics_registry().register_collector(
+                    "memory", _memory_monitor.publish_metrics
+                )
     return _memory_monitor
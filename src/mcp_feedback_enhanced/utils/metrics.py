@@ -0,0 +1,469 @@
+"""
+統一指標註冊表
+==============
+
+各組件將運行統計發佈到同一個註冊表，並以 OpenMetrics 文字格式輸出：
+- Counter / Gauge / Histogram，均支援標籤
+- 推送式：組件在事件發生時直接更新指標（如清理耗時、壓縮位元組）
+- 拉取式：組件註冊收集器，在輸出前從現有的統計讀取數值（如會話數量）
+- Web UI 在 /metrics 提供；未啟動 Web UI 時可透過 MCP_METRICS_FILE
+  定期將指標寫入檔案
+"""
+
+import atexit
+import math
+import os
+import re
+import tempfile
+import threading
+from collections.abc import Callable, Iterable, Sequence
+from typing import Any
+
+from ..debug import debug_log
+
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# 預設的直方圖邊界（秒）
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# 指標檔案的預設寫入間隔（秒），可透過 MCP_METRICS_INTERVAL 覆蓋
+DEFAULT_EXPORT_INTERVAL = 15.0
+
+_NAME_RE = re.compile(r"^[a-zA-Z_:][a-zA-Z0-9_:]*$")
+_LABEL_RE = re.compile(r"^[a-zA-Z_][a-zA-Z0-9_]*$")
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels: Sequence[tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels)
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    """指標基類：以標籤值元組管理各個時間序列"""
+
+    type_name = ""
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Iterable[str] = (), unit=""
+    ):
+        if not _NAME_RE.match(name):
+            raise ValueError(f"無效的指標名稱: {name}")
+        self.labelnames = tuple(labelnames)
+        for labelname in self.labelnames:
+            if not _LABEL_RE.match(labelname) or labelname == "le":
+                raise ValueError(f"無效的標籤名稱: {labelname}")
+        self.name = name
+        self.documentation = documentation
+        self.unit = unit
+        self._children: dict[tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **labelvalues):
+        """獲取指定標籤值的時間序列"""
+        if labelvalues:
+            if values:
+                raise ValueError("標籤值不能同時使用位置與關鍵字參數")
+            try:
+                values = tuple(labelvalues[name] for name in self.labelnames)
+            except KeyError as e:
+                raise ValueError(f"缺少標籤: {e}") from None
+            if len(labelvalues) != len(self.labelnames):
+                raise ValueError(f"標籤不符: {sorted(labelvalues)}")
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要標籤 {self.labelnames}")
+        key = tuple(str(value) for value in values)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+            return child
+
+    def remove(self, *values):
+        """移除指定標籤值的時間序列"""
+        with self._lock:
+            self._children.pop(tuple(str(value) for value in values), None)
+
+    def clear(self):
+        """移除所有時間序列"""
+        with self._lock:
+            self._children.clear()
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} 需要標籤 {self.labelnames}")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self, key: tuple[str, ...], child) -> list[tuple[str, list, float]]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        """輸出此指標的 OpenMetrics 文字行"""
+        lines = [f"# TYPE {self.name} {self.type_name}"]
+        if self.unit:
+            lines.append(f"# UNIT {self.name} {self.unit}")
+        lines.append(f"# HELP {self.name} {_escape_help(self.documentation)}")
+        with self._lock:
+            children = sorted(self._children.items())
+        for key, child in children:
+            for suffix, extra_labels, value in self._samples(key, child):
+                labels = [*zip(self.labelnames, key, strict=True), *extra_labels]
+                lines.append(
+                    f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}"
+                )
+        return lines
+
+
+class _CounterValue:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        """增加計數（不能為負）"""
+        if amount < 0:
+            raise ValueError("計數器只能增加")
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float):
+        """同步既有的累計值（僅供收集器使用）"""
+        with self._lock:
+            self.value = float(value)
+
+
+class _GaugeValue:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+
+class _HistogramValue:
+    __slots__ = ("_lock", "bounds", "count", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            for i, bound in enumerate(self.bounds):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+
+class Counter(_Metric):
+    """只增不減的計數器（輸出為 <name>_total）"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, *args, **kwargs):
+        if name.endswith("_total"):
+            name = name[: -len("_total")]
+        super().__init__(name, *args, **kwargs)
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def _samples(self, key, child):
+        return [("_total", [], child.value)]
+
+
+class Gauge(_Metric):
+    """可增可減的量測值"""
+
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def _samples(self, key, child):
+        return [("", [], child.value)]
+
+
+class Histogram(_Metric):
+    """累積分佈直方圖（輸出 _bucket / _count / _sum）"""
+
+    type_name = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        bounds = sorted(float(bound) for bound in buckets)
+        if not bounds or bounds[-1] != math.inf:
+            bounds.append(math.inf)
+        self.buckets = tuple(bounds)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def _samples(self, key, child):
+        with child._lock:
+            counts = list(child.counts)
+            count, total = child.count, child.sum
+        samples = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts, strict=True):
+            cumulative += bucket_count
+            le = "+Inf" if math.isinf(bound) else repr(bound)
+            samples.append(("_bucket", [("le", le)], cumulative))
+        samples.append(("_count", [], count))
+        samples.append(("_sum", [], total))
+        return samples
+
+
+class MetricsRegistry:
+    """指標註冊表 - 管理指標與收集器並輸出 OpenMetrics 文字"""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: dict[str, Callable[[MetricsRegistry], None]] = {}
+        self._lock = threading.RLock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, **kwargs):
+        metric = cls(name, documentation, **kwargs)
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is None:
+                self._metrics[metric.name] = metric
+                return metric
+        if type(existing) is not cls or existing.labelnames != metric.labelnames:
+            raise ValueError(f"指標 {metric.name} 已以不同的類型或標籤註冊")
+        return existing
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Iterable[str] = (), unit=""
+    ) -> Counter:
+        """獲取或建立計數器"""
+        return self._get_or_create(
+            Counter, name, documentation, labelnames=labelnames, unit=unit
+        )
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Iterable[str] = (), unit=""
+    ) -> Gauge:
+        """獲取或建立量測值"""
+        return self._get_or_create(
+            Gauge, name, documentation, labelnames=labelnames, unit=unit
+        )
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        unit="",
+    ) -> Histogram:
+        """獲取或建立直方圖"""
+        return self._get_or_create(
+            Histogram,
+            name,
+            documentation,
+            labelnames=labelnames,
+            buckets=buckets,
+            unit=unit,
+        )
+
+    def get(self, name: str) -> _Metric | None:
+        """按名稱獲取已註冊的指標"""
+        with self._lock:
+            return self._metrics.get(name)
+
+    def register_collector(
+        self, name: str, collector: Callable[["MetricsRegistry"], None]
+    ):
+        """註冊收集器，輸出前調用以更新拉取式指標（同名收集器會被取代）"""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def unregister_collector(self, name: str):
+        """移除收集器"""
+        with self._lock:
+            self._collectors.pop(name, None)
+
+    def collect(self):
+        """執行所有收集器（單個收集器失敗不影響其他指標）"""
+        with self._lock:
+            collectors = list(self._collectors.items())
+        for name, collector in collectors:
+            try:
+                collector(self)
+            except Exception as e:
+                debug_log(f"指標收集器執行失敗 ({name}): {e}")
+
+    def render(self) -> str:
+        """執行收集器並輸出 OpenMetrics 文字"""
+        self.collect()
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for _, metric in metrics:
+            lines.extend(metric.render())
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_to_file(self, path: str):
+        """將指標原子地寫入檔案（先寫暫存檔再替換）"""
+        text = self.render()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+
+_metrics_registry: MetricsRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """獲取全域指標註冊表實例"""
+    global _metrics_registry
+    if _metrics_registry is None:
+        with _registry_lock:
+            if _metrics_registry is None:
+                _metrics_registry = MetricsRegistry()
+    return _metrics_registry
+
+
+class MetricsFileExporter:
+    """定期將指標寫入檔案的背景線程（供未啟動 Web UI 的 stdio 模式使用）"""
+
+    def __init__(
+        self,
+        path: str,
+        interval: float = DEFAULT_EXPORT_INTERVAL,
+        registry: MetricsRegistry | None = None,
+    ):
+        self.path = path
+        self.interval = max(1.0, interval)
+        self.registry = registry or get_metrics_registry()
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        """啟動導出線程，並在進程結束時寫入最後一次"""
+        self._thread = threading.Thread(
+            target=self._run, name="MetricsFileExporter", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.stop)
+        debug_log(f"指標檔案導出已啟動: {self.path}（間隔 {self.interval} 秒）")
+
+    def stop(self):
+        """停止導出線程並寫入最後一次"""
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        self.export()
+
+    def export(self):
+        """立即寫入一次"""
+        try:
+            self.registry.write_to_file(self.path)
+        except Exception as e:
+            debug_log(f"寫入指標檔案失敗 ({self.path}): {e}")
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.export()
+            self._stop_event.wait(self.interval)
+
+
+def start_metrics_file_export() -> MetricsFileExporter | None:
+    """
+    依 MCP_METRICS_FILE 啟動指標檔案導出
+
+    Returns:
+        MetricsFileExporter | None: 未設定 MCP_METRICS_FILE 時為 None
+    """
+    path = os.getenv("MCP_METRICS_FILE", "").strip()
+    if not path:
+        return None
+    try:
+        interval = float(
+            os.getenv("MCP_METRICS_INTERVAL", str(DEFAULT_EXPORT_INTERVAL))
+        )
+    except ValueError:
+        interval = DEFAULT_EXPORT_INTERVAL
+    exporter = MetricsFileExporter(os.path.expanduser(path), interval)
+    exporter.start()
+    return exporter
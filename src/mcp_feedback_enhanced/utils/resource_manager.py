@@ -21,6 +21,7 @@ from typing import Any
 
 from ..debug import debug_log
 from .error_handler import ErrorHandler, ErrorType
+from .metrics import MetricsRegistry, get_metrics_registry
 
 
 class ResourceType:
@@ -297,6 +298,18 @@ class ResourceManager:
             )
             debug_log(f"註冊文件句柄失敗 [錯誤ID: {error_id}]: {e}")
 
+    def register_temp_file(self, file_path: str) -> None:
+        """
+        追蹤已存在的臨時文件，超過保留時間後由自動清理刪除
+
+        Args:
+            file_path: 文件路徑
+        """
+        if file_path not in self.temp_files:
+            self.temp_files.add(file_path)
+            self.stats["temp_files_created"] += 1
+            debug_log(f"追蹤臨時文件: {file_path}")
+
     def unregister_temp_file(self, file_path: str) -> bool:
         """
         取消臨時文件追蹤
@@ -652,6 +665,24 @@ class ResourceManager:
             self._cleanup_thread = None
             debug_log("自動清理線程已停止")
 
+    def publish_metrics(self, registry: MetricsRegistry):
+        """指標收集器：追蹤中的資源數量與累計建立數量"""
+        tracked = registry.gauge("mcp_tracked_resources", "追蹤中的資源數量", ("kind",))
+        tracked.labels("temp_files").set(len(self.temp_files))
+        tracked.labels("temp_dirs").set(len(self.temp_dirs))
+        tracked.labels("processes").set(len(self.processes))
+        tracked.labels("file_handles").set(len(self.file_handles))
+
+        created = registry.counter(
+            "mcp_resources_registered", "累計建立或註冊的資源數量", ("kind",)
+        )
+        created.labels("temp_files").set(self.stats["temp_files_created"])
+        created.labels("temp_dirs").set(self.stats["temp_dirs_created"])
+        created.labels("processes").set(self.stats["processes_registered"])
+        registry.counter("mcp_resource_cleanup_runs", "資源清理執行次數").labels().set(
+            self.stats["cleanup_runs"]
+        )
+
     def get_resource_stats(self) -> dict[str, Any]:
         """
         獲取資源統計信息
@@ -687,6 +718,7 @@ class ResourceManager:
                         "memory_status": memory_info.get("status", "unknown"),
                         "memory_cleanup_triggers": memory_stats.cleanup_triggers,
                         "memory_alerts_count": memory_stats.alerts_count,
+                        "memory_components": self.memory_monitor.get_component_stats(),
                     }
                 )
         except Exception as e:
@@ -769,6 +801,9 @@ def get_resource_manager() -> ResourceManager:
     global _resource_manager
     if _resource_manager is None:
         _resource_manager = ResourceManager()
+        get_metrics_registry().register_collector(
+            "resources", _resource_manager.publish_metrics
+        )
     return _resource_manager
 
 
@@ -0,0 +1,277 @@
+"""
+串流統計工具
+============
+
+在請求路徑上以常數時間更新的統計結構，查詢時不需要掃描原始記錄：
+- LogHistogram：對數分桶直方圖（HDR 風格），以固定相對誤差回答
+  p50/p95/p99 等分位數；相同參數的直方圖可直接合併，也支援移除
+  舊值，用於固定大小窗口的分位數
+- SpaceSaving：固定容量的高頻鍵（heavy hitters）統計，鍵的種類再多，
+  佔用也不會超過容量；出現頻率超過 N / capacity 的鍵保證被保留
+"""
+
+import math
+import sys
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from typing import Any
+
+
+# 預設的分位數（百分位）
+DEFAULT_PERCENTILES = (50, 95, 99)
+
+
+class LogHistogram:
+    """
+    對數分桶直方圖
+
+    值 v 落入第 ceil(log(v / min_value) / log(gamma)) 個桶，
+    每個桶的上界是下界的 gamma 倍，取桶的代表值時相對誤差不超過
+    relative_error。不大於 min_value 的值統一落入第 0 個桶。
+    桶以字典稀疏保存，佔用只與實際出現的數量級有關。
+    """
+
+    __slots__ = (
+        "_counts",
+        "_gamma",
+        "_log_gamma",
+        "count",
+        "max",
+        "min",
+        "min_value",
+        "relative_error",
+        "sum",
+    )
+
+    def __init__(self, relative_error: float = 0.01, min_value: float = 1e-6):
+        if not 0 < relative_error < 1:
+            raise ValueError("relative_error 必須介於 0 與 1 之間")
+        if min_value <= 0:
+            raise ValueError("min_value 必須大於 0")
+        self.relative_error = relative_error
+        self.min_value = min_value
+        self._gamma = (1 + relative_error) / (1 - relative_error)
+        self._log_gamma = math.log(self._gamma)
+        self._counts: dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def bucket(self, value: float) -> int:
+        """獲取數值所在的桶（參數相同的直方圖可共用，避免重複計算）"""
+        if value <= self.min_value:
+            return 0
+        return math.ceil(math.log(value / self.min_value) / self._log_gamma)
+
+    def _bucket_value(self, index: int) -> float:
+        if index == 0:
+            return self.min_value
+        # 桶 (min * gamma^(i-1), min * gamma^i] 的代表值，相對誤差對稱
+        return self.min_value * self._gamma**index * 2 / (self._gamma + 1)
+
+    def record(self, value: float, count: int = 1, bucket: int | None = None):
+        """記錄數值（bucket 為已由 bucket() 算好的桶）"""
+        index = self.bucket(value) if bucket is None else bucket
+        self._counts[index] = self._counts.get(index, 0) + count
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def discard(self, value: float, count: int = 1):
+        """
+        移除先前記錄的數值（用於固定大小窗口）
+
+        min / max 保留為歷史邊界，只用於限制分位數的範圍。
+        """
+        index = self.bucket(value)
+        remaining = self._counts.get(index, 0) - count
+        if remaining > 0:
+            self._counts[index] = remaining
+        else:
+            self._counts.pop(index, None)
+        self.count = max(0, self.count - count)
+        self.sum = self.sum - value * count if self.count else 0.0
+
+    def merge(self, other: "LogHistogram"):
+        """合併另一個相同參數的直方圖"""
+        if (
+            other.relative_error != self.relative_error
+            or other.min_value != self.min_value
+        ):
+            raise ValueError("只能合併參數相同的直方圖")
+        for index, count in other._counts.items():
+            self._counts[index] = self._counts.get(index, 0) + count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def clear(self):
+        """清空直方圖"""
+        self._counts.clear()
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def quantile(self, q: float) -> float:
+        """
+        獲取分位數
+
+        Args:
+            q: 0 到 1 之間的分位
+
+        Returns:
+            float: 分位數的估計值，沒有數據時為 0
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(min(max(q, 0.0), 1.0) * self.count))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= rank:
+                return min(max(self._bucket_value(index), self.min), self.max)
+        return self.max
+
+    def percentiles(
+        self, percentiles: tuple[int, ...] = DEFAULT_PERCENTILES
+    ) -> dict[str, float]:
+        """獲取多個百分位數，鍵為 p50、p95 等"""
+        return {f"p{p}": self.quantile(p / 100) for p in percentiles}
+
+    def mean(self) -> float:
+        """獲取平均值"""
+        return self.sum / self.count if self.count else 0.0
+
+    def memory_bytes(self) -> int:
+        """估算佔用的位元組數"""
+        return sys.getsizeof(self) + sys.getsizeof(self._counts)
+
+    def to_dict(self, scale: float = 1.0, digits: int = 3) -> dict[str, Any]:
+        """導出為字典（scale 用於單位換算，如秒轉毫秒）"""
+        data: dict[str, Any] = {"count": self.count}
+        if self.count:
+            data["mean"] = round(self.mean() * scale, digits)
+            data.update(
+                {
+                    name: round(value * scale, digits)
+                    for name, value in self.percentiles().items()
+                }
+            )
+            data["max"] = round(self.max * scale, digits)
+        return data
+
+
+class SpaceSaving:
+    """
+    Space-Saving 高頻鍵統計
+
+    最多追蹤 capacity 個鍵。新鍵在容量已滿時取代計數最小的鍵，
+    並繼承其計數作為誤差上界：count - error 是該鍵被追蹤期間的
+    實際次數，count 是總次數的上界。計數以「計數 → 鍵」分組，
+    記錄與淘汰都是常數時間。
+
+    每個鍵可附帶 factory 產生的資料（如路徑統計），鍵被淘汰時一併釋放。
+    """
+
+    def __init__(self, capacity: int, factory: Callable[[], Any] | None = None):
+        if capacity < 1:
+            raise ValueError("capacity 必須大於 0")
+        self.capacity = capacity
+        self._factory = factory
+        # 鍵 -> [計數, 誤差, 附帶資料]
+        self._entries: dict[Any, list] = {}
+        # 計數 -> 該計數的鍵（按進入順序，淘汰時取最舊者）
+        self._buckets: dict[int, OrderedDict[Any, None]] = {}
+        self._min_count = 0
+        self.total = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def _move(self, key, old_count: int, new_count: int):
+        bucket = self._buckets[old_count]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[old_count]
+            if self._min_count == old_count:
+                self._min_count = new_count
+        self._buckets.setdefault(new_count, OrderedDict())[key] = None
+
+    def record(self, key) -> Any:
+        """
+        記錄一次出現
+
+        Returns:
+            該鍵附帶的資料（新鍵或取代舊鍵時由 factory 重新建立）
+        """
+        self.total += 1
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._move(key, entry[0], entry[0] + 1)
+            entry[0] += 1
+            return entry[2]
+
+        payload = self._factory() if self._factory else None
+        if len(self._entries) < self.capacity:
+            self._entries[key] = [1, 0, payload]
+            self._buckets.setdefault(1, OrderedDict())[key] = None
+            self._min_count = 1
+            return payload
+
+        # 取代計數最小的鍵，繼承其計數作為誤差
+        min_count = self._min_count
+        victim, _ = self._buckets[min_count].popitem(last=False)
+        del self._entries[victim]
+        self.evictions += 1
+        if not self._buckets[min_count]:
+            del self._buckets[min_count]
+            self._min_count = min_count + 1
+        self._entries[key] = [min_count + 1, min_count, payload]
+        self._buckets.setdefault(min_count + 1, OrderedDict())[key] = None
+        return payload
+
+    def get(self, key, default=None) -> Any:
+        """獲取鍵附帶的資料"""
+        entry = self._entries.get(key)
+        return entry[2] if entry is not None else default
+
+    def counts(self, key) -> tuple[int, int]:
+        """獲取鍵的 (計數, 誤差上界)，未追蹤時為 (0, 0)"""
+        entry = self._entries.get(key)
+        return (entry[0], entry[1]) if entry is not None else (0, 0)
+
+    def items(self) -> Iterator[tuple[Any, Any]]:
+        """走訪 (鍵, 附帶資料)"""
+        for key, entry in self._entries.items():
+            yield key, entry[2]
+
+    def top(self, limit: int = 10) -> list[tuple[Any, int, int]]:
+        """獲取計數最高的鍵，返回 (鍵, 計數, 誤差上界)"""
+        ranked = sorted(self._entries.items(), key=lambda item: -item[1][0])
+        return [(key, entry[0], entry[1]) for key, entry in ranked[:limit]]
+
+    def clear(self):
+        """清空統計"""
+        self._entries.clear()
+        self._buckets.clear()
+        self._min_count = 0
+        self.total = 0
+        self.evictions = 0
+
+    def memory_bytes(self, payload_size: Callable[[Any], int] | None = None) -> int:
+        """估算佔用的位元組數（不含鍵本身共用的字串）"""
+        size = sys.getsizeof(self._entries) + sys.getsizeof(self._buckets)
+        size += sum(sys.getsizeof(bucket) for bucket in self._buckets.values())
+        for entry in self._entries.values():
+            size += sys.getsizeof(entry)
+            if payload_size is not None:
+                size += payload_size(entry[2])
+        return size
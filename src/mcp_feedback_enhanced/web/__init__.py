@@ -15,7 +15,26 @@ MCP Feedback Enhanced Web UI 模組
 - 本地和遠端環境適配
 """
 
-from .main import WebUIManager, get_web_ui_manager, launch_web_feedback_ui, stop_web_ui
+import importlib
+
+
+# 延遲導入：fastapi/uvicorn/jinja2 只在首次使用 Web UI 時載入，
+# 讓輕量的 web.prewarm 可以在 MCP 啟動時導入而不拖慢握手
+_LAZY_EXPORTS = (
+    "WebUIManager",
+    "get_web_ui_manager",
+    "launch_web_feedback_ui",
+    "stop_web_ui",
+)
+
+
+def __getattr__(name):
+    """按需從 web.main 導入"""
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(".main", __name__), name)
+    globals()[name] = value
+    return value
 
 
 __all__ = [
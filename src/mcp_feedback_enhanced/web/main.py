@@ -8,29 +8,122 @@ Web UI 主要管理類
 
 import asyncio
 import concurrent.futures
+import contextlib
+import errno
 import os
+import socket
 import threading
 import time
 import uuid
+from collections import deque
+from collections.abc import Callable
 from datetime import datetime
+from enum import Enum
 from pathlib import Path
 from typing import Any
 
 import uvicorn
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
 from ..debug import web_debug_log as debug_log
 from ..i18n import get_i18n_manager
+from ..utils.allocation_profiler import get_allocation_profiler, is_profiler_enabled
 from ..utils.error_handler import ErrorHandler, ErrorType
 from ..utils.memory_monitor import get_memory_monitor
+from ..utils.metrics import MetricsRegistry, get_metrics_registry
 from .models import CleanupReason, SessionStatus, WebFeedbackSession
+from .prewarm import wait_for_prewarm
 from .routes import setup_routes
 from .utils import get_browser_opener
+from .utils.asset_pipeline import DIST_DIRNAME, get_asset_pipeline
 from .utils.compression_config import get_compression_manager
+from .utils.connection_hub import ConnectionHub
+from .utils.deadline_scheduler import get_deadline_scheduler
+from .utils.page_cache import (
+    PageCache,
+    create_template_bytecode_cache,
+    is_page_cache_enabled,
+)
 from .utils.port_manager import PortManager
+from .utils.session_cleanup_manager import record_cleanup_metrics
+from .utils.session_index import IndexedSessions
+
+
+# 等待伺服器就緒與關閉連接的超時時間（秒）
+SERVER_READY_TIMEOUT = 10.0
+SERVER_DRAIN_TIMEOUT = 3
+
+# Windows 的 WSAEADDRINUSE
+WSAEADDRINUSE = 10048
+
+# 會話模式：multi 允許多個 MCP 調用同時等待回饋，single 為單一活躍會話
+SESSION_MODE_MULTI = "multi"
+SESSION_MODE_SINGLE = "single"
+DEFAULT_MAX_SESSIONS = 8
+
+
+class ServerState(Enum):
+    """Web 伺服器生命週期狀態"""
+
+    STOPPED = "stopped"  # 未運行
+    BINDING = "binding"  # 綁定端口並啟動 uvicorn
+    READY = "ready"  # uvicorn 已開始接受連接
+    DRAINING = "draining"  # 正在關閉連接
+
+
+def is_single_loop_enabled() -> bool:
+    """檢查是否在 MCP 事件循環上運行 Web 伺服器（MCP_WEB_SINGLE_LOOP，預設關閉）"""
+    return os.getenv("MCP_WEB_SINGLE_LOOP", "false").lower() in (
+        "true",
+        "1",
+        "yes",
+        "on",
+    )
+
+
+def get_session_mode() -> str:
+    """獲取會話模式（MCP_WEB_SESSION_MODE，預設 multi）"""
+    mode = os.getenv("MCP_WEB_SESSION_MODE", SESSION_MODE_MULTI).lower()
+    if mode not in (SESSION_MODE_MULTI, SESSION_MODE_SINGLE):
+        debug_log(f"MCP_WEB_SESSION_MODE 值無效 ({mode})，使用 {SESSION_MODE_MULTI}")
+        return SESSION_MODE_MULTI
+    return mode
+
+
+def _is_address_in_use(error: OSError) -> bool:
+    """判斷是否為端口已被占用錯誤（Linux/macOS 的 EADDRINUSE 與 Windows 10048）"""
+    return error.errno in (errno.EADDRINUSE, WSAEADDRINUSE) or (
+        getattr(error, "winerror", None) == WSAEADDRINUSE
+    )
+
+
+class _ReadySignalServer(uvicorn.Server):
+    """在 uvicorn 完成啟動（started=True）時發出就緒通知的伺服器"""
+
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        on_started: Callable[["_ReadySignalServer"], None],
+    ):
+        super().__init__(config)
+        self._on_started = on_started
+
+    async def startup(self, sockets=None):
+        try:
+            await super().startup(sockets=sockets)
+        except SystemExit as e:
+            # uvicorn 以 sys.exit 回報啟動失敗，單循環模式下不能讓它結束 MCP 進程
+            raise RuntimeError(f"uvicorn 啟動失敗 (退出碼 {e.code})") from None
+        if self.started:
+            self._on_started(self)
+
+    @contextlib.contextmanager
+    def capture_signals(self):
+        # 信號由 MCP 伺服器處理，uvicorn 不接管（單循環模式下運行在主線程）
+        yield
 
 
 class WebUIManager:
@@ -73,8 +166,6 @@ class WebUIManager:
             self.port = port
         elif preferred_port == 0:
             # 如果偏好端口為 0，使用系統自動分配
-            import socket
-
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
                 s.bind((self.host, 0))
                 self.port = s.getsockname()[1]
@@ -86,15 +177,30 @@ class WebUIManager:
             )
         self.app = FastAPI(title="MCP Feedback Enhanced")
 
+        # WebSocket 連接中心：每個連接有獨立的有界發送佇列
+        self.connection_hub = ConnectionHub()
+
         # 設置壓縮和緩存中間件
         self._setup_compression_middleware()
 
         # 設置內存監控
         self._setup_memory_monitoring()
 
-        # 重構：使用單一活躍會話而非會話字典
+        # 會話管理：current_session 為最新的會話（根路徑顯示），
+        # multi 模式下其他仍在等待回饋的會話同樣保存在 sessions 中並透過會話 ID 路由
         self.current_session: WebFeedbackSession | None = None
-        self.sessions: dict[str, WebFeedbackSession] = {}  # 保留用於向後兼容
+        # 會話字典同步維護淘汰索引，過期與容量清理無需掃描全部會話
+        self.sessions: IndexedSessions = IndexedSessions()
+        self.session_mode = get_session_mode()
+        try:
+            self.max_sessions = max(
+                1, int(os.getenv("MCP_WEB_MAX_SESSIONS", str(DEFAULT_MAX_SESSIONS)))
+            )
+        except ValueError:
+            self.max_sessions = DEFAULT_MAX_SESSIONS
+
+        # 渲染後頁面的 LRU 快取（會話建立與設定保存時失效）
+        self.page_cache = PageCache(enabled=is_page_cache_enabled())
 
         # 全局標籤頁狀態管理 - 跨會話保持
         self.global_active_tabs: dict[str, dict] = {}
@@ -116,6 +222,18 @@ class WebUIManager:
         self.server_thread: threading.Thread | None = None
         self.server_process = None
 
+        # 伺服器生命週期：STOPPED → BINDING → READY → DRAINING → STOPPED
+        self.server_state = ServerState.STOPPED
+        self._server: _ReadySignalServer | None = None
+        self._ready_future: concurrent.futures.Future | None = None
+        # 伺服器所在的事件循環（WebSocket 只能在此循環上收發）
+        self._server_loop: asyncio.AbstractEventLoop | None = None
+        self.server_task: asyncio.Task | None = None
+        self.single_loop = is_single_loop_enabled()
+        self._state_lock = threading.Lock()
+        self._state_entered_at = time.perf_counter()
+        self.lifecycle_transitions: deque[dict[str, Any]] = deque(maxlen=50)
+
         # 初始化標記，用於追蹤異步初始化狀態
         self._initialization_complete = False
         self._initialization_lock = threading.Lock()
@@ -123,6 +241,9 @@ class WebUIManager:
         # 同步初始化基本組件
         self._init_basic_components()
 
+        # 發佈會話與連接指標到 /metrics
+        get_metrics_registry().register_collector("web_ui", self._publish_metrics)
+
         debug_log(f"WebUIManager 基本初始化完成，將在 {self.host}:{self.port} 啟動")
         debug_log("回饋模式: web")
 
@@ -201,8 +322,11 @@ class WebUIManager:
             """壓縮和緩存中間件"""
             response = await call_next(request)
 
-            # 添加緩存頭
-            if not config.should_exclude_path(request.url.path):
+            # 添加緩存頭（路由已自行設定快取策略時保留，如 ETag 重新驗證）
+            if (
+                "cache-control" not in response.headers
+                and not config.should_exclude_path(request.url.path)
+            ):
                 cache_headers = config.get_cache_headers(request.url.path)
                 for key, value in cache_headers.items():
                     response.headers[key] = value
@@ -274,6 +398,31 @@ class WebUIManager:
 
             self.memory_monitor.add_cleanup_callback(session_cleanup_callback)
 
+            # WebSocket 佇列深度與丟棄統計
+            self.memory_monitor.add_stats_provider(
+                "websocket_hub", self.connection_hub.get_stats
+            )
+            # 會話清理期限排程統計
+            self.memory_monitor.add_stats_provider(
+                "session_deadlines", get_deadline_scheduler().get_stats
+            )
+            # 各會話命令日誌的內存與磁碟位元組
+            self.memory_monitor.add_stats_provider(
+                "command_logs", self.get_command_log_stats
+            )
+            # 會話淘汰索引統計（會話字典在內存監控之後才建立）
+            self.memory_monitor.add_stats_provider(
+                "session_index", lambda: self.sessions.index.get_stats()
+            )
+            # 頁面渲染快取的命中率與內存用量
+            self.memory_monitor.add_stats_provider(
+                "page_cache", lambda: self.page_cache.get_stats()
+            )
+
+            # 啟用分配分析器時，內存增長或高壓警告會自動拍攝分配快照
+            if is_profiler_enabled():
+                get_allocation_profiler()
+
             # 確保內存監控已啟動（ResourceManager 可能已經啟動了）
             if not self.memory_monitor.is_monitoring:
                 self.memory_monitor.start_monitoring()
@@ -288,71 +437,169 @@ class WebUIManager:
             )
             debug_log(f"設置 Web UI 內存監控失敗 [錯誤ID: {error_id}]: {e}")
 
+    def _publish_metrics(self, registry: MetricsRegistry):
+        """指標收集器：會話數量、WebSocket 連接與命令日誌位元組"""
+        sessions = registry.gauge("mcp_sessions", "目前保存的會話數量", ("status",))
+        sessions.clear()
+        counts: dict[str, int] = dict.fromkeys(
+            (status.value for status in SessionStatus), 0
+        )
+        for session in list(self.sessions.values()):
+            counts[session.status.value] += 1
+        for status, count in counts.items():
+            sessions.labels(status).set(count)
+
+        hub_stats = self.connection_hub.get_stats()
+        registry.gauge("mcp_websocket_connections", "目前的 WebSocket 連接數").set(
+            hub_stats["connections"]
+        )
+        registry.gauge(
+            "mcp_websocket_queue_depth", "所有 WebSocket 連接待發送的消息數"
+        ).set(hub_stats["total_queue_depth"])
+
+        log_stats = self.get_command_log_stats()
+        command_log_bytes = registry.gauge(
+            "mcp_command_log_bytes", "命令日誌位元組數", ("location",)
+        )
+        command_log_bytes.labels("memory").set(log_stats["memory_bytes"])
+        command_log_bytes.labels("disk").set(log_stats["disk_bytes"])
+
     def _setup_static_files(self):
         """設置靜態文件服務"""
         # Web UI 靜態文件
         web_static_path = Path(__file__).parent / "static"
         if web_static_path.exists():
+            # 雜湊命名的資源包必須在 /static 掛載之前註冊，才不會被 StaticFiles 攔截
+            self._setup_asset_bundles()
             self.app.mount(
                 "/static", StaticFiles(directory=str(web_static_path)), name="static"
             )
         else:
             raise RuntimeError(f"Static files directory not found: {web_static_path}")
 
+    def _setup_asset_bundles(self):
+        """設置資源包服務：直接送出預先壓縮的內容，並可永久快取"""
+        self.asset_pipeline = get_asset_pipeline()
+        cache_control = get_compression_manager().config.get_cache_headers(
+            f"/static/{DIST_DIRNAME}/"
+        )["Cache-Control"]
+
+        async def serve_asset_bundle(request: Request, filename: str) -> Response:
+            asset = self.asset_pipeline.get(filename)
+            if asset is None:
+                return Response(status_code=404)
+            content, encoding = asset.get_variant(
+                request.headers.get("accept-encoding", "")
+            )
+            headers = {"Cache-Control": cache_control}
+            if encoding:
+                # 未壓縮的響應由 GZipMiddleware 加上 Vary
+                headers["Content-Encoding"] = encoding
+                headers["Vary"] = "Accept-Encoding"
+            return Response(
+                content=content, media_type=asset.content_type, headers=headers
+            )
+
+        self.app.add_api_route(
+            f"/static/{DIST_DIRNAME}/{{filename}}",
+            serve_asset_bundle,
+            methods=["GET", "HEAD"],
+            include_in_schema=False,
+        )
+
+        # 在背景載入或建置資源包，首次渲染頁面時不必等待
+        threading.Thread(
+            target=self.asset_pipeline.ensure_loaded,
+            name="AssetPipeline",
+            daemon=True,
+        ).start()
+
     def _setup_templates(self):
         """設置模板引擎"""
         # Web UI 模板
         web_templates_path = Path(__file__).parent / "templates"
         if web_templates_path.exists():
             self.templates = Jinja2Templates(directory=str(web_templates_path))
+            self.templates.env.globals["asset_urls"] = self.asset_pipeline.urls
+            # 位元組碼快取：進程啟動後首次渲染不必重新編譯模板
+            self.templates.env.bytecode_cache = create_template_bytecode_cache()
         else:
             raise RuntimeError(f"Templates directory not found: {web_templates_path}")
 
     def create_session(self, project_directory: str, summary: str) -> str:
-        """創建新的回饋會話 - 重構為單一活躍會話模式，保留標籤頁狀態"""
-        # 保存舊會話的 WebSocket 連接以便發送更新通知
+        """
+        創建新的回饋會話，保留標籤頁狀態
+
+        single 模式下新會話總是取代當前活躍會話；multi 模式下仍在等待回饋的
+        會話保持不變，只有已結束的會話被取代，並行的 MCP 調用互不影響。
+        """
+        if self.session_mode == SESSION_MODE_MULTI:
+            # 超過上限時結束最舊的等待會話，限制同時保留的會話數量
+            waiting = sorted(self.get_waiting_sessions(), key=lambda s: s.created_at)
+            for oldest in waiting[: max(0, len(waiting) - self.max_sessions + 1)]:
+                debug_log(
+                    f"等待回饋的會話已達上限 ({self.max_sessions})，"
+                    f"結束最舊的會話 {oldest.session_id}"
+                )
+                oldest.evict(
+                    f"會話已被結束：同時等待回饋的會話超過上限 ({self.max_sessions})"
+                )
+            predecessor = self.current_session
+            if predecessor and predecessor.is_waiting_for_feedback():
+                predecessor = None
+            retired = [
+                session
+                for session in self.sessions.values()
+                if not session.is_waiting_for_feedback()
+            ]
+        else:
+            predecessor = self.current_session
+            retired = [predecessor] if predecessor else []
+
+        # 保存被取代會話的 WebSocket 連接以便發送更新通知
         old_websocket = None
-        if self.current_session and self.current_session.websocket:
-            old_websocket = self.current_session.websocket
+        if predecessor and predecessor.websocket:
+            old_websocket = predecessor.websocket
             debug_log("保存舊會話的 WebSocket 連接以發送更新通知")
 
-        # 如果已有活躍會話，先保存其標籤頁狀態到全局狀態
-        if self.current_session:
-            debug_log("保存現有會話的標籤頁狀態並清理會話")
+        for old_session in retired:
+            debug_log(f"保存會話 {old_session.session_id} 的標籤頁狀態並清理會話")
             # 保存標籤頁狀態到全局
-            if hasattr(self.current_session, "active_tabs"):
-                self._merge_tabs_to_global(self.current_session.active_tabs)
+            if hasattr(old_session, "active_tabs"):
+                self._merge_tabs_to_global(old_session.active_tabs)
 
             # 同步清理會話資源（但保留 WebSocket 連接）
-            self.current_session._cleanup_sync()
+            old_session._cleanup_sync()
+            if self.session_mode == SESSION_MODE_MULTI:
+                self.sessions.pop(old_session.session_id, None)
 
         session_id = str(uuid.uuid4())
         session = WebFeedbackSession(session_id, project_directory, summary)
+        session.connection_hub = self.connection_hub
+        session.schedule_on_server_loop = self.schedule_on_server_loop
 
         # 將全局標籤頁狀態繼承到新會話
         session.active_tabs = self.global_active_tabs.copy()
 
-        # 設置為當前活躍會話
+        # 設置為當前活躍會話並加入會話字典
         self.current_session = session
-        # 同時保存到字典中以保持向後兼容
         self.sessions[session_id] = session
 
-        debug_log(f"創建新的活躍會話: {session_id}")
+        debug_log(f"創建新的活躍會話: {session_id} (模式: {self.session_mode})")
         debug_log(f"繼承 {len(session.active_tabs)} 個活躍標籤頁")
 
         # 處理會話更新通知
         if old_websocket:
             # 有舊連接，立即發送會話更新通知並轉移連接
             self._old_websocket_for_update = old_websocket
+            self._old_session_id_for_update = predecessor.session_id
             self._new_session_for_update = session
             debug_log("已保存舊 WebSocket 連接，準備發送會話更新通知")
 
             # 立即發送會話更新通知
-            import asyncio
-
             try:
-                # 在後台任務中發送通知並轉移連接
-                asyncio.create_task(self._send_immediate_session_update())
+                # 在伺服器事件循環的後台任務中發送通知並轉移連接
+                self.schedule_on_server_loop(self._send_immediate_session_update())
             except Exception as e:
                 debug_log(f"創建會話更新任務失敗: {e}")
                 # 即使任務創建失敗，也要嘗試直接轉移連接
@@ -364,8 +611,90 @@ class WebUIManager:
             self._pending_session_update = True
             debug_log("沒有舊 WebSocket 連接，設置待更新標記")
 
+        # 舊會話的頁面不再需要（會話列表也已改變）
+        self.page_cache.invalidate()
+        self._notify_sessions_changed()
         return session_id
 
+    def get_waiting_sessions(self) -> list[WebFeedbackSession]:
+        """獲取仍在等待回饋的會話"""
+        return [
+            session
+            for session in self.sessions.values()
+            if session.is_waiting_for_feedback()
+        ]
+
+    def get_session_for_websocket(self, websocket) -> WebFeedbackSession | None:
+        """查找 WebSocket 連接目前所屬的會話（連接可能已轉移到新會話）"""
+        session_id = self.connection_hub.get_session_id(websocket)
+        if session_id and session_id in self.sessions:
+            return self.sessions[session_id]
+        for session in self.sessions.values():
+            if session.websocket is websocket:
+                return session
+        return None
+
+    def get_session_url(self, session: WebFeedbackSession) -> str:
+        """獲取會話頁面 URL（當前會話使用根路徑）"""
+        if self.session_mode == SESSION_MODE_SINGLE or (
+            session is self.current_session and len(self.get_waiting_sessions()) <= 1
+        ):
+            return self.get_server_url()
+        return f"{self.get_server_url()}/session/{session.session_id}"
+
+    def list_sessions(self) -> list[dict[str, Any]]:
+        """列出所有會話（供 UI 顯示與切換）"""
+        return [
+            {
+                "session_id": session.session_id,
+                "project_directory": session.project_directory,
+                "summary": session.summary,
+                "status": session.status.value,
+                "waiting": session.is_waiting_for_feedback(),
+                "is_current": session is self.current_session,
+                "created_at": session.created_at,
+                "url": f"/session/{session.session_id}",
+            }
+            for session in sorted(self.sessions.values(), key=lambda s: s.created_at)
+        ]
+
+    def _notify_sessions_changed(self):
+        """會話列表變更時通知所有已連接的頁面"""
+        if not len(self.connection_hub) and not any(
+            session.websocket for session in self.sessions.values()
+        ):
+            return
+        try:
+            self.schedule_on_server_loop(self._broadcast_sessions_changed())
+        except RuntimeError as e:
+            debug_log(f"無法排程會話列表通知: {e}")
+
+    async def _broadcast_sessions_changed(self):
+        """向每個會話的所有連接發送最新的會話列表"""
+        sessions = self.list_sessions()
+        for session in list(self.sessions.values()):
+            await session.send_message(
+                {
+                    "type": "sessions_changed",
+                    "session_id": session.session_id,
+                    "sessions": sessions,
+                }
+            )
+
+    def get_command_log_stats(self) -> dict[str, Any]:
+        """統計所有會話的命令日誌位元組"""
+        per_session = {
+            session_id: session.command_logs.get_stats()
+            for session_id, session in list(self.sessions.items())
+        }
+        return {
+            "sessions": len(per_session),
+            "memory_bytes": sum(s["memory_bytes"] for s in per_session.values()),
+            "disk_bytes": sum(s["disk_bytes"] for s in per_session.values()),
+            "total_bytes": sum(s["total_bytes"] for s in per_session.values()),
+            "per_session": per_session,
+        }
+
     def get_session(self, session_id: str) -> WebFeedbackSession | None:
         """獲取回饋會話 - 保持向後兼容"""
         return self.sessions.get(session_id)
@@ -387,6 +716,7 @@ class WebUIManager:
                 debug_log("清空當前活躍會話")
 
             debug_log(f"移除回饋會話: {session_id}")
+            self._notify_sessions_changed()
 
     def clear_current_session(self):
         """清空當前活躍會話"""
@@ -437,118 +767,315 @@ class WebUIManager:
 
     async def broadcast_to_active_tabs(self, message: dict):
         """向所有活躍標籤頁廣播消息"""
-        if not self.current_session or not self.current_session.websocket:
+        if not self.current_session or not await self.current_session.send_message(
+            message
+        ):
             debug_log("沒有活躍的 WebSocket 連接，無法廣播消息")
             return
 
+        debug_log(f"已廣播消息到活躍標籤頁: {message.get('type', 'unknown')}")
+
+    def _transition(self, new_state: ServerState):
+        """切換伺服器生命週期狀態並記錄停留時間（需持有 _state_lock）"""
+        now = time.perf_counter()
+        old_state = self.server_state
+        elapsed = now - self._state_entered_at
+        self.server_state = new_state
+        self._state_entered_at = now
+        self.lifecycle_transitions.append(
+            {
+                "from": old_state.value,
+                "to": new_state.value,
+                "at": datetime.now().isoformat(),
+                "elapsed": round(elapsed, 4),
+            }
+        )
+        debug_log(
+            f"伺服器狀態: {old_state.value} → {new_state.value} "
+            f"(在 {old_state.value} 停留 {elapsed:.3f}秒)"
+        )
+
+    def _bind_socket(self) -> socket.socket:
+        """
+        預先綁定監聽 socket，端口被占用時換端口重試（所有平台）
+
+        Returns:
+            socket.socket: 已綁定的 socket，交由 uvicorn 監聽
+        """
+        max_retries = 5
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+
+        for attempt in range(1, max_retries + 1):
+            debug_log(
+                f"嘗試綁定 {self.host}:{self.port} (嘗試 {attempt}/{max_retries})"
+            )
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            if os.name != "nt":
+                # Windows 的 SO_REUSEADDR 允許重複綁定同一端口，不能使用
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.bind((self.host, self.port))
+                return sock
+            except OSError as e:
+                sock.close()
+                if not _is_address_in_use(e) or attempt == max_retries:
+                    raise
+
+            debug_log(f"端口 {self.port} 被占用，使用增強端口管理查找新端口")
+            try:
+                self.port = PortManager.find_free_port_enhanced(
+                    preferred_port=self.port + 1,
+                    auto_cleanup=False,  # 啟動時不自動清理，避免誤殺其他服務
+                    host=self.host,
+                )
+                debug_log(f"找到新的可用端口: {self.port}")
+            except RuntimeError as port_error:
+                # 使用統一錯誤處理
+                error_id = ErrorHandler.log_error_with_context(
+                    port_error,
+                    context={
+                        "operation": "端口查找",
+                        "current_port": self.port,
+                    },
+                    error_type=ErrorType.NETWORK,
+                )
+                debug_log(f"無法找到可用端口 [錯誤ID: {error_id}]: {port_error}")
+                raise
+
+        raise RuntimeError("已達到最大重試次數，無法啟動伺服器")
+
+    def _on_server_started(self, server: "_ReadySignalServer"):
+        """uvicorn 完成啟動（started 已設置）時在伺服器事件循環中調用"""
+        with self._state_lock:
+            self._server_loop = asyncio.get_running_loop()
+            if self.server_state == ServerState.BINDING:
+                self._transition(ServerState.READY)
+            future = self._ready_future
+        if future is not None and not future.done():
+            future.set_result(self.port)
+
+    async def _serve(self, ready_future: concurrent.futures.Future):
+        """綁定端口並在當前事件循環中運行 uvicorn（線程模式與單循環模式共用）"""
+        sock = None
         try:
-            await self.current_session.websocket.send_json(message)
-            debug_log(f"已廣播消息到活躍標籤頁: {message.get('type', 'unknown')}")
+            sock = self._bind_socket()
+
+            config = uvicorn.Config(
+                app=self.app,
+                host=self.host,
+                port=self.port,
+                log_level="warning",
+                access_log=False,
+                timeout_graceful_shutdown=SERVER_DRAIN_TIMEOUT,
+            )
+            server = _ReadySignalServer(config, on_started=self._on_server_started)
+            with self._state_lock:
+                self._server = server
+                # 綁定期間已被要求停止
+                if self.server_state == ServerState.DRAINING:
+                    server.should_exit = True
+
+            # 在服務器啟動的同時進行異步初始化
+            results = await asyncio.gather(
+                server.serve(sockets=[sock]),
+                self._init_async_components(),
+                return_exceptions=True,
+            )
+            if isinstance(results[0], Exception):
+                raise results[0]
+
         except Exception as e:
-            debug_log(f"廣播消息失敗: {e}")
+            error_id = ErrorHandler.log_error_with_context(
+                e,
+                context={
+                    "operation": "伺服器運行",
+                    "host": self.host,
+                    "port": self.port,
+                },
+                error_type=ErrorType.NETWORK
+                if isinstance(e, OSError)
+                else ErrorType.SYSTEM,
+            )
+            debug_log(f"伺服器運行錯誤 [錯誤ID: {error_id}]: {e}")
+            if not ready_future.done():
+                ready_future.set_exception(e)
+        finally:
+            if sock is not None:
+                sock.close()
+            with self._state_lock:
+                self._server = None
+                self._server_loop = None
+                self._transition(ServerState.STOPPED)
+            if not ready_future.done():
+                ready_future.set_exception(RuntimeError("伺服器在就緒前已停止"))
+
+    def _run_server(self, ready_future: concurrent.futures.Future):
+        """伺服器線程主體：在線程自己的事件循環中運行 uvicorn"""
+        asyncio.run(self._serve(ready_future))
+
+    def start_server(
+        self, wait: bool = True, timeout: float = SERVER_READY_TIMEOUT
+    ) -> bool:
+        """
+        啟動 Web 伺服器（重複調用不會重複啟動）
 
-    def start_server(self):
-        """啟動 Web 伺服器（優化版本，支援並行初始化）"""
+        單循環模式（MCP_WEB_SINGLE_LOOP）下若在事件循環中調用，uvicorn 會作為
+        該循環上的任務運行，而不是另開線程與事件循環。
 
-        def run_server_with_retry():
-            max_retries = 5
-            retry_count = 0
+        Args:
+            wait: 是否阻塞等待伺服器就緒（異步調用方應使用 wait_until_ready）
+            timeout: 等待就緒的超時時間（秒）
 
-            while retry_count < max_retries:
-                try:
-                    debug_log(
-                        f"嘗試啟動伺服器在 {self.host}:{self.port} (嘗試 {retry_count + 1}/{max_retries})"
+        Returns:
+            bool: wait 為 True 時表示伺服器是否已就緒；否則表示是否已在啟動或運行
+        """
+        with self._state_lock:
+            if self.server_state == ServerState.DRAINING:
+                debug_log("伺服器正在停止，無法啟動")
+                return False
+            if self.server_state == ServerState.STOPPED:
+                self._ready_future = concurrent.futures.Future()
+                loop = self._get_running_loop() if self.single_loop else None
+                self._transition(ServerState.BINDING)
+                if loop is not None:
+                    # 單循環模式：uvicorn 作為 MCP 事件循環上的任務運行
+                    self.server_thread = None
+                    self.server_task = loop.create_task(self._serve(self._ready_future))
+                    debug_log("Web 伺服器以單循環模式運行在 MCP 事件循環上")
+                else:
+                    self.server_thread = threading.Thread(
+                        target=self._run_server,
+                        args=(self._ready_future,),
+                        name="WebUIServer",
+                        daemon=True,
                     )
+                    self.server_thread.start()
+            ready_future = self._ready_future
+
+        if not wait:
+            return True
+        if self.server_task is not None and not self.server_task.done():
+            # 在同一事件循環上阻塞等待會造成死鎖
+            debug_log("單循環模式下請使用 wait_until_ready 等待伺服器就緒")
+            return ready_future.done() and ready_future.exception() is None
+        try:
+            ready_future.result(timeout=timeout)
+            return True
+        except Exception as e:
+            debug_log(f"等待伺服器就緒失敗: {e}")
+            return False
 
-                    config = uvicorn.Config(
-                        app=self.app,
-                        host=self.host,
-                        port=self.port,
-                        log_level="warning",
-                        access_log=False,
-                    )
+    async def wait_until_ready(self, timeout: float = SERVER_READY_TIMEOUT) -> bool:
+        """
+        異步等待伺服器就緒（不阻塞事件循環）
 
-                    server_instance = uvicorn.Server(config)
+        Returns:
+            bool: 伺服器是否已就緒
+        """
+        ready_future = self._ready_future
+        if ready_future is None:
+            return False
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(ready_future)), timeout
+            )
+            return True
+        except Exception as e:
+            debug_log(f"等待伺服器就緒失敗: {e}")
+            return False
 
-                    # 創建事件循環並啟動服務器
-                    async def serve_with_async_init(server=server_instance):
-                        # 在服務器啟動的同時進行異步初始化
-                        server_task = asyncio.create_task(server.serve())
-                        init_task = asyncio.create_task(self._init_async_components())
+    @staticmethod
+    def _get_running_loop() -> asyncio.AbstractEventLoop | None:
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
 
-                        # 等待兩個任務完成
-                        await asyncio.gather(
-                            server_task, init_task, return_exceptions=True
-                        )
+    def schedule_on_server_loop(self, coro):
+        """
+        在伺服器事件循環上排程協程（不等待結果）
 
-                    asyncio.run(serve_with_async_init())
-                    break
+        WebSocket 屬於伺服器事件循環，從 MCP 事件循環或其他線程發送消息時
+        必須轉交到該循環；單循環模式下直接建立任務。
+        """
+        server_loop = self._server_loop
+        running_loop = self._get_running_loop()
+        if server_loop is None or server_loop.is_closed():
+            if running_loop is None:
+                coro.close()
+                raise RuntimeError("沒有可用的事件循環")
+            return running_loop.create_task(coro)
+        if server_loop is running_loop:
+            return server_loop.create_task(coro)
+        return asyncio.run_coroutine_threadsafe(coro, server_loop)
+
+    async def run_on_server_loop(self, coro):
+        """在伺服器事件循環上執行協程並等待結果"""
+        server_loop = self._server_loop
+        if (
+            server_loop is None
+            or server_loop.is_closed()
+            or server_loop is asyncio.get_running_loop()
+        ):
+            return await coro
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(coro, server_loop)
+        )
 
-                except OSError as e:
-                    if e.errno == 10048:  # Windows: 位址已在使用中
-                        retry_count += 1
-                        if retry_count < max_retries:
-                            debug_log(
-                                f"端口 {self.port} 被占用，使用增強端口管理查找新端口"
-                            )
-                            # 使用增強的端口管理查找新端口
-                            try:
-                                self.port = PortManager.find_free_port_enhanced(
-                                    preferred_port=self.port + 1,
-                                    auto_cleanup=False,  # 啟動時不自動清理，避免誤殺其他服務
-                                    host=self.host,
-                                )
-                                debug_log(f"找到新的可用端口: {self.port}")
-                            except RuntimeError as port_error:
-                                # 使用統一錯誤處理
-                                error_id = ErrorHandler.log_error_with_context(
-                                    port_error,
-                                    context={
-                                        "operation": "端口查找",
-                                        "current_port": self.port,
-                                    },
-                                    error_type=ErrorType.NETWORK,
-                                )
-                                debug_log(
-                                    f"無法找到可用端口 [錯誤ID: {error_id}]: {port_error}"
-                                )
-                                break
-                        else:
-                            debug_log("已達到最大重試次數，無法啟動伺服器")
-                            break
-                    else:
-                        # 使用統一錯誤處理
-                        error_id = ErrorHandler.log_error_with_context(
-                            e,
-                            context={
-                                "operation": "伺服器啟動",
-                                "host": self.host,
-                                "port": self.port,
-                            },
-                            error_type=ErrorType.NETWORK,
-                        )
-                        debug_log(f"伺服器啟動錯誤 [錯誤ID: {error_id}]: {e}")
-                        break
-                except Exception as e:
-                    # 使用統一錯誤處理
-                    error_id = ErrorHandler.log_error_with_context(
-                        e,
-                        context={
-                            "operation": "伺服器運行",
-                            "host": self.host,
-                            "port": self.port,
-                        },
-                        error_type=ErrorType.SYSTEM,
-                    )
-                    debug_log(f"伺服器運行錯誤 [錯誤ID: {error_id}]: {e}")
-                    break
+    def is_server_ready(self) -> bool:
+        """檢查伺服器是否處於 READY 狀態"""
+        return self.server_state == ServerState.READY
 
-        # 在新線程中啟動伺服器
-        self.server_thread = threading.Thread(target=run_server_with_retry, daemon=True)
-        self.server_thread.start()
+    def stop_server(self, timeout: float = SERVER_DRAIN_TIMEOUT + 1) -> bool:
+        """
+        停止 Web 伺服器：進入 DRAINING，等待 uvicorn 關閉連接後回到 STOPPED
 
-        # 等待伺服器啟動
-        time.sleep(2)
+        Returns:
+            bool: 伺服器是否已停止
+        """
+        with self._state_lock:
+            if self.server_state in (ServerState.STOPPED, ServerState.DRAINING):
+                server_thread = self.server_thread
+            else:
+                self._transition(ServerState.DRAINING)
+                if self._server is not None:
+                    self._server.should_exit = True
+                server_thread = self.server_thread
+
+        if (
+            server_thread is not None
+            and server_thread.is_alive()
+            and server_thread is not threading.current_thread()
+        ):
+            server_thread.join(timeout)
+        # 單循環模式下伺服器任務在事件循環上自行完成關閉
+        return self.server_state == ServerState.STOPPED
+
+    async def stop_server_async(
+        self, timeout: float = SERVER_DRAIN_TIMEOUT + 1
+    ) -> bool:
+        """異步停止 Web 伺服器（單循環模式下等待伺服器任務完成）"""
+        server_task = self.server_task
+        if server_task is None or server_task.done():
+            return await asyncio.to_thread(self.stop_server, timeout)
+        self.stop_server(timeout)
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(asyncio.shield(server_task), timeout)
+        return self.server_state == ServerState.STOPPED
+
+    def get_server_status(self) -> dict[str, Any]:
+        """獲取伺服器生命週期狀態與狀態切換耗時"""
+        with self._state_lock:
+            return {
+                "state": self.server_state.value,
+                "mode": "single_loop" if self.server_task is not None else "thread",
+                "host": self.host,
+                "port": self.port,
+                "state_duration": round(
+                    time.perf_counter() - self._state_entered_at, 4
+                ),
+                "transitions": list(self.lifecycle_transitions),
+            }
 
     def open_browser(self, url: str):
         """開啟瀏覽器"""
@@ -588,20 +1115,18 @@ class WebUIManager:
     async def notify_session_update(self, session):
         """向活躍標籤頁發送會話更新通知"""
         try:
-            # 檢查是否有活躍的 WebSocket 連接
-            if session.websocket:
-                # 直接通過當前會話的 WebSocket 發送
-                await session.websocket.send_json(
-                    {
-                        "type": "session_updated",
-                        "message": "新會話已創建，正在更新頁面內容",
-                        "session_info": {
-                            "project_directory": session.project_directory,
-                            "summary": session.summary,
-                            "session_id": session.session_id,
-                        },
-                    }
-                )
+            # 通過會話的所有連接發送
+            if await session.send_message(
+                {
+                    "type": "session_updated",
+                    "message": "新會話已創建，正在更新頁面內容",
+                    "session_info": {
+                        "project_directory": session.project_directory,
+                        "summary": session.summary,
+                        "session_id": session.session_id,
+                    },
+                }
+            ):
                 debug_log("會話更新通知已通過 WebSocket 發送")
             else:
                 # 沒有活躍連接，設置待更新標記
@@ -621,10 +1146,31 @@ class WebUIManager:
             ):
                 old_websocket = self._old_websocket_for_update
                 new_session = self._new_session_for_update
+                old_session_id = getattr(self, "_old_session_id_for_update", None)
 
                 # 改進的連接有效性檢查
                 websocket_valid = False
-                if old_websocket:
+                moved_by_hub = False
+                hub = self.connection_hub
+                if old_session_id and hub.has_connections(old_session_id):
+                    # 通知在轉移前入列，各連接的寫入任務會依序先送出，無需等待
+                    hub.send(
+                        old_session_id,
+                        {
+                            "type": "session_updated",
+                            "message": "新會話已創建，正在更新頁面內容",
+                            "session_info": {
+                                "project_directory": new_session.project_directory,
+                                "summary": new_session.summary,
+                                "session_id": new_session.session_id,
+                            },
+                        },
+                    )
+                    hub.move_session(old_session_id, new_session.session_id)
+                    new_session.websocket = old_websocket
+                    moved_by_hub = True
+                    debug_log("已將會話的所有 WebSocket 連接轉移到新會話")
+                elif old_websocket:
                     try:
                         # 檢查 WebSocket 連接狀態
                         if hasattr(old_websocket, "client_state"):
@@ -667,13 +1213,14 @@ class WebUIManager:
                         # 如果發送失敗，仍然嘗試轉移連接
                         new_session.websocket = old_websocket
                         debug_log("發送失敗但仍轉移 WebSocket 連接到新會話")
-                else:
+                elif not moved_by_hub:
                     debug_log("舊 WebSocket 連接無效，設置待更新標記")
                     self._pending_session_update = True
 
                 # 清理臨時變數
                 delattr(self, "_old_websocket_for_update")
                 delattr(self, "_new_session_for_update")
+                self._old_session_id_for_update = None
 
             else:
                 # 沒有舊連接，設置待更新標記
@@ -751,12 +1298,12 @@ class WebUIManager:
     def cleanup_expired_sessions(self) -> int:
         """清理過期會話"""
         cleanup_start_time = time.time()
-        expired_sessions = []
 
-        # 掃描過期會話
-        for session_id, session in self.sessions.items():
-            if session.is_expired():
-                expired_sessions.append(session_id)
+        # 從淘汰索引取出已過期的會話，成本與過期數量成正比
+        expired_sessions = [
+            session.session_id
+            for session in self.sessions.index.pop_expired(cleanup_start_time)
+        ]
 
         # 批量清理過期會話
         cleaned_count = 0
@@ -784,9 +1331,13 @@ class WebUIManager:
                     error_type=ErrorType.SYSTEM,
                 )
                 debug_log(f"清理過期會話 {session_id} 失敗 [錯誤ID: {error_id}]: {e}")
+                # 清理失敗的會話重新加入索引，下次仍可被取出
+                if session_id in self.sessions:
+                    self.sessions.index.touch(self.sessions[session_id])
 
         # 更新統計
         cleanup_duration = time.time() - cleanup_start_time
+        record_cleanup_metrics("web_ui", "expired", cleaned_count, cleanup_duration)
         self.cleanup_stats.update(
             {
                 "total_cleanups": self.cleanup_stats["total_cleanups"] + 1,
@@ -873,6 +1424,9 @@ class WebUIManager:
 
         # 更新統計
         cleanup_duration = time.time() - cleanup_start_time
+        record_cleanup_metrics(
+            "web_ui", "memory_pressure", cleaned_count, cleanup_duration
+        )
         self.cleanup_stats.update(
             {
                 "total_cleanups": self.cleanup_stats["total_cleanups"] + 1,
@@ -952,6 +1506,7 @@ class WebUIManager:
 
         # 更新統計
         cleanup_duration = time.time() - cleanup_start_time
+        record_cleanup_metrics("web_ui", "shutdown", session_count, cleanup_duration)
         self.cleanup_stats.update(
             {
                 "total_cleanups": self.cleanup_stats["total_cleanups"] + 1,
@@ -968,20 +1523,24 @@ class WebUIManager:
             f"停止服務時清理了 {session_count} 個會話，耗時: {cleanup_duration:.2f}秒"
         )
 
-        # 停止伺服器（注意：uvicorn 的 graceful shutdown 需要額外處理）
-        if self.server_thread is not None and self.server_thread.is_alive():
+        # 停止伺服器
+        if self.server_state != ServerState.STOPPED:
             debug_log("正在停止 Web UI 服務")
+            self.stop_server()
 
 
 # 全域實例
 _web_ui_manager: WebUIManager | None = None
+_manager_lock = threading.Lock()
 
 
 def get_web_ui_manager() -> WebUIManager:
-    """獲取 Web UI 管理器實例"""
+    """獲取 Web UI 管理器實例（預熱線程與首次調用可能同時存取）"""
     global _web_ui_manager
     if _web_ui_manager is None:
-        _web_ui_manager = WebUIManager()
+        with _manager_lock:
+            if _web_ui_manager is None:
+                _web_ui_manager = WebUIManager()
     return _web_ui_manager
 
 
@@ -999,28 +1558,36 @@ async def launch_web_feedback_ui(
     Returns:
         dict: 回饋結果，包含 logs、interactive_feedback 和 images
     """
+    # 預熱模式下等待背景預熱完成，之後只需建立會話
+    await wait_for_prewarm()
     manager = get_web_ui_manager()
 
-    # 創建或更新當前活躍會話
-    manager.create_session(project_directory, summary)
-    session = manager.get_current_session()
+    # 創建新會話（multi 模式下不影響其他仍在等待回饋的會話）
+    session_id = manager.create_session(project_directory, summary)
+    session = manager.get_session(session_id)
 
     if not session:
         raise RuntimeError("無法創建回饋會話")
 
-    # 啟動伺服器（如果尚未啟動）
-    if manager.server_thread is None or not manager.server_thread.is_alive():
-        manager.start_server()
+    # 啟動伺服器（如果尚未啟動）並等待就緒
+    manager.start_server(wait=False)
+    if not await manager.wait_until_ready():
+        raise RuntimeError("Web 伺服器啟動失敗")
 
-    # 使用根路徑 URL 並智能開啟瀏覽器
-    feedback_url = manager.get_server_url()  # 直接使用根路徑
-    has_active_tabs = await manager.smart_open_browser(feedback_url)
+    feedback_url = manager.get_session_url(session)
+    if feedback_url == manager.get_server_url():
+        # 單一會話使用根路徑 URL 並智能開啟瀏覽器
+        has_active_tabs = await manager.smart_open_browser(feedback_url)
+    else:
+        # 其他會話仍在等待回饋，現有標籤頁屬於它們，為新會話開啟獨立頁面
+        manager.open_browser(feedback_url)
+        has_active_tabs = False
 
     debug_log(f"[DEBUG] 服務器地址: {feedback_url}")
 
     # 如果檢測到活躍標籤頁但沒有開啟新視窗，立即發送會話更新通知
     if has_active_tabs:
-        await manager._send_immediate_session_update()
+        await manager.run_on_server_loop(manager._send_immediate_session_update())
         debug_log("已向活躍標籤頁發送會話更新通知")
 
     try:
@@ -1032,6 +1599,11 @@ async def launch_web_feedback_ui(
         debug_log("會話超時")
         # 資源已在 wait_for_feedback 中清理，這裡只需要記錄和重新拋出
         raise
+    except asyncio.CancelledError:
+        # MCP 調用被取消，不再有人等待此會話的回饋
+        debug_log(f"會話 {session_id} 的 MCP 調用已取消")
+        manager.remove_session(session_id)
+        raise
     except Exception as e:
         debug_log(f"會話發生錯誤: {e}")
         raise
@@ -11,6 +11,7 @@ Web 回饋會話模型
 
 import asyncio
 import base64
+import functools
 import shlex
 import subprocess
 import threading
@@ -19,13 +20,22 @@ from collections.abc import Callable
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from fastapi import WebSocket
 
 from ...debug import web_debug_log as debug_log
+from ...utils.command_log import CommandLogBuffer, LogLineWriter
 from ...utils.error_handler import ErrorHandler, ErrorType
+from ...utils.image_pipeline import NormalizedImage, get_image_normalizer
+from ...utils.image_store import content_key, get_image_store
 from ...utils.resource_manager import get_resource_manager, register_process
+from ..utils.command_runner import CommandRunner
+from ..utils.deadline_scheduler import ScheduledDeadline, get_deadline_scheduler
+
+
+if TYPE_CHECKING:
+    from ..utils.connection_hub import ConnectionHub
 
 
 class SessionStatus(Enum):
@@ -48,6 +58,7 @@ class CleanupReason(Enum):
     MEMORY_PRESSURE = "memory_pressure"  # 內存壓力清理
     MANUAL = "manual"  # 手動清理
     ERROR = "error"  # 錯誤清理
+    EVICTED = "evicted"  # 會話數量超過上限被結束
     SHUTDOWN = "shutdown"  # 系統關閉清理
 
 
@@ -64,6 +75,70 @@ SUPPORTED_IMAGE_TYPES = {
 TEMP_DIR = Path.home() / ".cache" / "interactive-feedback-mcp-web"
 
 
+class CompletionEvent(threading.Event):
+    """
+    可在事件循環中等待的完成事件
+
+    保留 threading.Event 的介面（is_set/set/wait），同時支援 ``await
+    wait_async()``：等待者只在自己的事件循環上登記一個 Future，不佔用
+    執行緒池線程；set() 可從任何線程調用，透過 call_soon_threadsafe 喚醒
+    各事件循環上的等待者。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._waiters_lock = threading.Lock()
+
+    def set(self):
+        with self._waiters_lock:
+            super().set()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve_waiter, future)
+            except RuntimeError:
+                # 事件循環已關閉，等待者不再存在
+                pass
+
+    async def wait_async(self, timeout: float | None = None) -> bool:
+        """
+        在當前事件循環中等待事件被設置
+
+        Returns:
+            bool: 事件是否已設置（超時返回 False）
+        """
+        if self.is_set():
+            return True
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._waiters_lock:
+            if self.is_set():
+                return True
+            self._waiters.append((loop, future))
+
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except TimeoutError:
+            return self.is_set()
+        finally:
+            with self._waiters_lock:
+                if (loop, future) in self._waiters:
+                    self._waiters.remove((loop, future))
+
+    def waiter_count(self) -> int:
+        """獲取目前在事件循環中等待的數量"""
+        with self._waiters_lock:
+            return len(self._waiters)
+
+
+def _resolve_waiter(future: asyncio.Future):
+    if not future.done():
+        future.set_result(True)
+
+
 def _safe_parse_command(command: str) -> list[str]:
     """
     安全解析命令字符串，避免 shell 注入攻擊
@@ -126,15 +201,30 @@ class WebFeedbackSession:
         self.session_id = session_id
         self.project_directory = project_directory
         self.summary = summary
-        self.websocket: WebSocket | None = None
+        self.websocket: WebSocket | None = None  # 最近建立的連接（向後兼容）
+        # 連接中心：管理本會話的所有連接與發送佇列（由 WebUIManager 設置）
+        self.connection_hub: ConnectionHub | None = None
+        # 在伺服器事件循環上排程協程（由 WebUIManager 設置）
+        self.schedule_on_server_loop: Callable[[Any], Any] | None = None
         self.feedback_result: str | None = None
         self.images: list[dict] = []
+        self._stored_image_keys: list[str] = []  # 圖片存儲中持有引用的內容鍵
+        # 已預處理的原始圖片（內容鍵 -> 字節），提交時前端只需送出內容鍵
+        self._prepared_images: dict[str, bytes] = {}
         self.settings: dict[str, Any] = {}  # 圖片設定
-        self.feedback_completed = threading.Event()
+        # 回饋完成事件：MCP 調用以 await 等待，可從任何線程設置
+        self.feedback_completed = CompletionEvent()
+        self._evicted = False  # 因會話數量上限被結束
         self.process: subprocess.Popen | None = None
-        self.command_logs: list[str] = []
+        self._command_runner: CommandRunner | None = None
+        self.last_command_stats: dict[str, Any] | None = None  # 最近一次命令的吞吐量
+        # 命令日誌：內存有上限，超出時溢寫到暫存檔
+        self.command_logs = CommandLogBuffer(session_id)
         self._cleanup_done = False  # 防止重複清理
 
+        # 淘汰索引（加入 WebUIManager 的會話字典時設置），狀態與活動時間變更時更新
+        self._eviction_index = None
+
         # 新增：會話狀態管理
         self.status = SessionStatus.WAITING
         self.status_message = "等待用戶回饋"
@@ -145,7 +235,8 @@ class WebFeedbackSession:
         # 新增：自動清理配置
         self.auto_cleanup_delay = auto_cleanup_delay  # 自動清理延遲時間（秒）
         self.max_idle_time = max_idle_time  # 最大空閒時間（秒）
-        self.cleanup_timer: threading.Timer | None = None
+        # 清理期限由全域排程器管理，不為每個會話建立線程
+        self.cleanup_timer: ScheduledDeadline | None = None
         self.cleanup_callbacks: list[Callable[..., None]] = []  # 清理回調函數列表
 
         # 新增：清理統計
@@ -174,6 +265,26 @@ class WebFeedbackSession:
             f"會話 {self.session_id} 初始化完成，自動清理延遲: {auto_cleanup_delay}秒，最大空閒: {max_idle_time}秒"
         )
 
+    @property
+    def status(self) -> SessionStatus:
+        return self._status
+
+    @status.setter
+    def status(self, value: SessionStatus):
+        self._status = value
+        if self._eviction_index is not None:
+            self._eviction_index.touch(self)
+
+    @property
+    def last_activity(self) -> float:
+        return self._last_activity
+
+    @last_activity.setter
+    def last_activity(self, value: float):
+        self._last_activity = value
+        if self._eviction_index is not None:
+            self._eviction_index.touch(self)
+
     def update_status(self, status: SessionStatus, message: str | None = None):
         """更新會話狀態"""
         self.status = status
@@ -204,6 +315,13 @@ class WebFeedbackSession:
             "session_id": self.session_id,
         }
 
+    def is_waiting_for_feedback(self) -> bool:
+        """檢查會話是否仍有 MCP 調用在等待回饋"""
+        return not self.feedback_completed.is_set() and self.status in [
+            SessionStatus.WAITING,
+            SessionStatus.ACTIVE,
+        ]
+
     def is_active(self) -> bool:
         """檢查會話是否活躍"""
         return self.status in [
@@ -250,58 +368,62 @@ class WebFeedbackSession:
         current_time = time.time()
         return current_time - self.last_activity
 
-    def _schedule_auto_cleanup(self):
-        """安排自動清理定時器"""
-        if self.cleanup_timer:
-            self.cleanup_timer.cancel()
+    def _schedule_auto_cleanup(self, delay: float | None = None):
+        """安排（或重設）自動清理期限"""
+        if delay is None:
+            delay = self.auto_cleanup_delay
+        self.cleanup_timer = get_deadline_scheduler().reschedule(
+            self.cleanup_timer,
+            delay,
+            self._auto_cleanup,
+            name=f"session-{self.session_id}",
+        )
+        debug_log(f"會話 {self.session_id} 自動清理期限已設置，{delay}秒後觸發")
 
-        def auto_cleanup():
-            """自動清理回調"""
-            try:
-                if not self._cleanup_done and self.is_expired():
-                    debug_log(f"會話 {self.session_id} 觸發自動清理（過期）")
-                    # 使用異步方式執行清理
-                    import asyncio
+    def _auto_cleanup(self):
+        """自動清理回調（在排程線程中執行，實際清理轉交出排程線程）"""
+        try:
+            if not self._cleanup_done and self.is_expired():
+                debug_log(f"會話 {self.session_id} 觸發自動清理（過期）")
+                self._dispatch_cleanup(CleanupReason.EXPIRED)
+            elif not self._cleanup_done:
+                # 如果還沒過期，重新安排期限
+                self._schedule_auto_cleanup()
+        except Exception as e:
+            error_id = ErrorHandler.log_error_with_context(
+                e,
+                context={"session_id": self.session_id, "operation": "自動清理"},
+                error_type=ErrorType.SYSTEM,
+            )
+            debug_log(f"自動清理失敗 [錯誤ID: {error_id}]: {e}")
 
-                    try:
-                        loop = asyncio.get_event_loop()
-                        loop.create_task(
-                            self._cleanup_resources_enhanced(CleanupReason.EXPIRED)
-                        )
-                    except RuntimeError:
-                        # 如果沒有事件循環，使用同步清理
-                        self._cleanup_sync_enhanced(CleanupReason.EXPIRED)
-                else:
-                    # 如果還沒過期，重新安排定時器
-                    self._schedule_auto_cleanup()
-            except Exception as e:
-                error_id = ErrorHandler.log_error_with_context(
-                    e,
-                    context={"session_id": self.session_id, "operation": "自動清理"},
-                    error_type=ErrorType.SYSTEM,
-                )
-                debug_log(f"自動清理失敗 [錯誤ID: {error_id}]: {e}")
+    def _dispatch_cleanup(self, reason: CleanupReason):
+        """
+        將清理轉交到伺服器事件循環或工作線程執行
 
-        self.cleanup_timer = threading.Timer(self.auto_cleanup_delay, auto_cleanup)
-        self.cleanup_timer.daemon = True
-        self.cleanup_timer.start()
-        debug_log(
-            f"會話 {self.session_id} 自動清理定時器已設置，{self.auto_cleanup_delay}秒後觸發"
-        )
+        排程線程由所有會話共用，清理時終止命令進程可能等待數秒，
+        不能在排程線程中執行，否則會延誤其他會話的期限。
+        """
+        if self.schedule_on_server_loop is not None:
+            try:
+                self.schedule_on_server_loop(self._cleanup_resources_enhanced(reason))
+                return
+            except RuntimeError as e:
+                debug_log(f"無法在伺服器事件循環上清理會話，改用工作線程: {e}")
+        threading.Thread(
+            target=self._cleanup_sync_enhanced,
+            args=(reason,),
+            name=f"SessionCleanup-{self.session_id[:8]}",
+            daemon=True,
+        ).start()
 
     def extend_cleanup_timer(self, additional_time: int | None = None):
-        """延長清理定時器"""
+        """延長清理期限"""
         if additional_time is None:
             additional_time = self.auto_cleanup_delay
 
-        if self.cleanup_timer:
-            self.cleanup_timer.cancel()
-
-        self.cleanup_timer = threading.Timer(additional_time, lambda: None)
-        self.cleanup_timer.daemon = True
-        self.cleanup_timer.start()
-
-        debug_log(f"會話 {self.session_id} 清理定時器已延長 {additional_time} 秒")
+        self._schedule_auto_cleanup(additional_time)
+        debug_log(f"會話 {self.session_id} 清理期限已延長 {additional_time} 秒")
 
     def add_cleanup_callback(self, callback: Callable[..., None]):
         """添加清理回調函數"""
@@ -329,6 +451,7 @@ class WebFeedbackSession:
                 "has_websocket": self.websocket is not None,
                 "has_process": self.process is not None,
                 "command_logs_count": len(self.command_logs),
+                "command_log": self.command_logs.get_stats(),
                 "images_count": len(self.images),
             }
         )
@@ -355,17 +478,17 @@ class WebFeedbackSession:
                 f"會話 {self.session_id} 開始等待回饋，超時時間: {actual_timeout} 秒（原始: {timeout} 秒）"
             )
 
-            loop = asyncio.get_event_loop()
-
-            def wait_in_thread():
-                return self.feedback_completed.wait(actual_timeout)
-
-            completed = await loop.run_in_executor(None, wait_in_thread)
+            # 在事件循環中等待完成事件，不佔用執行緒池線程
+            completed = await self.feedback_completed.wait_async(actual_timeout)
 
             if completed:
+                if self._evicted:
+                    # 被結束的會話沒有回饋，不能當作空白回饋返回
+                    raise RuntimeError(self.status_message)
                 debug_log(f"會話 {self.session_id} 收到用戶回饋")
                 return {
-                    "logs": "\n".join(self.command_logs),
+                    # 只返回有界的日誌尾部，完整日誌以檔案路徑引用
+                    "logs": self.command_logs.get_result_text(),
                     "interactive_feedback": self.feedback_result or "",
                     "images": self.images,
                     "settings": self.settings,
@@ -402,7 +525,10 @@ class WebFeedbackSession:
         self.feedback_result = feedback
         # 先設置設定，再處理圖片（因為處理圖片時需要用到設定）
         self.settings = settings or {}
-        self.images = self._process_images(images)
+        self.images = self._store_images(
+            await self._normalize_images(self._process_images(images))
+        )
+        self._prepared_images.clear()
 
         # 更新狀態為已提交反饋
         self.update_status(
@@ -412,26 +538,25 @@ class WebFeedbackSession:
         self.feedback_completed.set()
 
         # 發送反饋已收到的消息給前端
-        if self.websocket:
-            try:
-                await self.websocket.send_json(
-                    {
-                        "type": "feedback_received",
-                        "message": "反饋已成功提交",
-                        "status": self.status.value,
-                    }
-                )
-            except Exception as e:
-                debug_log(f"發送反饋確認失敗: {e}")
+        await self.send_message(
+            {
+                "type": "feedback_received",
+                "message": "反饋已成功提交",
+                "status": self.status.value,
+            }
+        )
 
         # 重構：不再自動關閉 WebSocket，保持連接以支援頁面持久性
 
-    def _process_images(self, images: list[dict]) -> list[dict]:
+    def _process_images(
+        self, images: list[dict], settings: dict[str, Any] | None = None
+    ) -> list[dict]:
         """
         處理圖片數據，轉換為統一格式
 
         Args:
             images: 原始圖片數據列表
+            settings: 圖片設定（可選，預設使用會話設定）
 
         Returns:
             List[dict]: 處理後的圖片數據
@@ -439,13 +564,23 @@ class WebFeedbackSession:
         processed_images = []
 
         # 從設定中獲取圖片大小限制，如果沒有設定則使用預設值
-        size_limit = self.settings.get("image_size_limit", MAX_IMAGE_SIZE)
+        if settings is None:
+            settings = self.settings
+        size_limit = settings.get("image_size_limit", MAX_IMAGE_SIZE)
 
         for img in images:
             try:
-                if not all(key in img for key in ["name", "data", "size"]):
+                if not all(key in img for key in ["name", "size"]):
                     continue
 
+                # 已預處理的圖片只帶內容鍵，從預處理記錄取回原始數據
+                raw_data = img.get("data")
+                if raw_data is None:
+                    raw_data = self._prepared_images.get(img.get("key") or "")
+                    if raw_data is None:
+                        debug_log(f"圖片 {img['name']} 未找到預處理記錄，跳過")
+                        continue
+
                 # 檢查文件大小（只有當限制大於0時才檢查）
                 if size_limit > 0 and img["size"] > size_limit:
                     debug_log(
@@ -454,14 +589,14 @@ class WebFeedbackSession:
                     continue
 
                 # 解碼 base64 數據
-                if isinstance(img["data"], str):
+                if isinstance(raw_data, str):
                     try:
-                        image_bytes = base64.b64decode(img["data"])
+                        image_bytes = base64.b64decode(raw_data)
                     except Exception as e:
                         debug_log(f"圖片 {img['name']} base64 解碼失敗: {e}")
                         continue
                 else:
-                    image_bytes = img["data"]
+                    image_bytes = raw_data
 
                 if len(image_bytes) == 0:
                     debug_log(f"圖片 {img['name']} 數據為空，跳過")
@@ -485,22 +620,105 @@ class WebFeedbackSession:
 
         return processed_images
 
+    def prepare_images(
+        self, images: list[dict], settings: dict[str, Any] | None = None
+    ) -> list[dict[str, Any]]:
+        """
+        圖片上傳時預先提交到背景正規化工作池，提交回饋時直接命中快取
+
+        預處理的原始圖片以內容鍵保存在會話中，提交時前端只需送出內容鍵，
+        不必再次傳送整張圖片的 base64。
+
+        Args:
+            images: 前端上傳的圖片列表（ref 為前端用於對應回覆的標識）
+            settings: 前端當前的圖片設定（可選）
+
+        Returns:
+            List[dict]: 已預處理的圖片（ref 與內容鍵 key）
+        """
+        normalizer = get_image_normalizer()
+        prepared = []
+        for img in images:
+            processed = self._process_images([img], settings)
+            if not processed:
+                continue
+            data = processed[0]["data"]
+            key = content_key(data)
+            self._prepared_images[key] = data
+            normalizer.submit(data, key)
+            prepared.append({"ref": img.get("ref"), "key": key})
+        return prepared
+
+    async def _normalize_images(self, images: list[dict]) -> list[dict]:
+        """等待圖片正規化結果（已預處理的圖片直接取用快取）"""
+        if not images:
+            return images
+
+        normalizer = get_image_normalizer()
+        results = await asyncio.gather(
+            *(asyncio.wrap_future(normalizer.submit(img["data"])) for img in images),
+            return_exceptions=True,
+        )
+
+        for img, normalized in zip(images, results, strict=True):
+            if not isinstance(normalized, NormalizedImage) or not normalized.transcoded:
+                continue
+            img["name"] = normalized.rename(img["name"])
+            img["data"] = normalized.data
+            img["size"] = normalized.size
+
+        return images
+
+    def _store_images(self, images: list[dict]) -> list[dict]:
+        """將圖片存入共享的內容定址存儲，相同圖片在各會話間只保留一份"""
+        store = get_image_store()
+        self._release_stored_images()
+        for img in images:
+            entry = store.put(img["data"])
+            img["data"] = entry.data
+            self._stored_image_keys.append(entry.key)
+        return images
+
+    def _release_stored_images(self):
+        """釋放本會話持有的圖片存儲引用"""
+        if self._stored_image_keys:
+            get_image_store().release_all(self._stored_image_keys)
+            self._stored_image_keys.clear()
+
+    async def send_message(self, message: dict[str, Any]) -> bool:
+        """
+        向本會話的所有連接發送消息
+
+        有連接中心時只將消息放入各連接的發送佇列，不等待瀏覽器接收；
+        否則直接透過 websocket 發送。
+
+        Returns:
+            bool: 是否有連接接收消息
+        """
+        hub = self.connection_hub
+        if hub is not None and hub.send(self.session_id, message):
+            return True
+        if self.websocket:
+            try:
+                await self.websocket.send_json(message)
+                return True
+            except Exception as e:
+                debug_log(f"WebSocket 發送失敗: {e}")
+        return False
+
     def add_log(self, log_entry: str):
-        """添加命令日誌"""
+        """添加命令日誌（超過內存上限的部分溢寫到暫存檔）"""
         self.command_logs.append(log_entry)
 
     async def run_command(self, command: str):
-        """執行命令並透過 WebSocket 發送輸出（安全版本）"""
-        if self.process:
+        """執行命令並透過 WebSocket 批次發送輸出（安全版本）"""
+        if self._command_runner:
             # 終止現有進程
             try:
-                self.process.terminate()
-                self.process.wait(timeout=5)
-            except:
-                try:
-                    self.process.kill()
-                except:
-                    pass
+                await self._command_runner.terminate()
+            except Exception as e:
+                debug_log(f"終止現有命令失敗: {e}")
+            self._command_runner = None
             self.process = None
 
         try:
@@ -512,87 +730,69 @@ class WebFeedbackSession:
             except ValueError as e:
                 error_msg = f"命令安全檢查失敗: {e}"
                 debug_log(error_msg)
-                if self.websocket:
-                    await self.websocket.send_json(
-                        {"type": "command_error", "error": error_msg}
-                    )
+                await self.send_message({"type": "command_error", "error": error_msg})
                 return
 
-            # 使用安全的方式執行命令（不使用 shell=True）
-            self.process = subprocess.Popen(
-                parsed_command,
-                shell=False,  # 安全：不使用 shell
-                cwd=self.project_directory,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
+            # 使用安全的方式執行命令（不使用 shell），輸出以批次轉發
+            log_writer = LogLineWriter(self.command_logs)
+            runner = CommandRunner(
+                functools.partial(self._forward_command_output, log_writer=log_writer)
             )
+            await runner.start(parsed_command, cwd=self.project_directory)
+            self._command_runner = runner
+            self.process = runner.popen
 
             # 註冊進程到資源管理器
-            register_process(
-                self.process,
-                description=f"WebFeedbackSession-{self.session_id}-command",
-                auto_cleanup=True,
-            )
-
-            # 在背景線程中讀取輸出
-            async def read_output():
-                loop = asyncio.get_event_loop()
-                try:
-                    # 使用線程池執行器來處理阻塞的讀取操作
-                    def read_line():
-                        if self.process and self.process.stdout:
-                            return self.process.stdout.readline()
-                        return ""
-
-                    while True:
-                        line = await loop.run_in_executor(None, read_line)
-                        if not line:
-                            break
-
-                        self.add_log(line.rstrip())
-                        if self.websocket:
-                            try:
-                                await self.websocket.send_json(
-                                    {"type": "command_output", "output": line}
-                                )
-                            except Exception as e:
-                                debug_log(f"WebSocket 發送失敗: {e}")
-                                break
-
-                except Exception as e:
-                    debug_log(f"讀取命令輸出錯誤: {e}")
-                finally:
-                    # 等待進程完成
-                    if self.process:
-                        exit_code = self.process.wait()
-
-                        # 從資源管理器取消註冊進程
-                        self.resource_manager.unregister_process(self.process.pid)
-
-                        # 發送命令完成信號
-                        if self.websocket:
-                            try:
-                                await self.websocket.send_json(
-                                    {"type": "command_complete", "exit_code": exit_code}
-                                )
-                            except Exception as e:
-                                debug_log(f"發送完成信號失敗: {e}")
+            if self.process:
+                register_process(
+                    self.process,
+                    description=f"WebFeedbackSession-{self.session_id}-command",
+                    auto_cleanup=True,
+                )
 
             # 啟動異步任務讀取輸出
-            asyncio.create_task(read_output())
+            asyncio.create_task(self._read_command_output(runner, log_writer))
 
         except Exception as e:
             debug_log(f"執行命令錯誤: {e}")
-            if self.websocket:
-                try:
-                    await self.websocket.send_json(
-                        {"type": "command_error", "error": str(e)}
-                    )
-                except:
-                    pass
+            await self.send_message({"type": "command_error", "error": str(e)})
+
+    async def _forward_command_output(self, output: str, log_writer: LogLineWriter):
+        """記錄並轉發一批命令輸出（一批只佔一個 command_output 幀）
+
+        批次可能在行中間切開，日誌只記錄完整的行，未完成的尾行留待下一批。
+        """
+        log_writer.write(output)
+        await self.send_message({"type": "command_output", "output": output})
+
+    async def _read_command_output(
+        self, runner: CommandRunner, log_writer: LogLineWriter
+    ):
+        """讀取命令輸出直到結束並發送完成信號"""
+        try:
+            exit_code = await runner.run()
+        except Exception as e:
+            debug_log(f"讀取命令輸出錯誤: {e}")
+            return
+        finally:
+            # 命令已結束，記錄沒有換行結尾的最後一行
+            log_writer.close()
+            # 從資源管理器取消註冊進程
+            if runner.popen:
+                self.resource_manager.unregister_process(runner.popen.pid)
+            if self._command_runner is runner:
+                self._command_runner = None
+                self.process = None
+
+        self.last_command_stats = runner.get_stats()
+        # 發送命令完成信號（附帶吞吐量統計）
+        await self.send_message(
+            {
+                "type": "command_complete",
+                "exit_code": exit_code,
+                "stats": self.last_command_stats,
+            }
+        )
 
     async def _cleanup_resources_on_timeout(self):
         """超時時清理所有資源（保持向後兼容）"""
@@ -645,7 +845,7 @@ class WebFeedbackSession:
                         CleanupReason.SHUTDOWN: "系統正在關閉，會話將被清理",
                     }
 
-                    await self.websocket.send_json(
+                    await self.send_message(
                         {
                             "type": "session_cleanup",
                             "reason": reason.value,
@@ -664,7 +864,18 @@ class WebFeedbackSession:
                     self.websocket = None
 
             # 3. 終止正在運行的命令進程
-            if self.process:
+            if self._command_runner:
+                try:
+                    # 在事件循環中等待進程退出，不阻塞其他連接
+                    await self._command_runner.terminate(timeout=3)
+                    debug_log(f"會話 {self.session_id} 命令進程已終止")
+                    resources_cleaned += 1
+                except Exception as e:
+                    debug_log(f"終止命令進程時發生錯誤: {e}")
+                finally:
+                    self._command_runner = None
+                    self.process = None
+            elif self.process:
                 try:
                     self.process.terminate()
                     try:
@@ -688,6 +899,8 @@ class WebFeedbackSession:
 
             self.command_logs.clear()
             self.images.clear()
+            self._release_stored_images()
+            self._prepared_images.clear()
             self.settings.clear()
 
             if logs_count > 0 or images_count > 0:
@@ -758,6 +971,12 @@ class WebFeedbackSession:
             # 即使發生錯誤也要更新統計
             self.cleanup_stats["cleanup_duration"] = time.time() - cleanup_start_time
 
+    def evict(self, message: str):
+        """結束仍在等待回饋的會話，等待中的 MCP 調用會收到錯誤而非空白回饋"""
+        self.status_message = message
+        self._evicted = True
+        self._cleanup_sync_enhanced(CleanupReason.EVICTED)
+
     def _cleanup_sync(self):
         """同步清理會話資源（但保留 WebSocket 連接）- 保持向後兼容"""
         self._cleanup_sync_enhanced(CleanupReason.MANUAL, preserve_websocket=True)
@@ -813,6 +1032,7 @@ class WebFeedbackSession:
                     except:
                         pass
                 self.process = None
+                self._command_runner = None
 
             # 3. 清理臨時數據
             logs_count = len(self.command_logs)
@@ -821,6 +1041,8 @@ class WebFeedbackSession:
             self.command_logs.clear()
             if not preserve_websocket:
                 self.images.clear()
+                self._release_stored_images()
+                self._prepared_images.clear()
                 self.settings.clear()
                 resources_cleaned += images_count
 
@@ -836,7 +1058,7 @@ class WebFeedbackSession:
                     self.status = SessionStatus.EXPIRED
                 elif reason == CleanupReason.TIMEOUT:
                     self.status = SessionStatus.TIMEOUT
-                elif reason == CleanupReason.ERROR:
+                elif reason in (CleanupReason.ERROR, CleanupReason.EVICTED):
                     self.status = SessionStatus.ERROR
                 else:
                     self.status = SessionStatus.COMPLETED
@@ -902,6 +1124,14 @@ class WebFeedbackSession:
 
     async def _safe_close_websocket(self):
         """安全關閉 WebSocket 連接，避免事件循環衝突"""
+        hub = self.connection_hub
+        if hub is not None and hub.close_session(
+            self.session_id, code=1000, reason="會話清理"
+        ):
+            # 由各連接的寫入任務在送出已入列的消息後關閉
+            debug_log(f"會話 {self.session_id} 的 WebSocket 連接將在發送完畢後關閉")
+            return
+
         if not self.websocket:
             return
 
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Web UI 預熱
+===========
+
+可選的預熱模式（MCP_WEB_PREWARM=true 或 ``server --prewarm-web``）：
+MCP 伺服器啟動時在背景線程中導入 Web 堆疊、建立 FastAPI 應用、綁定端口、
+編譯模板、載入翻譯與靜態資源並啟動 uvicorn，透過 ready future 通知完成。
+第一次 interactive_feedback 調用只需建立會話，並記錄預熱節省的時間。
+
+本模組只依賴標準庫，Web 堆疊在預熱線程中才導入，不影響 MCP 握手。
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any
+
+from ..debug import web_debug_log as debug_log
+
+
+# 首次調用等待預熱的最長時間（秒），逾時改走正常啟動流程
+PREWARM_WAIT_TIMEOUT = 30.0
+
+_prewarm_future: Future | None = None
+_prewarm_lock = threading.Lock()
+
+# 啟動指標
+_startup_metrics: dict[str, Any] = {
+    "prewarm_enabled": False,
+    "prewarm_started_at": None,
+    "prewarm_seconds": None,
+    "phases": {},
+    "first_call_wait_seconds": None,
+    "time_saved_seconds": None,
+}
+
+
+def is_prewarm_enabled() -> bool:
+    """檢查是否啟用 Web UI 預熱（預設關閉）"""
+    return os.getenv("MCP_WEB_PREWARM", "false").lower() in ("true", "1", "yes", "on")
+
+
+def _warm_static_assets(web_dir: Path) -> dict[str, int]:
+    """讀取靜態資源與翻譯檔案，讓首次請求命中作業系統頁面快取"""
+    warmed = {"files": 0, "bytes": 0}
+    for directory in (web_dir / "static", web_dir / "locales"):
+        if not directory.exists():
+            continue
+        for path in directory.rglob("*"):
+            if path.is_file():
+                warmed["files"] += 1
+                warmed["bytes"] += len(path.read_bytes())
+    return warmed
+
+
+def _run_prewarm(future: Future):
+    """預熱線程主體"""
+    phases = _startup_metrics["phases"]
+    start = time.perf_counter()
+
+    def mark(phase: str, phase_start: float) -> float:
+        now = time.perf_counter()
+        phases[phase] = round(now - phase_start, 4)
+        return now
+
+    try:
+        from .main import get_web_ui_manager
+        from .utils.translation_cache import get_translation_cache
+
+        phase_start = mark("import_web_stack", start)
+
+        manager = get_web_ui_manager()
+        phase_start = mark("build_app", phase_start)
+
+        for template_name in ("index.html", "feedback.html"):
+            manager.templates.get_template(template_name)
+        manager.i18n.get_supported_languages()
+        warmed = _warm_static_assets(Path(__file__).parent)
+        manager.asset_pipeline.ensure_loaded()
+        get_translation_cache().get_all()
+        phase_start = mark("load_assets", phase_start)
+
+        if manager.single_loop:
+            # 單循環模式下伺服器必須運行在 MCP 事件循環上，留待首次調用啟動
+            debug_log("單循環模式：伺服器將在首次調用時於 MCP 事件循環上啟動")
+        elif not manager.start_server():
+            raise RuntimeError("Web 伺服器未能就緒")
+        mark("start_server", phase_start)
+
+        total = time.perf_counter() - start
+        _startup_metrics["prewarm_seconds"] = round(total, 4)
+        debug_log(
+            f"Web UI 預熱完成，耗時 {total:.2f} 秒，"
+            f"預載 {warmed['files']} 個資源檔案 ({warmed['bytes']} bytes)，"
+            f"服務地址: {manager.get_server_url()}"
+        )
+        future.set_result(manager)
+    except Exception as e:
+        debug_log(f"Web UI 預熱失敗，首次調用時將正常啟動: {e}")
+        future.set_exception(e)
+
+
+def start_prewarm() -> Future:
+    """
+    在背景線程中預熱 Web UI（重複調用返回同一個 future）
+
+    Returns:
+        Future: 預熱完成時結果為 WebUIManager 的 ready future
+    """
+    global _prewarm_future
+    with _prewarm_lock:
+        if _prewarm_future is None:
+            _prewarm_future = Future()
+            _startup_metrics["prewarm_enabled"] = True
+            _startup_metrics["prewarm_started_at"] = time.time()
+            threading.Thread(
+                target=_run_prewarm,
+                args=(_prewarm_future,),
+                name="WebUIPrewarm",
+                daemon=True,
+            ).start()
+            debug_log("已在背景啟動 Web UI 預熱")
+    return _prewarm_future
+
+
+def get_prewarm_future() -> Future | None:
+    """獲取預熱 ready future（未啟用預熱時為 None）"""
+    return _prewarm_future
+
+
+async def wait_for_prewarm(timeout: float | None = PREWARM_WAIT_TIMEOUT) -> bool:
+    """
+    等待預熱完成（首次調用時記錄等待時間與節省時間）
+
+    Args:
+        timeout: 最長等待時間（秒），None 表示不限；逾時後由調用者正常啟動
+
+    Returns:
+        bool: 預熱是否在時限內成功完成
+    """
+    future = _prewarm_future
+    if future is None:
+        return False
+
+    wait_start = time.perf_counter()
+    try:
+        await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        succeeded = True
+    except TimeoutError:
+        debug_log(f"等待 Web UI 預熱超過 {timeout} 秒，改用正常啟動流程")
+        succeeded = False
+    except Exception as e:
+        debug_log(f"等待 Web UI 預熱失敗: {e}")
+        succeeded = False
+    waited = time.perf_counter() - wait_start
+
+    if _startup_metrics["first_call_wait_seconds"] is None:
+        _startup_metrics["first_call_wait_seconds"] = round(waited, 4)
+        if succeeded:
+            saved = max(0.0, _startup_metrics["prewarm_seconds"] - waited)
+            _startup_metrics["time_saved_seconds"] = round(saved, 4)
+            debug_log(f"首次回饋調用等待預熱 {waited:.3f} 秒，預熱節省 {saved:.2f} 秒")
+    return succeeded
+
+
+def get_startup_metrics() -> dict[str, Any]:
+    """獲取 Web UI 啟動指標"""
+    metrics = dict(_startup_metrics)
+    metrics["phases"] = dict(_startup_metrics["phases"])
+    metrics["prewarm_ready"] = bool(
+        _prewarm_future is not None
+        and _prewarm_future.done()
+        and _prewarm_future.exception() is None
+    )
+    return metrics
@@ -6,42 +6,146 @@
 設置 Web UI 的主要路由和處理邏輯。
 """
 
+import asyncio
 import json
+import re
 import time
+from collections.abc import Callable
 from pathlib import Path
 from typing import TYPE_CHECKING
 
 from fastapi import Request, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
+from markupsafe import Markup
 
 from ... import __version__
 from ...debug import web_debug_log as debug_log
+from ...utils.allocation_profiler import get_allocation_profiler, is_profiler_enabled
+from ...utils.metrics import OPENMETRICS_CONTENT_TYPE, get_metrics_registry
+from ..utils.http_cache import conditional_bytes, conditional_json, file_version
+from ..utils.translation_cache import TranslationBundle, get_translation_cache
 
 
 if TYPE_CHECKING:
     from ..main import WebUIManager
 
 
-def load_user_layout_settings() -> str:
-    """載入用戶的佈局模式設定"""
-    try:
-        # 使用統一的設定檔案路徑
-        config_dir = Path.home() / ".config" / "mcp-feedback-enhanced"
-        settings_file = config_dir / "ui_settings.json"
+# 內嵌於回饋頁面的首次載入資料格式版本，格式不相容地變更時遞增
+BOOTSTRAP_VERSION = 1
+
+# 內嵌於 <script> 時需轉義的字元（只會出現在 JSON 字串內）
+_SCRIPT_ESCAPES = (
+    ("<", "\\u003c"),
+    (">", "\\u003e"),
+    ("&", "\\u0026"),
+    ("'", "\\u0027"),
+)
+
 
+# 以檔案版本快取解析後的設定：(版本, 設定)
+_settings_cache: tuple[tuple, dict] | None = None
+
+
+def _read_user_settings(settings_file: Path) -> dict:
+    try:
         if settings_file.exists():
             with open(settings_file, encoding="utf-8") as f:
                 settings = json.load(f)
-                layout_mode = settings.get("layoutMode", "combined-vertical")
-                debug_log(f"從設定檔案載入佈局模式: {layout_mode}")
-                # 修復 no-any-return 錯誤 - 確保返回 str 類型
-                return str(layout_mode)
+            if isinstance(settings, dict):
+                return settings
+            debug_log("設定檔案格式錯誤，使用預設設定")
         else:
-            debug_log("設定檔案不存在，使用預設佈局模式: combined-vertical")
-            return "combined-vertical"
+            debug_log("設定檔案不存在，使用預設設定")
     except Exception as e:
-        debug_log(f"載入佈局設定失敗: {e}，使用預設佈局模式: combined-vertical")
-        return "combined-vertical"
+        debug_log(f"載入設定失敗: {e}，使用預設設定")
+    return {}
+
+
+def load_user_settings_versioned() -> tuple[tuple, dict]:
+    """
+    載入用戶的 UI 設定及其檔案版本
+
+    與 /api/load-settings 使用相同的檔案；檔案的修改時間與大小未變時
+    直接返回上次解析的結果（調用者不應修改返回的字典）。
+    """
+    global _settings_cache
+    # 使用統一的設定檔案路徑
+    settings_file = (
+        Path.home() / ".config" / "mcp-feedback-enhanced" / "ui_settings.json"
+    )
+    version = file_version([settings_file])
+    cached = _settings_cache
+    if cached is not None and cached[0] == version:
+        return cached
+    _settings_cache = (version, _read_user_settings(settings_file))
+    return _settings_cache
+
+
+def load_user_settings() -> dict:
+    """載入用戶的 UI 設定（與 /api/load-settings 相同的檔案）"""
+    return load_user_settings_versioned()[1]
+
+
+def load_user_layout_settings(settings: dict | None = None) -> str:
+    """載入用戶的佈局模式設定"""
+    if settings is None:
+        settings = load_user_settings()
+    # 修復 no-any-return 錯誤 - 確保返回 str 類型
+    layout_mode = str(settings.get("layoutMode", "combined-vertical"))
+    debug_log(f"使用佈局模式: {layout_mode}")
+    return layout_mode
+
+
+def resolve_bootstrap_language(settings: dict) -> tuple[str, TranslationBundle]:
+    """選擇內嵌翻譯的語言（設定中的語言，不支援或沒有翻譯時為 zh-TW）"""
+    cache = get_translation_cache()
+    language = settings.get("language")
+    bundle = cache.get_language(language) if isinstance(language, str) else None
+    if bundle is None or not bundle.data:
+        language = "zh-TW"
+        bundle = cache.get_language(language)
+    return language, bundle
+
+
+def build_bootstrap_payload(
+    manager: "WebUIManager",
+    session,
+    settings: dict,
+    layout_mode: str,
+    translations: tuple[str, TranslationBundle] | None = None,
+) -> Markup:
+    """
+    產生內嵌於回饋頁面的首次載入資料
+
+    包含會話狀態、會話列表、用戶設定與當前語言的翻譯，讓前端不必在
+    啟動時再請求 /api/translations、/api/load-settings 或等待 WebSocket
+    的 status_update。翻譯直接使用翻譯快取中已序列化的內容。
+
+    Returns:
+        Markup: 可直接放入 <script> 的 JSON
+    """
+    language, bundle = translations or resolve_bootstrap_language(settings)
+
+    head = json.dumps(
+        {
+            "version": BOOTSTRAP_VERSION,
+            "app_version": __version__,
+            "session": session.get_status_info(),
+            "sessions": manager.list_sessions(),
+            "settings": settings,
+            "layout_mode": layout_mode,
+            "language": language,
+            "translations_etag": bundle.etag,
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    translations = bundle.body.decode("utf-8")
+    payload = f'{head[:-1]},"translations":{{"{language}":{translations}}}}}'
+    for char, escaped in _SCRIPT_ESCAPES:
+        payload = payload.replace(char, escaped)
+    # 已轉義 <、>、&、'，可安全放入 <script>
+    return Markup(payload)  # noqa: S704
 
 
 def setup_routes(manager: "WebUIManager"):
@@ -49,73 +153,74 @@ def setup_routes(manager: "WebUIManager"):
 
     @manager.app.get("/", response_class=HTMLResponse)
     async def index(request: Request):
-        """統一回饋頁面 - 重構後的主頁面"""
+        """統一回饋頁面 - 顯示當前（最新）會話"""
         # 獲取當前活躍會話
         current_session = manager.get_current_session()
 
         if not current_session:
             # 沒有活躍會話時顯示等待頁面
-            return manager.templates.TemplateResponse(
+            return render_cached_page(
+                manager,
+                request,
                 "index.html",
-                {
-                    "request": request,
+                (
+                    *manager.asset_pipeline.urls("index.css"),
+                    *manager.asset_pipeline.urls("index.js"),
+                ),
+                lambda: {
                     "title": "MCP Feedback Enhanced",
                     "has_session": False,
                     "version": __version__,
                 },
             )
 
-        # 有活躍會話時顯示回饋頁面
-        # 載入用戶的佈局模式設定
-        layout_mode = load_user_layout_settings()
-
-        return manager.templates.TemplateResponse(
-            "feedback.html",
-            {
-                "request": request,
-                "project_directory": current_session.project_directory,
-                "summary": current_session.summary,
-                "title": "Interactive Feedback - 回饋收集",
-                "version": __version__,
-                "has_session": True,
-                "layout_mode": layout_mode,
-                "i18n": manager.i18n,
-            },
-        )
+        return render_feedback_page(manager, request, current_session)
 
-    @manager.app.get("/api/translations")
-    async def get_translations():
-        """獲取翻譯數據 - 從 Web 專用翻譯檔案載入"""
-        translations = {}
+    @manager.app.get("/session/{session_id}", response_class=HTMLResponse)
+    async def session_page(request: Request, session_id: str):
+        """指定會話的回饋頁面（多個會話同時等待回饋時使用）"""
+        session = manager.get_session(session_id)
+        if not session:
+            # 會話已結束或被取代，回到當前會話
+            return RedirectResponse(url="/")
 
-        # 獲取 Web 翻譯檔案目錄
-        web_locales_dir = Path(__file__).parent.parent / "locales"
-        supported_languages = ["zh-TW", "zh-CN", "en"]
+        return render_feedback_page(manager, request, session)
 
-        for lang_code in supported_languages:
-            lang_dir = web_locales_dir / lang_code
-            translation_file = lang_dir / "translation.json"
+    @manager.app.get("/api/translations")
+    async def get_translations(request: Request):
+        """獲取所有語言的翻譯數據 - 從內存快取送出（以檔案版本作為 ETag）"""
+        bundle = get_translation_cache().get_all()
+        return conditional_bytes(request, bundle.etag, bundle.body, bundle.gzip_body)
+
+    @manager.app.get("/api/translations/{language}")
+    async def get_language_translations(request: Request, language: str):
+        """獲取單一語言的翻譯數據，前端只需下載當前語言"""
+        bundle = get_translation_cache().get_language(language)
+        if bundle is None:
+            return JSONResponse(
+                status_code=404, content={"error": f"不支援的語言: {language}"}
+            )
+        return conditional_bytes(request, bundle.etag, bundle.body, bundle.gzip_body)
 
-            try:
-                if translation_file.exists():
-                    with open(translation_file, encoding="utf-8") as f:
-                        lang_data = json.load(f)
-                        translations[lang_code] = lang_data
-                        debug_log(f"成功載入 Web 翻譯: {lang_code}")
-                else:
-                    debug_log(f"Web 翻譯檔案不存在: {translation_file}")
-                    translations[lang_code] = {}
-            except Exception as e:
-                debug_log(f"載入 Web 翻譯檔案失敗 {lang_code}: {e}")
-                translations[lang_code] = {}
-
-        debug_log(f"Web 翻譯 API 返回 {len(translations)} 種語言的數據")
-        return JSONResponse(content=translations)
+    @manager.app.get("/api/sessions")
+    async def list_sessions():
+        """列出所有會話（multi 模式下可能有多個會話同時等待回饋）"""
+        return JSONResponse(
+            content={
+                "mode": manager.session_mode,
+                "max_sessions": manager.max_sessions,
+                "sessions": manager.list_sessions(),
+            }
+        )
 
     @manager.app.get("/api/session-status")
-    async def get_session_status():
-        """獲取當前會話狀態"""
-        current_session = manager.get_current_session()
+    async def get_session_status(request: Request, session_id: str | None = None):
+        """獲取會話狀態（未指定 session_id 時為當前會話）"""
+        current_session = (
+            manager.get_session(session_id)
+            if session_id
+            else manager.get_current_session()
+        )
 
         if not current_session:
             return JSONResponse(
@@ -126,8 +231,9 @@ def setup_routes(manager: "WebUIManager"):
                 }
             )
 
-        return JSONResponse(
-            content={
+        return conditional_json(
+            request,
+            {
                 "has_session": True,
                 "status": "active",
                 "session_info": {
@@ -135,103 +241,140 @@ def setup_routes(manager: "WebUIManager"):
                     "summary": current_session.summary,
                     "feedback_completed": current_session.feedback_completed.is_set(),
                 },
-            }
+            },
         )
 
     @manager.app.get("/api/current-session")
-    async def get_current_session():
-        """獲取當前會話詳細信息"""
-        current_session = manager.get_current_session()
+    async def get_current_session(request: Request, session_id: str | None = None):
+        """獲取會話詳細信息（未指定 session_id 時為當前會話）"""
+        current_session = (
+            manager.get_session(session_id)
+            if session_id
+            else manager.get_current_session()
+        )
 
         if not current_session:
             return JSONResponse(status_code=404, content={"error": "沒有活躍會話"})
 
-        return JSONResponse(
-            content={
+        return conditional_json(
+            request,
+            {
                 "session_id": current_session.session_id,
                 "project_directory": current_session.project_directory,
                 "summary": current_session.summary,
                 "feedback_completed": current_session.feedback_completed.is_set(),
-                "command_logs": current_session.command_logs,
+                "command_logs": current_session.command_logs.tail(200),
+                "command_log": current_session.command_logs.get_stats(),
                 "images_count": len(current_session.images),
-            }
+            },
         )
 
-    @manager.app.websocket("/ws")
-    async def websocket_endpoint(websocket: WebSocket):
-        """WebSocket 端點 - 重構後移除 session_id 依賴"""
-        # 獲取當前活躍會話
-        session = manager.get_current_session()
-        if not session:
-            await websocket.close(code=4004, reason="沒有活躍會話")
-            return
+    @manager.app.get("/api/command-log")
+    async def get_command_log(
+        session_id: str | None = None,
+        view: str = "tail",
+        lines: int = 200,
+        pattern: str | None = None,
+    ):
+        """檢視命令日誌（view: head、tail 或 grep，grep 需提供 pattern）"""
+        current_session = (
+            manager.get_session(session_id)
+            if session_id
+            else manager.get_current_session()
+        )
+        if not current_session:
+            return JSONResponse(status_code=404, content={"error": "沒有活躍會話"})
 
-        await websocket.accept()
+        command_logs = current_session.command_logs
+        lines = max(1, min(lines, 5000))
+        if view == "head":
+            content = {"lines": command_logs.head(lines)}
+        elif view == "tail":
+            content = {"lines": command_logs.tail(lines)}
+        elif view == "grep" and pattern:
+            try:
+                content = {"matches": command_logs.grep(pattern, limit=lines)}
+            except re.error as e:
+                return JSONResponse(
+                    status_code=400, content={"error": f"無效的正則表達式: {e}"}
+                )
+        else:
+            return JSONResponse(
+                status_code=400, content={"error": "view 必須為 head、tail 或 grep"}
+            )
 
-        # 檢查會話是否已有 WebSocket 連接
-        if session.websocket and session.websocket != websocket:
-            debug_log("會話已有 WebSocket 連接，替換為新連接")
+        return JSONResponse(
+            content={"view": view, "stats": command_logs.get_stats(), **content}
+        )
 
-        session.websocket = websocket
-        debug_log(f"WebSocket 連接建立: 當前活躍會話 {session.session_id}")
+    @manager.app.get("/metrics")
+    async def metrics():
+        """OpenMetrics 格式的運行指標（會話、內存、清理耗時、壓縮比率等）"""
+        return Response(
+            content=get_metrics_registry().render(),
+            media_type=OPENMETRICS_CONTENT_TYPE,
+        )
 
-        # 發送連接成功消息
-        try:
-            await websocket.send_json(
-                {"type": "connection_established", "message": "WebSocket 連接已建立"}
-            )
+    @manager.app.get("/api/debug/alloc")
+    async def alloc_profiler_status():
+        """分配分析器狀態與保留中的快照"""
+        return await _run_profiler_action(lambda profiler: profiler.get_status())
+
+    @manager.app.post("/api/debug/alloc/start")
+    async def alloc_profiler_start(frames: int | None = None):
+        """開始追蹤內存分配"""
+        return await _run_profiler_action(lambda profiler: profiler.start(frames))
+
+    @manager.app.post("/api/debug/alloc/stop")
+    async def alloc_profiler_stop():
+        """停止追蹤並釋放快照"""
+        return await _run_profiler_action(lambda profiler: profiler.stop())
+
+    @manager.app.post("/api/debug/alloc/snapshot")
+    async def alloc_profiler_snapshot(label: str = ""):
+        """拍攝分配快照"""
+        return await _run_profiler_action(
+            lambda profiler: profiler.take_snapshot(label)
+        )
 
-            # 檢查是否有待發送的會話更新
-            if getattr(manager, "_pending_session_update", False):
-                debug_log("檢測到待發送的會話更新，準備發送通知")
-                await websocket.send_json(
-                    {
-                        "type": "session_updated",
-                        "message": "新會話已創建，正在更新頁面內容",
-                        "session_info": {
-                            "project_directory": session.project_directory,
-                            "summary": session.summary,
-                            "session_id": session.session_id,
-                        },
-                    }
-                )
-                manager._pending_session_update = False
-                debug_log("✅ 已發送會話更新通知到前端")
-            else:
-                # 發送當前會話狀態
-                await websocket.send_json(
-                    {"type": "status_update", "status_info": session.get_status_info()}
-                )
-                debug_log("已發送當前會話狀態到前端")
+    @manager.app.get("/api/debug/alloc/top")
+    async def alloc_profiler_top(
+        snapshot: int | None = None, group_by: str = "lineno", limit: int = 20
+    ):
+        """分配最多的位置（未指定快照時使用當前狀態）"""
+        return await _run_profiler_action(
+            lambda profiler: {
+                "snapshot": snapshot,
+                "group_by": group_by,
+                "stats": profiler.top(snapshot, group_by, limit),
+            }
+        )
 
-        except Exception as e:
-            debug_log(f"發送連接確認失敗: {e}")
+    @manager.app.get("/api/debug/alloc/diff")
+    async def alloc_profiler_diff(
+        old: int, new: int | None = None, group_by: str = "lineno", limit: int = 20
+    ):
+        """比較兩個快照的分配差異（未指定 new 時與當前狀態比較）"""
+        return await _run_profiler_action(
+            lambda profiler: {
+                "old": old,
+                "new": new,
+                "group_by": group_by,
+                "stats": profiler.diff(old, new, group_by, limit),
+            }
+        )
 
-        try:
-            while True:
-                data = await websocket.receive_text()
-                message = json.loads(data)
-
-                # 重新獲取當前會話，以防會話已切換
-                current_session = manager.get_current_session()
-                if current_session and current_session.websocket == websocket:
-                    await handle_websocket_message(manager, current_session, message)
-                else:
-                    debug_log("會話已切換或 WebSocket 連接不匹配，忽略消息")
-                    break
-
-        except WebSocketDisconnect:
-            debug_log("WebSocket 連接正常斷開")
-        except ConnectionResetError:
-            debug_log("WebSocket 連接被重置")
-        except Exception as e:
-            debug_log(f"WebSocket 錯誤: {e}")
-        finally:
-            # 安全清理 WebSocket 連接
-            current_session = manager.get_current_session()
-            if current_session and current_session.websocket == websocket:
-                current_session.websocket = None
-                debug_log("已清理會話中的 WebSocket 連接")
+    @manager.app.websocket("/ws")
+    async def websocket_endpoint(websocket: WebSocket):
+        """WebSocket 端點 - 連接到當前活躍會話"""
+        await serve_session_websocket(manager, websocket, manager.get_current_session())
+
+    @manager.app.websocket("/ws/{session_id}")
+    async def session_websocket_endpoint(websocket: WebSocket, session_id: str):
+        """WebSocket 端點 - 依會話 ID 連接到指定會話"""
+        await serve_session_websocket(
+            manager, websocket, manager.get_session(session_id)
+        )
 
     @manager.app.post("/api/save-settings")
     async def save_settings(request: Request):
@@ -249,6 +392,8 @@ def setup_routes(manager: "WebUIManager"):
                 json.dump(data, f, ensure_ascii=False, indent=2)
 
             debug_log(f"設定已保存到: {settings_file}")
+            # 頁面內嵌了設定與佈局，保存後重新渲染
+            manager.page_cache.invalidate()
 
             return JSONResponse(content={"status": "success", "message": "設定已保存"})
 
@@ -260,21 +405,26 @@ def setup_routes(manager: "WebUIManager"):
             )
 
     @manager.app.get("/api/load-settings")
-    async def load_settings():
-        """從檔案載入設定"""
+    async def load_settings(request: Request):
+        """從檔案載入設定（以設定檔案版本作為 ETag）"""
         try:
             # 使用統一的設定檔案路徑
             config_dir = Path.home() / ".config" / "mcp-feedback-enhanced"
             settings_file = config_dir / "ui_settings.json"
 
-            if settings_file.exists():
-                with open(settings_file, encoding="utf-8") as f:
-                    settings = json.load(f)
+            def read_settings() -> dict:
+                if settings_file.exists():
+                    with open(settings_file, encoding="utf-8") as f:
+                        settings = json.load(f)
 
-                debug_log(f"設定已從檔案載入: {settings_file}")
-                return JSONResponse(content=settings)
-            debug_log("設定檔案不存在，返回空設定")
-            return JSONResponse(content={})
+                    debug_log(f"設定已從檔案載入: {settings_file}")
+                    return settings
+                debug_log("設定檔案不存在，返回空設定")
+                return {}
+
+            return conditional_json(
+                request, read_settings, version=file_version([settings_file])
+            )
 
         except Exception as e:
             debug_log(f"載入設定失敗: {e}")
@@ -294,6 +444,7 @@ def setup_routes(manager: "WebUIManager"):
             if settings_file.exists():
                 settings_file.unlink()
                 debug_log(f"設定檔案已刪除: {settings_file}")
+                manager.page_cache.invalidate()
             else:
                 debug_log("設定檔案不存在，無需刪除")
 
@@ -381,8 +532,205 @@ def setup_routes(manager: "WebUIManager"):
             return JSONResponse(status_code=500, content={"error": f"註冊失敗: {e!s}"})
 
 
-async def handle_websocket_message(manager: "WebUIManager", session, data: dict):
-    """處理 WebSocket 消息"""
+async def _run_profiler_action(action) -> JSONResponse:
+    """在執行緒中執行分配分析器操作（快照可能耗時），並將錯誤轉換為 HTTP 狀態碼"""
+    if not is_profiler_enabled():
+        return JSONResponse(
+            status_code=403,
+            content={
+                "error": "分配分析器未啟用，請設定 MCP_ALLOC_PROFILER=true 或 manual"
+            },
+        )
+    try:
+        result = await asyncio.to_thread(action, get_allocation_profiler())
+        return JSONResponse(content=result)
+    except KeyError as e:
+        return JSONResponse(status_code=404, content={"error": e.args[0]})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except RuntimeError as e:
+        return JSONResponse(status_code=409, content={"error": str(e)})
+
+
+def render_cached_page(
+    manager: "WebUIManager",
+    request: Request,
+    template_name: str,
+    key: tuple,
+    build_context: Callable[[], dict],
+) -> HTMLResponse:
+    """
+    從頁面快取送出渲染結果，未命中時渲染模板並保存
+
+    Args:
+        manager: Web UI 管理器
+        request: 當前請求
+        template_name: 模板名稱
+        key: 決定渲染結果的所有狀態（不含模板名稱）
+        build_context: 產生模板上下文的函數，只在未命中時調用
+    """
+    cache_key = (template_name, *key)
+    page = manager.page_cache.get(cache_key)
+    if page is None:
+        html = manager.templates.get_template(template_name).render(build_context())
+        page = manager.page_cache.put(cache_key, html)
+    return page.to_response(request)
+
+
+def render_feedback_page(manager: "WebUIManager", request: Request, session):
+    """
+    渲染會話的回饋頁面
+
+    快取鍵包含會話狀態、會話列表版本、設定檔案版本、語言、佈局與翻譯版本；
+    內嵌資料中的 last_activity 等時間欄位可能較舊，連接 WebSocket 後
+    伺服器發送的 status_update 會更新它們。
+    """
+    # 載入用戶設定與佈局模式（設定檔案未變更時不重新讀取）
+    settings_version, settings = load_user_settings_versioned()
+    layout_mode = load_user_layout_settings(settings)
+    translations = resolve_bootstrap_language(settings)
+    language, bundle = translations
+
+    key = (
+        session.session_id,
+        session.status.value,
+        session.status_message,
+        session.feedback_completed.is_set(),
+        manager.sessions.version,
+        tuple(s.status.value for s in list(manager.sessions.values())),
+        settings_version,
+        language,
+        layout_mode,
+        bundle.etag,
+        *manager.asset_pipeline.urls("feedback.css"),
+        *manager.asset_pipeline.urls("feedback.js"),
+    )
+
+    return render_cached_page(
+        manager,
+        request,
+        "feedback.html",
+        key,
+        lambda: {
+            "session_id": session.session_id,
+            "project_directory": session.project_directory,
+            "summary": session.summary,
+            "title": "Interactive Feedback - 回饋收集",
+            "version": __version__,
+            "has_session": True,
+            "layout_mode": layout_mode,
+            "i18n": manager.i18n,
+            "bootstrap": build_bootstrap_payload(
+                manager, session, settings, layout_mode, translations
+            ),
+        },
+    )
+
+
+async def serve_session_websocket(
+    manager: "WebUIManager", websocket: WebSocket, session
+):
+    """處理一個會話的 WebSocket 連接（連接可能隨會話更新轉移到新會話）"""
+    if not session:
+        await websocket.close(code=4004, reason="沒有活躍會話")
+        return
+
+    await websocket.accept()
+    hub = manager.connection_hub
+    hub.register(session.session_id, websocket)
+
+    # 檢查會話是否已有 WebSocket 連接（多個標籤頁可同時連接同一會話）
+    if session.websocket and session.websocket != websocket:
+        debug_log("會話已有 WebSocket 連接，新連接將同時接收消息")
+
+    session.websocket = websocket
+    debug_log(f"WebSocket 連接建立: 會話 {session.session_id}")
+
+    # 發送連接成功消息（經由連接的發送佇列）
+    hub.send_to(
+        websocket, {"type": "connection_established", "message": "WebSocket 連接已建立"}
+    )
+
+    # 檢查是否有待發送的會話更新（只針對當前會話）
+    if session is manager.get_current_session() and getattr(
+        manager, "_pending_session_update", False
+    ):
+        debug_log("檢測到待發送的會話更新，準備發送通知")
+        hub.send_to(
+            websocket,
+            {
+                "type": "session_updated",
+                "message": "新會話已創建，正在更新頁面內容",
+                "session_info": {
+                    "project_directory": session.project_directory,
+                    "summary": session.summary,
+                    "session_id": session.session_id,
+                },
+            },
+        )
+        manager._pending_session_update = False
+        debug_log("✅ 已發送會話更新通知到前端")
+    else:
+        # 發送當前會話狀態
+        hub.send_to(
+            websocket,
+            {"type": "status_update", "status_info": session.get_status_info()},
+        )
+        debug_log("已發送當前會話狀態到前端")
+
+    # 發送會話列表，讓頁面顯示其他等待回饋的會話
+    hub.send_to(
+        websocket,
+        {
+            "type": "sessions_changed",
+            "session_id": session.session_id,
+            "sessions": manager.list_sessions(),
+        },
+    )
+
+    try:
+        while True:
+            data = await websocket.receive_text()
+            message = json.loads(data)
+
+            # 重新查找連接所屬的會話，以防連接已轉移到新會話
+            current_session = manager.get_session_for_websocket(websocket)
+            if current_session:
+                await handle_websocket_message(
+                    manager, current_session, message, websocket
+                )
+            else:
+                debug_log("會話已結束或 WebSocket 連接已被替換，忽略消息")
+                break
+
+    except WebSocketDisconnect:
+        debug_log("WebSocket 連接正常斷開")
+    except ConnectionResetError:
+        debug_log("WebSocket 連接被重置")
+    except Exception as e:
+        debug_log(f"WebSocket 錯誤: {e}")
+    finally:
+        # 安全清理 WebSocket 連接
+        current_session = manager.get_session_for_websocket(websocket)
+        hub.unregister(websocket)
+        if current_session and current_session.websocket is websocket:
+            # 其他標籤頁仍連接時保留其連接作為會話的主要連接
+            remaining = hub.get_connections(current_session.session_id)
+            current_session.websocket = remaining[-1].websocket if remaining else None
+            debug_log("已清理會話中的 WebSocket 連接")
+
+
+async def _reply(session, websocket: WebSocket | None, message: dict):
+    """回覆發出請求的連接（無連接中心記錄時發送到會話）"""
+    hub = session.connection_hub
+    if websocket is None or hub is None or not hub.send_to(websocket, message):
+        await session.send_message(message)
+
+
+async def handle_websocket_message(
+    manager: "WebUIManager", session, data: dict, websocket: WebSocket | None = None
+):
+    """處理 WebSocket 消息（websocket 為發出消息的連接）"""
     message_type = data.get("type")
 
     if message_type == "submit_feedback":
@@ -392,6 +740,23 @@ async def handle_websocket_message(manager: "WebUIManager", session, data: dict)
         settings = data.get("settings", {})
         await session.submit_feedback(feedback, images, settings)
 
+    elif message_type == "prepare_images":
+        # 圖片上傳時預先正規化
+        images = data.get("images", [])
+        if images:
+            prepared = session.prepare_images(images, data.get("settings"))
+            debug_log(f"已提交 {len(prepared)} 張圖片進行背景正規化")
+            # 回覆內容鍵，提交回饋時前端以內容鍵引用這些圖片
+            await _reply(
+                session,
+                websocket,
+                {
+                    "type": "images_prepared",
+                    "session_id": session.session_id,
+                    "images": prepared,
+                },
+            )
+
     elif message_type == "run_command":
         # 執行命令
         command = data.get("command", "")
@@ -400,13 +765,11 @@ async def handle_websocket_message(manager: "WebUIManager", session, data: dict)
 
     elif message_type == "get_status":
         # 獲取會話狀態
-        if session.websocket:
-            try:
-                await session.websocket.send_json(
-                    {"type": "status_update", "status_info": session.get_status_info()}
-                )
-            except Exception as e:
-                debug_log(f"發送狀態更新失敗: {e}")
+        await _reply(
+            session,
+            websocket,
+            {"type": "status_update", "status_info": session.get_status_info()},
+        )
 
     elif message_type == "heartbeat":
         # WebSocket 心跳處理
@@ -425,17 +788,11 @@ async def handle_websocket_message(manager: "WebUIManager", session, data: dict)
         manager.global_active_tabs[tab_id] = tab_info
 
         # 發送心跳回應
-        if session.websocket:
-            try:
-                await session.websocket.send_json(
-                    {
-                        "type": "heartbeat_response",
-                        "tabId": tab_id,
-                        "timestamp": timestamp,
-                    }
-                )
-            except Exception as e:
-                debug_log(f"發送心跳回應失敗: {e}")
+        await _reply(
+            session,
+            websocket,
+            {"type": "heartbeat_response", "tabId": tab_id, "timestamp": timestamp},
+        )
 
     elif message_type == "user_timeout":
         # 用戶設置的超時已到
@@ -191,6 +191,9 @@
                             layoutMode: settings.layoutMode,
                             onSettingsChange: function() {
                                 self.saveImageSettings();
+                            },
+                            onImageAdd: function(fileData) {
+                                self.prepareImage(fileData);
                             }
                         });
 
@@ -212,7 +215,10 @@
                             self.checkAndStartAutoSubmit();
                         }, 500); // 延遲 500ms 確保所有初始化完成
 
-                        // 14. 建立 WebSocket 連接
+                        // 14. 以頁面內嵌的會話狀態更新 UI，不必等待 WebSocket 的 status_update
+                        self.applyBootstrapSession();
+
+                        // 15. 建立 WebSocket 連接
                         self.webSocketManager.connect();
 
                         resolve();
@@ -224,6 +230,26 @@
         });
     };
 
+    /**
+     * 套用頁面內嵌的會話狀態與會話列表（僅首次載入）
+     */
+    FeedbackApp.prototype.applyBootstrapSession = function() {
+        const bootstrap = window.MCPFeedbackBootstrap;
+        if (!bootstrap || !bootstrap.session) {
+            return;
+        }
+
+        const statusInfo = bootstrap.session;
+        const sessions = bootstrap.sessions;
+        delete bootstrap.session;
+        delete bootstrap.sessions;
+
+        this.handleStatusUpdate(statusInfo);
+        if (sessions && this.sessionManager) {
+            this.sessionManager.updateWaitingSessions(sessions, statusInfo.session_id);
+        }
+    };
+
     /**
      * 設置事件監聽器
      */
@@ -484,6 +510,14 @@
                 console.log('🔄 收到會話更新訊息:', data.session_info);
                 this.handleSessionUpdated(data);
                 break;
+            case 'images_prepared':
+                this.handleImagesPrepared(data);
+                break;
+            case 'sessions_changed':
+                if (this.sessionManager) {
+                    this.sessionManager.updateWaitingSessions(data.sessions, data.session_id || this.currentSessionId);
+                }
+                break;
         }
     };
 
@@ -728,6 +762,67 @@
         }
     };
 
+    /**
+     * 圖片加入後立即送到伺服器背景正規化，提交時直接使用處理結果
+     */
+    FeedbackApp.prototype.prepareImage = function(fileData) {
+        if (!this.webSocketManager) {
+            return;
+        }
+        this.preparedImageRef = (this.preparedImageRef || 0) + 1;
+        fileData.prepareRef = this.preparedImageRef;
+        this.pendingPreparedImages = this.pendingPreparedImages || {};
+        this.pendingPreparedImages[fileData.prepareRef] = fileData;
+        this.webSocketManager.send({
+            type: 'prepare_images',
+            images: [{
+                ref: fileData.prepareRef,
+                name: fileData.name,
+                data: fileData.data,
+                size: fileData.size
+            }],
+            settings: {
+                image_size_limit: this.imageHandler ? this.imageHandler.imageSizeLimit : 0
+            }
+        });
+    };
+
+    /**
+     * 記錄伺服器已預處理圖片的內容鍵
+     */
+    FeedbackApp.prototype.handleImagesPrepared = function(data) {
+        const pending = this.pendingPreparedImages || {};
+        (data.images || []).forEach(function(prepared) {
+            const fileData = pending[prepared.ref];
+            if (fileData) {
+                fileData.preparedKey = prepared.key;
+                fileData.preparedSessionId = data.session_id;
+                delete pending[prepared.ref];
+            }
+        });
+    };
+
+    /**
+     * 提交時的圖片列表：當前會話已預處理的圖片只送出內容鍵
+     */
+    FeedbackApp.prototype.buildSubmitImages = function(images) {
+        const sessionId = this.currentSessionId;
+        return images.map(function(image) {
+            if (image.preparedKey && image.preparedSessionId === sessionId) {
+                return {
+                    name: image.name,
+                    size: image.size,
+                    key: image.preparedKey
+                };
+            }
+            return {
+                name: image.name,
+                data: image.data,
+                size: image.size
+            };
+        });
+    };
+
     /**
      * 收集回饋數據
      */
@@ -777,7 +872,7 @@
             const success = this.webSocketManager.send({
                 type: 'submit_feedback',
                 feedback: feedbackData.feedback,
-                images: feedbackData.images,
+                images: this.buildSubmitImages(feedbackData.images),
                 settings: feedbackData.settings
             });
 
@@ -816,6 +911,7 @@
         if (this.imageHandler) {
             this.imageHandler.clearImages();
         }
+        this.pendingPreparedImages = {};
 
         console.log('✅ 回饋內容清空完成');
     };
@@ -971,7 +1067,8 @@
 
         const self = this;
 
-        fetch('/api/current-session')
+        // 以 ETag 重新驗證：會話資料未變更時伺服器返回 304，瀏覽器直接使用快取
+        fetch('/api/current-session', { cache: 'no-cache' })
             .then(function(response) {
                 if (!response.ok) {
                     throw new Error('API 請求失敗: ' + response.status);
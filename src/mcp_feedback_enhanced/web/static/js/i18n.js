@@ -3,13 +3,15 @@
  * =================
  * 
  * 處理多語言支援和界面文字翻譯
- * 從後端 /api/translations 載入翻譯數據
+ * 從後端 /api/translations/{language} 載入當前語言的翻譯數據
  */
 
 class I18nManager {
     constructor() {
         this.currentLanguage = 'zh-TW';
+        this.supportedLanguages = ['zh-TW', 'zh-CN', 'en'];
         this.translations = {};
+        this.languagePromises = {};
         this.loadingPromise = null;
     }
 
@@ -19,6 +21,9 @@ class I18nManager {
         if (savedLanguage) {
             this.currentLanguage = savedLanguage;
             console.log(`i18nManager 從 localStorage 載入語言: ${savedLanguage}`);
+        } else if (window.MCPFeedbackBootstrap && window.MCPFeedbackBootstrap.language) {
+            this.currentLanguage = window.MCPFeedbackBootstrap.language;
+            console.log(`i18nManager 使用設定中的語言: ${this.currentLanguage}`);
         } else {
             console.log(`i18nManager 使用默認語言: ${this.currentLanguage}`);
         }
@@ -43,27 +48,64 @@ class I18nManager {
             return this.loadingPromise;
         }
 
-        this.loadingPromise = fetch('/api/translations')
-            .then(response => response.json())
-            .then(data => {
-                this.translations = data;
-                console.log('翻譯數據載入完成:', Object.keys(this.translations));
-                
-                // 檢查當前語言是否有翻譯數據
-                if (!this.translations[this.currentLanguage] || Object.keys(this.translations[this.currentLanguage]).length === 0) {
+        // 頁面內嵌的翻譯直接使用，不必再請求
+        const bootstrap = window.MCPFeedbackBootstrap;
+        if (bootstrap && bootstrap.translations) {
+            Object.keys(bootstrap.translations).forEach(language => {
+                this.translations[language] = bootstrap.translations[language];
+                this.languagePromises[language] = Promise.resolve(true);
+            });
+            delete bootstrap.translations;
+        }
+
+        // 只下載當前語言，其他語言在切換時才載入
+        this.loadingPromise = this.loadLanguage(this.currentLanguage)
+            .then(loaded => {
+                if (!loaded && this.currentLanguage !== 'zh-TW') {
                     console.warn(`當前語言 ${this.currentLanguage} 沒有翻譯數據，回退到 zh-TW`);
                     this.currentLanguage = 'zh-TW';
+                    return this.loadLanguage('zh-TW');
                 }
+                return loaded;
             })
-            .catch(error => {
-                console.error('載入翻譯數據失敗:', error);
-                // 使用最小的回退翻譯
-                this.translations = this.getMinimalFallbackTranslations();
+            .then(loaded => {
+                if (!loaded) {
+                    // 使用最小的回退翻譯
+                    Object.assign(this.translations, this.getMinimalFallbackTranslations());
+                }
+                console.log('翻譯數據載入完成:', Object.keys(this.translations));
             });
 
         return this.loadingPromise;
     }
 
+    loadLanguage(language) {
+        if (!this.languagePromises[language]) {
+            // 以 ETag 重新驗證：翻譯未變更時伺服器返回 304，瀏覽器直接使用快取
+            this.languagePromises[language] = fetch(`/api/translations/${encodeURIComponent(language)}`, { cache: 'no-cache' })
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error(`HTTP ${response.status}`);
+                    }
+                    return response.json();
+                })
+                .then(data => {
+                    if (!data || Object.keys(data).length === 0) {
+                        return false;
+                    }
+                    this.translations[language] = data;
+                    return true;
+                })
+                .catch(error => {
+                    console.error(`載入翻譯數據失敗 (${language}):`, error);
+                    // 允許稍後重試
+                    delete this.languagePromises[language];
+                    return false;
+                });
+        }
+        return this.languagePromises[language];
+    }
+
     getMinimalFallbackTranslations() {
         // 最小的回退翻譯，只包含關鍵項目
         return {
@@ -121,23 +163,24 @@ class I18nManager {
         }, obj);
     }
 
-    setLanguage(language) {
+    async setLanguage(language) {
         console.log(`🔄 i18nManager.setLanguage() 被調用: ${this.currentLanguage} -> ${language}`);
-        if (this.translations[language]) {
-            this.currentLanguage = language;
-            localStorage.setItem('language', language);
-            this.applyTranslations();
+        if (!this.supportedLanguages.includes(language) || !(await this.loadLanguage(language))) {
+            console.warn(`❌ i18nManager 不支援的語言: ${language}`);
+            return;
+        }
+
+        this.currentLanguage = language;
+        localStorage.setItem('language', language);
+        this.applyTranslations();
 
-            // 更新所有語言選擇器（包括現代化版本）
-            this.setupLanguageSelectors();
+        // 更新所有語言選擇器（包括現代化版本）
+        this.setupLanguageSelectors();
 
-            // 更新 HTML lang 屬性
-            document.documentElement.lang = language;
+        // 更新 HTML lang 屬性
+        document.documentElement.lang = language;
 
-            console.log(`✅ i18nManager 語言已切換到: ${language}`);
-        } else {
-            console.warn(`❌ i18nManager 不支援的語言: ${language}`);
-        }
+        console.log(`✅ i18nManager 語言已切換到: ${language}`);
     }
 
     applyTranslations() {
@@ -314,7 +357,7 @@ class I18nManager {
     }
 
     getAvailableLanguages() {
-        return Object.keys(this.translations);
+        return this.supportedLanguages.slice();
     }
 }
 
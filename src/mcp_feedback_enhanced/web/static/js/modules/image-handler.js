@@ -29,6 +29,7 @@
 
         // 回調函數
         this.onSettingsChange = options.onSettingsChange || null;
+        this.onImageAdd = options.onImageAdd || null;
 
         // 創建檔案上傳管理器
         const self = this;
@@ -37,6 +38,9 @@
             enableBase64Detail: this.enableBase64Detail,
             onFileAdd: function(fileData) {
                 console.log('📁 檔案已添加:', fileData.name);
+                if (self.onImageAdd) {
+                    self.onImageAdd(fileData);
+                }
             },
             onFileRemove: function(fileData, index) {
                 console.log('🗑️ 檔案已移除:', fileData.name);
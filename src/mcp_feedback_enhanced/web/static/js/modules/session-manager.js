@@ -128,6 +128,62 @@
         }
     };
 
+    /**
+     * 更新其他等待回饋的會話列表（伺服器同時有多個會話時）
+     */
+    SessionManager.prototype.updateWaitingSessions = function(sessions, currentSessionId) {
+        const section = document.getElementById('waitingSessionsSection');
+        const list = document.getElementById('waitingSessionsList');
+        if (!section || !list) {
+            return;
+        }
+
+        const others = (sessions || []).filter(function(session) {
+            return session.waiting && session.session_id !== currentSessionId;
+        });
+
+        list.innerHTML = '';
+        section.style.display = others.length > 0 ? '' : 'none';
+
+        const openText = window.i18nManager ? window.i18nManager.t('sessionManagement.openSession') : '開啟';
+        others.forEach(function(session) {
+            const card = document.createElement('div');
+            card.className = 'session-card';
+
+            const header = document.createElement('div');
+            header.className = 'session-header';
+            const sessionId = document.createElement('div');
+            sessionId.className = 'session-id';
+            sessionId.textContent = session.session_id.substring(0, 8) + '...';
+            header.appendChild(sessionId);
+
+            const info = document.createElement('div');
+            info.className = 'session-info';
+            const project = document.createElement('div');
+            project.className = 'session-project';
+            project.textContent = session.project_directory;
+            const summary = document.createElement('div');
+            summary.className = 'session-summary';
+            summary.textContent = session.summary.length > 80 ? session.summary.substring(0, 80) + '...' : session.summary;
+            info.appendChild(project);
+            info.appendChild(summary);
+
+            const actions = document.createElement('div');
+            actions.className = 'session-actions';
+            const link = document.createElement('a');
+            link.className = 'btn-small';
+            link.href = session.url;
+            link.target = '_blank';
+            link.textContent = openText;
+            actions.appendChild(link);
+
+            card.appendChild(header);
+            card.appendChild(info);
+            card.appendChild(actions);
+            list.appendChild(card);
+        });
+    };
+
     /**
      * 處理歷史記錄變更
      */
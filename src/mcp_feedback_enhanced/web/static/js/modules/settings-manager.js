@@ -87,7 +87,16 @@
      * 從伺服器載入設定
      */
     SettingsManager.prototype.loadFromServer = function() {
-        return fetch('/api/load-settings')
+        // 首次載入時使用頁面內嵌的設定，不必再請求
+        const bootstrap = window.MCPFeedbackBootstrap;
+        if (bootstrap && bootstrap.settings) {
+            const settings = bootstrap.settings;
+            delete bootstrap.settings;
+            return Promise.resolve(settings);
+        }
+
+        // 以 ETag 重新驗證：設定未變更時伺服器返回 304，瀏覽器直接使用快取
+        return fetch('/api/load-settings', { cache: 'no-cache' })
             .then(function(response) {
                 if (response.ok) {
                     return response.json();
@@ -57,7 +57,10 @@
         // 確保 WebSocket URL 格式正確
         const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
         const host = window.location.host;
-        const wsUrl = protocol + '//' + host + '/ws';
+        // 會話頁面（/session/<id>）連接到指定會話，根路徑連接到當前會話
+        const sessionMatch = window.location.pathname.match(/^\/session\/([\w-]+)/);
+        const wsPath = sessionMatch ? '/ws/' + sessionMatch[1] : '/ws';
+        const wsUrl = protocol + '//' + host + wsPath;
 
         console.log('嘗試連接 WebSocket:', wsUrl);
         const connectingMessage = window.i18nManager ? window.i18nManager.t('connectionMonitor.connecting') : '連接中...';
@@ -175,7 +178,11 @@
         }
 
         // 處理不同的關閉原因
-        if (event.code === 4004) {
+        if (event.code === 4004 && window.location.pathname.indexOf('/session/') === 0) {
+            // 指定的會話已結束或被取代，回到當前會話頁面
+            window.location.href = '/';
+            return;
+        } else if (event.code === 4004) {
             const noActiveSessionMessage = window.i18nManager ? window.i18nManager.t('connectionMonitor.noActiveSession') : '沒有活躍會話';
             this.updateConnectionStatus('disconnected', noActiveSessionMessage);
         } else {
@@ -0,0 +1,591 @@
+#!/usr/bin/env python3
+"""
+靜態資源管線
+============
+
+將 Web UI 的 JS / CSS 依載入順序合併為少數幾個包，並且：
+- 以純 Python 做保守的壓縮（移除註釋與多餘空白，不改寫標識符）
+- 以內容雜湊命名（如 feedback.3f2a1b9c0d.js），可永久快取
+- 預先產生 .gz（以及安裝 brotli 時的 .br）變體，請求時直接送出
+
+scripts/build_assets.py 會把結果寫入 static/dist（不納入版本控制，也不隨套件
+發佈）；運行時若 dist 與原始檔一致就直接載入，否則在首次使用時於內存中建置。
+設定 MCP_WEB_ASSET_BUNDLE=false 時模板改回逐一引用原始檔，方便除錯。
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from ...debug import web_debug_log as debug_log
+from ...utils.error_handler import ErrorHandler, ErrorType
+
+
+# 管線版本，壓縮規則改變時遞增以讓舊的 dist 失效
+PIPELINE_VERSION = 1
+
+# 資源包定義：包名 -> 依載入順序排列的原始檔（相對 static 目錄）
+BUNDLES: dict[str, tuple[str, ...]] = {
+    "feedback.css": (
+        "css/styles.css",
+        "css/session-management.css",
+        "css/prompt-management.css",
+    ),
+    "feedback.js": (
+        "js/i18n.js",
+        # 工具模組
+        "js/modules/utils/dom-utils.js",
+        "js/modules/utils/time-utils.js",
+        "js/modules/utils/status-utils.js",
+        # 會話管理模組
+        "js/modules/session/session-data-manager.js",
+        "js/modules/session/session-ui-renderer.js",
+        "js/modules/session/session-details-modal.js",
+        # 提示詞管理模組
+        "js/modules/prompt/prompt-manager.js",
+        "js/modules/prompt/prompt-modal.js",
+        "js/modules/prompt/prompt-settings-ui.js",
+        "js/modules/prompt/prompt-input-buttons.js",
+        # 其他模組
+        "js/modules/utils.js",
+        "js/modules/tab-manager.js",
+        "js/modules/websocket-manager.js",
+        "js/modules/connection-monitor.js",
+        "js/modules/session-manager.js",
+        "js/modules/file-upload-manager.js",
+        "js/modules/image-handler.js",
+        "js/modules/settings-manager.js",
+        "js/modules/ui-manager.js",
+        # 主應用程式
+        "js/app.js",
+    ),
+    "index.css": ("css/styles.css",),
+    "index.js": (
+        "js/i18n.js",
+        "js/modules/utils.js",
+        "js/modules/tab-manager.js",
+        "js/modules/websocket-manager.js",
+        "js/modules/image-handler.js",
+        "js/modules/settings-manager.js",
+        "js/modules/ui-manager.js",
+        "js/app.js",
+    ),
+}
+
+CONTENT_TYPES = {
+    ".js": "application/javascript; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+}
+
+# 檔名中內容雜湊的長度
+HASH_LENGTH = 10
+
+DIST_DIRNAME = "dist"
+MANIFEST_NAME = "manifest.json"
+
+
+# ===== 壓縮 =====
+
+_JS_PLAIN = re.compile(r"[^'\"`/{}\s]+")
+_JS_SPACE = re.compile(r"\s+")
+_JS_TRAILING_WORD = re.compile(r"[\w$]+$")
+# 這些字元或關鍵字之後的 / 是正則表達式的開頭，其餘情況視為除號
+_REGEX_PREFIX_CHARS = frozenset("(,=:[!&|?{};+-*%<>~^")
+_REGEX_PREFIX_WORDS = frozenset(
+    (
+        "return",
+        "typeof",
+        "instanceof",
+        "in",
+        "of",
+        "new",
+        "delete",
+        "void",
+        "throw",
+        "case",
+        "do",
+        "else",
+        "yield",
+        "await",
+    )
+)
+# 換行符號出現在這些字元之後（或之前）時可以安全移除，不影響自動插入分號
+_NEWLINE_AFTER = frozenset(";{(,[")
+_NEWLINE_BEFORE = frozenset("})],")
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char in "_$\\" or ord(char) > 127
+
+
+class _JsMinifier:
+    """
+    保守的 JS 壓縮器
+
+    只移除註釋和不影響語義的空白；字串、模板字串和正則表達式原樣保留。
+    可能觸發自動插入分號的換行都會保留。
+    """
+
+    def __init__(self, source: str):
+        self.src = source
+        self.pos = 0
+        self.out: list[str] = []
+        self.last = ""
+        self.last_word = ""
+        self.pending = ""
+
+    def run(self) -> str:
+        self._code(until_brace=False)
+        return "".join(self.out).strip() + "\n"
+
+    def _emit(self, text: str):
+        if self.pending:
+            self._emit_separator(text[0])
+            self.pending = ""
+        self.out.append(text)
+        self.last = text[-1]
+        match = _JS_TRAILING_WORD.search(text)
+        self.last_word = match.group() if match and match.end() == len(text) else ""
+
+    def _emit_separator(self, next_char: str):
+        last = self.last
+        if not last:
+            return
+        if self.pending == "\n":
+            if last in _NEWLINE_AFTER or next_char in _NEWLINE_BEFORE:
+                return
+            self.out.append("\n")
+            return
+        if (
+            (_is_word_char(last) and _is_word_char(next_char))
+            or (last == next_char and last in "+-/")
+            or (last.isdigit() and next_char == ".")
+        ):
+            self.out.append(" ")
+
+    def _regex_allowed(self) -> bool:
+        if not self.last:
+            return True
+        if self.last in _REGEX_PREFIX_CHARS:
+            return True
+        return self.last_word in _REGEX_PREFIX_WORDS
+
+    def _code(self, until_brace: bool):
+        src = self.src
+        depth = 0
+        while self.pos < len(src):
+            char = src[self.pos]
+            plain = _JS_PLAIN.match(src, self.pos)
+            if plain:
+                self._emit(plain.group())
+                self.pos = plain.end()
+            elif char.isspace():
+                space = _JS_SPACE.match(src, self.pos)
+                if "\n" in space.group() or self.pending == "\n":
+                    self.pending = "\n"
+                else:
+                    self.pending = " "
+                self.pos = space.end()
+            elif char in "'\"":
+                self._string(char)
+            elif char == "`":
+                self._template()
+            elif char == "/":
+                self._slash()
+            elif char == "{":
+                depth += 1
+                self._emit("{")
+                self.pos += 1
+            else:  # "}"
+                if until_brace and depth == 0:
+                    return
+                depth -= 1
+                self._emit("}")
+                self.pos += 1
+
+    def _string(self, quote: str):
+        src = self.src
+        end = self.pos + 1
+        while end < len(src) and src[end] != quote:
+            end += 2 if src[end] == "\\" else 1
+        self._emit(src[self.pos : end + 1])
+        self.pos = end + 1
+
+    def _template(self):
+        src = self.src
+        start = self.pos
+        end = start + 1
+        while end < len(src):
+            char = src[end]
+            if char == "\\":
+                end += 2
+            elif char == "`":
+                break
+            elif char == "$" and src.startswith("${", end):
+                # 插值表達式內部是一般代碼，可能再包含模板字串
+                self._emit(src[start : end + 2])
+                self.pos = end + 2
+                self._code(until_brace=True)
+                start = self.pos
+                end = start + 1
+                if src.startswith("}", start):
+                    continue
+                break
+            else:
+                end += 1
+        self._emit(src[start : end + 1])
+        self.pos = end + 1
+
+    def _slash(self):
+        src = self.src
+        pos = self.pos
+        if src.startswith("//", pos):
+            end = src.find("\n", pos)
+            self.pos = len(src) if end == -1 else end
+            return
+        if src.startswith("/*", pos):
+            end = src.find("*/", pos + 2)
+            end = len(src) if end == -1 else end + 2
+            comment = src[pos:end]
+            if "\n" in comment or self.pending == "\n":
+                self.pending = "\n"
+            elif not self.pending:
+                self.pending = " "
+            self.pos = end
+            return
+        if not self._regex_allowed():
+            self._emit("/")
+            self.pos += 1
+            return
+        end = pos + 1
+        in_class = False
+        while end < len(src):
+            char = src[end]
+            if char == "\\":
+                end += 2
+                continue
+            if char == "[":
+                in_class = True
+            elif char == "]":
+                in_class = False
+            elif (char == "/" and not in_class) or char == "\n":
+                break
+            end += 1
+        end += 1
+        while end < len(src) and src[end].isalpha():
+            end += 1
+        self._emit(src[pos:end])
+        self.pos = end
+
+
+def minify_js(source: str) -> str:
+    """移除 JS 的註釋與多餘空白"""
+    return _JsMinifier(source).run()
+
+
+_CSS_TOKENS = re.compile(
+    r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|([^\"'/]+|/)", re.DOTALL
+)
+_CSS_SPACE = re.compile(r"\s+")
+_CSS_PUNCT_SPACE = re.compile(r"\s*([{};,>])\s*")
+_CSS_COLON_SPACE = re.compile(r":\s+")
+
+
+def minify_css(source: str) -> str:
+    """移除 CSS 的註釋與多餘空白"""
+    parts = []
+    for string, comment, other in _CSS_TOKENS.findall(source):
+        if string:
+            parts.append(string)
+        elif comment:
+            parts.append(" ")
+        else:
+            compact = _CSS_SPACE.sub(" ", other)
+            compact = _CSS_PUNCT_SPACE.sub(r"\1", compact)
+            compact = _CSS_COLON_SPACE.sub(":", compact)
+            parts.append(compact.replace(";}", "}"))
+    return "".join(parts).strip() + "\n"
+
+
+def _brotli_compress(data: bytes) -> bytes | None:
+    """以 brotli 壓縮（未安裝 brotli 時返回 None）"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return bytes(brotli.compress(data, quality=11))
+
+
+# ===== 建置 =====
+
+
+@dataclass
+class BuiltAsset:
+    """建置完成的資源包"""
+
+    name: str
+    filename: str
+    content_type: str
+    content: bytes
+    gzip_content: bytes
+    brotli_content: bytes | None = None
+    sources: tuple[str, ...] = field(default_factory=tuple)
+
+    def get_variant(self, accept_encoding: str) -> tuple[bytes, str | None]:
+        """依 Accept-Encoding 選擇要送出的內容與 Content-Encoding"""
+        accepted = {
+            token.split(";")[0].strip().lower() for token in accept_encoding.split(",")
+        }
+        if self.brotli_content is not None and "br" in accepted:
+            return self.brotli_content, "br"
+        if "gzip" in accepted:
+            return self.gzip_content, "gzip"
+        return self.content, None
+
+    def to_manifest(self) -> dict[str, Any]:
+        return {
+            "file": self.filename,
+            "sources": list(self.sources),
+            "size": len(self.content),
+            "gzip_size": len(self.gzip_content),
+            "brotli_size": len(self.brotli_content)
+            if self.brotli_content is not None
+            else None,
+        }
+
+
+def _hashed_filename(name: str, content: bytes) -> str:
+    stem, ext = os.path.splitext(name)
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    return f"{stem}.{digest}{ext}"
+
+
+class AssetPipeline:
+    """靜態資源管線"""
+
+    def __init__(
+        self,
+        static_dir: Path,
+        bundles: dict[str, tuple[str, ...]] | None = None,
+        *,
+        use_brotli: bool = True,
+    ):
+        self.static_dir = Path(static_dir)
+        self.dist_dir = self.static_dir / DIST_DIRNAME
+        self.bundles = bundles or BUNDLES
+        self.use_brotli = use_brotli
+        self.assets: dict[str, BuiltAsset] = {}
+        self._by_filename: dict[str, BuiltAsset] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.stats: dict[str, Any] = {"source": None, "build_seconds": 0.0}
+
+    def fingerprint(self) -> str:
+        """原始檔與管線版本的雜湊，用於判斷 dist 是否過期"""
+        digest = hashlib.sha256(f"v{PIPELINE_VERSION}".encode())
+        for name in sorted(self.bundles):
+            digest.update(name.encode())
+            for source in self.bundles[name]:
+                digest.update(source.encode())
+                digest.update((self.static_dir / source).read_bytes())
+        return digest.hexdigest()
+
+    def _build_asset(self, name: str) -> BuiltAsset:
+        ext = os.path.splitext(name)[1]
+        sources = self.bundles[name]
+        texts = [
+            (self.static_dir / source).read_text(encoding="utf-8") for source in sources
+        ]
+        if ext == ".js":
+            # 以分號分隔，避免前一個檔案結尾缺少分號時與下一個檔案連在一起
+            text = ";\n".join(minify_js(source) for source in texts)
+        else:
+            text = "".join(minify_css(source) for source in texts)
+        content = text.encode("utf-8")
+        return BuiltAsset(
+            name=name,
+            filename=_hashed_filename(name, content),
+            content_type=CONTENT_TYPES[ext],
+            content=content,
+            gzip_content=gzip.compress(content, compresslevel=9, mtime=0),
+            brotli_content=_brotli_compress(content) if self.use_brotli else None,
+            sources=sources,
+        )
+
+    def build(self) -> dict[str, BuiltAsset]:
+        """在內存中建置所有資源包"""
+        start = time.perf_counter()
+        assets = {name: self._build_asset(name) for name in self.bundles}
+        self._install(assets, "built", time.perf_counter() - start)
+        return assets
+
+    def write(self, output_dir: Path | None = None) -> Path:
+        """
+        建置並寫入 dist 目錄（雜湊檔名的內容與 .gz / .br 變體，以及 manifest）
+
+        Returns:
+            Path: manifest 的路徑
+        """
+        assets = self.build()
+        output_dir = Path(output_dir or self.dist_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        manifest: dict[str, Any] = {
+            "version": PIPELINE_VERSION,
+            "fingerprint": self.fingerprint(),
+            "assets": {},
+        }
+        keep = {MANIFEST_NAME}
+        for name, asset in assets.items():
+            variants = {
+                asset.filename: asset.content,
+                f"{asset.filename}.gz": asset.gzip_content,
+            }
+            if asset.brotli_content is not None:
+                variants[f"{asset.filename}.br"] = asset.brotli_content
+            for filename, data in variants.items():
+                (output_dir / filename).write_bytes(data)
+                keep.add(filename)
+            manifest["assets"][name] = asset.to_manifest()
+
+        # 清除同名資源包的舊雜湊檔案
+        prefixes = tuple(f"{os.path.splitext(name)[0]}." for name in assets)
+        for path in output_dir.iterdir():
+            if (
+                path.is_file()
+                and path.name.startswith(prefixes)
+                and path.name not in keep
+            ):
+                path.unlink()
+
+        manifest_path = output_dir / MANIFEST_NAME
+        manifest_path.write_text(
+            json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        return manifest_path
+
+    def _load_dist(self) -> bool:
+        """載入預先建置的 dist（不存在或已過期時返回 False）"""
+        manifest_path = self.dist_dir / MANIFEST_NAME
+        if not manifest_path.exists():
+            return False
+        start = time.perf_counter()
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if manifest.get("fingerprint") != self.fingerprint() or set(
+            manifest.get("assets", {})
+        ) != set(self.bundles):
+            debug_log("靜態資源 dist 已過期，改為在內存中建置")
+            return False
+
+        assets = {}
+        for name, entry in manifest["assets"].items():
+            path = self.dist_dir / entry["file"]
+            brotli_path = path.with_name(f"{path.name}.br")
+            assets[name] = BuiltAsset(
+                name=name,
+                filename=entry["file"],
+                content_type=CONTENT_TYPES[os.path.splitext(name)[1]],
+                content=path.read_bytes(),
+                gzip_content=path.with_name(f"{path.name}.gz").read_bytes(),
+                brotli_content=brotli_path.read_bytes()
+                if brotli_path.exists()
+                else None,
+                sources=tuple(entry["sources"]),
+            )
+        self._install(assets, "dist", time.perf_counter() - start)
+        return True
+
+    def _install(self, assets: dict[str, BuiltAsset], source: str, seconds: float):
+        self.assets = assets
+        self._by_filename = {asset.filename: asset for asset in assets.values()}
+        self._loaded = True
+        self.stats = {"source": source, "build_seconds": round(seconds, 4)}
+        debug_log(
+            f"靜態資源包已就緒（{source}，{seconds * 1000:.1f} ms）: "
+            + ", ".join(asset.filename for asset in assets.values())
+        )
+
+    def ensure_loaded(self) -> bool:
+        """
+        確保資源包可用（優先載入 dist，否則在內存中建置）
+
+        Returns:
+            bool: 是否可用；失敗時模板改回引用原始檔
+        """
+        if self._loaded:
+            return True
+        with self._lock:
+            if self._loaded:
+                return True
+            try:
+                if not self._load_dist():
+                    self.build()
+            except Exception as e:
+                error_id = ErrorHandler.log_error_with_context(
+                    e,
+                    context={"operation": "建置靜態資源包"},
+                    error_type=ErrorType.FILE_IO,
+                )
+                debug_log(f"靜態資源包建置失敗，改用原始檔 [錯誤ID: {error_id}]: {e}")
+                self.stats = {"source": "error", "build_seconds": 0.0}
+                return False
+            return True
+
+    def get(self, filename: str) -> BuiltAsset | None:
+        """以雜湊檔名查找資源包"""
+        if not self.ensure_loaded():
+            return None
+        return self._by_filename.get(filename)
+
+    def urls(self, name: str) -> list[str]:
+        """
+        模板使用的資源網址
+
+        啟用打包時返回單一雜湊網址，否則返回各原始檔的網址。
+        """
+        if is_bundling_enabled() and self.ensure_loaded():
+            return [f"/static/{DIST_DIRNAME}/{self.assets[name].filename}"]
+        from ... import __version__
+
+        return [f"/static/{source}?v={__version__}" for source in self.bundles[name]]
+
+    def get_stats(self) -> dict[str, Any]:
+        """獲取資源包統計"""
+        return {
+            **self.stats,
+            "bundling_enabled": is_bundling_enabled(),
+            "assets": {
+                name: asset.to_manifest() for name, asset in self.assets.items()
+            },
+        }
+
+
+def is_bundling_enabled() -> bool:
+    """是否以資源包提供靜態資源（MCP_WEB_ASSET_BUNDLE，預設開啟）"""
+    return os.getenv("MCP_WEB_ASSET_BUNDLE", "true").lower() not in (
+        "false",
+        "0",
+        "no",
+        "off",
+    )
+
+
+_asset_pipeline: AssetPipeline | None = None
+_pipeline_lock = threading.Lock()
+
+
+def get_asset_pipeline() -> AssetPipeline:
+    """獲取全域靜態資源管線實例"""
+    global _asset_pipeline
+    if _asset_pipeline is None:
+        with _pipeline_lock:
+            if _asset_pipeline is None:
+                _asset_pipeline = AssetPipeline(Path(__file__).parent.parent / "static")
+    return _asset_pipeline
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+命令執行器
+==========
+
+以 asyncio.create_subprocess_exec 執行命令，並以大塊讀取輸出：
+- 每次最多讀取 READ_CHUNK_SIZE 位元組，無需逐行切換到執行緒池
+- 輸出累積到 FLUSH_INTERVAL 秒或 FLUSH_BYTES 位元組後才回調一次，
+  大量輸出（如 pytest -v、建置日誌）只產生少量 WebSocket 幀
+- 記錄行數、位元組數、幀數與每秒行數/幀數
+"""
+
+import asyncio
+import codecs
+import os
+import subprocess
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from ...debug import web_debug_log as debug_log
+
+
+# 輸出批次的最長等待時間（秒），可透過 MCP_COMMAND_FLUSH_MS 覆蓋
+FLUSH_INTERVAL = 0.05
+# 輸出批次的最大位元組數
+FLUSH_BYTES = 16 * 1024
+# 單次讀取的最大位元組數
+READ_CHUNK_SIZE = 64 * 1024
+# 終止命令時等待退出的時間（秒）
+TERMINATE_TIMEOUT = 5.0
+
+
+def _get_flush_interval() -> float:
+    try:
+        return max(0.0, float(os.getenv("MCP_COMMAND_FLUSH_MS", "")) / 1000)
+    except ValueError:
+        return FLUSH_INTERVAL
+
+
+class CommandRunner:
+    """非同步命令執行器：批次轉發合併輸出"""
+
+    def __init__(
+        self,
+        on_output: Callable[[str], Awaitable[None]],
+        flush_interval: float | None = None,
+        flush_bytes: int = FLUSH_BYTES,
+    ):
+        self.on_output = on_output
+        self.flush_interval = (
+            _get_flush_interval() if flush_interval is None else flush_interval
+        )
+        self.flush_bytes = flush_bytes
+        self.process: asyncio.subprocess.Process | None = None
+        self.stats: dict[str, Any] = {
+            "lines": 0,
+            "bytes": 0,
+            "frames": 0,
+            "duration": 0.0,
+            "exit_code": None,
+        }
+        self._started_at = 0.0
+
+    @property
+    def popen(self) -> subprocess.Popen | None:
+        """底層的 Popen 對象（供資源管理器追蹤與同步清理）"""
+        if self.process is None:
+            return None
+        transport = getattr(self.process, "_transport", None)
+        return transport.get_extra_info("subprocess") if transport else None
+
+    async def start(self, argv: list[str], cwd: str | None = None):
+        """啟動命令（stderr 合併到 stdout，不使用 shell）"""
+        self.process = await asyncio.create_subprocess_exec(
+            *argv,
+            cwd=cwd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+        self._started_at = time.perf_counter()
+        return self.process
+
+    async def run(self) -> int:
+        """
+        讀取輸出直到命令結束
+
+        Returns:
+            int: 命令的退出碼
+        """
+        if self.process is None or self.process.stdout is None:
+            raise RuntimeError("命令尚未啟動")
+
+        loop = asyncio.get_running_loop()
+        stdout = self.process.stdout
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending: list[str] = []
+        pending_bytes = 0
+        deadline = 0.0
+
+        async def flush():
+            nonlocal pending, pending_bytes
+            if not pending:
+                return
+            text = "".join(pending)
+            pending, pending_bytes = [], 0
+            self.stats["frames"] += 1
+            self.stats["lines"] += text.count("\n")
+            await self.on_output(text)
+
+        try:
+            while True:
+                timeout = max(0.0, deadline - loop.time()) if pending else None
+                try:
+                    chunk = await asyncio.wait_for(
+                        stdout.read(READ_CHUNK_SIZE), timeout
+                    )
+                except TimeoutError:
+                    await flush()
+                    continue
+
+                if not chunk:
+                    break
+
+                self.stats["bytes"] += len(chunk)
+                text = decoder.decode(chunk)
+                if not text:
+                    continue
+                if not pending:
+                    deadline = loop.time() + self.flush_interval
+                pending.append(text)
+                pending_bytes += len(chunk)
+
+                if pending_bytes >= self.flush_bytes or loop.time() >= deadline:
+                    await flush()
+
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                pending.append(tail)
+            await flush()
+        finally:
+            exit_code = await self.process.wait()
+            self.stats["exit_code"] = exit_code
+            self.stats["duration"] = time.perf_counter() - self._started_at
+
+        stats = self.get_stats()
+        debug_log(
+            f"命令結束（退出碼 {exit_code}）：{stats['lines']} 行 / "
+            f"{stats['frames']} 幀，{stats['lines_per_second']} 行/秒，"
+            f"{stats['frames_per_second']} 幀/秒"
+        )
+        return exit_code
+
+    async def terminate(self, timeout: float = TERMINATE_TIMEOUT):
+        """終止命令，超時未退出時強制結束"""
+        process = self.process
+        if process is None or process.returncode is not None:
+            return
+        try:
+            process.terminate()
+            await asyncio.wait_for(process.wait(), timeout)
+        except TimeoutError:
+            process.kill()
+            await process.wait()
+        except ProcessLookupError:
+            pass
+
+    def get_stats(self) -> dict[str, Any]:
+        """獲取輸出吞吐量統計"""
+        duration = self.stats["duration"] or (
+            time.perf_counter() - self._started_at if self._started_at else 0.0
+        )
+
+        def rate(count: int) -> float:
+            return round(count / duration, 1) if duration > 0 else 0.0
+
+        return {
+            **self.stats,
+            "duration": round(duration, 4),
+            "lines_per_second": rate(self.stats["lines"]),
+            "frames_per_second": rate(self.stats["frames"]),
+        }
@@ -11,6 +11,8 @@ import os
 from dataclasses import dataclass, field
 from typing import Any
 
+from ...utils.metrics import MetricsRegistry, get_metrics_registry
+
 
 @dataclass
 class CompressionConfig:
@@ -22,6 +24,7 @@ class CompressionConfig:
 
     # 緩存設定
     static_cache_max_age: int = 3600  # 靜態文件緩存時間（秒）
+    bundle_cache_max_age: int = 31536000  # 內容雜湊資源包的緩存時間（秒）
     api_cache_max_age: int = 0  # API 響應緩存時間（秒，0表示不緩存）
 
     # 支援的 MIME 類型
@@ -89,7 +92,13 @@ class CompressionConfig:
         """獲取緩存頭"""
         headers = {}
 
-        if path.startswith("/static/"):
+        if path.startswith("/static/dist/"):
+            # 內容雜湊命名的資源包，內容改變時檔名也會改變，可永久快取
+            headers["Cache-Control"] = (
+                f"public, max-age={self.bundle_cache_max_age}, immutable"
+            )
+            headers["Expires"] = self._get_expires_header(self.bundle_cache_max_age)
+        elif path.startswith("/static/"):
             # 靜態文件緩存
             headers["Cache-Control"] = f"public, max-age={self.static_cache_max_age}"
             headers["Expires"] = self._get_expires_header(self.static_cache_max_age)
@@ -125,6 +134,17 @@ class CompressionConfig:
         }
 
 
+_metrics = get_metrics_registry()
+HTTP_RESPONSES = _metrics.counter(
+    "mcp_http_responses", "HTTP 響應數量", ("compressed",)
+)
+HTTP_RESPONSE_BYTES = _metrics.counter(
+    "mcp_http_response_bytes",
+    "HTTP 響應位元組數（original 為壓縮前，sent 為實際發送）",
+    ("kind",),
+)
+
+
 class CompressionManager:
     """壓縮管理器"""
 
@@ -144,6 +164,11 @@ class CompressionManager:
         """更新壓縮統計"""
         self._stats["requests_total"] += 1
         self._stats["bytes_original"] += original_size
+        HTTP_RESPONSES.labels("true" if was_compressed else "false").inc()
+        HTTP_RESPONSE_BYTES.labels("original").inc(original_size)
+        HTTP_RESPONSE_BYTES.labels("sent").inc(
+            compressed_size if was_compressed else original_size
+        )
 
         if was_compressed:
             self._stats["requests_compressed"] += 1
@@ -167,6 +192,12 @@ class CompressionManager:
         )
         return stats
 
+    def publish_metrics(self, registry: MetricsRegistry):
+        """指標收集器：整體壓縮比率"""
+        registry.gauge(
+            "mcp_http_compression_ratio_percent", "HTTP 響應的整體壓縮比率"
+        ).set(self._stats["compression_ratio"])
+
     def reset_stats(self):
         """重置統計"""
         self._stats = {
@@ -187,4 +218,7 @@ def get_compression_manager() -> CompressionManager:
     global _compression_manager
     if _compression_manager is None:
         _compression_manager = CompressionManager()
+        get_metrics_registry().register_collector(
+            "compression", _compression_manager.publish_metrics
+        )
     return _compression_manager
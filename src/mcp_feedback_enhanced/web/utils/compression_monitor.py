@@ -5,12 +5,41 @@
 
 監控 Gzip 壓縮的性能效果，包括壓縮比率、響應時間和文件大小統計。
 提供實時性能數據和優化建議。
+
+最近的請求保存在固定大小的環形緩衝區中，窗口總量隨記錄增量更新；
+響應時間與大小另以對數分桶直方圖統計，按路徑和內容類型回答
+p50/p95/p99，查詢時不需要掃描記錄。
+
+路徑與內容類型統計以 Space-Saving 結構保存，只追蹤固定數量的高頻鍵，
+帶有變動部分的路徑（如快取破壞查詢字串）不會讓統計無限增長。
 """
 
+import itertools
+import sys
 import threading
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 
+from ...utils.metrics import get_metrics_registry
+from ...utils.streaming_stats import LogHistogram, SpaceSaving
+
+
+# 追蹤的路徑與內容類型數量上限
+DEFAULT_MAX_PATHS = 200
+DEFAULT_MAX_CONTENT_TYPES = 50
+
+_metrics = get_metrics_registry()
+COMPRESSION_RATIO = _metrics.histogram(
+    "mcp_compression_ratio_percent",
+    "已壓縮響應的壓縮比率分佈",
+    ("content_type",),
+    buckets=(10, 20, 30, 40, 50, 60, 70, 80, 90, 95),
+)
+RESPONSE_SECONDS = _metrics.histogram(
+    "mcp_http_response_duration_seconds", "HTTP 響應耗時", ("compressed",)
+)
+
 
 @dataclass
 class CompressionMetrics:
@@ -39,22 +68,127 @@ class CompressionSummary:
     compression_percentage: float = 0.0
     bandwidth_saved: int = 0
     top_compressed_paths: list[tuple[str, float]] = field(default_factory=list)
+    response_time_percentiles: dict[str, float] = field(default_factory=dict)
+
+
+def _new_window_totals() -> dict:
+    return {
+        "requests": 0,
+        "compressed_requests": 0,
+        "total_original_bytes": 0,
+        "total_compressed_bytes": 0,
+        "total_response_time": 0.0,
+    }
+
+
+# 響應時間（秒）與大小（位元組）直方圖的最小可分辨值
+RESPONSE_TIME_MIN = 1e-6
+SIZE_MIN = 1.0
+
+# 參數相同的直方圖共用分桶結果，每個請求只計算一次
+_RESPONSE_TIME_SCALE = LogHistogram(min_value=RESPONSE_TIME_MIN)
+_SIZE_SCALE = LogHistogram(min_value=SIZE_MIN)
+
+
+class ResponseHistograms:
+    """響應時間（秒）與實際傳送大小（位元組）的直方圖"""
+
+    __slots__ = ("response_time", "size")
+
+    def __init__(self):
+        self.response_time = LogHistogram(min_value=RESPONSE_TIME_MIN)
+        self.size = LogHistogram(min_value=SIZE_MIN)
+
+    @staticmethod
+    def buckets(response_time: float, size: int) -> tuple[int, int]:
+        return _RESPONSE_TIME_SCALE.bucket(response_time), _SIZE_SCALE.bucket(size)
+
+    def record(self, response_time: float, size: int, buckets: tuple[int, int]):
+        self.response_time.record(response_time, bucket=buckets[0])
+        self.size.record(size, bucket=buckets[1])
+
+    def merge(self, other: "ResponseHistograms"):
+        self.response_time.merge(other.response_time)
+        self.size.merge(other.size)
+
+    def to_dict(self) -> dict:
+        return {
+            "response_time_ms": self.response_time.to_dict(scale=1000),
+            "size_bytes": self.size.to_dict(digits=0),
+        }
+
+    def memory_bytes(self) -> int:
+        return self.response_time.memory_bytes() + self.size.memory_bytes()
+
+
+class TrackedStats:
+    """被追蹤的路徑或內容類型的累計統計與分佈"""
+
+    __slots__ = ("histograms", "stats")
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+        self.histograms = ResponseHistograms()
+
+    @staticmethod
+    def for_path() -> "TrackedStats":
+        return TrackedStats(
+            {
+                "requests": 0,
+                "compressed_requests": 0,
+                "total_original_bytes": 0,
+                "total_compressed_bytes": 0,
+                "total_response_time": 0.0,
+                "best_compression_ratio": 0.0,
+            }
+        )
+
+    @staticmethod
+    def for_content_type() -> "TrackedStats":
+        return TrackedStats(
+            {
+                "requests": 0,
+                "compressed_requests": 0,
+                "total_original_bytes": 0,
+                "total_compressed_bytes": 0,
+                "average_compression_ratio": 0.0,
+            }
+        )
+
+    def memory_bytes(self) -> int:
+        return (
+            sys.getsizeof(self)
+            + sys.getsizeof(self.stats)
+            + self.histograms.memory_bytes()
+        )
 
 
 class CompressionMonitor:
     """壓縮性能監控器"""
 
-    def __init__(self, max_metrics: int = 1000):
+    def __init__(
+        self,
+        max_metrics: int = 1000,
+        max_paths: int = DEFAULT_MAX_PATHS,
+        max_content_types: int = DEFAULT_MAX_CONTENT_TYPES,
+    ):
         self.max_metrics = max_metrics
-        self.metrics: list[CompressionMetrics] = []
+        # 環形緩衝區：滿了之後 append 會在常數時間內淘汰最舊的記錄
+        self.metrics: deque[CompressionMetrics] = deque(maxlen=max_metrics)
         self.lock = threading.Lock()
         self._start_time = datetime.now()
 
-        # 路徑統計
-        self.path_stats: dict[str, dict] = {}
+        # 緩衝區窗口內的總量與響應時間分佈，隨記錄和淘汰增量更新
+        self._window = _new_window_totals()
+        self._window_response_time = LogHistogram(min_value=RESPONSE_TIME_MIN)
 
-        # 內容類型統計
-        self.content_type_stats: dict[str, dict] = {}
+        # 路徑統計（最多追蹤 max_paths 個高頻路徑）
+        self.path_stats = SpaceSaving(max_paths, TrackedStats.for_path)
+
+        # 內容類型統計（最多追蹤 max_content_types 個）
+        self.content_type_stats = SpaceSaving(
+            max_content_types, TrackedStats.for_content_type
+        )
 
     def record_request(
         self,
@@ -82,33 +216,53 @@ class CompressionMonitor:
             was_compressed=was_compressed,
         )
 
+        RESPONSE_SECONDS.labels("true" if was_compressed else "false").observe(
+            response_time
+        )
+        if was_compressed:
+            COMPRESSION_RATIO.labels(
+                content_type.partition(";")[0].strip() or "unknown"
+            ).observe(compression_ratio)
+
         with self.lock:
+            # 緩衝區已滿時，先從窗口總量中扣除即將被淘汰的記錄
+            if len(self.metrics) == self.max_metrics:
+                self._update_window(self.metrics[0], -1)
+            buckets = ResponseHistograms.buckets(response_time, compressed_size)
             self.metrics.append(metric)
-
-            # 限制記錄數量
-            if len(self.metrics) > self.max_metrics:
-                self.metrics = self.metrics[-self.max_metrics :]
+            self._update_window(metric, 1, buckets[0])
 
             # 更新路徑統計
-            self._update_path_stats(metric)
+            self._update_path_stats(metric, buckets)
 
             # 更新內容類型統計
-            self._update_content_type_stats(metric)
-
-    def _update_path_stats(self, metric: CompressionMetrics):
-        """更新路徑統計"""
-        path = metric.path
-        if path not in self.path_stats:
-            self.path_stats[path] = {
-                "requests": 0,
-                "compressed_requests": 0,
-                "total_original_bytes": 0,
-                "total_compressed_bytes": 0,
-                "total_response_time": 0.0,
-                "best_compression_ratio": 0.0,
-            }
+            self._update_content_type_stats(metric, buckets)
 
-        stats = self.path_stats[path]
+    def _update_window(
+        self, metric: CompressionMetrics, sign: int, bucket: int | None = None
+    ):
+        """增量更新窗口總量（sign 為 1 表示加入，-1 表示淘汰）"""
+        window = self._window
+        window["requests"] += sign
+        window["compressed_requests"] += sign * metric.was_compressed
+        window["total_original_bytes"] += sign * metric.original_size
+        window["total_compressed_bytes"] += sign * metric.compressed_size
+        if sign > 0:
+            window["total_response_time"] += metric.response_time
+            self._window_response_time.record(metric.response_time, bucket=bucket)
+        elif window["requests"]:
+            window["total_response_time"] -= metric.response_time
+            self._window_response_time.discard(metric.response_time)
+        else:
+            # 窗口清空時歸零，避免浮點誤差累積
+            self._window = _new_window_totals()
+            self._window_response_time.clear()
+
+    def _update_path_stats(self, metric: CompressionMetrics, buckets: tuple[int, int]):
+        """更新路徑統計（忽略查詢字串）"""
+        tracked = self.path_stats.record(metric.path.partition("?")[0])
+        tracked.histograms.record(metric.response_time, metric.compressed_size, buckets)
+        stats = tracked.stats
         stats["requests"] += 1
         stats["total_original_bytes"] += metric.original_size
         stats["total_compressed_bytes"] += metric.compressed_size
@@ -120,19 +274,14 @@ class CompressionMonitor:
                 stats["best_compression_ratio"], metric.compression_ratio
             )
 
-    def _update_content_type_stats(self, metric: CompressionMetrics):
+    def _update_content_type_stats(
+        self, metric: CompressionMetrics, buckets: tuple[int, int]
+    ):
         """更新內容類型統計"""
         content_type = metric.content_type or "unknown"
-        if content_type not in self.content_type_stats:
-            self.content_type_stats[content_type] = {
-                "requests": 0,
-                "compressed_requests": 0,
-                "total_original_bytes": 0,
-                "total_compressed_bytes": 0,
-                "average_compression_ratio": 0.0,
-            }
-
-        stats = self.content_type_stats[content_type]
+        tracked = self.content_type_stats.record(content_type)
+        tracked.histograms.record(metric.response_time, metric.compressed_size, buckets)
+        stats = tracked.stats
         stats["requests"] += 1
         stats["total_original_bytes"] += metric.original_size
         stats["total_compressed_bytes"] += metric.compressed_size
@@ -147,30 +296,40 @@ class CompressionMonitor:
                 ) * 100
 
     def get_summary(self, time_window: timedelta | None = None) -> CompressionSummary:
-        """獲取壓縮摘要統計"""
-        with self.lock:
-            metrics = self.metrics
+        """
+        獲取壓縮摘要統計
 
-            # 如果指定時間窗口，過濾數據
+        不指定時間窗口時直接讀取增量維護的窗口總量；指定時間窗口時
+        只從緩衝區尾端往回走訪窗口內的記錄。
+        """
+        with self.lock:
             if time_window:
+                totals = _new_window_totals()
+                response_times = LogHistogram(min_value=RESPONSE_TIME_MIN)
                 cutoff_time = datetime.now() - time_window
-                metrics = [m for m in metrics if m.timestamp >= cutoff_time]
-
-            if not metrics:
+                for m in reversed(self.metrics):
+                    if m.timestamp < cutoff_time:
+                        break
+                    totals["requests"] += 1
+                    totals["compressed_requests"] += m.was_compressed
+                    totals["total_original_bytes"] += m.original_size
+                    totals["total_compressed_bytes"] += m.compressed_size
+                    totals["total_response_time"] += m.response_time
+                    response_times.record(m.response_time)
+            else:
+                totals = self._window
+                response_times = self._window_response_time
+
+            total_requests = totals["requests"]
+            if not total_requests:
                 return CompressionSummary()
 
-            total_requests = len(metrics)
-            compressed_requests = sum(1 for m in metrics if m.was_compressed)
-            total_original_bytes = sum(m.original_size for m in metrics)
-            total_compressed_bytes = sum(m.compressed_size for m in metrics)
-            total_response_time = sum(m.response_time for m in metrics)
+            compressed_requests = totals["compressed_requests"]
+            total_original_bytes = totals["total_original_bytes"]
+            total_compressed_bytes = totals["total_compressed_bytes"]
 
             # 計算統計數據
-            compression_percentage = (
-                (compressed_requests / total_requests * 100)
-                if total_requests > 0
-                else 0
-            )
+            compression_percentage = compressed_requests / total_requests * 100
             average_compression_ratio = 0.0
             bandwidth_saved = 0
 
@@ -180,9 +339,7 @@ class CompressionMonitor:
                 ) * 100
                 bandwidth_saved = total_original_bytes - total_compressed_bytes
 
-            average_response_time = (
-                total_response_time / total_requests if total_requests > 0 else 0
-            )
+            average_response_time = totals["total_response_time"] / total_requests
 
             # 獲取壓縮效果最好的路徑
             top_compressed_paths = self._get_top_compressed_paths()
@@ -197,13 +354,24 @@ class CompressionMonitor:
                 compression_percentage=compression_percentage,
                 bandwidth_saved=bandwidth_saved,
                 top_compressed_paths=top_compressed_paths,
+                response_time_percentiles=response_times.percentiles(),
             )
 
     def _get_top_compressed_paths(self, limit: int = 5) -> list[tuple[str, float]]:
-        """獲取壓縮效果最好的路徑"""
+        """
+        獲取壓縮效果最好的路徑
+
+        只在 Space-Saving 追蹤中的高頻路徑之間比較，並排除被追蹤期間
+        次數不超過誤差上界的路徑：這類路徑可能剛取代其他路徑，
+        統計只涵蓋極少的請求，比率不具代表性。
+        """
         path_ratios = []
 
-        for path, stats in self.path_stats.items():
+        for path, tracked in self.path_stats.items():
+            stats = tracked.stats
+            count, error = self.path_stats.counts(path)
+            if error and count - error <= error:
+                continue
             if stats["compressed_requests"] > 0 and stats["total_original_bytes"] > 0:
                 compression_ratio = (
                     1 - stats["total_compressed_bytes"] / stats["total_original_bytes"]
@@ -214,25 +382,109 @@ class CompressionMonitor:
         path_ratios.sort(key=lambda x: x[1], reverse=True)
         return path_ratios[:limit]
 
+    def _export_tracked(self, sketch: SpaceSaving) -> dict[str, dict]:
+        """導出追蹤中的統計，附帶 Space-Saving 的計數誤差上界"""
+        result = {}
+        for key, tracked in sketch.items():
+            stats = dict(tracked.stats)
+            stats["count_error"] = sketch.counts(key)[1]
+            result[key] = stats
+        return result
+
     def get_path_stats(self) -> dict[str, dict]:
         """獲取路徑統計"""
         with self.lock:
-            return self.path_stats.copy()
+            return self._export_tracked(self.path_stats)
 
     def get_content_type_stats(self) -> dict[str, dict]:
         """獲取內容類型統計"""
         with self.lock:
-            return self.content_type_stats.copy()
+            return self._export_tracked(self.content_type_stats)
+
+    def get_top_paths(self, limit: int = 10) -> list[dict]:
+        """
+        獲取請求最多的路徑
+
+        Returns:
+            list: path、requests（總次數上界）與 error（誤差上界）
+        """
+        with self.lock:
+            return [
+                {"path": path, "requests": count, "error": error}
+                for path, count, error in self.path_stats.top(limit)
+            ]
+
+    def get_memory_usage(self) -> dict:
+        """估算各項統計的內存佔用"""
+        with self.lock:
+            metric_size = (
+                sys.getsizeof(self.metrics[0]) + sys.getsizeof(self.metrics[0].__dict__)
+                if self.metrics
+                else 0
+            )
+            usage = {
+                "ring_buffer": {
+                    "entries": len(self.metrics),
+                    "capacity": self.max_metrics,
+                    "estimated_bytes": sys.getsizeof(self.metrics)
+                    + metric_size * len(self.metrics),
+                },
+            }
+            for name, sketch in (
+                ("paths", self.path_stats),
+                ("content_types", self.content_type_stats),
+            ):
+                usage[name] = {
+                    "tracked": len(sketch),
+                    "capacity": sketch.capacity,
+                    "evictions": sketch.evictions,
+                    "estimated_bytes": sketch.memory_bytes(
+                        lambda tracked: tracked.memory_bytes()
+                    ),
+                }
+            usage["estimated_bytes"] = sum(
+                item["estimated_bytes"] for item in usage.values()
+            )
+            return usage
+
+    def get_percentiles(
+        self, path: str | None = None, content_type: str | None = None
+    ) -> dict:
+        """
+        獲取響應時間與大小的分位數
+
+        Args:
+            path: 指定路徑，None 表示不限
+            content_type: 指定內容類型，None 表示不限
+
+        Returns:
+            dict: response_time_ms 與 size_bytes 的 count/mean/p50/p95/p99/max，
+                  沒有對應記錄時為空字典
+        """
+        with self.lock:
+            if path is not None:
+                tracked = self.path_stats.get(path.partition("?")[0])
+            elif content_type is not None:
+                tracked = self.content_type_stats.get(content_type or "unknown")
+            else:
+                # 各內容類型的直方圖參數相同，可直接合併
+                tracked = TrackedStats({})
+                for _, content_type_tracked in self.content_type_stats.items():
+                    tracked.histograms.merge(content_type_tracked.histograms)
+            return tracked.histograms.to_dict() if tracked else {}
 
     def get_recent_metrics(self, limit: int = 100) -> list[CompressionMetrics]:
         """獲取最近的指標數據"""
         with self.lock:
-            return self.metrics[-limit:] if self.metrics else []
+            start = max(0, len(self.metrics) - limit)
+            return list(itertools.islice(self.metrics, start, None))
 
     def reset_stats(self):
         """重置統計數據"""
         with self.lock:
             self.metrics.clear()
+            self._window = _new_window_totals()
+            self._window_response_time.clear()
             self.path_stats.clear()
             self.content_type_stats.clear()
             self._start_time = datetime.now()
@@ -240,30 +492,13 @@ class CompressionMonitor:
     def export_stats(self) -> dict:
         """導出統計數據為字典格式"""
         summary = self.get_summary()
+        memory = self.get_memory_usage()
 
-        return {
-            "summary": {
-                "total_requests": summary.total_requests,
-                "compressed_requests": summary.compressed_requests,
-                "compression_percentage": round(summary.compression_percentage, 2),
-                "average_compression_ratio": round(
-                    summary.average_compression_ratio, 2
-                ),
-                "bandwidth_saved_mb": round(summary.bandwidth_saved / (1024 * 1024), 2),
-                "average_response_time_ms": round(
-                    summary.average_response_time * 1000, 2
-                ),
-                "monitoring_duration_hours": round(
-                    (datetime.now() - self._start_time).total_seconds() / 3600, 2
-                ),
-            },
-            "top_compressed_paths": [
-                {"path": path, "compression_ratio": round(ratio, 2)}
-                for path, ratio in summary.top_compressed_paths
-            ],
-            "path_stats": {
+        with self.lock:
+            path_stats = {
                 path: {
                     "requests": stats["requests"],
+                    "count_error": self.path_stats.counts(path)[1],
                     "compression_percentage": round(
                         stats["compressed_requests"] / stats["requests"] * 100, 2
                     )
@@ -282,10 +517,12 @@ class CompressionMonitor:
                         / 1024,
                         2,
                     ),
+                    **tracked.histograms.to_dict(),
                 }
-                for path, stats in self.path_stats.items()
-            },
-            "content_type_stats": {
+                for path, tracked in self.path_stats.items()
+                for stats in (tracked.stats,)
+            }
+            content_type_stats = {
                 content_type: {
                     "requests": stats["requests"],
                     "compression_percentage": round(
@@ -296,9 +533,39 @@ class CompressionMonitor:
                     "average_compression_ratio": round(
                         stats["average_compression_ratio"], 2
                     ),
+                    **tracked.histograms.to_dict(),
                 }
-                for content_type, stats in self.content_type_stats.items()
+                for content_type, tracked in self.content_type_stats.items()
+                for stats in (tracked.stats,)
+            }
+
+        return {
+            "summary": {
+                "total_requests": summary.total_requests,
+                "compressed_requests": summary.compressed_requests,
+                "compression_percentage": round(summary.compression_percentage, 2),
+                "average_compression_ratio": round(
+                    summary.average_compression_ratio, 2
+                ),
+                "bandwidth_saved_mb": round(summary.bandwidth_saved / (1024 * 1024), 2),
+                "average_response_time_ms": round(
+                    summary.average_response_time * 1000, 2
+                ),
+                "monitoring_duration_hours": round(
+                    (datetime.now() - self._start_time).total_seconds() / 3600, 2
+                ),
+                "response_time_percentiles_ms": {
+                    name: round(value * 1000, 3)
+                    for name, value in summary.response_time_percentiles.items()
+                },
             },
+            "top_compressed_paths": [
+                {"path": path, "compression_ratio": round(ratio, 2)}
+                for path, ratio in summary.top_compressed_paths
+            ],
+            "path_stats": path_stats,
+            "content_type_stats": content_type_stats,
+            "memory": memory,
         }
 
 
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+WebSocket 連接中心
+==================
+
+追蹤每個會話的所有 WebSocket 連接（同一會話可在多個標籤頁開啟），
+並為每個連接提供有界的發送佇列與獨立的寫入任務：
+- 產生事件的一方只需入列，不會被緩慢的瀏覽器阻塞
+- 連續的 command_output 消息合併為一條，減少幀數
+- 佇列滿時，同類狀態消息只保留最新一條；仍無法入列時關閉過慢的連接
+- 每個連接記錄佇列深度、已發送、已合併與已丟棄的消息數；
+  連接移除時其計數併入連接中心的累計值，總數不會因連接關閉而減少
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from fastapi import WebSocket
+
+from ...debug import web_debug_log as debug_log
+
+
+# 每個連接的發送佇列容量，可透過 MCP_WS_QUEUE_SIZE 覆蓋
+DEFAULT_QUEUE_SIZE = 256
+# 單次發送超時（秒），超時視為連接過慢
+SEND_TIMEOUT = 10.0
+# 合併後的單條命令輸出上限（字元），超出時捨棄最舊的部分並加上截斷標記
+MAX_COALESCED_OUTPUT = 64 * 1024
+
+# 可合併的高頻消息類型
+COALESCE_TYPES = frozenset({"command_output"})
+# 只需保留最新一條的消息類型（佇列滿時取代舊消息）
+LATEST_WINS_TYPES = frozenset(
+    {"status_update", "sessions_changed", "heartbeat_response"}
+)
+
+# 連接移除時併入連接中心累計值的計數
+CUMULATIVE_STATS = ("sent", "coalesced", "dropped", "truncated_chars")
+
+# 佇列中的關閉標記
+_CLOSE = object()
+
+
+def _truncation_marker(count: int) -> str:
+    """合併輸出被截斷時加在開頭的標記"""
+    return f"[… 已截斷 {count} 個字元 …]\n"
+
+
+class HubConnection:
+    """單一 WebSocket 連接：有界發送佇列 + 寫入任務"""
+
+    def __init__(
+        self,
+        hub: "ConnectionHub",
+        session_id: str,
+        websocket: WebSocket,
+        queue_size: int,
+    ):
+        self.hub = hub
+        self.session_id = session_id
+        self.websocket = websocket
+        self.queue_size = queue_size
+        self.queue: deque[Any] = deque()
+        self.loop = asyncio.get_running_loop()
+        self.connected_at = time.time()
+        self.closed = False
+        self.stats = {
+            "sent": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "truncated_chars": 0,
+            "max_queue_depth": 0,
+            "send_errors": 0,
+        }
+        self._wakeup = asyncio.Event()
+        self._writer = self.loop.create_task(self._write_loop())
+
+    def enqueue(self, message: dict[str, Any]):
+        """將消息加入發送佇列（可從任何線程調用）"""
+        if self.closed:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._enqueue(message)
+        else:
+            self.loop.call_soon_threadsafe(self._enqueue, message)
+
+    def _enqueue(self, message: dict[str, Any]):
+        """在連接的事件循環中入列，套用合併與背壓策略"""
+        if self.closed:
+            return
+        message_type = message.get("type")
+        tail = self.queue[-1] if self.queue else None
+
+        if (
+            message_type in COALESCE_TYPES
+            and isinstance(tail, dict)
+            and tail.get("type") == message_type
+        ):
+            # 尚未發送的同類輸出直接合併，不增加佇列深度
+            truncated = tail.get("truncated", 0)
+            previous = tail.get("output", "")
+            if truncated:
+                previous = previous[len(_truncation_marker(truncated)) :]
+            output = previous + message.get("output", "")
+            merged = {**tail}
+            if len(output) > MAX_COALESCED_OUTPUT:
+                dropped = len(output) - MAX_COALESCED_OUTPUT
+                truncated += dropped
+                self.stats["truncated_chars"] += dropped
+                output = _truncation_marker(truncated) + output[-MAX_COALESCED_OUTPUT:]
+                merged["truncated"] = truncated
+            merged["output"] = output
+            self.queue[-1] = merged
+            self.stats["coalesced"] += 1
+            return
+
+        if len(self.queue) >= self.queue_size and not self._make_room(message_type):
+            debug_log(
+                f"WebSocket 連接過慢（佇列 {len(self.queue)} 條），關閉會話 "
+                f"{self.session_id} 的連接"
+            )
+            self.stats["dropped"] += len(self.queue) + 1
+            self.queue.clear()
+            self.close(code=1013, reason="連接過慢")
+            return
+
+        self.queue.append(message)
+        self.stats["max_queue_depth"] = max(
+            self.stats["max_queue_depth"], len(self.queue)
+        )
+        self._wakeup.set()
+
+    def _make_room(self, message_type: str | None) -> bool:
+        """佇列已滿時騰出空間，返回是否可以入列"""
+        # 同類的「最新值」消息只保留新的一條
+        if message_type in LATEST_WINS_TYPES:
+            for index, queued in enumerate(self.queue):
+                if isinstance(queued, dict) and queued.get("type") == message_type:
+                    del self.queue[index]
+                    self.stats["dropped"] += 1
+                    return True
+
+        # 否則丟棄最舊的一條可替代消息
+        for index, queued in enumerate(self.queue):
+            if isinstance(queued, dict) and queued.get("type") in LATEST_WINS_TYPES:
+                del self.queue[index]
+                self.stats["dropped"] += 1
+                return True
+        return False
+
+    def close(self, code: int = 1000, reason: str = ""):
+        """在佇列中的消息發送完畢後關閉連接"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.append((_CLOSE, code, reason))
+        self._wakeup.set()
+
+    async def _write_loop(self):
+        """寫入任務：依序發送佇列中的消息"""
+        try:
+            while True:
+                while not self.queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+
+                item = self.queue.popleft()
+                if isinstance(item, tuple) and item[0] is _CLOSE:
+                    try:
+                        await asyncio.wait_for(
+                            self.websocket.close(code=item[1], reason=item[2]),
+                            SEND_TIMEOUT,
+                        )
+                    except Exception as e:
+                        debug_log(f"關閉 WebSocket 連接時發生錯誤: {e}")
+                    break
+
+                try:
+                    await asyncio.wait_for(self.websocket.send_json(item), SEND_TIMEOUT)
+                    self.stats["sent"] += 1
+                except Exception as e:
+                    self.stats["send_errors"] += 1
+                    debug_log(f"WebSocket 發送失敗，移除連接: {e}")
+                    break
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.closed = True
+            self.queue.clear()
+            self.hub._discard(self)
+
+    def cancel(self):
+        """停止寫入任務並丟棄未發送的消息"""
+        self.closed = True
+        if not self._writer.done():
+            self.loop.call_soon_threadsafe(self._writer.cancel)
+
+    def get_stats(self) -> dict[str, Any]:
+        """獲取連接統計"""
+        return {
+            "session_id": self.session_id,
+            "queue_depth": len(self.queue),
+            "connected_seconds": round(time.time() - self.connected_at, 1),
+            **self.stats,
+        }
+
+
+class ConnectionHub:
+    """WebSocket 連接中心 - 以會話 ID 分組管理所有連接"""
+
+    def __init__(self, queue_size: int | None = None):
+        if queue_size is None:
+            queue_size = int(os.getenv("MCP_WS_QUEUE_SIZE", str(DEFAULT_QUEUE_SIZE)))
+        self.queue_size = max(1, queue_size)
+        # 以 id(websocket) 為鍵，避免依賴 WebSocket 的相等性語義
+        self._connections: dict[int, HubConnection] = {}
+        # 已移除連接的累計計數
+        self._retired_stats = dict.fromkeys(CUMULATIVE_STATS, 0)
+        self._lock = threading.Lock()
+
+    def register(self, session_id: str, websocket: WebSocket) -> HubConnection:
+        """註冊連接並啟動其寫入任務（需在伺服器事件循環中調用）"""
+        connection = HubConnection(self, session_id, websocket, self.queue_size)
+        with self._lock:
+            self._connections[id(websocket)] = connection
+        debug_log(
+            f"WebSocket 連接已註冊到會話 {session_id}，"
+            f"該會話共 {len(self.get_connections(session_id))} 個連接"
+        )
+        return connection
+
+    def unregister(self, websocket: WebSocket):
+        """移除連接並停止其寫入任務"""
+        with self._lock:
+            connection = self._connections.pop(id(websocket), None)
+            if connection is not None:
+                self._retire_locked(connection)
+        if connection is not None:
+            connection.cancel()
+
+    def _discard(self, connection: HubConnection):
+        """寫入任務結束時移除連接"""
+        with self._lock:
+            if self._connections.get(id(connection.websocket)) is connection:
+                del self._connections[id(connection.websocket)]
+                self._retire_locked(connection)
+
+    def _retire_locked(self, connection: HubConnection):
+        """將移除的連接計數併入累計值（需持有鎖）"""
+        for key in CUMULATIVE_STATS:
+            self._retired_stats[key] += connection.stats[key]
+
+    def get_connections(self, session_id: str) -> list[HubConnection]:
+        """獲取會話的所有連接"""
+        with self._lock:
+            return [
+                c
+                for c in self._connections.values()
+                if c.session_id == session_id and not c.closed
+            ]
+
+    def get_session_id(self, websocket: WebSocket) -> str | None:
+        """獲取連接目前所屬的會話 ID"""
+        with self._lock:
+            connection = self._connections.get(id(websocket))
+        return connection.session_id if connection and not connection.closed else None
+
+    def has_connections(self, session_id: str) -> bool:
+        return bool(self.get_connections(session_id))
+
+    def send(self, session_id: str, message: dict[str, Any]) -> int:
+        """
+        向會話的所有連接發送消息（只入列，不等待發送）
+
+        Returns:
+            int: 消息入列的連接數
+        """
+        connections = self.get_connections(session_id)
+        for connection in connections:
+            connection.enqueue(message)
+        return len(connections)
+
+    def send_to(self, websocket: WebSocket, message: dict[str, Any]) -> bool:
+        """只向指定連接發送消息"""
+        with self._lock:
+            connection = self._connections.get(id(websocket))
+        if connection is None or connection.closed:
+            return False
+        connection.enqueue(message)
+        return True
+
+    def broadcast(self, message: dict[str, Any]) -> int:
+        """向所有連接發送消息"""
+        with self._lock:
+            connections = [c for c in self._connections.values() if not c.closed]
+        for connection in connections:
+            connection.enqueue(message)
+        return len(connections)
+
+    def move_session(self, old_session_id: str, new_session_id: str) -> int:
+        """將舊會話的所有連接轉移到新會話（會話更新時頁面保持連接）"""
+        moved = 0
+        with self._lock:
+            for connection in self._connections.values():
+                if connection.session_id == old_session_id:
+                    connection.session_id = new_session_id
+                    moved += 1
+        if moved:
+            debug_log(
+                f"已將 {moved} 個 WebSocket 連接從會話 {old_session_id} 轉移到 "
+                f"{new_session_id}"
+            )
+        return moved
+
+    def close_session(self, session_id: str, code: int = 1000, reason: str = "") -> int:
+        """在發送完已入列的消息後關閉會話的所有連接"""
+        connections = self.get_connections(session_id)
+        for connection in connections:
+            connection.loop.call_soon_threadsafe(connection.close, code, reason)
+        return len(connections)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._connections)
+
+    def get_stats(self) -> dict[str, Any]:
+        """獲取連接中心統計（含每個連接的佇列深度；total_* 為包含已關閉連接的累計值）"""
+        with self._lock:
+            connections = list(self._connections.values())
+            retired = dict(self._retired_stats)
+        per_connection = [c.get_stats() for c in connections]
+        stats: dict[str, Any] = {
+            "connections": len(per_connection),
+            "sessions": len({c["session_id"] for c in per_connection}),
+            "queue_size": self.queue_size,
+            "total_queue_depth": sum(c["queue_depth"] for c in per_connection),
+        }
+        for key in CUMULATIVE_STATS:
+            stats[f"total_{key}"] = retired[key] + sum(c[key] for c in per_connection)
+        stats["per_connection"] = per_connection
+        return stats
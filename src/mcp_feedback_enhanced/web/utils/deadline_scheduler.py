@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+會話期限排程器
+==============
+
+以單一最小堆管理所有會話的清理期限，取代每個會話一個 threading.Timer：
+- 整個進程只有一個排程線程，會話數量與重設次數不影響線程數
+- 排程與重設為 O(log n)：重設時作廢舊條目並推入新條目（延遲刪除），
+  作廢條目過多時重建堆
+- 統計待觸發、已觸發、已取消與已重設的期限數量
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from ...debug import web_debug_log as debug_log
+from ...utils.error_handler import ErrorHandler, ErrorType
+
+
+class ScheduledDeadline:
+    """已排程的期限（可取消）"""
+
+    __slots__ = ("callback", "cancelled", "deadline", "fired", "name", "scheduler")
+
+    def __init__(
+        self,
+        scheduler: "DeadlineScheduler",
+        deadline: float,
+        callback: Callable[[], None],
+        name: str,
+    ):
+        self.scheduler = scheduler
+        self.deadline = deadline
+        self.callback = callback
+        self.name = name
+        self.cancelled = False
+        self.fired = False
+
+    def cancel(self):
+        """取消期限（已觸發時無效果）"""
+        self.scheduler.cancel(self)
+
+    def is_alive(self) -> bool:
+        """期限是否仍在等待觸發"""
+        return not (self.cancelled or self.fired)
+
+    def remaining(self) -> float:
+        """距離觸發的秒數"""
+        return max(0.0, self.deadline - time.monotonic())
+
+
+class DeadlineScheduler:
+    """期限排程器 - 最小堆 + 單一排程線程"""
+
+    def __init__(self):
+        self._heap: list[tuple[float, int, ScheduledDeadline]] = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._pending = 0
+        self._stats = {
+            "scheduled": 0,
+            "rescheduled": 0,
+            "cancelled": 0,
+            "fired": 0,
+            "callback_errors": 0,
+            "compactions": 0,
+        }
+
+    def schedule(
+        self, delay: float, callback: Callable[[], None], name: str = ""
+    ) -> ScheduledDeadline:
+        """在 delay 秒後於排程線程中調用 callback"""
+        entry = ScheduledDeadline(self, time.monotonic() + delay, callback, name)
+        with self._condition:
+            self._push_locked(entry)
+            self._stats["scheduled"] += 1
+        return entry
+
+    def reschedule(
+        self,
+        entry: ScheduledDeadline | None,
+        delay: float,
+        callback: Callable[[], None] | None = None,
+        name: str = "",
+    ) -> ScheduledDeadline:
+        """作廢舊期限並排程新期限（舊期限為 None 時等同 schedule）"""
+        if entry is None:
+            return self.schedule(delay, callback, name)
+        new_entry = ScheduledDeadline(
+            self,
+            time.monotonic() + delay,
+            callback or entry.callback,
+            name or entry.name,
+        )
+        with self._condition:
+            if entry.is_alive():
+                entry.cancelled = True
+                self._pending -= 1
+            self._push_locked(new_entry)
+            self._stats["rescheduled"] += 1
+            self._maybe_compact_locked()
+        return new_entry
+
+    def cancel(self, entry: ScheduledDeadline):
+        """取消期限（條目留在堆中，觸發時跳過）"""
+        with self._condition:
+            if not entry.is_alive():
+                return
+            entry.cancelled = True
+            self._pending -= 1
+            self._stats["cancelled"] += 1
+            self._maybe_compact_locked()
+
+    def _push_locked(self, entry: ScheduledDeadline):
+        heapq.heappush(self._heap, (entry.deadline, next(self._counter), entry))
+        self._pending += 1
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="SessionDeadlineScheduler", daemon=True
+            )
+            self._thread.start()
+        elif self._heap[0][2] is entry:
+            # 新期限比目前等待的更早，喚醒排程線程
+            self._condition.notify()
+
+    def _maybe_compact_locked(self):
+        """作廢條目超過一半時重建堆，限制堆的大小"""
+        if len(self._heap) > 64 and self._pending < len(self._heap) // 2:
+            self._heap = [item for item in self._heap if item[2].is_alive()]
+            heapq.heapify(self._heap)
+            self._stats["compactions"] += 1
+
+    def _run(self):
+        """排程線程主循環"""
+        while True:
+            with self._condition:
+                while True:
+                    while self._heap and not self._heap[0][2].is_alive():
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    delay = self._heap[0][0] - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+
+                entry = heapq.heappop(self._heap)[2]
+                entry.fired = True
+                self._pending -= 1
+                self._stats["fired"] += 1
+                self._maybe_compact_locked()
+
+            try:
+                entry.callback()
+            except Exception as e:
+                self._stats["callback_errors"] += 1
+                error_id = ErrorHandler.log_error_with_context(
+                    e,
+                    context={"operation": "會話期限回調", "deadline": entry.name},
+                    error_type=ErrorType.SYSTEM,
+                )
+                debug_log(f"期限回調執行失敗 [錯誤ID: {error_id}]: {e}")
+
+    def get_stats(self) -> dict[str, Any]:
+        """獲取排程統計"""
+        with self._condition:
+            next_deadline = min(
+                (item[0] for item in self._heap if item[2].is_alive()), default=None
+            )
+            return {
+                "pending": self._pending,
+                "heap_size": len(self._heap),
+                "next_due_in": (
+                    round(max(0.0, next_deadline - time.monotonic()), 3)
+                    if next_deadline is not None
+                    else None
+                ),
+                "thread_alive": bool(self._thread and self._thread.is_alive()),
+                **self._stats,
+            }
+
+
+_deadline_scheduler: DeadlineScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_deadline_scheduler() -> DeadlineScheduler:
+    """獲取全域期限排程器實例"""
+    global _deadline_scheduler
+    if _deadline_scheduler is None:
+        with _scheduler_lock:
+            if _deadline_scheduler is None:
+                _deadline_scheduler = DeadlineScheduler()
+    return _deadline_scheduler
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+HTTP 條件請求
+=============
+
+為 JSON API 加上 ETag，並以 If-None-Match 回應 304：
+- 能以便宜的方式得知版本時（如檔案的修改時間），直接以版本作為 ETag，
+  版本相符時完全不需要產生 JSON
+- 否則以序列化後內容的雜湊作為 ETag，仍可省下傳輸
+
+響應帶有 Cache-Control: no-cache，瀏覽器會快取內容但每次使用前都向
+伺服器重新驗證；前端以 fetch(url, { cache: "no-cache" }) 取得時，
+304 會由瀏覽器透明地換成快取中的內容。
+"""
+
+import hashlib
+import json
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from fastapi import Request
+from fastapi.responses import Response
+
+
+# 可快取但每次使用前都需要重新驗證
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """以任意內容或版本組件產生弱 ETag（GZip 壓縮後語義不變）"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return f'W/"{digest.hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """檢查 If-None-Match 是否包含 ETag（弱比較）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def file_version(paths: Iterable) -> tuple:
+    """以檔案的修改時間與大小作為版本（不存在的檔案記為 None）"""
+    version = []
+    for path in paths:
+        try:
+            stat = path.stat()
+            version.append((str(path), stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            version.append((str(path), None))
+    return tuple(version)
+
+
+def not_modified(etag: str) -> Response:
+    """304 響應"""
+    return Response(
+        status_code=304,
+        headers={"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL},
+    )
+
+
+def conditional_json(
+    request: Request,
+    content: Any | Callable[[], Any],
+    *,
+    version: Any = None,
+) -> Response:
+    """
+    產生支援條件請求的 JSON 響應
+
+    Args:
+        request: 當前請求
+        content: 響應內容，或產生內容的函數（版本相符時不會被調用）
+        version: 內容的版本；為 None 時以序列化後內容的雜湊作為 ETag
+
+    Returns:
+        Response: 200（帶 ETag）或 304
+    """
+    if_none_match = request.headers.get("if-none-match")
+
+    etag = make_etag(version) if version is not None else None
+    if etag is not None and etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    if callable(content):
+        content = content()
+    # 與 JSONResponse 相同的序列化方式
+    body = json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+    if etag is None:
+        etag = make_etag(body)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL},
+    )
+
+
+def accepts_gzip(request: Request) -> bool:
+    """客戶端是否接受 gzip 編碼"""
+    return any(
+        token.split(";")[0].strip().lower() == "gzip"
+        for token in request.headers.get("accept-encoding", "").split(",")
+    )
+
+
+def conditional_bytes(
+    request: Request,
+    etag: str,
+    body: bytes,
+    gzip_body: bytes | None = None,
+    media_type: str = "application/json",
+) -> Response:
+    """
+    送出預先序列化（及壓縮）的內容，支援條件請求
+
+    Args:
+        request: 當前請求
+        etag: 內容的 ETag
+        body: 未壓縮的內容
+        gzip_body: 預先壓縮的 gzip 內容，客戶端接受時直接送出
+        media_type: 內容類型
+
+    Returns:
+        Response: 200（帶 ETag）或 304
+    """
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+    if gzip_body is not None and accepts_gzip(request):
+        # 已帶 Content-Encoding 的響應會被 GZipMiddleware 略過
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+        body = gzip_body
+    return Response(content=body, media_type=media_type, headers=headers)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+頁面渲染快取
+============
+
+Web UI 的頁面在重新整理、多個標籤頁與切換會話時會被重複請求，
+而在會話狀態、語言與佈局不變時渲染結果完全相同。
+這裡以 LRU 保存渲染後的 HTML 與預先壓縮的 gzip 內容；
+快取鍵由路由組成（會話狀態版本、語言、佈局等），
+會話建立與設定保存時整個快取失效。
+
+另外為 Jinja 提供位元組碼快取，讓進程啟動後首次渲染不必重新編譯模板。
+"""
+
+import gzip
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse
+from jinja2 import BytecodeCache, FileSystemBytecodeCache
+
+from ...debug import web_debug_log as debug_log
+from .http_cache import accepts_gzip
+
+
+DEFAULT_MAX_PAGES = 32
+
+# Jinja 位元組碼快取目錄
+TEMPLATE_CACHE_DIR = Path.home() / ".cache" / "mcp-feedback-enhanced" / "templates"
+
+
+def is_page_cache_enabled() -> bool:
+    """是否快取渲染後的頁面（MCP_WEB_PAGE_CACHE，預設開啟）"""
+    return os.getenv("MCP_WEB_PAGE_CACHE", "true").lower() not in (
+        "false",
+        "0",
+        "no",
+        "off",
+    )
+
+
+@dataclass
+class RenderedPage:
+    """渲染完成的頁面"""
+
+    body: bytes
+    gzip_body: bytes | None = None
+
+    def to_response(self, request: Request) -> HTMLResponse:
+        """依 Accept-Encoding 送出原始或預先壓縮的內容"""
+        if self.gzip_body is not None and accepts_gzip(request):
+            # 已帶 Content-Encoding 的響應會被 GZipMiddleware 略過
+            return HTMLResponse(
+                content=self.gzip_body,
+                headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+            )
+        return HTMLResponse(content=self.body)
+
+
+class PageCache:
+    """渲染後頁面的 LRU 快取"""
+
+    def __init__(self, max_pages: int = DEFAULT_MAX_PAGES, enabled: bool = True):
+        self.max_pages = max(1, max_pages)
+        self.enabled = enabled
+        self._pages: OrderedDict[Hashable, RenderedPage] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key: Hashable) -> RenderedPage | None:
+        """查找頁面，命中時移到最近使用的位置"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None:
+                self.stats["misses"] += 1
+                return None
+            self._pages.move_to_end(key)
+            self.stats["hits"] += 1
+            return page
+
+    def put(self, key: Hashable, html: str) -> RenderedPage:
+        """保存渲染結果，超過容量時淘汰最久未使用的頁面"""
+        body = html.encode("utf-8")
+        if not self.enabled:
+            # 未啟用時不預先壓縮，交由 GZipMiddleware 處理
+            return RenderedPage(body=body)
+        page = RenderedPage(body=body, gzip_body=gzip.compress(body, mtime=0))
+        with self._lock:
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+                self.stats["evictions"] += 1
+        return page
+
+    def invalidate(self):
+        """清除所有頁面（會話建立或設定保存時調用）"""
+        with self._lock:
+            if self._pages:
+                self._pages.clear()
+                self.stats["invalidations"] += 1
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def get_stats(self) -> dict[str, Any]:
+        """獲取快取統計"""
+        with self._lock:
+            pages = list(self._pages.values())
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "pages": len(pages),
+            "max_pages": self.max_pages,
+            "memory_bytes": sum(len(p.body) + len(p.gzip_body or b"") for p in pages),
+        }
+
+
+def create_template_bytecode_cache(
+    directory: Path = TEMPLATE_CACHE_DIR,
+) -> BytecodeCache | None:
+    """建立 Jinja 位元組碼快取，目錄無法寫入時返回 None"""
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        return FileSystemBytecodeCache(str(directory))
+    except OSError as e:
+        debug_log(f"無法建立模板位元組碼快取目錄 {directory}: {e}")
+        return None
@@ -17,9 +17,31 @@ from typing import Any
 
 from ...debug import web_debug_log as debug_log
 from ...utils.error_handler import ErrorHandler, ErrorType
+from ...utils.metrics import get_metrics_registry
 from ..models.feedback_session import CleanupReason, SessionStatus
 
 
+_metrics = get_metrics_registry()
+SESSION_CLEANUP_SECONDS = _metrics.histogram(
+    "mcp_session_cleanup_duration_seconds",
+    "會話清理操作耗時（component 為 web_ui 或 cleanup_manager）",
+    ("component", "trigger"),
+)
+SESSIONS_CLEANED = _metrics.counter(
+    "mcp_sessions_cleaned",
+    "已清理的會話數量",
+    ("component", "trigger"),
+)
+
+
+def record_cleanup_metrics(
+    component: str, trigger: str, cleaned_count: int, duration: float
+):
+    """發佈一次會話清理的耗時與清理數量"""
+    SESSION_CLEANUP_SECONDS.labels(component, trigger).observe(duration)
+    SESSIONS_CLEANED.labels(component, trigger).inc(cleaned_count)
+
+
 @dataclass
 class CleanupPolicy:
     """清理策略配置"""
@@ -267,7 +289,18 @@ class SessionCleanupManager:
         # 計算需要清理的會話數量
         excess_count = len(sessions) - self.policy.max_sessions
 
-        # 按優先級排序會話（優先清理舊的、非活躍的會話）
+        index = getattr(sessions, "index", None)
+        if index is not None:
+            # 從淘汰索引依優先級桶取出 excess_count 個會話：O(k log n)
+            candidates = [
+                (session.session_id, session)
+                for session in index.pop_evictable(
+                    excess_count, exclude=self._protected_session_ids()
+                )
+            ]
+            return self._cleanup_sessions(candidates, CleanupReason.MANUAL, "容量清理")
+
+        # 無索引時按優先級排序會話（優先清理舊的、非活躍的會話）
         session_priorities = []
         for session_id, session in sessions.items():
             # 跳過當前活躍會話（如果啟用保護）
@@ -316,8 +349,49 @@ class SessionCleanupManager:
 
         return cleaned_count
 
+    def _protected_session_ids(self) -> set[str]:
+        """獲取受保護、不參與淘汰的會話 ID"""
+        current = self.web_ui_manager.current_session
+        if self.policy.preserve_active_session and current:
+            return {current.session_id}
+        return set()
+
+    def _cleanup_sessions(self, candidates, reason: CleanupReason, label: str) -> int:
+        """清理從淘汰索引取出的會話，清理失敗的會話放回索引"""
+        sessions = self.web_ui_manager.sessions
+        cleaned_count = 0
+        for session_id, session in candidates:
+            try:
+                session._cleanup_sync_enhanced(reason)
+                sessions.pop(session_id, None)
+                cleaned_count += 1
+
+                # 如果清理的是當前活躍會話，清空當前會話
+                current = self.web_ui_manager.current_session
+                if current and current.session_id == session_id:
+                    self.web_ui_manager.current_session = None
+            except Exception as e:
+                debug_log(f"{label}會話 {session_id} 失敗: {e}")
+                if session_id in sessions:
+                    sessions.index.touch(session)
+        return cleaned_count
+
     def _cleanup_expired_sessions(self) -> int:
         """清理過期會話"""
+        sessions = self.web_ui_manager.sessions
+        index = getattr(sessions, "index", None)
+        if index is not None:
+            # 已過期與超過最大年齡的會話都從索引的堆頂取出
+            now = time.time()
+            candidates = {
+                session.session_id: session for session in index.pop_expired(now)
+            }
+            for session in index.pop_created_before(now - self.policy.max_session_age):
+                candidates.setdefault(session.session_id, session)
+            return self._cleanup_sessions(
+                candidates.items(), CleanupReason.EXPIRED, "清理過期"
+            )
+
         expired_sessions = []
 
         for session_id, session in self.web_ui_manager.sessions.items():
@@ -349,6 +423,18 @@ class SessionCleanupManager:
 
     def _cleanup_idle_sessions(self) -> int:
         """清理空閒會話"""
+        sessions = self.web_ui_manager.sessions
+        index = getattr(sessions, "index", None)
+        if index is not None:
+            candidates = [
+                (session.session_id, session)
+                for session in index.pop_idle(
+                    time.time() - self.policy.max_idle_time,
+                    exclude=self._protected_session_ids(),
+                )
+            ]
+            return self._cleanup_sessions(candidates, CleanupReason.EXPIRED, "清理空閒")
+
         idle_sessions = []
 
         for session_id, session in self.web_ui_manager.sessions.items():
@@ -387,6 +473,9 @@ class SessionCleanupManager:
         self.stats.total_sessions_cleaned += cleaned_count
         self.stats.total_cleanup_time += duration
         self.stats.last_cleanup_time = datetime.now()
+        record_cleanup_metrics(
+            "cleanup_manager", trigger.value, cleaned_count, duration
+        )
 
         # 更新平均清理時間
         if self.stats.total_cleanups > 0:
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+會話淘汰索引
+============
+
+在會話狀態或活動時間變更時增量維護的索引，讓過期清理與容量淘汰
+不需要每次掃描並排序全部會話：
+- 過期堆：以會話下一次過期的時間為鍵（與 is_expired() 的規則一致）
+- 空閒堆：以最後活動時間為鍵
+- 年齡堆：以建立時間為鍵
+- 優先級分桶：依狀態分為「已結束」「已提交回饋」「進行中」三桶，
+  桶內以最後活動時間排序，容量淘汰依桶順序取出
+
+堆中的舊條目以版本號延遲作廢，取出 k 個會話的成本為 O(k log n)。
+IndexedSessions 是維護索引的會話字典，現有的字典操作無需修改。
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from ..models.feedback_session import SessionStatus
+
+
+# 錯誤/超時狀態的會話超過此時間（秒）視為過期，與 is_expired() 一致
+ERROR_STATE_EXPIRY = 300
+
+# 容量淘汰的優先級分桶（依序淘汰）
+BUCKET_FINISHED = 0
+BUCKET_SUBMITTED = 1
+BUCKET_IN_PROGRESS = 2
+_STATUS_BUCKETS = {
+    SessionStatus.COMPLETED: BUCKET_FINISHED,
+    SessionStatus.ERROR: BUCKET_FINISHED,
+    SessionStatus.TIMEOUT: BUCKET_FINISHED,
+    SessionStatus.EXPIRED: BUCKET_FINISHED,
+    SessionStatus.FEEDBACK_SUBMITTED: BUCKET_SUBMITTED,
+}
+
+
+def next_expiry(session) -> float:
+    """計算會話下一次被 is_expired() 判定為過期的時間"""
+    status = session.status
+    if status == SessionStatus.EXPIRED:
+        return float("-inf")
+    expires_at = session.last_activity + session.max_idle_time
+    if status in (SessionStatus.ERROR, SessionStatus.TIMEOUT):
+        expires_at = min(expires_at, session.last_activity + ERROR_STATE_EXPIRY)
+    return expires_at
+
+
+class SessionEvictionIndex:
+    """會話淘汰索引 - 版本化的延遲作廢最小堆"""
+
+    def __init__(self):
+        self._sessions: dict[str, Any] = {}
+        self._versions: dict[str, int] = {}
+        self._expiry: list[tuple[float, int, int, str]] = []
+        self._activity: list[tuple[float, int, int, str]] = []
+        self._age: list[tuple[float, int, str]] = []
+        self._buckets: list[list[tuple[float, int, int, str]]] = [[], [], []]
+        self._counter = itertools.count()
+        self._lock = threading.RLock()
+        self.stats = {"touches": 0, "popped": 0, "stale_skipped": 0, "rebuilds": 0}
+
+    # ===== 維護 =====
+
+    def add(self, session):
+        """加入會話"""
+        with self._lock:
+            session_id = session.session_id
+            self._sessions[session_id] = session
+            heapq.heappush(
+                self._age, (session.created_at, next(self._counter), session_id)
+            )
+            self._push_locked(session)
+
+    def remove(self, session_id: str):
+        """移除會話（堆中的條目在取出時跳過）"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._versions.pop(session_id, None)
+
+    def touch(self, session):
+        """會話狀態或活動時間變更後更新索引"""
+        with self._lock:
+            if self._sessions.get(session.session_id) is not session:
+                return
+            self.stats["touches"] += 1
+            self._push_locked(session)
+            if self._heap_entries() > 4 * len(self._sessions) + 256:
+                self._rebuild_locked()
+
+    def _push_locked(self, session):
+        session_id = session.session_id
+        version = self._versions.get(session_id, 0) + 1
+        self._versions[session_id] = version
+        seq = next(self._counter)
+        activity = session.last_activity
+        heapq.heappush(self._expiry, (next_expiry(session), seq, version, session_id))
+        heapq.heappush(self._activity, (activity, seq, version, session_id))
+        bucket = _STATUS_BUCKETS.get(session.status, BUCKET_IN_PROGRESS)
+        heapq.heappush(self._buckets[bucket], (activity, seq, version, session_id))
+
+    def _heap_entries(self) -> int:
+        return (
+            len(self._expiry)
+            + len(self._activity)
+            + sum(len(bucket) for bucket in self._buckets)
+        )
+
+    def _rebuild_locked(self):
+        """作廢條目過多時以現有會話重建所有堆"""
+        self._expiry.clear()
+        self._activity.clear()
+        for bucket in self._buckets:
+            bucket.clear()
+        self._age = [
+            (session.created_at, next(self._counter), session_id)
+            for session_id, session in self._sessions.items()
+        ]
+        heapq.heapify(self._age)
+        for session in self._sessions.values():
+            self._push_locked(session)
+        self.stats["rebuilds"] += 1
+
+    def _is_current(self, entry: tuple) -> bool:
+        if self._versions.get(entry[3]) == entry[2]:
+            return True
+        self.stats["stale_skipped"] += 1
+        return False
+
+    # ===== 查詢 =====
+
+    def _pop_where(self, heap: list, limit: float, exclude: set[str]) -> list:
+        """從堆中取出鍵小於等於 limit 的有效會話（排除的會話放回）"""
+        popped, kept = [], []
+        while heap and heap[0][0] <= limit:
+            entry = heapq.heappop(heap)
+            if not self._is_current(entry):
+                continue
+            if entry[3] in exclude:
+                kept.append(entry)
+                continue
+            popped.append(self._sessions[entry[3]])
+        for entry in kept:
+            heapq.heappush(heap, entry)
+        self.stats["popped"] += len(popped)
+        return popped
+
+    def pop_expired(self, now: float | None = None, exclude: Iterable[str] = ()):
+        """
+        取出已過期的會話（依過期時間排序）
+
+        取出的會話不再出現在過期堆中；呼叫方未將其移除時應調用 touch() 放回。
+        """
+        if now is None:
+            now = time.time()
+        with self._lock:
+            return self._pop_where(self._expiry, now, set(exclude))
+
+    def pop_idle(self, idle_before: float, exclude: Iterable[str] = ()):
+        """取出最後活動時間早於 idle_before 的會話"""
+        with self._lock:
+            return self._pop_where(self._activity, idle_before, set(exclude))
+
+    def pop_created_before(self, created_before: float, exclude: Iterable[str] = ()):
+        """取出建立時間早於 created_before 的會話"""
+        exclude = set(exclude)
+        with self._lock:
+            popped, kept = [], []
+            while self._age and self._age[0][0] <= created_before:
+                entry = heapq.heappop(self._age)
+                session_id = entry[2]
+                if session_id not in self._sessions:
+                    continue
+                if session_id in exclude:
+                    kept.append(entry)
+                    continue
+                popped.append(self._sessions[session_id])
+            for entry in kept:
+                heapq.heappush(self._age, entry)
+            self.stats["popped"] += len(popped)
+            return popped
+
+    def pop_evictable(self, count: int, exclude: Iterable[str] = ()):
+        """
+        依淘汰優先級取出 count 個會話
+
+        先淘汰已結束的會話，其次是已提交回饋的會話，最後是進行中的會話；
+        同一桶內空閒最久的優先。
+        """
+        exclude = set(exclude)
+        with self._lock:
+            popped = []
+            for bucket in self._buckets:
+                kept = []
+                while bucket and len(popped) < count:
+                    entry = heapq.heappop(bucket)
+                    if not self._is_current(entry):
+                        continue
+                    if entry[3] in exclude:
+                        kept.append(entry)
+                        continue
+                    popped.append(self._sessions[entry[3]])
+                for entry in kept:
+                    heapq.heappush(bucket, entry)
+                if len(popped) >= count:
+                    break
+            self.stats["popped"] += len(popped)
+            return popped
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get_stats(self) -> dict[str, Any]:
+        """獲取索引統計"""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "heap_entries": self._heap_entries() + len(self._age),
+                **self.stats,
+            }
+
+
+class IndexedSessions(dict):
+    """同步維護淘汰索引的會話字典"""
+
+    def __init__(self):
+        super().__init__()
+        self.index = SessionEvictionIndex()
+        # 會話加入或移除時遞增，供頁面快取判斷會話列表是否改變
+        self.version = 0
+
+    def __setitem__(self, session_id, session):
+        old = self.get(session_id)
+        if old is not None and old is not session:
+            self._detach(old)
+        super().__setitem__(session_id, session)
+        self.version += 1
+        session._eviction_index = self.index
+        self.index.add(session)
+
+    def __delitem__(self, session_id):
+        session = self[session_id]
+        super().__delitem__(session_id)
+        self._detach(session)
+
+    def pop(self, session_id, *default):
+        if session_id not in self:
+            return super().pop(session_id, *default)
+        session = super().pop(session_id)
+        self._detach(session)
+        return session
+
+    def popitem(self):
+        session_id, session = super().popitem()
+        self._detach(session)
+        return session_id, session
+
+    def clear(self):
+        for session in list(self.values()):
+            self._detach(session)
+        super().clear()
+
+    def setdefault(self, session_id, default=None):
+        if session_id not in self:
+            self[session_id] = default
+        return self[session_id]
+
+    def update(self, *args, **kwargs):
+        for session_id, session in dict(*args, **kwargs).items():
+            self[session_id] = session
+
+    def _detach(self, session):
+        self.version += 1
+        self.index.remove(session.session_id)
+        if getattr(session, "_eviction_index", None) is self.index:
+            session._eviction_index = None
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+翻譯資料快取
+============
+
+Web UI 每次載入頁面或切換會話都會請求翻譯資料。翻譯檔案只會在開發或
+升級時改變，因此每個語言只解析一次，並把序列化後的 JSON 與 gzip 壓縮
+後的內容保存在內存中，請求時直接送出。
+
+每次取得時以檔案的修改時間與大小檢查是否需要重新載入；
+ETag 同樣由檔案版本產生，與未快取時的 /api/translations 一致。
+"""
+
+import gzip
+import json
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from ...debug import web_debug_log as debug_log
+from .http_cache import file_version, make_etag
+
+
+SUPPORTED_LANGUAGES = ("zh-TW", "zh-CN", "en")
+
+
+@dataclass
+class TranslationBundle:
+    """序列化完成的翻譯資料"""
+
+    data: dict[str, Any]
+    version: tuple
+    etag: str
+    body: bytes
+    gzip_body: bytes
+
+
+def _make_bundle(data: dict[str, Any], version: tuple) -> TranslationBundle:
+    # 與 conditional_json 相同的序列化方式
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return TranslationBundle(
+        data=data,
+        version=version,
+        etag=make_etag(version),
+        body=body,
+        gzip_body=gzip.compress(body, compresslevel=9, mtime=0),
+    )
+
+
+class TranslationCache:
+    """翻譯資料快取：以檔案的修改時間與大小失效"""
+
+    def __init__(
+        self,
+        locales_dir: Path | None = None,
+        languages: tuple[str, ...] = SUPPORTED_LANGUAGES,
+    ):
+        self.locales_dir = locales_dir or Path(__file__).parent.parent / "locales"
+        self.languages = languages
+        self._languages: dict[str, TranslationBundle] = {}
+        self._combined: TranslationBundle | None = None
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "loads": 0, "rebuilds": 0}
+
+    def translation_file(self, language: str) -> Path:
+        return self.locales_dir / language / "translation.json"
+
+    def _load(self, language: str) -> dict[str, Any]:
+        """解析單一語言的翻譯檔案，失敗時返回空字典"""
+        translation_file = self.translation_file(language)
+        try:
+            if translation_file.exists():
+                with open(translation_file, encoding="utf-8") as f:
+                    data = json.load(f)
+                debug_log(f"成功載入 Web 翻譯: {language}")
+                return data
+            debug_log(f"Web 翻譯檔案不存在: {translation_file}")
+        except Exception as e:
+            debug_log(f"載入 Web 翻譯檔案失敗 {language}: {e}")
+        return {}
+
+    def _get_language_locked(self, language: str, version: tuple) -> TranslationBundle:
+        bundle = self._languages.get(language)
+        if bundle is None or bundle.version != version:
+            bundle = _make_bundle(self._load(language), version)
+            self._languages[language] = bundle
+            self.stats["loads"] += 1
+        return bundle
+
+    def get_language(self, language: str) -> TranslationBundle | None:
+        """獲取單一語言的翻譯資料，不支援的語言返回 None"""
+        if language not in self.languages:
+            return None
+        version = file_version([self.translation_file(language)])
+        bundle = self._languages.get(language)
+        if bundle is not None and bundle.version == version:
+            self.stats["hits"] += 1
+            return bundle
+        with self._lock:
+            return self._get_language_locked(language, version)
+
+    def get_all(self) -> TranslationBundle:
+        """獲取所有語言的翻譯資料"""
+        version = file_version(
+            self.translation_file(language) for language in self.languages
+        )
+        bundle = self._combined
+        if bundle is not None and bundle.version == version:
+            self.stats["hits"] += 1
+            return bundle
+        with self._lock:
+            bundle = self._combined
+            if bundle is None or bundle.version != version:
+                data = {
+                    language: self._get_language_locked(language, (entry,)).data
+                    for language, entry in zip(self.languages, version, strict=True)
+                }
+                bundle = _make_bundle(data, version)
+                self._combined = bundle
+                self.stats["rebuilds"] += 1
+                debug_log(f"Web 翻譯快取已建立，共 {len(data)} 種語言")
+            return bundle
+
+    def clear(self):
+        """清除快取"""
+        with self._lock:
+            self._languages.clear()
+            self._combined = None
+
+    def get_stats(self) -> dict[str, Any]:
+        """獲取快取統計"""
+        bundles = list(self._languages.values())
+        if self._combined is not None:
+            bundles.append(self._combined)
+        return {
+            **self.stats,
+            "cached_languages": sorted(self._languages),
+            "memory_bytes": sum(
+                len(bundle.body) + len(bundle.gzip_body) for bundle in bundles
+            ),
+        }
+
+
+_translation_cache: TranslationCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_translation_cache() -> TranslationCache:
+    """獲取全域翻譯資料快取實例"""
+    global _translation_cache
+    if _translation_cache is None:
+        with _cache_lock:
+            if _translation_cache is None:
+                _translation_cache = TranslationCache()
+    return _translation_cache
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+內存分配分析器測試
+==================
+
+測試 tracemalloc 快照、分配位置統計與快照差異，
+內存增長警告觸發的自動快照，以及 /api/debug/alloc 路由。
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+
+from mcp_feedback_enhanced.utils.allocation_profiler import AllocationProfiler
+from mcp_feedback_enhanced.utils.memory_monitor import (
+    GROWTH_WINDOW,
+    MemoryAlert,
+    MemoryMonitor,
+    MemorySnapshot,
+)
+
+
+def allocate_blocks(count: int = 2000) -> list[bytearray]:
+    """在此檔案中分配一批內存，供快照差異定位"""
+    return [bytearray(1024) for _ in range(count)]
+
+
+@pytest.fixture
+def profiler():
+    profiler = AllocationProfiler(max_snapshots=3)
+    profiler.start(frames=5)
+    yield profiler
+    profiler.stop()
+
+
+class TestAllocationProfiler:
+    """測試分配分析器"""
+
+    def test_snapshot_diff_finds_growth(self, profiler):
+        first = profiler.take_snapshot("before")
+        blocks = allocate_blocks()
+        second = profiler.take_snapshot("after")
+
+        stats = profiler.diff(first["id"], second["id"], group_by="filename")
+        assert stats[0]["location"] == __file__
+        assert stats[0]["size_diff"] >= len(blocks) * 1024
+
+        top = profiler.top(second["id"], group_by="lineno", limit=5)
+        assert any(__file__ in stat["location"] for stat in top)
+
+        traceback_stats = profiler.diff(first["id"], group_by="traceback", limit=1)
+        assert len(traceback_stats[0]["traceback"]) > 1
+        del blocks
+
+    def test_snapshot_retention(self, profiler):
+        ids = [profiler.take_snapshot()["id"] for _ in range(4)]
+        assert [info["id"] for info in profiler.list_snapshots()] == ids[1:]
+        with pytest.raises(KeyError):
+            profiler.top(ids[0])
+        with pytest.raises(ValueError):
+            profiler.top(group_by="module")
+
+    def test_requires_tracing(self):
+        profiler = AllocationProfiler()
+        with pytest.raises(RuntimeError):
+            profiler.take_snapshot()
+        assert not profiler.get_status()["running"]
+
+    def test_growth_alert_triggers_snapshot(self, profiler):
+        monitor = MemoryMonitor()
+        monitor.add_alert_callback(profiler.on_memory_alert)
+        for i in range(GROWTH_WINDOW):
+            monitor.snapshots.append(
+                MemorySnapshot(
+                    timestamp=datetime.now(),
+                    system_total=8 * 1024**3,
+                    system_available=4 * 1024**3,
+                    system_used=4 * 1024**3,
+                    system_percent=50.0,
+                    process_rss=(100 + i * 10) * 1024**2,
+                    process_vms=400 * 1024**2,
+                    process_percent=1.0,
+                    gc_objects=0,
+                )
+            )
+
+        monitor._check_process_growth()
+        monitor._check_process_growth()
+
+        assert [alert.level for alert in monitor.alerts] == ["growth"]
+        snapshots = profiler.list_snapshots()
+        assert len(snapshots) == 1
+        assert snapshots[0]["reason"] == "alert:growth"
+
+        # 自動快照受頻率限制
+        profiler.on_memory_alert(
+            MemoryAlert("critical", "高壓", datetime.now(), 92.0, "清理")
+        )
+        assert len(profiler.list_snapshots()) == 1
+
+
+class TestAllocationProfilerRoutes:
+    """測試 /api/debug/alloc 路由"""
+
+    def _endpoint(self, manager, path: str, method: str):
+        return next(
+            route.endpoint
+            for route in manager.app.routes
+            if route.path == path and method in getattr(route, "methods", ())
+        )
+
+    @pytest.mark.asyncio
+    async def test_routes_require_opt_in(self, web_ui_manager, monkeypatch):
+        monkeypatch.delenv("MCP_ALLOC_PROFILER", raising=False)
+        status = self._endpoint(web_ui_manager, "/api/debug/alloc", "GET")
+        response = await status()
+        assert response.status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_routes_control_profiler(self, web_ui_manager, monkeypatch):
+        monkeypatch.setenv("MCP_ALLOC_PROFILER", "manual")
+        start = self._endpoint(web_ui_manager, "/api/debug/alloc/start", "POST")
+        snapshot = self._endpoint(web_ui_manager, "/api/debug/alloc/snapshot", "POST")
+        diff = self._endpoint(web_ui_manager, "/api/debug/alloc/diff", "GET")
+        stop = self._endpoint(web_ui_manager, "/api/debug/alloc/stop", "POST")
+
+        try:
+            assert json.loads((await start(frames=3)).body)["running"]
+            first = json.loads((await snapshot(label="base")).body)
+            assert first["label"] == "base"
+
+            response = await diff(old=first["id"], new=None, group_by="filename")
+            assert response.status_code == 200
+            assert "stats" in json.loads(response.body)
+
+            missing = await diff(old=999, new=None, group_by="filename")
+            assert missing.status_code == 404
+        finally:
+            assert not json.loads((await stop()).body)["running"]
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+靜態資源管線測試
+================
+
+測試 JS / CSS 壓縮、內容雜湊命名、dist 的寫入與載入，
+以及 Web UI 送出預先壓縮的資源包。
+"""
+
+import gzip
+import json
+
+import pytest
+from starlette.requests import Request
+
+from mcp_feedback_enhanced.web.utils.asset_pipeline import (
+    MANIFEST_NAME,
+    AssetPipeline,
+    minify_css,
+    minify_js,
+)
+
+
+JS_SOURCE = """
+/**
+ * 模組說明
+ */
+(function() {
+    'use strict';
+    // 行註釋
+    const url = "http://example.com/*not-a-comment*/";
+    const pattern = /\\/\\*[a-z]+\\*\\//g;
+    const ratio = total / count / 2;
+    const html = `<div class="${ active ? `on` : 'off' }">// 保留</div>`;
+    function next(value) {
+        return
+            value;
+    }
+    let i = 0
+    i
+    ++count
+    window.Demo = { url, pattern, ratio, html, next };
+})();
+"""
+
+
+class TestMinify:
+    """測試壓縮器"""
+
+    def test_minify_js_keeps_literals(self):
+        result = minify_js(JS_SOURCE)
+
+        assert "模組說明" not in result
+        assert "行註釋" not in result
+        assert '"http://example.com/*not-a-comment*/"' in result
+        assert "/\\/\\*[a-z]+\\*\\//g" in result
+        assert "total/count/2" in result
+        assert "`<div class=\"${active?`on`:'off'}\">// 保留</div>`" in result
+        # 可能觸發自動插入分號的換行必須保留
+        assert "return\nvalue" in result
+        assert "i\n++count" in result
+        assert len(result) < len(JS_SOURCE)
+
+    def test_minify_css(self):
+        source = """
+/* 標題 */
+.header > .title ,
+.header a:hover {
+    color : red;
+    content: "a  /* b */  c";
+    margin: 0 auto;
+}
+"""
+        assert minify_css(source) == (
+            '.header>.title,.header a:hover{color :red;content:"a  /* b */  c";'
+            "margin:0 auto}\n"
+        )
+
+
+@pytest.fixture
+def static_dir(temp_dir):
+    (temp_dir / "js").mkdir()
+    (temp_dir / "css").mkdir()
+    (temp_dir / "js" / "a.js").write_text("// a\nvar a = 1\n", encoding="utf-8")
+    (temp_dir / "js" / "b.js").write_text("window.b = a + 1;\n", encoding="utf-8")
+    (temp_dir / "css" / "site.css").write_text(
+        "body {\n    margin: 0;\n}\n", encoding="utf-8"
+    )
+    return temp_dir
+
+
+BUNDLES = {"app.js": ("js/a.js", "js/b.js"), "app.css": ("css/site.css",)}
+
+
+class TestAssetPipeline:
+    """測試資源管線"""
+
+    def test_build_hashes_and_compresses(self, static_dir):
+        pipeline = AssetPipeline(static_dir, BUNDLES, use_brotli=False)
+        assets = pipeline.build()
+
+        js = assets["app.js"]
+        assert js.content == b"var a=1\n;\nwindow.b=a+1;\n"
+        assert js.filename.startswith("app.") and js.filename.endswith(".js")
+        assert gzip.decompress(js.gzip_content) == js.content
+        assert js.get_variant("gzip, deflate, br") == (js.gzip_content, "gzip")
+        assert js.get_variant("") == (js.content, None)
+        assert assets["app.css"].content == b"body{margin:0}\n"
+
+        # 內容改變時檔名也改變
+        (static_dir / "js" / "b.js").write_text("window.b = 2;\n", encoding="utf-8")
+        assert pipeline.build()["app.js"].filename != js.filename
+
+    def test_write_and_load_dist(self, static_dir):
+        writer = AssetPipeline(static_dir, BUNDLES, use_brotli=False)
+        manifest_path = writer.write()
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        filename = manifest["assets"]["app.js"]["file"]
+        assert (writer.dist_dir / filename).exists()
+        assert (writer.dist_dir / f"{filename}.gz").exists()
+
+        reader = AssetPipeline(static_dir, BUNDLES, use_brotli=False)
+        assert reader.ensure_loaded()
+        assert reader.stats["source"] == "dist"
+        assert reader.get(filename).content == writer.assets["app.js"].content
+        assert reader.urls("app.js") == [f"/static/dist/{filename}"]
+
+        # 原始檔改變後 dist 過期，改為重新建置
+        (static_dir / "css" / "site.css").write_text("p{}\n", encoding="utf-8")
+        stale = AssetPipeline(static_dir, BUNDLES, use_brotli=False)
+        assert stale.ensure_loaded()
+        assert stale.stats["source"] == "built"
+
+        # 重新寫入時清除舊雜湊檔案
+        stale.write()
+        assert manifest_path.exists()
+        assert len(list(writer.dist_dir.glob("app.*.css"))) == 1
+
+    def test_bundling_disabled(self, static_dir, monkeypatch):
+        monkeypatch.setenv("MCP_WEB_ASSET_BUNDLE", "false")
+        pipeline = AssetPipeline(static_dir, BUNDLES, use_brotli=False)
+        urls = pipeline.urls("app.js")
+        assert [url.split("?")[0] for url in urls] == [
+            "/static/js/a.js",
+            "/static/js/b.js",
+        ]
+        assert not (static_dir / "dist" / MANIFEST_NAME).exists()
+
+
+class TestAssetRoutes:
+    """測試資源包路由與模板"""
+
+    @staticmethod
+    def _request(path: str, accept_encoding: str = "") -> Request:
+        return Request(
+            {
+                "type": "http",
+                "method": "GET",
+                "path": path,
+                "query_string": b"",
+                "headers": [(b"accept-encoding", accept_encoding.encode())],
+            }
+        )
+
+    @pytest.mark.asyncio
+    async def test_serves_precompressed_bundle(self, web_ui_manager):
+        pipeline = web_ui_manager.asset_pipeline
+        assert pipeline.ensure_loaded()
+        url = pipeline.urls("feedback.js")[0]
+        filename = url.rsplit("/", 1)[1]
+
+        route = next(
+            r for r in web_ui_manager.app.routes if r.path == "/static/dist/{filename}"
+        )
+        response = await route.endpoint(self._request(url, "gzip, br"), filename)
+        asset = pipeline.assets["feedback.js"]
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.body == asset.gzip_content
+        assert "immutable" in response.headers["cache-control"]
+
+        missing = await route.endpoint(self._request(url), "feedback.0000.js")
+        assert missing.status_code == 404
+
+        index = next(r for r in web_ui_manager.app.routes if r.path == "/")
+        page = await index.endpoint(self._request("/"))
+        body = page.body.decode("utf-8")
+        assert pipeline.urls("index.js")[0] in body
+        assert "/static/js/app.js" not in body
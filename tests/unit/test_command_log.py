@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+命令日誌緩衝區測試
+==================
+
+測試內存上限、溢寫到暫存檔、head/tail/grep 檢視與回饋結果的有界尾部。
+"""
+
+import os
+
+import pytest
+
+from mcp_feedback_enhanced.utils.command_log import CommandLogBuffer, LogLineWriter
+from mcp_feedback_enhanced.utils.resource_manager import get_resource_manager
+
+
+@pytest.fixture
+def log_buffer():
+    buffer = CommandLogBuffer("test", memory_limit=4096)
+    yield buffer
+    path = buffer.log_path
+    buffer._keep_file = False
+    buffer.clear()
+    assert path is None or not os.path.exists(path)
+
+
+class TestCommandLogBuffer:
+    """測試命令日誌緩衝區"""
+
+    def test_small_log_stays_in_memory(self, log_buffer):
+        log_buffer.extend(["a", "b", "c"])
+
+        assert len(log_buffer) == 3
+        assert log_buffer.log_path is None
+        assert log_buffer.tail(2) == ["b", "c"]
+        assert log_buffer.get_result_text() == "a\nb\nc"
+
+    def test_spills_to_disk_over_memory_limit(self, log_buffer):
+        lines = [f"line {i:05d}" for i in range(5000)]
+        log_buffer.extend(lines)
+
+        stats = log_buffer.get_stats()
+        assert stats["spilled"]
+        assert stats["memory_bytes"] <= 4096
+        assert stats["total_lines"] == 5000
+        assert stats["disk_bytes"] == stats["total_bytes"] == 5000 * 11
+
+        # 暫存檔包含完整日誌，內存只保留尾部
+        assert log_buffer.head(3) == lines[:3]
+        assert log_buffer.tail(3) == lines[-3:]
+        assert log_buffer.tail(2000) == lines[-2000:]
+        with open(log_buffer.log_path, encoding="utf-8") as f:
+            assert f.read().splitlines() == lines
+
+    def test_grep(self, log_buffer):
+        log_buffer.extend(
+            [f"{'ERROR' if i % 1000 == 0 else 'ok'} {i}" for i in range(5000)]
+        )
+
+        matches = log_buffer.grep(r"^ERROR")
+        assert [m["line"] for m in matches] == [1, 1001, 2001, 3001, 4001]
+        assert log_buffer.grep("ERROR", limit=2)[-1]["text"] == "ERROR 1000"
+
+    def test_result_text_is_bounded_with_pointer(self, log_buffer):
+        log_buffer.extend(f"output {i}" for i in range(10000))
+
+        text = log_buffer.get_result_text(max_bytes=1024)
+        header, *tail = text.splitlines()
+        assert len(text.encode()) < 1024 + len(header.encode()) + 1
+        assert tail[-1] == "output 9999"
+        assert log_buffer.log_path in header
+
+        # 被回饋結果引用的完整日誌不隨會話清理刪除，交由資源管理器按保留時間清理
+        path = log_buffer.log_path
+        log_buffer.clear()
+        assert os.path.exists(path)
+        assert path in get_resource_manager().temp_files
+        os.unlink(path)
+        get_resource_manager().unregister_temp_file(path)
+
+    def test_result_text_under_memory_limit_keeps_full_log(self):
+        buffer = CommandLogBuffer("test", memory_limit=64 * 1024)
+        buffer.extend(f"output {i}" for i in range(1000))
+
+        text = buffer.get_result_text(max_bytes=1024)
+        header, *tail = text.splitlines()
+        assert header.startswith("[日誌已截斷")
+        assert tail[-1] == "output 999"
+
+        # 即使未超過內存上限，截斷的結果也指向寫在磁碟上的完整日誌
+        path = buffer.log_path
+        assert path in header
+        buffer.extend(["output 1000"])
+        buffer.clear()
+        with open(path, encoding="utf-8") as f:
+            assert f.read().splitlines() == [f"output {i}" for i in range(1001)]
+        assert path in get_resource_manager().temp_files
+        os.unlink(path)
+        get_resource_manager().unregister_temp_file(path)
+
+    def test_untruncated_result_text_has_no_file(self, log_buffer):
+        log_buffer.extend(f"output {i}" for i in range(10))
+        assert "完整日誌" not in log_buffer.get_result_text(max_bytes=1024)
+        assert log_buffer.log_path is None
+
+
+class TestLogLineWriter:
+    """測試輸出批次組合為完整行"""
+
+    def test_partial_lines_are_held_back(self, log_buffer):
+        writer = LogLineWriter(log_buffer)
+        writer.write("a\nb")
+        assert log_buffer.tail() == ["a"]
+        writer.write("c\r")
+        writer.write("\nd\n\ne")
+        assert log_buffer.tail() == ["a", "bc", "d", ""]
+        writer.close()
+        assert log_buffer.tail() == ["a", "bc", "d", "", "e"]
+        writer.close()
+        assert len(log_buffer) == 5
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+命令執行器測試
+==============
+
+測試 asyncio 子進程執行器以大塊讀取並批次轉發輸出，
+以及會話透過它發送 command_output / command_complete。
+"""
+
+import asyncio
+import sys
+
+import pytest
+
+from mcp_feedback_enhanced.web.models.feedback_session import WebFeedbackSession
+from mcp_feedback_enhanced.web.utils.command_runner import CommandRunner
+
+
+LINE_COUNT = 50000
+PRINT_LINES = f"print(chr(10).join(map(str,range({LINE_COUNT}))))"
+
+
+class RecordingWebSocket:
+    """記錄會話發送的消息"""
+
+    def __init__(self):
+        self.messages: list[dict] = []
+        self.completed = asyncio.Event()
+
+    async def send_json(self, message):
+        self.messages.append(message)
+        if message["type"] == "command_complete":
+            self.completed.set()
+
+
+class TestCommandRunner:
+    """測試命令執行器"""
+
+    @pytest.mark.asyncio
+    async def test_output_is_batched(self):
+        chunks: list[str] = []
+
+        async def on_output(text: str):
+            chunks.append(text)
+
+        runner = CommandRunner(on_output)
+        await runner.start([sys.executable, "-c", PRINT_LINES])
+        assert await runner.run() == 0
+
+        output = "".join(chunks)
+        assert output.splitlines() == [str(i) for i in range(LINE_COUNT)]
+
+        stats = runner.get_stats()
+        assert stats["lines"] == LINE_COUNT
+        assert stats["frames"] == len(chunks)
+        # 5 萬行只產生少量幀
+        assert stats["frames"] < LINE_COUNT / 100
+        assert stats["lines_per_second"] > stats["frames_per_second"] > 0
+
+    @pytest.mark.asyncio
+    async def test_flush_interval_bounds_latency(self):
+        chunks: list[str] = []
+
+        async def on_output(text: str):
+            chunks.append(text)
+
+        script = "import time\nprint('a', flush=True)\ntime.sleep(0.5)\nprint('b')"
+        runner = CommandRunner(on_output, flush_interval=0.01)
+        await runner.start([sys.executable, "-c", script])
+        assert await runner.run() == 0
+
+        # 輸出間隔超過批次時間時分開發送，不等待後續輸出
+        assert chunks == ["a\n", "b\n"]
+
+    @pytest.mark.asyncio
+    async def test_terminate(self):
+        async def on_output(text: str):
+            pass
+
+        runner = CommandRunner(on_output)
+        await runner.start([sys.executable, "-c", "import time; time.sleep(30)"])
+        await runner.terminate(timeout=5)
+        assert runner.process.returncode is not None
+
+
+class TestSessionRunCommand:
+    """測試會話命令執行"""
+
+    @pytest.mark.asyncio
+    async def test_run_command_streams_batches(self, temp_dir):
+        session = WebFeedbackSession("cmd", str(temp_dir), "命令")
+        websocket = RecordingWebSocket()
+        session.websocket = websocket
+
+        await session.run_command(f'{sys.executable} -c "{PRINT_LINES}"')
+        await asyncio.wait_for(websocket.completed.wait(), 30)
+
+        outputs = [m for m in websocket.messages if m["type"] == "command_output"]
+        complete = websocket.messages[-1]
+        assert "".join(m["output"] for m in outputs).count("\n") == LINE_COUNT
+        assert len(outputs) == complete["stats"]["frames"]
+        assert complete["exit_code"] == 0
+        assert complete["stats"]["lines"] == LINE_COUNT
+        assert session.command_logs.tail(1) == [str(LINE_COUNT - 1)]
+        assert session.process is None
+
+    @pytest.mark.asyncio
+    async def test_line_split_across_flushes_is_logged_once(self, temp_dir):
+        session = WebFeedbackSession("cmd", str(temp_dir), "命令")
+        websocket = RecordingWebSocket()
+        session.websocket = websocket
+
+        script = (
+            "import sys, time\n"
+            "sys.stdout.write('test_x ... ')\n"
+            "sys.stdout.flush()\n"
+            "time.sleep(0.5)\n"
+            "sys.stdout.write('PASSED' + chr(10) + 'tail')"
+        )
+        await session.run_command(f'{sys.executable} -c "{script}"')
+        await asyncio.wait_for(websocket.completed.wait(), 30)
+
+        outputs = [
+            m["output"] for m in websocket.messages if m["type"] == "command_output"
+        ]
+        # 行在兩批之間被切開，但日誌只記錄完整的行，結束時補上最後的殘行
+        assert outputs[0] == "test_x ... "
+        assert session.command_logs.tail() == ["test_x ... PASSED", "tail"]
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+WebSocket 連接中心測試
+======================
+
+測試每個連接的有界發送佇列：command_output 合併、狀態消息只保留最新、
+過慢連接被關閉，以及同一會話多個連接的扇出與會話轉移。
+"""
+
+import asyncio
+
+import pytest
+
+from mcp_feedback_enhanced.web.utils import connection_hub
+from mcp_feedback_enhanced.web.utils.connection_hub import ConnectionHub
+
+
+class FakeWebSocket:
+    """記錄發送內容的假連接，可暫停發送以模擬緩慢的瀏覽器"""
+
+    def __init__(self):
+        self.sent: list[dict] = []
+        self.closed_with: tuple[int, str] | None = None
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def send_json(self, message):
+        await self.gate.wait()
+        self.sent.append(message)
+
+    async def close(self, code=1000, reason=""):
+        self.closed_with = (code, reason)
+
+
+async def drain():
+    """讓寫入任務運行到佇列清空"""
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+class TestConnectionHub:
+    """測試連接中心"""
+
+    @pytest.mark.asyncio
+    async def test_fan_out_to_all_connections(self):
+        hub = ConnectionHub(queue_size=8)
+        first, second, other = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        hub.register("s1", first)
+        hub.register("s1", second)
+        hub.register("s2", other)
+
+        assert hub.send("s1", {"type": "feedback_received"}) == 2
+        await drain()
+
+        assert first.sent == second.sent == [{"type": "feedback_received"}]
+        assert other.sent == []
+
+        hub.unregister(first)
+        assert len(hub.get_connections("s1")) == 1
+
+    @pytest.mark.asyncio
+    async def test_command_output_is_coalesced(self):
+        hub = ConnectionHub(queue_size=8)
+        websocket = FakeWebSocket()
+        websocket.gate.clear()
+        connection = hub.register("s1", websocket)
+
+        # 第一條被寫入任務取出後阻塞，其餘在佇列中合併
+        hub.send("s1", {"type": "command_output", "output": "a\n"})
+        await drain()
+        for line in ("b\n", "c\n", "d\n"):
+            hub.send("s1", {"type": "command_output", "output": line})
+        hub.send("s1", {"type": "command_complete", "exit_code": 0})
+        assert len(connection.queue) == 2
+
+        websocket.gate.set()
+        await drain()
+
+        assert websocket.sent == [
+            {"type": "command_output", "output": "a\n"},
+            {"type": "command_output", "output": "b\nc\nd\n"},
+            {"type": "command_complete", "exit_code": 0},
+        ]
+        assert connection.stats["coalesced"] == 2
+
+    @pytest.mark.asyncio
+    async def test_coalesced_output_truncation_is_marked(self, monkeypatch):
+        monkeypatch.setattr(connection_hub, "MAX_COALESCED_OUTPUT", 8)
+        hub = ConnectionHub(queue_size=8)
+        websocket = FakeWebSocket()
+        websocket.gate.clear()
+        connection = hub.register("s1", websocket)
+
+        hub.send("s1", {"type": "command_output", "output": "start\n"})
+        await drain()
+        for chunk in ("aaaa", "bbbb", "cccc", "dddd"):
+            hub.send("s1", {"type": "command_output", "output": chunk})
+
+        websocket.gate.set()
+        await drain()
+
+        merged = websocket.sent[1]
+        assert merged["output"] == "[… 已截斷 8 個字元 …]\nccccdddd"
+        assert merged["truncated"] == 8
+        assert connection.stats["truncated_chars"] == 8
+        assert hub.get_stats()["total_truncated_chars"] == 8
+
+    @pytest.mark.asyncio
+    async def test_full_queue_keeps_latest_status(self):
+        hub = ConnectionHub(queue_size=2)
+        websocket = FakeWebSocket()
+        websocket.gate.clear()
+        connection = hub.register("s1", websocket)
+
+        hub.send("s1", {"type": "feedback_received"})
+        await drain()
+        hub.send("s1", {"type": "status_update", "status_info": 1})
+        hub.send("s1", {"type": "session_cleanup"})
+        hub.send("s1", {"type": "status_update", "status_info": 2})
+
+        websocket.gate.set()
+        await drain()
+
+        assert websocket.sent == [
+            {"type": "feedback_received"},
+            {"type": "session_cleanup"},
+            {"type": "status_update", "status_info": 2},
+        ]
+        assert connection.stats["dropped"] == 1
+        assert websocket.closed_with is None
+
+    @pytest.mark.asyncio
+    async def test_slow_consumer_is_closed(self):
+        hub = ConnectionHub(queue_size=2)
+        slow, fast = FakeWebSocket(), FakeWebSocket()
+        slow.gate.clear()
+        hub.register("s1", slow)
+        hub.register("s1", fast)
+
+        for i in range(4):
+            hub.send("s1", {"type": "command_error", "error": str(i)})
+            await drain()
+
+        # 過慢的連接被關閉並移除，不影響同一會話的其他連接
+        assert len(fast.sent) == 4
+        slow.gate.set()
+        await drain()
+        assert slow.closed_with == (1013, "連接過慢")
+        assert [c.websocket for c in hub.get_connections("s1")] == [fast]
+
+    @pytest.mark.asyncio
+    async def test_move_session_and_stats(self):
+        hub = ConnectionHub(queue_size=4)
+        websocket = FakeWebSocket()
+        hub.register("old", websocket)
+
+        hub.send("old", {"type": "session_updated"})
+        assert hub.move_session("old", "new") == 1
+        hub.send("new", {"type": "status_update"})
+        await drain()
+
+        assert hub.get_session_id(websocket) == "new"
+        assert [m["type"] for m in websocket.sent] == [
+            "session_updated",
+            "status_update",
+        ]
+
+        stats = hub.get_stats()
+        assert stats["connections"] == 1
+        assert stats["total_sent"] == 2
+        assert stats["per_connection"][0]["queue_depth"] == 0
+
+        assert hub.close_session("new", reason="會話清理") == 1
+        await drain()
+        assert websocket.closed_with == (1000, "會話清理")
+        assert len(hub) == 0
+
+    @pytest.mark.asyncio
+    async def test_totals_survive_closed_connections(self, monkeypatch):
+        monkeypatch.setattr(connection_hub, "MAX_COALESCED_OUTPUT", 8)
+        hub = ConnectionHub(queue_size=2)
+        unregistered, closed, slow = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        hub.register("s1", unregistered)
+        hub.register("s1", closed)
+        hub.register("s2", slow)
+        slow.gate.clear()
+
+        hub.send("s1", {"type": "feedback_received"})
+        hub.send("s2", {"type": "command_output", "output": "start\n"})
+        await drain()
+        for chunk in ("aaaa", "bbbb", "cccc"):
+            hub.send("s2", {"type": "command_output", "output": chunk})
+        before = hub.get_stats()
+
+        # 主動移除、寫入任務結束與過慢被關閉的連接，其計數都保留在總數中
+        hub.unregister(unregistered)
+        hub.close_session("s1")
+        for i in range(3):
+            hub.send("s2", {"type": "command_error", "error": str(i)})
+        slow.gate.set()
+        await drain()
+
+        after = hub.get_stats()
+        assert after["connections"] == 0
+        assert after["total_sent"] == before["total_sent"] + 1 == 3
+        assert after["total_coalesced"] == before["total_coalesced"] == 2
+        assert after["total_truncated_chars"] == before["total_truncated_chars"] == 4
+        assert after["total_dropped"] > before["total_dropped"]
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+會話期限排程器測試
+==================
+
+測試所有會話期限共用一個最小堆與排程線程，重設期限不建立新線程。
+"""
+
+import threading
+import time
+
+from mcp_feedback_enhanced.web.models.feedback_session import WebFeedbackSession
+from mcp_feedback_enhanced.web.utils.deadline_scheduler import DeadlineScheduler
+
+
+def wait_until(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class TestDeadlineScheduler:
+    """測試期限排程器"""
+
+    def test_fires_in_deadline_order(self):
+        scheduler = DeadlineScheduler()
+        fired: list[str] = []
+
+        scheduler.schedule(0.15, lambda: fired.append("late"))
+        scheduler.schedule(0.05, lambda: fired.append("early"))
+        cancelled = scheduler.schedule(0.1, lambda: fired.append("cancelled"))
+        cancelled.cancel()
+
+        assert wait_until(lambda: len(fired) == 2)
+        assert fired == ["early", "late"]
+
+        stats = scheduler.get_stats()
+        assert stats["fired"] == 2
+        assert stats["cancelled"] == 1
+        assert stats["pending"] == 0
+
+    def test_reschedule_replaces_deadline(self):
+        scheduler = DeadlineScheduler()
+        fired = threading.Event()
+
+        entry = scheduler.schedule(0.05, fired.set)
+        new_entry = scheduler.reschedule(entry, 60)
+
+        assert not entry.is_alive()
+        assert new_entry.is_alive()
+        assert new_entry.remaining() > 50
+        assert not fired.wait(0.2)
+        assert scheduler.get_stats()["pending"] == 1
+
+    def test_many_reschedules_use_one_thread(self):
+        scheduler = DeadlineScheduler()
+        entries = [scheduler.schedule(60, lambda: None) for _ in range(1000)]
+        threads_before = threading.active_count()
+
+        for _ in range(5):
+            entries = [scheduler.reschedule(entry, 60) for entry in entries]
+
+        stats = scheduler.get_stats()
+        assert threading.active_count() == threads_before
+        assert stats["pending"] == 1000
+        assert stats["rescheduled"] == 5000
+        # 作廢條目被重建堆時移除，堆大小保持有界
+        assert stats["compactions"] > 0
+        assert stats["heap_size"] < 3000
+
+
+class TestSessionDeadlines:
+    """測試會話使用共用的期限排程"""
+
+    def test_status_updates_do_not_create_threads(self, temp_dir):
+        sessions = [
+            WebFeedbackSession(f"deadline-{i}", str(temp_dir), "期限")
+            for i in range(50)
+        ]
+        threads_before = threading.active_count()
+
+        for session in sessions:
+            session.update_status(session.status.ACTIVE, "活躍")
+            session.extend_cleanup_timer(120)
+
+        assert threading.active_count() == threads_before
+        assert all(0 < s.cleanup_timer.remaining() <= 120 for s in sessions)
+
+        timers = [session.cleanup_timer for session in sessions]
+        for session in sessions:
+            session._cleanup_sync()
+        # 清理時取消期限
+        assert not any(timer.is_alive() for timer in timers)
+
+    def test_expired_session_is_cleaned(self, temp_dir):
+        session = WebFeedbackSession(
+            "deadline-expire", str(temp_dir), "期限", auto_cleanup_delay=0.05
+        )
+        session.last_activity = time.time() - session.max_idle_time - 1
+
+        assert wait_until(lambda: session._cleanup_done)
+        assert session.cleanup_timer is None
+
+    def test_cleanup_does_not_block_scheduler(self, temp_dir, monkeypatch):
+        session = WebFeedbackSession("deadline-slow", str(temp_dir), "期限")
+        session.last_activity = time.time() - session.max_idle_time - 1
+        release = threading.Event()
+        cleaned: list[str] = []
+
+        def slow_cleanup(reason, preserve_websocket=False):
+            # 模擬等待命令進程退出
+            release.wait(5)
+            cleaned.append(threading.current_thread().name)
+
+        monkeypatch.setattr(session, "_cleanup_sync_enhanced", slow_cleanup)
+
+        start = time.monotonic()
+        session._auto_cleanup()
+        assert time.monotonic() - start < 1
+        release.set()
+        assert wait_until(lambda: cleaned)
+        assert cleaned[0].startswith("SessionCleanup-")
+
+    def test_cleanup_dispatched_to_server_loop(self, temp_dir):
+        session = WebFeedbackSession("deadline-loop", str(temp_dir), "期限")
+        session.last_activity = time.time() - session.max_idle_time - 1
+        scheduled = []
+        session.schedule_on_server_loop = scheduled.append
+
+        session._auto_cleanup()
+
+        assert len(scheduled) == 1
+        assert scheduled[0].cr_code.co_name == "_cleanup_resources_enhanced"
+        scheduled[0].close()
+        session._cleanup_sync()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+回饋歸檔測試
+============
+
+測試僅追加回饋歸檔的批次寫入、內容定址圖片、查詢與保留策略。
+"""
+
+import time
+
+import pytest
+
+from mcp_feedback_enhanced.models import ImageRecord
+from mcp_feedback_enhanced.utils.feedback_archive import (
+    ArchivePolicy,
+    FeedbackArchive,
+)
+
+
+@pytest.fixture
+def archive(temp_dir):
+    """創建使用臨時目錄的歸檔器"""
+    archive = FeedbackArchive(archive_dir=temp_dir, policy=ArchivePolicy())
+    yield archive
+    archive.close()
+
+
+def make_feedback(text: str, images=None, ui_mode: str = "web") -> dict:
+    return {
+        "interactive_feedback": text,
+        "command_logs": "$ echo ok\nok",
+        "images": images or [],
+        "metadata": {"ui_mode": ui_mode},
+    }
+
+
+class TestFeedbackArchive:
+    """測試回饋歸檔器"""
+
+    def test_schema_created_on_writer(self, temp_dir):
+        archive_dir = temp_dir / "archive"
+        archive = FeedbackArchive(archive_dir=archive_dir, policy=ArchivePolicy())
+        try:
+            # 建構與提交只入佇列，目錄由背景寫入線程建立
+            assert not archive_dir.exists()
+            archive.submit(make_feedback("延遲建立"))
+            assert archive.flush(timeout=5)
+            assert archive_dir.exists()
+            assert archive.query()[0].feedback_text == "延遲建立"
+        finally:
+            archive.close()
+
+    def test_submit_and_query(self, archive):
+        """測試提交後可查詢"""
+        archive.submit(make_feedback("第一筆"), project_directory="/proj/a")
+        archive.submit(make_feedback("第二筆", ui_mode="gui"), "/proj/b")
+        assert archive.flush(timeout=10)
+
+        records = archive.query()
+        assert [r.feedback_text for r in records] == ["第二筆", "第一筆"]
+
+        assert [
+            r.feedback_text for r in archive.query(project_directory="/proj/a")
+        ] == ["第一筆"]
+        assert [r.feedback_text for r in archive.query(ui_mode="gui")] == ["第二筆"]
+        assert archive.query(since=time.time() + 60) == []
+
+    def test_images_deduplicated(self, archive):
+        """測試相同圖片只保存一份 blob"""
+        image = ImageRecord(name="shot.png", data=b"\x89PNG" + b"x" * 1000)
+        archive.submit(make_feedback("a", [image]), "/proj")
+        archive.submit(
+            make_feedback("b", [{"name": "copy.png", "data": image.data}]), "/proj"
+        )
+        assert archive.flush(timeout=10)
+
+        records = archive.query()
+        assert records[0].images[0].sha256 == records[1].images[0].sha256
+        assert archive.get_image_data(records[0].images[0].sha256) == image.data
+
+        stats = archive.get_archive_stats()
+        assert stats["image_blobs"] == 1
+        assert stats["images_written"] == 2
+
+    def test_batched_writes(self, archive):
+        """測試多筆記錄在同一批次寫入"""
+        for i in range(10):
+            archive.submit(make_feedback(f"#{i}"), "/proj")
+        assert archive.flush(timeout=10)
+
+        assert archive.stats["records_written"] == 10
+        assert archive.stats["batches_written"] < 10
+
+    def test_compaction_removes_excess_and_orphans(self, temp_dir):
+        """測試保留策略刪除超量記錄與孤立 blob"""
+        archive = FeedbackArchive(
+            archive_dir=temp_dir, policy=ArchivePolicy(max_records=2)
+        )
+        try:
+            for i in range(4):
+                image = ImageRecord(name=f"{i}.png", data=bytes([i]) * 100)
+                archive.submit(make_feedback(f"#{i}", [image]), "/proj")
+            archive.flush(timeout=10)
+
+            result = archive.compact()
+            assert result["records"] == 2
+            assert result["blobs"] == 2
+
+            records = archive.query()
+            assert [r.feedback_text for r in records] == ["#3", "#2"]
+            assert archive.get(records[0].id).images[0].name == "3.png"
+        finally:
+            archive.close()
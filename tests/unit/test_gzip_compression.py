@@ -12,6 +12,7 @@ Gzip 壓縮功能測試
 
 import gzip
 import json
+from datetime import timedelta
 from unittest.mock import patch
 
 import pytest
@@ -225,6 +226,102 @@ class TestCompressionMonitor:
         assert exported["summary"]["total_requests"] == 1
         assert exported["summary"]["compressed_requests"] == 1
 
+    def test_ring_buffer_window(self):
+        """測試環形緩衝區淘汰時窗口總量同步更新"""
+        monitor = CompressionMonitor(max_metrics=3)
+
+        for i in range(5):
+            monitor.record_request(
+                f"/static/{i}.js",
+                1000 * (i + 1),
+                500 * (i + 1),
+                0.01 * (i + 1),
+                "application/javascript",
+                i % 2 == 0,
+            )
+
+        assert len(monitor.metrics) == 3
+        assert [m.path for m in monitor.get_recent_metrics(2)] == [
+            "/static/3.js",
+            "/static/4.js",
+        ]
+
+        # 窗口只包含最近 3 筆（i = 2, 3, 4）
+        summary = monitor.get_summary()
+        assert summary.total_requests == 3
+        assert summary.compressed_requests == 2
+        assert summary.total_original_bytes == 3000 + 4000 + 5000
+        assert summary.bandwidth_saved == 1500 + 2000 + 2500
+        assert abs(summary.average_response_time - 0.04) < 1e-9
+        assert abs(summary.response_time_percentiles["p50"] - 0.04) < 0.04 * 0.02
+
+        windowed = monitor.get_summary(time_window=timedelta(minutes=1))
+        assert windowed.total_requests == 3
+        assert windowed.bandwidth_saved == summary.bandwidth_saved
+
+        # 路徑統計仍保留全部歷史
+        assert len(monitor.get_path_stats()) == 5
+
+    def test_bounded_path_stats(self):
+        """測試路徑統計只追蹤固定數量的高頻路徑"""
+        monitor = CompressionMonitor(max_paths=4)
+
+        for i in range(300):
+            monitor.record_request(
+                f"/static/app.js?v={i}", 4000, 1000, 0.01, "text/javascript", True
+            )
+            monitor.record_request(f"/api/session/{i}", 800, 800, 0.01, "", False)
+            if i % 2 == 0:
+                monitor.record_request("/", 3000, 1500, 0.01, "text/html", True)
+
+        # 查詢字串不區分路徑，變動路徑不會讓統計無限增長
+        path_stats = monitor.get_path_stats()
+        assert len(path_stats) == 4
+        assert path_stats["/static/app.js"]["requests"] == 300
+        assert path_stats["/static/app.js"]["count_error"] == 0
+
+        top_paths = monitor.get_top_paths(2)
+        assert [item["path"] for item in top_paths] == ["/static/app.js", "/"]
+        assert top_paths[1]["requests"] == 150
+
+        # 剛取代其他路徑的低頻路徑不參與壓縮排行
+        assert [path for path, _ in monitor.get_summary().top_compressed_paths] == [
+            "/static/app.js",
+            "/",
+        ]
+
+        exported = monitor.export_stats()
+        assert exported["memory"]["paths"]["tracked"] == 4
+        assert exported["memory"]["paths"]["evictions"] > 0
+        assert exported["memory"]["estimated_bytes"] > 0
+
+    def test_percentiles(self):
+        """測試按路徑和內容類型的分位數"""
+        monitor = CompressionMonitor()
+
+        for i in range(1, 101):
+            monitor.record_request(
+                "/api/data", 2000, 800, i / 1000, "application/json", True
+            )
+        monitor.record_request("/", 500, 500, 0.2, "text/html", False)
+
+        percentiles = monitor.get_percentiles(path="/api/data")
+        assert percentiles["response_time_ms"]["count"] == 100
+        assert abs(percentiles["response_time_ms"]["p50"] - 50) <= 1
+        assert abs(percentiles["response_time_ms"]["p99"] - 99) <= 2
+        assert percentiles["size_bytes"]["p95"] == 800
+
+        by_type = monitor.get_percentiles(content_type="text/html")
+        assert by_type["response_time_ms"]["max"] == 200
+
+        overall = monitor.get_percentiles()
+        assert overall["response_time_ms"]["count"] == 101
+        assert monitor.get_percentiles(path="/missing") == {}
+
+        exported = monitor.export_stats()
+        assert "p95" in exported["path_stats"]["/api/data"]["response_time_ms"]
+        assert "p99" in exported["summary"]["response_time_percentiles_ms"]
+
 
 class TestGzipIntegration:
     """測試 Gzip 壓縮集成"""
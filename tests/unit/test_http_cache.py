@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+HTTP 條件請求測試
+=================
+
+測試 ETag 產生與比對、conditional_json 的 304 處理，
+以及 Web UI JSON API 的重新驗證。
+"""
+
+import json
+
+import pytest
+from starlette.requests import Request
+
+from mcp_feedback_enhanced.web.utils.http_cache import (
+    conditional_json,
+    etag_matches,
+    file_version,
+    make_etag,
+)
+
+
+def make_request(path: str = "/api/test", if_none_match: str | None = None):
+    headers = []
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "query_string": b"",
+            "headers": headers,
+        }
+    )
+
+
+class TestConditionalJson:
+    """測試條件請求工具"""
+
+    def test_etag_matching(self):
+        etag = make_etag("v1")
+        assert etag.startswith('W/"')
+        assert etag_matches(etag, etag)
+        assert etag_matches(etag.removeprefix("W/"), etag)
+        assert etag_matches(f'"other", {etag}', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches(make_etag("v2"), etag)
+        assert not etag_matches(None, etag)
+
+    def test_version_skips_building_content(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            return {"value": 1}
+
+        first = conditional_json(make_request(), build, version=("settings", 1))
+        assert first.status_code == 200
+        assert json.loads(first.body) == {"value": 1}
+        assert first.headers["cache-control"] == "no-cache"
+
+        etag = first.headers["etag"]
+        second = conditional_json(
+            make_request(if_none_match=etag), build, version=("settings", 1)
+        )
+        assert second.status_code == 304
+        assert second.headers["etag"] == etag
+        assert calls == [1]
+
+        changed = conditional_json(
+            make_request(if_none_match=etag), build, version=("settings", 2)
+        )
+        assert changed.status_code == 200
+        assert calls == [1, 1]
+
+    def test_content_hash(self):
+        first = conditional_json(make_request(), {"name": "測試"})
+        assert json.loads(first.body) == {"name": "測試"}
+
+        etag = first.headers["etag"]
+        assert (
+            conditional_json(
+                make_request(if_none_match=etag), {"name": "測試"}
+            ).status_code
+            == 304
+        )
+        assert (
+            conditional_json(
+                make_request(if_none_match=etag), {"name": "變更"}
+            ).status_code
+            == 200
+        )
+
+    def test_file_version(self, temp_dir):
+        path = temp_dir / "settings.json"
+        missing = file_version([path])
+        path.write_text("{}", encoding="utf-8")
+        created = file_version([path])
+        assert created != missing
+        assert file_version([path]) == created
+
+
+class TestApiRevalidation:
+    """測試 Web UI JSON API 的 ETag"""
+
+    @staticmethod
+    def _endpoint(manager, path: str):
+        return next(
+            route.endpoint for route in manager.app.routes if route.path == path
+        )
+
+    @pytest.mark.asyncio
+    async def test_translations_and_session(self, web_ui_manager):
+        translations = self._endpoint(web_ui_manager, "/api/translations")
+        first = await translations(make_request("/api/translations"))
+        assert first.status_code == 200
+        assert "zh-TW" in json.loads(first.body)
+
+        etag = first.headers["etag"]
+        second = await translations(make_request("/api/translations", etag))
+        assert second.status_code == 304
+        assert second.body == b""
+
+        session_id = web_ui_manager.create_session("/tmp/etag", "ETag 測試")
+        current = self._endpoint(web_ui_manager, "/api/current-session")
+        response = await current(make_request("/api/current-session"), session_id)
+        assert json.loads(response.body)["session_id"] == session_id
+
+        etag = response.headers["etag"]
+        revalidated = await current(
+            make_request("/api/current-session", etag), session_id
+        )
+        assert revalidated.status_code == 304
+
+        # 內容變更後 ETag 失效
+        web_ui_manager.get_session(session_id).summary = "已更新"
+        updated = await current(make_request("/api/current-session", etag), session_id)
+        assert updated.status_code == 200
+        assert json.loads(updated.body)["summary"] == "已更新"
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+圖片正規化管線測試
+==================
+
+使用 QImage 在無顯示環境下測試格式檢測、元數據去除、縮放與快取。
+"""
+
+import base64
+import os
+
+import pytest
+
+
+QtGui = pytest.importorskip("PySide6.QtGui")
+QtCore = pytest.importorskip("PySide6.QtCore")
+
+from mcp_feedback_enhanced.models import ImageRecord, detect_image_mime_type
+from mcp_feedback_enhanced.utils.image_pipeline import (
+    ImageNormalizer,
+    ImagePipelineConfig,
+    normalize_image,
+    strip_image_metadata,
+)
+
+
+def make_image(
+    width: int,
+    height: int,
+    fmt: str = "PNG",
+    alpha: bool = False,
+    noise: bool = False,
+) -> bytes:
+    """產生帶文字元數據的測試圖片（noise 時為難以無損壓縮的雜訊圖）"""
+    image_format = (
+        QtGui.QImage.Format.Format_ARGB32 if alpha else QtGui.QImage.Format.Format_RGB32
+    )
+    if noise:
+        pixels = os.urandom(width * height * 4)
+        image = QtGui.QImage(pixels, width, height, width * 4, image_format).copy()
+    else:
+        image = QtGui.QImage(width, height, image_format)
+        image.fill(QtGui.QColor(30, 60, 90, 128 if alpha else 255))
+    image.setText("Comment", "private-metadata")
+    output = QtCore.QByteArray()
+    buffer = QtCore.QBuffer(output)
+    buffer.open(QtCore.QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, fmt)
+    buffer.close()
+    return bytes(output.data())
+
+
+def with_exif_orientation(jpeg: bytes, orientation: int) -> bytes:
+    """在 JPEG 的 SOI 之後插入只含方向標籤的 EXIF 段"""
+    tiff = (
+        b"MM\x00*\x00\x00\x00\x08"  # 大端序 TIFF 標頭，IFD 位於偏移 8
+        + b"\x00\x01"  # 1 個條目
+        + b"\x01\x12\x00\x03\x00\x00\x00\x01"  # Orientation, SHORT, 1 個值
+        + orientation.to_bytes(2, "big")
+        + b"\x00\x00"
+        + b"\x00\x00\x00\x00"  # 無下一個 IFD
+    )
+    payload = b"Exif\x00\x00" + tiff
+    segment = b"\xff\xe1" + (len(payload) + 2).to_bytes(2, "big") + payload
+    return jpeg[:2] + segment + jpeg[2:]
+
+
+class TestFormatDetection:
+    """測試魔數格式檢測"""
+
+    def test_detect_common_formats(self):
+        assert detect_image_mime_type(make_image(4, 4, "PNG")) == "image/png"
+        assert detect_image_mime_type(make_image(4, 4, "JPEG")) == "image/jpeg"
+        assert detect_image_mime_type(b"GIF89a....") == "image/gif"
+        assert detect_image_mime_type(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image/webp"
+        assert detect_image_mime_type(b"not an image") is None
+
+    def test_record_mime_type_ignores_wrong_extension(self):
+        record = ImageRecord(name="screenshot.png", data=make_image(4, 4, "JPEG"))
+        assert record.mime_type == "image/jpeg"
+
+
+class TestNormalizeImage:
+    """測試單張圖片正規化"""
+
+    def test_downscale_and_transcode(self):
+        data = make_image(3840, 2160, noise=True)
+        result = normalize_image(
+            data, ImagePipelineConfig(max_dimension=1568, output_format="auto")
+        )
+
+        assert result.transcoded and result.resized
+        assert (result.width, result.height) == (1568, 882)
+        assert result.mime_type == "image/jpeg"
+        assert detect_image_mime_type(result.data) == "image/jpeg"
+        assert result.original_mime_type == "image/png"
+
+    def test_strips_metadata(self):
+        data = make_image(64, 64)
+        assert b"private-metadata" in data
+
+        result = normalize_image(data, ImagePipelineConfig(max_dimension=0))
+        assert result.transcoded
+        assert b"private-metadata" not in result.data
+
+    def test_default_lossless(self):
+        """預設不縮放、不轉換格式，JPEG 只在容器層去除元數據"""
+        data = make_image(2000, 1000, "JPEG", noise=True)
+        assert b"private-metadata" in data
+        result = normalize_image(data)
+
+        assert not result.resized
+        assert (result.width, result.height) == (2000, 1000)
+        assert result.mime_type == "image/jpeg"
+        assert result.size <= len(data)
+        assert b"private-metadata" not in result.data
+        assert result.rename("photo.jpeg") == "photo.jpeg"
+
+        # 壓縮資料原樣保留，解碼結果與原圖相同
+        original = QtGui.QImage.fromData(data)
+        assert QtGui.QImage.fromData(result.data) == original
+
+    @pytest.mark.parametrize("noise", [False, True])
+    def test_jpeg_never_larger(self, noise):
+        data = make_image(640, 480, "JPEG", noise=noise)
+        result = normalize_image(data)
+        assert result.mime_type == "image/jpeg"
+        assert result.size <= len(data)
+
+    def test_jpeg_orientation_keeps_exif(self):
+        """依賴 EXIF 方向的 JPEG 保留 EXIF，其餘元數據去除"""
+        data = with_exif_orientation(make_image(64, 32, "JPEG"), 6)
+        result = normalize_image(data)
+
+        assert result.mime_type == "image/jpeg"
+        assert b"Exif\x00\x00" in result.data
+        assert b"private-metadata" not in result.data
+        # 仍依 EXIF 方向旋轉顯示
+        reader = QtGui.QImageReader()
+        buffer = QtCore.QBuffer()
+        buffer.setData(result.data)
+        reader.setDevice(buffer)
+        reader.setAutoTransform(True)
+        assert reader.read().size() == QtCore.QSize(32, 64)
+
+        unrotated = normalize_image(
+            with_exif_orientation(make_image(64, 32, "JPEG"), 1)
+        )
+        assert b"Exif\x00\x00" not in unrotated.data
+
+    def test_png_never_larger(self):
+        data = make_image(256, 256)
+        result = normalize_image(data)
+        assert result.mime_type == "image/png"
+        assert result.size <= len(data)
+        assert b"private-metadata" not in result.data
+
+    def test_strip_image_metadata(self):
+        png = make_image(8, 8)
+        stripped = strip_image_metadata(png, "image/png")
+        assert b"private-metadata" not in stripped
+        assert QtGui.QImage.fromData(stripped) == QtGui.QImage.fromData(png)
+
+        assert strip_image_metadata(b"not an image", "image/jpeg") is None
+        assert strip_image_metadata(png, "image/gif") is None
+
+    def test_config_from_env(self, monkeypatch):
+        config = ImagePipelineConfig.from_env()
+        assert (config.max_dimension, config.output_format) == (0, "png")
+
+        monkeypatch.setenv("MCP_IMAGE_MAX_DIMENSION", "1568")
+        monkeypatch.setenv("MCP_IMAGE_FORMAT", "jpg")
+        config = ImagePipelineConfig.from_env()
+        assert (config.max_dimension, config.output_format) == (1568, "jpeg")
+
+    def test_never_larger_than_lossless(self):
+        """純色截圖 JPEG 反而更大時改用 PNG"""
+        data = make_image(3840, 2160)
+        result = normalize_image(
+            data, ImagePipelineConfig(max_dimension=1568, output_format="auto")
+        )
+
+        assert result.resized
+        assert result.mime_type == "image/png"
+        assert result.size < len(data)
+
+    def test_alpha_kept_as_png(self):
+        result = normalize_image(make_image(32, 32, alpha=True))
+        assert result.mime_type == "image/png"
+
+    def test_invalid_data_passthrough(self):
+        result = normalize_image(b"not an image")
+        assert not result.transcoded
+        assert result.data == b"not an image"
+
+    def test_disabled_passthrough(self):
+        data = make_image(32, 32)
+        result = normalize_image(data, ImagePipelineConfig(enabled=False))
+        assert result.data is data
+
+    def test_rename_extension(self):
+        result = normalize_image(
+            make_image(64, 64, noise=True), ImagePipelineConfig(output_format="jpeg")
+        )
+        assert result.rename("shot.png") == "shot.jpg"
+
+
+class TestImageNormalizer:
+    """測試背景工作池與快取"""
+
+    def test_submit_cached_by_content(self):
+        normalizer = ImageNormalizer(ImagePipelineConfig(max_dimension=256))
+        data = make_image(1024, 512)
+        try:
+            first = normalizer.submit(data)
+            assert normalizer.submit(bytes(data)) is first
+
+            result = normalizer.normalize(data)
+            assert result.width == 256
+            stats = normalizer.get_stats()
+            assert stats["processed"] == 1
+            assert stats["cache_hits"] == 2
+        finally:
+            normalizer.shutdown(wait=True)
+
+    def test_cache_bounded_by_bytes(self):
+        config = ImagePipelineConfig(max_dimension=64)
+        results = []
+        normalizer = ImageNormalizer(config)
+        try:
+            for size in (200, 201, 202):
+                results.append(normalizer.normalize(make_image(size, size, noise=True)))
+            # 預算只夠保留最後兩個結果
+            config.cache_budget_bytes = results[-1].size + results[-2].size
+            normalizer.normalize(make_image(203, 203, noise=True))
+            stats = normalizer.get_stats()
+            assert stats["cache_bytes"] <= config.cache_budget_bytes
+            assert stats["cached"] <= 2
+            assert stats["cache_evictions"] >= 2
+
+            assert normalizer.trim(force=True) > 0
+            assert normalizer.get_stats()["cache_bytes"] == 0
+        finally:
+            normalizer.shutdown(wait=True)
+
+    def test_passthrough_not_counted(self):
+        normalizer = ImageNormalizer(ImagePipelineConfig(enabled=False))
+        try:
+            normalizer.normalize(make_image(64, 64))
+            stats = normalizer.get_stats()
+            assert stats["cached"] == 1
+            assert stats["cache_bytes"] == 0
+        finally:
+            normalizer.shutdown(wait=True)
+
+    def test_normalize_record(self):
+        normalizer = ImageNormalizer(
+            ImagePipelineConfig(max_dimension=100, output_format="auto")
+        )
+        try:
+            record = ImageRecord(name="big.png", data=make_image(400, 200, noise=True))
+            normalized = normalizer.normalize_record(record)
+            assert normalized.name == "big.jpg"
+            assert normalized.mime_type == "image/jpeg"
+            assert normalized.size < record.size
+        finally:
+            normalizer.shutdown(wait=True)
+
+
+class TestWebSessionNormalization:
+    """測試 Web 會話上傳時預處理、提交時取用結果"""
+
+    @pytest.mark.asyncio
+    async def test_prepare_then_submit(self, temp_dir):
+        from mcp_feedback_enhanced.utils.image_pipeline import get_image_normalizer
+        from mcp_feedback_enhanced.web.models import WebFeedbackSession
+
+        session = WebFeedbackSession("pipeline-session", str(temp_dir), "summary")
+        data = make_image(3000, 1000, noise=True)
+        image = {
+            "name": "screen.png",
+            "data": base64.b64encode(data).decode(),
+            "size": len(data),
+        }
+        settings = {"image_size_limit": 0}
+
+        prepared = session.prepare_images([{**image, "ref": 1}], settings)
+        assert len(prepared) == 1
+        assert prepared[0]["ref"] == 1
+        hits_before = get_image_normalizer().get_stats()["cache_hits"]
+
+        # 提交時只送出內容鍵，不再傳送圖片數據
+        reference = {"name": "screen.png", "size": len(data), "key": prepared[0]["key"]}
+        await session.submit_feedback("ok", [reference], settings)
+
+        assert get_image_normalizer().get_stats()["cache_hits"] == hits_before + 1
+        assert len(session.images) == 1
+        submitted = session.images[0]
+        assert submitted["name"] == "screen.png"
+        assert detect_image_mime_type(submitted["data"]) == "image/png"
+        assert b"private-metadata" not in submitted["data"]
+        assert submitted["size"] == len(submitted["data"])
+
+    @pytest.mark.asyncio
+    async def test_unknown_key_skipped(self, temp_dir):
+        from mcp_feedback_enhanced.web.models import WebFeedbackSession
+
+        session = WebFeedbackSession("pipeline-missing", str(temp_dir), "summary")
+        await session.submit_feedback(
+            "ok", [{"name": "lost.png", "size": 10, "key": "0" * 64}], {}
+        )
+        assert session.images == []
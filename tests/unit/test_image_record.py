@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+圖片記錄測試
+============
+
+測試 ImageRecord 的編碼快取，以及伺服器回饋路徑共享同一份編碼。
+"""
+
+import base64
+import json
+
+from mcp_feedback_enhanced.models import FeedbackResult, ImageRecord
+from mcp_feedback_enhanced.server import (
+    create_feedback_text,
+    process_images,
+    save_feedback_to_file,
+)
+
+
+SAMPLE_BYTES = bytes(range(256)) * 40
+
+
+class TestImageRecord:
+    """測試 ImageRecord"""
+
+    def test_from_bytes_dict(self):
+        """測試從 bytes 圖片字典建立記錄"""
+        record = ImageRecord.from_any({"name": "shot.png", "data": SAMPLE_BYTES})
+
+        assert record is not None
+        assert record.size == len(SAMPLE_BYTES)
+        assert record.base64 == base64.b64encode(SAMPLE_BYTES).decode()
+
+    def test_from_base64_dict_reuses_encoding(self):
+        """測試 base64 輸入直接作為快取，不重新編碼"""
+        encoded = base64.b64encode(SAMPLE_BYTES).decode()
+        record = ImageRecord.from_any({"name": "shot.jpg", "data": encoded})
+
+        assert record.data == SAMPLE_BYTES
+        assert record.base64 is encoded
+        assert record.mime_type == "image/jpeg"
+
+    def test_preview_and_length_without_full_encoding(self):
+        """測試預覽與長度不需要完整編碼"""
+        record = ImageRecord(name="a.png", data=SAMPLE_BYTES)
+        expected = base64.b64encode(SAMPLE_BYTES).decode()
+
+        for length in (1, 4, 49, 50, 51):
+            assert record.base64_preview(length) == expected[:length]
+        assert record.base64_length == len(expected)
+        assert record._base64 is None
+
+    def test_base64_cached(self):
+        """測試完整編碼只計算一次"""
+        record = ImageRecord(name="a.png", data=SAMPLE_BYTES)
+        assert record.base64 is record.base64
+
+    def test_dict_style_access(self):
+        """測試向後兼容的字典式讀取"""
+        record = ImageRecord(name="a.gif", data=b"GIF89a")
+
+        assert record["data"] == b"GIF89a"
+        assert record.get("name") == "a.gif"
+        assert record.get("missing", "x") == "x"
+        assert record.image_format == "gif"
+
+    def test_feedback_result_converts_images(self):
+        """測試 FeedbackResult 將圖片統一轉換為記錄"""
+        result = FeedbackResult.from_dict(
+            {"images": [{"name": "a.png", "data": b"123"}, "invalid"]}
+        )
+
+        assert len(result.images) == 1
+        assert isinstance(result.images[0], ImageRecord)
+
+
+class TestFeedbackReturnPath:
+    """測試回饋返回路徑共享圖片編碼"""
+
+    def test_single_encoding_shared(self, temp_dir):
+        """測試儲存、文字摘要與 MCP 圖片共享同一份 base64"""
+        record = ImageRecord(name="shot.png", data=SAMPLE_BYTES)
+        feedback = {"interactive_feedback": "ok", "images": [record]}
+
+        text = create_feedback_text(feedback)
+        assert record._base64 is None
+        assert f"完整 Base64 長度: {record.base64_length}" in text
+
+        file_path = save_feedback_to_file(feedback, str(temp_dir / "fb.json"))
+        cached = record._base64
+        assert cached is not None
+
+        mcp_images = process_images(feedback["images"])
+        assert len(mcp_images) == 1
+        assert mcp_images[0].data is cached
+
+        with open(file_path, encoding="utf-8") as f:
+            saved = json.load(f)
+        assert saved["images"][0]["data"] == cached
+        assert saved["images"][0]["data_type"] == "base64"
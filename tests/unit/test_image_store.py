@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+內容定址圖片存儲測試
+====================
+
+測試去重、引用計數、位元組預算 LRU 淘汰與內存監控統計回報。
+"""
+
+import base64
+
+import pytest
+
+from mcp_feedback_enhanced.utils.image_store import ImageStore, content_key
+from mcp_feedback_enhanced.utils.memory_monitor import MemoryMonitor
+
+
+class TestImageStore:
+    """測試 ImageStore"""
+
+    def test_identical_images_stored_once(self):
+        store = ImageStore(budget_bytes=1024 * 1024)
+        first = store.put(b"a" * 100)
+        second = store.put(bytes(bytearray(b"a" * 100)))
+
+        assert second is first
+        assert len(store) == 1
+        assert first.refcount == 2
+
+        stats = store.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+        assert stats["bytes_deduplicated"] == 100
+        assert stats["bytes_stored"] == 100
+
+    def test_referenced_entries_not_evicted(self):
+        store = ImageStore(budget_bytes=150)
+        pinned = store.put(b"1" * 100)
+        store.put(b"2" * 100, retain=False)
+
+        # 超出預算時只淘汰未被引用的條目
+        assert pinned.key in store
+        assert len(store) == 1
+        assert store.get_stats()["evictions"] == 1
+
+    def test_release_makes_evictable_in_lru_order(self):
+        store = ImageStore(budget_bytes=250)
+        a = store.put(b"a" * 100)
+        b = store.put(b"b" * 100)
+        store.release(a.key)
+        store.release(b.key)
+        store.get(a.key)  # a 變為最近使用
+
+        store.put(b"c" * 100)
+
+        assert a.key in store
+        assert b.key not in store
+        assert store.get_stats()["bytes_stored"] == 200
+
+    def test_trim(self):
+        store = ImageStore(budget_bytes=1000)
+        for char in b"xyz":
+            store.put(bytes([char]) * 100, retain=False)
+        pinned = store.put(b"p" * 100)
+
+        assert store.trim(force=True) == 300
+        assert len(store) == 1
+        assert pinned.key in store
+
+    def test_content_key(self):
+        assert content_key(b"abc") == (
+            "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
+        )
+
+
+class TestMemoryMonitorComponents:
+    """測試組件統計透過內存監控器回報"""
+
+    def test_stats_provider_exported(self):
+        monitor = MemoryMonitor()
+        store = ImageStore(budget_bytes=1024)
+        store.put(b"same")
+        store.put(b"same")
+        monitor.add_stats_provider("image_store", store.get_stats)
+
+        exported = monitor.export_memory_data()
+        assert exported["components"]["image_store"]["hit_rate"] == 0.5
+
+        monitor.remove_stats_provider("image_store")
+        assert "image_store" not in monitor.get_component_stats()
+
+
+class TestSessionDeduplication:
+    """測試 Web 會話之間共享相同圖片"""
+
+    @pytest.mark.asyncio
+    async def test_sessions_share_identical_images(self, temp_dir):
+        from mcp_feedback_enhanced.utils.image_store import get_image_store
+        from mcp_feedback_enhanced.web.models import WebFeedbackSession
+        from mcp_feedback_enhanced.web.models.feedback_session import CleanupReason
+
+        data = b"\x00not-a-real-image" * 64
+        image = {
+            "name": "same.bin",
+            "data": base64.b64encode(data).decode(),
+            "size": len(data),
+        }
+        settings = {"image_size_limit": 0}
+        store = get_image_store()
+        key = content_key(data)
+
+        first = WebFeedbackSession("dedup-1", str(temp_dir), "summary")
+        second = WebFeedbackSession("dedup-2", str(temp_dir), "summary")
+        await first.submit_feedback("one", [image], settings)
+        await second.submit_feedback("two", [image], settings)
+
+        assert first.images[0]["data"] is second.images[0]["data"]
+        assert store._entries[key].refcount == 2
+
+        first._cleanup_sync_enhanced(CleanupReason.MANUAL)
+        second._cleanup_sync_enhanced(CleanupReason.MANUAL)
+        assert store._entries.get(key) is None or store._entries[key].refcount == 0
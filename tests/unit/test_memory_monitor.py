@@ -380,6 +380,83 @@ class TestMemoryMonitor:
             assert len(exported_data["recent_alerts"]) == 1
 
 
+class TestTieredSampling:
+    """測試分層採樣與自適應間隔"""
+
+    def _snapshot(self, system_percent: float) -> MemorySnapshot:
+        return MemorySnapshot(
+            timestamp=datetime.now(),
+            system_total=8 * 1024**3,
+            system_available=4 * 1024**3,
+            system_used=4 * 1024**3,
+            system_percent=system_percent,
+            process_rss=100 * 1024**2,
+            process_vms=200 * 1024**2,
+            process_percent=1.25,
+            gc_objects=0,
+        )
+
+    def test_fast_snapshot_skips_census(self):
+        """測試快速採樣不遍歷 GC 堆"""
+        monitor = MemoryMonitor()
+        with patch(
+            "mcp_feedback_enhanced.utils.memory_monitor.gc.get_objects"
+        ) as mock_get_objects:
+            snapshot = monitor._collect_fast_snapshot()
+
+        mock_get_objects.assert_not_called()
+        assert not snapshot.census
+        assert snapshot.process_rss > 0
+        assert len(snapshot.gc_counts) == 3
+        assert 0 < snapshot.process_percent < 100
+        assert monitor.get_sampling_stats()["fast_samples"] == 1
+
+    def test_census_on_demand(self):
+        """測試按需查詢時執行普查，並記錄其耗時"""
+        monitor = MemoryMonitor()
+        info = monitor.get_current_memory_info()
+
+        stats = monitor.get_sampling_stats()
+        assert info["gc_objects"] > 0
+        assert stats["census_samples"] == 1
+        assert stats["last_census_objects"] == info["gc_objects"]
+        # 之後的快速採樣沿用最近一次普查的結果
+        assert monitor._collect_fast_snapshot().gc_objects == info["gc_objects"]
+
+    def test_census_rate_limited(self):
+        """測試持續警告時普查受頻率限制"""
+        monitor = MemoryMonitor()
+        assert monitor._census_due()
+        monitor._run_census()
+        assert not monitor._census_due()
+
+    def test_adaptive_interval(self):
+        """測試間隔依內存壓力與趨勢調整"""
+        monitor = MemoryMonitor(monitoring_interval=30)
+        assert monitor.min_interval == 5
+        assert monitor.max_interval == 120
+
+        # 數據不足時使用基礎間隔
+        assert monitor._next_interval("normal") == 30
+        # 內存壓力下縮短間隔
+        assert monitor._next_interval("warning") == 5
+
+        # 內存穩定時逐步拉長間隔，不超過上限
+        for _ in range(10):
+            monitor.snapshots.append(self._snapshot(50.0))
+        for _ in range(10):
+            monitor.current_interval = monitor._next_interval("normal")
+        assert monitor.current_interval == 120
+
+        # 內存上升時縮短間隔
+        for i in range(10):
+            monitor.snapshots.append(self._snapshot(50.0 + i * 2))
+        assert monitor._next_interval("normal") == 5
+
+        fixed = MemoryMonitor(monitoring_interval=30, adaptive_interval=False)
+        assert fixed._next_interval("emergency") == 30
+
+
 def test_global_memory_monitor_singleton():
     """測試全域內存監控器單例模式"""
     monitor1 = get_memory_monitor()
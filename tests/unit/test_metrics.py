@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+指標註冊表測試
+==============
+
+測試 Counter / Gauge / Histogram 的 OpenMetrics 輸出、收集器，
+以及 Web UI 的 /metrics 端點。
+"""
+
+import pytest
+
+from mcp_feedback_enhanced.utils.metrics import (
+    OPENMETRICS_CONTENT_TYPE,
+    MetricsFileExporter,
+    MetricsRegistry,
+    get_metrics_registry,
+)
+
+
+class TestMetricsRegistry:
+    """測試指標註冊表"""
+
+    def test_render_openmetrics(self):
+        registry = MetricsRegistry()
+        requests = registry.counter("demo_requests_total", "請求數", ("path",))
+        requests.labels("/a").inc()
+        requests.labels(path='/"b"').inc(2)
+        registry.gauge("demo_sessions", "會話數").set(3)
+        latency = registry.histogram("demo_seconds", "耗時", buckets=(0.1, 1.0))
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(5)
+
+        lines = registry.render().splitlines()
+        assert lines[-1] == "# EOF"
+        assert "# TYPE demo_requests counter" in lines
+        assert 'demo_requests_total{path="/a"} 1' in lines
+        assert 'demo_requests_total{path="/\\"b\\""} 2' in lines
+        assert "# TYPE demo_sessions gauge" in lines
+        assert "demo_sessions 3" in lines
+        assert 'demo_seconds_bucket{le="0.1"} 1' in lines
+        assert 'demo_seconds_bucket{le="1.0"} 2' in lines
+        assert 'demo_seconds_bucket{le="+Inf"} 3' in lines
+        assert "demo_seconds_count 3" in lines
+        assert "demo_seconds_sum 5.55" in lines
+
+    def test_get_or_create(self):
+        registry = MetricsRegistry()
+        gauge = registry.gauge("demo_value", "值", ("kind",))
+        assert registry.gauge("demo_value", "值", ("kind",)) is gauge
+        with pytest.raises(ValueError):
+            registry.counter("demo_value", "值", ("kind",))
+        with pytest.raises(ValueError):
+            gauge.labels("a", "b")
+        with pytest.raises(ValueError):
+            registry.counter("demo_count", "計數").inc(-1)
+
+    def test_collectors(self):
+        registry = MetricsRegistry()
+        state = {"sessions": 2}
+
+        def publish(reg):
+            reg.gauge("demo_sessions", "會話數").set(state["sessions"])
+
+        def broken(reg):
+            raise RuntimeError("壞掉的收集器")
+
+        registry.register_collector("demo", publish)
+        registry.register_collector("broken", broken)
+        assert "demo_sessions 2" in registry.render()
+
+        state["sessions"] = 5
+        assert "demo_sessions 5" in registry.render()
+
+        registry.unregister_collector("demo")
+        state["sessions"] = 7
+        assert "demo_sessions 5" in registry.render()
+
+    def test_file_exporter(self, temp_dir):
+        registry = MetricsRegistry()
+        registry.counter("demo_events", "事件數").inc()
+        path = temp_dir / "metrics" / "mcp.prom"
+
+        MetricsFileExporter(str(path), registry=registry).export()
+
+        content = path.read_text(encoding="utf-8")
+        assert "demo_events_total 1" in content
+        assert content.endswith("# EOF\n")
+
+
+class TestMetricsEndpoint:
+    """測試 Web UI 的 /metrics 端點"""
+
+    @pytest.mark.asyncio
+    async def test_metrics_route(self, web_ui_manager):
+        web_ui_manager.create_session("/tmp/metrics", "指標測試")
+        web_ui_manager.cleanup_expired_sessions()
+
+        route = next(r for r in web_ui_manager.app.routes if r.path == "/metrics")
+        response = await route.endpoint()
+        body = response.body.decode("utf-8")
+
+        assert response.media_type == OPENMETRICS_CONTENT_TYPE
+        assert 'mcp_sessions{status="waiting"} 1' in body
+        assert "mcp_websocket_connections 0" in body
+        assert 'mcp_session_cleanup_duration_seconds_count{component="web_ui"' in body
+        assert "mcp_process_resident_memory_bytes" in body
+        assert body.endswith("# EOF\n")
+        assert get_metrics_registry().get("mcp_sessions") is not None
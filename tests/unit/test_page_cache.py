@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+頁面渲染快取測試
+================
+
+測試渲染後頁面的 LRU 快取、快取鍵與失效，以及 Jinja 位元組碼快取。
+"""
+
+import gzip
+import json
+
+import pytest
+from jinja2 import DictLoader, Environment
+
+from mcp_feedback_enhanced.web.models import SessionStatus
+from mcp_feedback_enhanced.web.utils.page_cache import (
+    PageCache,
+    create_template_bytecode_cache,
+)
+
+
+class TestPageCache:
+    """測試頁面快取"""
+
+    def test_lru_eviction(self):
+        cache = PageCache(max_pages=2)
+        first = cache.put("a", "<p>a</p>")
+        assert gzip.decompress(first.gzip_body) == b"<p>a</p>"
+        cache.put("b", "<p>b</p>")
+
+        # 使用 a 之後，b 成為最久未使用
+        assert cache.get("a") is first
+        cache.put("c", "<p>c</p>")
+        assert cache.get("b") is None
+        assert cache.get("a") is first
+        assert cache.stats["evictions"] == 1
+
+        cache.invalidate()
+        assert len(cache) == 0
+        assert cache.get("a") is None
+
+    def test_disabled(self):
+        cache = PageCache(enabled=False)
+        page = cache.put("a", "<p>a</p>")
+        assert page.body == b"<p>a</p>"
+        assert page.gzip_body is None
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_bytecode_cache(self, temp_dir):
+        bytecode_cache = create_template_bytecode_cache(temp_dir / "templates")
+        loader = DictLoader({"page.html": "<p>{{ value }}</p>"})
+
+        env = Environment(loader=loader, bytecode_cache=bytecode_cache, autoescape=True)
+        assert env.get_template("page.html").render(value=1) == "<p>1</p>"
+        assert list((temp_dir / "templates").iterdir())
+
+        # 新的環境（如重新啟動進程）直接載入位元組碼
+        fresh = Environment(
+            loader=loader, bytecode_cache=bytecode_cache, autoescape=True
+        )
+        assert fresh.get_template("page.html").render(value=2) == "<p>2</p>"
+
+
+class TestPageRoutes:
+    """測試頁面路由使用快取"""
+
+    @pytest.fixture
+    def client(self, web_ui_manager, temp_dir, monkeypatch):
+        from fastapi.testclient import TestClient
+
+        # 設定檔案寫入臨時目錄
+        monkeypatch.setenv("HOME", str(temp_dir))
+        web_ui_manager.page_cache.invalidate()
+        return TestClient(web_ui_manager.app)
+
+    @staticmethod
+    def _bootstrap(text: str) -> dict:
+        start = text.index("window.MCPFeedbackBootstrap = ") + len(
+            "window.MCPFeedbackBootstrap = "
+        )
+        return json.loads(text[start : text.index(";\n", start)])
+
+    def test_feedback_page_cached(self, web_ui_manager, client, temp_dir):
+        cache = web_ui_manager.page_cache
+        web_ui_manager.create_session(str(temp_dir), "第一個會話")
+
+        first = client.get("/")
+        assert first.status_code == 200
+        assert first.headers["content-encoding"] == "gzip"
+        assert "第一個會話" in first.text
+        hits = cache.stats["hits"]
+
+        second = client.get("/")
+        assert second.text == first.text
+        assert cache.stats["hits"] == hits + 1
+
+        # 會話建立後重新渲染
+        web_ui_manager.create_session(str(temp_dir), "第二個會話")
+        assert len(cache) == 0
+        assert "第二個會話" in client.get("/").text
+
+    def test_settings_change_rerenders(self, web_ui_manager, client, temp_dir):
+        web_ui_manager.create_session(str(temp_dir), "設定測試")
+        assert "layout-combined-vertical" in client.get("/").text
+
+        response = client.post(
+            "/api/save-settings",
+            json={"layoutMode": "combined-horizontal", "language": "en"},
+        )
+        assert response.status_code == 200
+        assert len(web_ui_manager.page_cache) == 0
+
+        page = client.get("/").text
+        assert "layout-combined-horizontal" in page
+        bootstrap = self._bootstrap(page)
+        assert bootstrap["language"] == "en"
+        assert list(bootstrap["translations"]) == ["en"]
+
+        # 設定檔案被其他程序修改時，檔案版本改變也會重新渲染
+        settings_file = (
+            temp_dir / ".config" / "mcp-feedback-enhanced" / "ui_settings.json"
+        )
+        settings_file.write_text(
+            json.dumps({"layoutMode": "combined-vertical", "extra": True}),
+            encoding="utf-8",
+        )
+        assert "layout-combined-vertical" in client.get("/").text
+
+    def test_status_change_rerenders(self, web_ui_manager, client, temp_dir):
+        session_id = web_ui_manager.create_session(str(temp_dir), "狀態測試")
+        assert self._bootstrap(client.get("/").text)["session"]["status"] == "waiting"
+
+        web_ui_manager.get_session(session_id).update_status(
+            SessionStatus.FEEDBACK_SUBMITTED, "已送出"
+        )
+        bootstrap = self._bootstrap(client.get("/").text)
+        assert bootstrap["session"]["status"] == "feedback_submitted"
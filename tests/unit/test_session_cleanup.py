@@ -23,6 +23,7 @@ from mcp_feedback_enhanced.web.utils.session_cleanup_manager import (
     CleanupTrigger,
     SessionCleanupManager,
 )
+from mcp_feedback_enhanced.web.utils.session_index import IndexedSessions
 
 
 class TestWebFeedbackSessionCleanup:
@@ -366,5 +367,76 @@ class TestSessionCleanupManager:
         assert len(history) == 0
 
 
+class TestSessionEvictionIndex:
+    """測試會話淘汰索引"""
+
+    def setup_method(self):
+        """測試前設置"""
+        self.sessions = IndexedSessions()
+        for i in range(4):
+            session = WebFeedbackSession(
+                f"s{i}", "/tmp/test_project", "索引測試", max_idle_time=30
+            )
+            self.sessions[session.session_id] = session
+
+    def teardown_method(self):
+        """測試後清理"""
+        for session in list(self.sessions.values()):
+            session._cleanup_sync_enhanced(CleanupReason.MANUAL)
+
+    def test_pop_expired_follows_updates(self):
+        """測試活動時間與狀態變更會更新過期順序"""
+        now = time.time()
+        assert self.sessions.index.pop_expired(now) == []
+
+        self.sessions["s1"].last_activity = now - 40
+        self.sessions["s2"].status = SessionStatus.ERROR
+        self.sessions["s2"].last_activity = now - 20
+        self.sessions["s3"].last_activity = now - 400
+        # 再次活動的會話不會被取出
+        self.sessions["s3"].last_activity = now
+
+        expired = self.sessions.index.pop_expired(now)
+        assert [session.session_id for session in expired] == ["s1"]
+        assert all(session.is_expired() for session in expired)
+
+    def test_pop_evictable_by_priority(self):
+        """測試容量淘汰依狀態分桶，且保留受保護的會話"""
+        now = time.time()
+        self.sessions["s0"].last_activity = now - 100
+        self.sessions["s1"].status = SessionStatus.FEEDBACK_SUBMITTED
+        self.sessions["s2"].status = SessionStatus.COMPLETED
+        self.sessions["s3"].status = SessionStatus.COMPLETED
+
+        popped = self.sessions.index.pop_evictable(3, exclude={"s3"})
+        assert [session.session_id for session in popped] == ["s2", "s1", "s0"]
+
+    def test_removed_sessions_leave_index(self):
+        """測試從字典移除的會話不再出現在索引中"""
+        session = self.sessions.pop("s0")
+        session.last_activity = time.time() - 100
+        del self.sessions["s1"]
+
+        assert len(self.sessions.index) == 2
+        assert session._eviction_index is None
+        assert self.sessions.index.pop_idle(time.time()) != []
+        assert self.sessions.index.pop_idle(time.time()) == []
+        session._cleanup_sync_enhanced(CleanupReason.MANUAL)
+
+    def test_cleanup_manager_uses_index(self):
+        """測試清理管理器經由索引做容量清理並保留當前會話"""
+        manager = Mock()
+        manager.sessions = self.sessions
+        manager.current_session = self.sessions["s0"]
+        self.sessions["s0"].last_activity = time.time() - 100
+        cleanup_manager = SessionCleanupManager(
+            manager, CleanupPolicy(max_sessions=2, enable_auto_cleanup=False)
+        )
+
+        assert cleanup_manager._cleanup_by_capacity() == 2
+        assert "s0" in self.sessions
+        assert len(self.sessions) == len(self.sessions.index) == 2
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
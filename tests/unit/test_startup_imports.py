@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+啟動導入預算測試
+================
+
+以 ``python -X importtime`` 在乾淨的子進程中導入 MCP 伺服器入口，確保：
+- Web UI（fastapi/jinja2）、GUI（PySide6）與 psutil 不在啟動時載入
+- 導入伺服器不會啟動任何背景線程
+- 本套件模組的導入耗時不超過預算（MCP_IMPORT_BUDGET_MS 可覆蓋）
+
+第三方依賴（fastmcp/mcp/pydantic）的耗時不計入預算，以免隨依賴版本浮動。
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+
+SRC_DIR = Path(__file__).resolve().parents[2] / "src"
+ENTRY_MODULE = "mcp_feedback_enhanced.server"
+
+# 只應在首次真正使用時才載入的模組
+LAZY_MODULES = (
+    "fastapi",
+    "jinja2",
+    "PySide6",
+    "psutil",
+    "mcp_feedback_enhanced.web",
+    "mcp_feedback_enhanced.gui",
+    "mcp_feedback_enhanced.utils.memory_monitor",
+)
+
+# 本套件模組導入耗時預算（毫秒，取多次測量中的最小值）
+DEFAULT_BUDGET_MS = 250
+MEASURE_ROUNDS = 3
+
+
+def run_python(code: str, *args: str) -> subprocess.CompletedProcess:
+    """在乾淨的子進程中執行 Python 代碼"""
+    env = os.environ.copy()
+    env["PYTHONPATH"] = str(SRC_DIR) + os.pathsep + env.get("PYTHONPATH", "")
+    env.pop("MCP_DEBUG", None)
+    return subprocess.run(
+        [sys.executable, *args, "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        timeout=60,
+        check=True,
+    )
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """解析 -X importtime 輸出為 {模組: (自身微秒, 累計微秒)}"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:") :].split("|")
+            modules[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue
+    return modules
+
+
+def measure_import() -> dict[str, tuple[int, int]]:
+    """測量一次冷啟動導入"""
+    result = run_python(f"import {ENTRY_MODULE}", "-X", "importtime")
+    return parse_importtime(result.stderr)
+
+
+class TestStartupImports:
+    """測試 MCP 伺服器入口的啟動導入"""
+
+    def test_heavy_modules_not_imported(self):
+        """測試重量級模組延遲到首次使用時才載入"""
+        modules = measure_import()
+        assert ENTRY_MODULE in modules
+
+        eager = sorted(
+            name
+            for name in modules
+            if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES)
+        )
+        assert not eager, f"啟動時不應載入: {eager}"
+
+    def test_no_background_threads_at_import(self):
+        """測試導入伺服器不會啟動背景線程"""
+        result = run_python(
+            f"import threading, {ENTRY_MODULE}; print(threading.active_count())"
+        )
+        assert result.stdout.strip() == "1"
+
+    def test_package_import_time_budget(self):
+        """測試本套件模組導入耗時不超過預算"""
+        budget_ms = float(os.getenv("MCP_IMPORT_BUDGET_MS", DEFAULT_BUDGET_MS))
+
+        own_ms = []
+        for _ in range(MEASURE_ROUNDS):
+            modules = measure_import()
+            own_ms.append(
+                sum(
+                    self_us
+                    for name, (self_us, _) in modules.items()
+                    if name.split(".")[0] == "mcp_feedback_enhanced"
+                )
+                / 1000
+            )
+
+        assert min(own_ms) <= budget_ms, (
+            f"套件導入耗時 {min(own_ms):.1f}ms 超過預算 {budget_ms}ms"
+        )
+
+    def test_lazy_exports_still_available(self):
+        """測試延遲導出在首次存取時載入"""
+        result = run_python(
+            "import sys, mcp_feedback_enhanced as m;"
+            "assert 'fastapi' not in sys.modules;"
+            "print(m.WebUIManager.__name__, 'fastapi' in sys.modules)"
+        )
+        assert result.stdout.strip() == "WebUIManager True"
+
+    def test_unknown_attribute(self):
+        """測試未知屬性仍拋出 AttributeError"""
+        import mcp_feedback_enhanced
+
+        with pytest.raises(AttributeError):
+            _ = mcp_feedback_enhanced.missing_attribute
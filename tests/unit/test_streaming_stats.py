@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+串流統計工具測試
+================
+
+測試對數分桶直方圖的分位數誤差、合併與窗口移除，
+以及 Space-Saving 高頻鍵統計。
+"""
+
+import random
+
+import pytest
+
+from mcp_feedback_enhanced.utils.streaming_stats import LogHistogram, SpaceSaving
+
+
+class TestLogHistogram:
+    """測試對數分桶直方圖"""
+
+    def test_quantiles_within_relative_error(self):
+        rng = random.Random(0)
+        values = [rng.lognormvariate(-4, 1) for _ in range(20000)]
+        histogram = LogHistogram(relative_error=0.01)
+        for value in values:
+            histogram.record(value)
+
+        values.sort()
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * len(values)) - 1]
+            assert abs(histogram.quantile(q) - exact) / exact < 0.03
+
+        assert histogram.count == len(values)
+        assert histogram.quantile(1.0) <= histogram.max
+        assert abs(histogram.quantile(1.0) - values[-1]) / values[-1] < 0.01
+        assert histogram.quantile(0.0) >= histogram.min
+
+    def test_merge(self):
+        left = LogHistogram()
+        right = LogHistogram()
+        for i in range(1, 51):
+            left.record(i / 1000)
+            right.record((i + 50) / 1000)
+
+        left.merge(right)
+        assert left.count == 100
+        assert abs(left.quantile(0.5) - 0.05) < 0.05 * 0.02
+        assert left.max == 0.1
+
+        with pytest.raises(ValueError):
+            left.merge(LogHistogram(relative_error=0.05))
+
+    def test_discard_window(self):
+        histogram = LogHistogram(min_value=1.0)
+        for size in (100, 200, 300, 10000):
+            histogram.record(size)
+        histogram.discard(10000)
+
+        assert histogram.count == 3
+        assert histogram.sum == 600
+        assert abs(histogram.quantile(0.99) - 300) <= 300 * 0.01
+
+        for size in (100, 200, 300):
+            histogram.discard(size)
+        assert histogram.count == 0
+        assert histogram.quantile(0.5) == 0.0
+        assert histogram.to_dict() == {"count": 0}
+
+    def test_small_values(self):
+        histogram = LogHistogram(min_value=1.0)
+        histogram.record(0)
+        histogram.record(1)
+        assert histogram.percentiles() == {"p50": 1.0, "p95": 1.0, "p99": 1.0}
+
+
+class TestSpaceSaving:
+    """測試 Space-Saving 高頻鍵統計"""
+
+    def test_heavy_hitters_survive(self):
+        rng = random.Random(0)
+        sketch = SpaceSaving(10, factory=list)
+        exact: dict[str, int] = {}
+        for i in range(20000):
+            key = rng.choice(["a", "b", "c"]) if i % 2 else f"noise-{i}"
+            exact[key] = exact.get(key, 0) + 1
+            sketch.record(key).append(i)
+
+        assert len(sketch) == 10
+        assert sketch.total == 20000
+        assert sketch.evictions > 0
+        assert [key for key, _, _ in sketch.top(3)] == sorted(
+            "abc", key=lambda key: -exact[key]
+        )
+        for key in "abc":
+            count, error = sketch.counts(key)
+            assert count - error <= exact[key] <= count
+            assert len(sketch.get(key)) == count - error
+
+    def test_eviction_inherits_error(self):
+        sketch = SpaceSaving(2)
+        for key in ("a", "a", "b", "c"):
+            sketch.record(key)
+
+        # c 取代計數最小的 b，繼承其計數作為誤差
+        assert "b" not in sketch
+        assert sketch.counts("c") == (2, 1)
+        assert sketch.counts("a") == (2, 0)
+
+        sketch.record("d")
+        assert sketch.counts("d") == (3, 2)
+        assert sketch.memory_bytes() > 0
+
+        sketch.clear()
+        assert len(sketch) == 0
+        assert sketch.counts("a") == (0, 0)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+翻譯資料快取測試
+================
+
+測試翻譯檔案只解析一次、檔案變更時失效，以及按語言提供翻譯的 API。
+"""
+
+import gzip
+import json
+import os
+
+import pytest
+from starlette.requests import Request
+
+from mcp_feedback_enhanced.web.utils.translation_cache import TranslationCache
+
+
+def write_translation(locales_dir, language: str, data: dict):
+    path = locales_dir / language / "translation.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def locales_dir(temp_dir):
+    write_translation(temp_dir, "zh-TW", {"title": "標題"})
+    write_translation(temp_dir, "en", {"title": "Title"})
+    return temp_dir
+
+
+class TestTranslationCache:
+    """測試翻譯資料快取"""
+
+    def test_parses_once(self, locales_dir):
+        cache = TranslationCache(locales_dir, ("zh-TW", "en"))
+        bundle = cache.get_all()
+        assert json.loads(bundle.body) == {
+            "zh-TW": {"title": "標題"},
+            "en": {"title": "Title"},
+        }
+        assert gzip.decompress(bundle.gzip_body) == bundle.body
+
+        assert cache.get_all() is bundle
+        assert cache.get_language("en").data == {"title": "Title"}
+        assert cache.stats["loads"] == 2
+        assert cache.stats["rebuilds"] == 1
+        assert cache.get_language("fr") is None
+
+    def test_invalidates_on_file_change(self, locales_dir):
+        cache = TranslationCache(locales_dir, ("zh-TW", "en"))
+        bundle = cache.get_all()
+        zh_tw = cache.get_language("zh-TW")
+
+        path = write_translation(locales_dir, "en", {"title": "New title"})
+        stat = path.stat()
+        # 確保修改時間改變（部分檔案系統的時間精度較低）
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        updated = cache.get_all()
+        assert updated.etag != bundle.etag
+        assert json.loads(updated.body)["en"] == {"title": "New title"}
+        # 未變更的語言不重新解析
+        assert cache.get_language("zh-TW") is zh_tw
+        assert cache.stats["loads"] == 3
+
+    def test_missing_file(self, locales_dir):
+        cache = TranslationCache(locales_dir, ("zh-TW", "zh-CN"))
+        assert cache.get_language("zh-CN").data == {}
+
+        write_translation(locales_dir, "zh-CN", {"title": "标题"})
+        assert cache.get_language("zh-CN").data == {"title": "标题"}
+
+
+class TestTranslationRoutes:
+    """測試翻譯 API"""
+
+    @staticmethod
+    def _request(path: str, headers: list | None = None) -> Request:
+        return Request(
+            {
+                "type": "http",
+                "method": "GET",
+                "path": path,
+                "query_string": b"",
+                "headers": headers or [],
+            }
+        )
+
+    @pytest.mark.asyncio
+    async def test_language_endpoint(self, web_ui_manager):
+        route = next(
+            r
+            for r in web_ui_manager.app.routes
+            if r.path == "/api/translations/{language}"
+        )
+        response = await route.endpoint(
+            self._request("/api/translations/en", [(b"accept-encoding", b"gzip")]),
+            "en",
+        )
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        data = json.loads(gzip.decompress(response.body))
+        assert "zh-TW" not in data
+        assert data
+
+        revalidated = await route.endpoint(
+            self._request(
+                "/api/translations/en",
+                [(b"if-none-match", response.headers["etag"].encode())],
+            ),
+            "en",
+        )
+        assert revalidated.status_code == 304
+
+        missing = await route.endpoint(self._request("/api/translations/fr"), "fr")
+        assert missing.status_code == 404
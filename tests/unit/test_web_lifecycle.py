@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Web 伺服器生命週期測試
+======================
+
+測試 STOPPED → BINDING → READY → DRAINING → STOPPED 狀態機、
+事件驅動的就緒等待、跨平台端口衝突重試與單循環模式。
+"""
+
+import asyncio
+import errno
+import socket
+import urllib.request
+
+import pytest
+
+from mcp_feedback_enhanced.web.main import ServerState, _is_address_in_use
+
+
+def fetch_status(manager) -> int:
+    url = f"{manager.get_server_url()}/api/session-status"
+    # 本地測試伺服器的 http URL
+    with urllib.request.urlopen(url, timeout=5) as response:  # noqa: S310
+        return response.status
+
+
+class TestServerLifecycle:
+    """測試伺服器生命週期狀態機"""
+
+    def test_start_and_stop_transitions(self, web_ui_manager):
+        assert web_ui_manager.server_state == ServerState.STOPPED
+
+        assert web_ui_manager.start_server()
+        # 返回時已可接受連接，無需固定等待
+        assert web_ui_manager.is_server_ready()
+        assert fetch_status(web_ui_manager) == 200
+
+        # 重複啟動不會建立新的伺服器線程
+        server_thread = web_ui_manager.server_thread
+        assert web_ui_manager.start_server()
+        assert web_ui_manager.server_thread is server_thread
+
+        assert web_ui_manager.stop_server()
+        assert not server_thread.is_alive()
+
+        status = web_ui_manager.get_server_status()
+        assert status["state"] == "stopped"
+        assert [(t["from"], t["to"]) for t in status["transitions"]] == [
+            ("stopped", "binding"),
+            ("binding", "ready"),
+            ("ready", "draining"),
+            ("draining", "stopped"),
+        ]
+        assert all(t["elapsed"] >= 0 for t in status["transitions"])
+
+    @pytest.mark.asyncio
+    async def test_wait_until_ready(self, web_ui_manager):
+        assert not await web_ui_manager.wait_until_ready(timeout=0.1)
+
+        assert web_ui_manager.start_server(wait=False)
+        assert await web_ui_manager.wait_until_ready()
+        assert web_ui_manager.is_server_ready()
+
+        web_ui_manager.stop_server()
+
+    def test_port_conflict_is_retried(self, web_ui_manager):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as blocker:
+            blocker.bind(("127.0.0.1", 0))
+            blocker.listen()
+            busy_port = blocker.getsockname()[1]
+            web_ui_manager.port = busy_port
+
+            assert web_ui_manager.start_server()
+            assert web_ui_manager.port != busy_port
+            assert fetch_status(web_ui_manager) == 200
+
+        web_ui_manager.stop_server()
+
+    def test_address_in_use_detection(self):
+        assert _is_address_in_use(OSError(errno.EADDRINUSE, "in use"))
+        assert _is_address_in_use(OSError(10048, "in use"))
+        assert not _is_address_in_use(OSError(errno.EACCES, "denied"))
+
+
+class TestSingleLoopMode:
+    """測試 Web 伺服器運行在調用方（MCP）事件循環上"""
+
+    @pytest.mark.asyncio
+    async def test_server_runs_on_calling_loop(self, web_ui_manager):
+        web_ui_manager.single_loop = True
+        loop = asyncio.get_running_loop()
+
+        assert web_ui_manager.start_server(wait=False)
+        assert await web_ui_manager.wait_until_ready()
+        assert web_ui_manager.server_thread is None
+        assert web_ui_manager._server_loop is loop
+        assert web_ui_manager.get_server_status()["mode"] == "single_loop"
+
+        # 請求由同一事件循環上的 uvicorn 處理
+        assert await asyncio.to_thread(fetch_status, web_ui_manager) == 200
+
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        task = web_ui_manager.schedule_on_server_loop(current_loop())
+        assert isinstance(task, asyncio.Task)
+        assert await task is loop
+
+        assert await web_ui_manager.stop_server_async()
+        assert web_ui_manager.server_state == ServerState.STOPPED
+
+    @pytest.mark.asyncio
+    async def test_thread_mode_dispatches_to_server_loop(self, web_ui_manager):
+        assert web_ui_manager.start_server(wait=False)
+        assert await web_ui_manager.wait_until_ready()
+
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        server_loop = await web_ui_manager.run_on_server_loop(current_loop())
+        assert server_loop is web_ui_manager._server_loop
+        assert server_loop is not asyncio.get_running_loop()
+
+        assert await web_ui_manager.stop_server_async()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+多會話並行測試
+==============
+
+測試 multi 模式下多個 MCP 調用同時等待回饋時互不取代，
+並透過會話 ID 路由頁面、API 與 WebSocket。
+"""
+
+import asyncio
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from mcp_feedback_enhanced.web.main import SESSION_MODE_SINGLE
+from mcp_feedback_enhanced.web.models import SessionStatus
+from mcp_feedback_enhanced.web.models.feedback_session import (
+    CompletionEvent,
+    WebFeedbackSession,
+)
+
+
+def open_local(url: str):
+    """請求本地測試伺服器（只允許 http URL）"""
+    assert url.startswith("http://")
+    return urllib.request.urlopen(url, timeout=5)  # noqa: S310
+
+
+def get_json(manager, path: str) -> dict:
+    with open_local(manager.get_server_url() + path) as resp:
+        return json.loads(resp.read())
+
+
+class TestMultiSessionManager:
+    """測試多會話管理"""
+
+    def test_concurrent_sessions_do_not_clobber(self, web_ui_manager, temp_dir):
+        first_id = web_ui_manager.create_session(str(temp_dir), "第一個代理")
+        second_id = web_ui_manager.create_session(str(temp_dir), "第二個代理")
+
+        first = web_ui_manager.get_session(first_id)
+        assert first.is_waiting_for_feedback()
+        assert web_ui_manager.get_current_session().session_id == second_id
+        assert [s["session_id"] for s in web_ui_manager.list_sessions()] == [
+            first_id,
+            second_id,
+        ]
+
+        # 第二個會話使用獨立頁面，避免取代第一個會話的標籤頁
+        second = web_ui_manager.get_session(second_id)
+        assert web_ui_manager.get_session_url(second).endswith(f"/session/{second_id}")
+
+    @pytest.mark.asyncio
+    async def test_parallel_waits_receive_own_feedback(self, web_ui_manager, temp_dir):
+        sessions = [
+            web_ui_manager.get_session(
+                web_ui_manager.create_session(str(temp_dir), f"代理 {i}")
+            )
+            for i in range(3)
+        ]
+        waits = [
+            asyncio.create_task(session.wait_for_feedback(timeout=30))
+            for session in sessions
+        ]
+
+        for i, session in reversed(list(enumerate(sessions))):
+            await session.submit_feedback(f"回饋 {i}", [])
+
+        results = await asyncio.gather(*waits)
+        assert [r["interactive_feedback"] for r in results] == [
+            "回饋 0",
+            "回饋 1",
+            "回饋 2",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_finished_sessions_are_replaced(self, web_ui_manager, temp_dir):
+        done_id = web_ui_manager.create_session(str(temp_dir), "已完成")
+        await web_ui_manager.get_session(done_id).submit_feedback("ok", [])
+        waiting_id = web_ui_manager.create_session(str(temp_dir), "等待中")
+
+        new_id = web_ui_manager.create_session(str(temp_dir), "新調用")
+
+        assert web_ui_manager.get_session(done_id) is None
+        assert set(web_ui_manager.sessions) == {waiting_id, new_id}
+
+    @pytest.mark.asyncio
+    async def test_max_sessions(self, web_ui_manager, temp_dir):
+        web_ui_manager.max_sessions = 2
+        oldest_id = web_ui_manager.create_session(str(temp_dir), "一")
+        web_ui_manager.create_session(str(temp_dir), "二")
+        oldest = web_ui_manager.get_session(oldest_id)
+        waiter = asyncio.create_task(oldest.wait_for_feedback(timeout=60))
+        await asyncio.sleep(0)
+
+        web_ui_manager.create_session(str(temp_dir), "三")
+
+        # 超過上限時最舊的等待會話被結束，其等待者收到錯誤而非空白回饋
+        with pytest.raises(RuntimeError, match="上限"):
+            await asyncio.wait_for(waiter, 5)
+        assert oldest.status == SessionStatus.ERROR
+        assert oldest_id not in web_ui_manager.sessions
+        assert len(web_ui_manager.get_waiting_sessions()) == 2
+
+    def test_single_mode_replaces_current(self, web_ui_manager, temp_dir):
+        web_ui_manager.session_mode = SESSION_MODE_SINGLE
+        web_ui_manager.create_session(str(temp_dir), "一")
+        second_id = web_ui_manager.create_session(str(temp_dir), "二")
+
+        second = web_ui_manager.get_session(second_id)
+        assert web_ui_manager.get_session_url(second) == web_ui_manager.get_server_url()
+
+    def test_command_logs_bounded_per_session(self, web_ui_manager, temp_dir):
+        session = web_ui_manager.get_session(
+            web_ui_manager.create_session(str(temp_dir), "日誌")
+        )
+        session.command_logs.memory_limit = 4096
+        for i in range(2000):
+            session.add_log(f"line {i}")
+
+        stats = web_ui_manager.get_command_log_stats()["per_session"][
+            session.session_id
+        ]
+        assert stats["total_lines"] == 2000
+        assert stats["memory_bytes"] <= 4096
+        assert session.command_logs.head(1) == ["line 0"]
+        session.command_logs.clear()
+
+
+class TestAwaitableCompletion:
+    """測試回饋等待不佔用執行緒"""
+
+    @pytest.mark.asyncio
+    async def test_many_waits_use_no_threads(self, temp_dir):
+        sessions = [
+            WebFeedbackSession(f"wait-{i}", str(temp_dir), "等待") for i in range(300)
+        ]
+        threads_before = threading.active_count()
+        waits = [
+            asyncio.create_task(session.wait_for_feedback(timeout=60))
+            for session in sessions
+        ]
+        await asyncio.sleep(0.05)
+
+        assert threading.active_count() == threads_before
+        assert all(s.feedback_completed.waiter_count() == 1 for s in sessions)
+
+        # 從其他線程完成，等待者在自己的事件循環上被喚醒
+        def complete_all():
+            for session in sessions:
+                session.feedback_result = session.session_id
+                session.feedback_completed.set()
+
+        await asyncio.to_thread(complete_all)
+        results = await asyncio.wait_for(asyncio.gather(*waits), 5)
+
+        assert [r["interactive_feedback"] for r in results] == [
+            s.session_id for s in sessions
+        ]
+        assert all(s.feedback_completed.waiter_count() == 0 for s in sessions)
+
+    @pytest.mark.asyncio
+    async def test_wait_async_timeout(self):
+        event = CompletionEvent()
+        assert not await event.wait_async(timeout=0.01)
+        assert event.waiter_count() == 0
+
+        event.set()
+        assert await event.wait_async(timeout=0.01)
+        # 保留 threading.Event 的同步介面
+        assert event.wait(0)
+
+
+class TestSessionRouting:
+    """測試依會話 ID 路由"""
+
+    @pytest.mark.asyncio
+    async def test_routes_by_session_id(self, web_ui_manager, temp_dir):
+        import websockets
+
+        first_id = web_ui_manager.create_session(str(temp_dir), "第一個代理")
+        second_id = web_ui_manager.create_session(str(temp_dir), "第二個代理")
+        assert web_ui_manager.start_server()
+
+        listed = await asyncio.to_thread(get_json, web_ui_manager, "/api/sessions")
+        assert [s["session_id"] for s in listed["sessions"]] == [first_id, second_id]
+
+        status = await asyncio.to_thread(
+            get_json, web_ui_manager, f"/api/session-status?session_id={first_id}"
+        )
+        assert status["session_info"]["summary"] == "第一個代理"
+
+        ws_url = f"ws://127.0.0.1:{web_ui_manager.port}/ws/{first_id}"
+        async with websockets.connect(ws_url) as ws:
+            messages = [json.loads(await ws.recv()) for _ in range(3)]
+            assert messages[1]["status_info"]["session_id"] == first_id
+            assert messages[2]["type"] == "sessions_changed"
+
+            await ws.send(json.dumps({"type": "submit_feedback", "feedback": "一"}))
+            await asyncio.wait_for(
+                asyncio.to_thread(
+                    web_ui_manager.get_session(first_id).feedback_completed.wait, 5
+                ),
+                10,
+            )
+
+        first = web_ui_manager.get_session(first_id)
+        second = web_ui_manager.get_session(second_id)
+        assert first.feedback_result == "一"
+        assert second.is_waiting_for_feedback()
+
+        web_ui_manager.stop_server()
+
+    def test_unknown_session_page_redirects(self, web_ui_manager, temp_dir):
+        web_ui_manager.create_session(str(temp_dir), "摘要")
+        assert web_ui_manager.start_server()
+
+        try:
+            url = f"{web_ui_manager.get_server_url()}/api/current-session?session_id=x"
+            with pytest.raises(urllib.error.HTTPError) as excinfo:
+                open_local(url)
+            assert excinfo.value.code == 404
+
+            with open_local(
+                f"{web_ui_manager.get_server_url()}/session/missing"
+            ) as response:
+                assert response.url == web_ui_manager.get_server_url() + "/"
+        finally:
+            web_ui_manager.stop_server()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Web UI 預熱測試
+===============
+
+測試預熱在背景完成 Web UI 啟動，並回報節省時間的啟動指標。
+"""
+
+import urllib.request
+from concurrent.futures import Future
+
+import pytest
+
+from mcp_feedback_enhanced.web import main as web_main
+from mcp_feedback_enhanced.web import prewarm
+
+
+@pytest.fixture
+def clean_prewarm(monkeypatch):
+    """隔離全域預熱狀態與 Web UI 管理器"""
+    monkeypatch.setenv("MCP_TEST_MODE", "true")
+    monkeypatch.setenv("MCP_WEB_PORT", "0")
+    monkeypatch.setattr(prewarm, "_prewarm_future", None)
+    monkeypatch.setattr(
+        prewarm,
+        "_startup_metrics",
+        {
+            "prewarm_enabled": False,
+            "prewarm_started_at": None,
+            "prewarm_seconds": None,
+            "phases": {},
+            "first_call_wait_seconds": None,
+            "time_saved_seconds": None,
+        },
+    )
+    monkeypatch.setattr(web_main, "_web_ui_manager", None)
+    yield
+    if web_main._web_ui_manager is not None:
+        web_main._web_ui_manager.stop()
+
+
+class TestWebPrewarm:
+    """測試 Web UI 預熱"""
+
+    def test_prewarm_disabled_by_default(self, monkeypatch):
+        monkeypatch.delenv("MCP_WEB_PREWARM", raising=False)
+        assert not prewarm.is_prewarm_enabled()
+
+        monkeypatch.setenv("MCP_WEB_PREWARM", "true")
+        assert prewarm.is_prewarm_enabled()
+
+    @pytest.mark.asyncio
+    async def test_no_prewarm_wait_is_noop(self, clean_prewarm):
+        assert prewarm.get_prewarm_future() is None
+        assert await prewarm.wait_for_prewarm() is False
+        assert prewarm.get_startup_metrics()["first_call_wait_seconds"] is None
+
+    @pytest.mark.asyncio
+    async def test_wait_is_bounded(self, clean_prewarm, monkeypatch):
+        # 預熱卡住時不會讓首次調用無限等待
+        monkeypatch.setattr(prewarm, "_prewarm_future", Future())
+        assert await prewarm.wait_for_prewarm(timeout=0.05) is False
+
+        metrics = prewarm.get_startup_metrics()
+        assert metrics["first_call_wait_seconds"] < 5
+        assert metrics["time_saved_seconds"] is None
+        assert not metrics["prewarm_ready"]
+
+    @pytest.mark.asyncio
+    async def test_prewarm_serves_before_first_call(self, clean_prewarm):
+        future = prewarm.start_prewarm()
+        assert prewarm.start_prewarm() is future
+
+        manager = future.result(timeout=30)
+        assert manager is web_main.get_web_ui_manager()
+
+        # 服務已在背景就緒，首次調用前即可回應
+        url = f"{manager.get_server_url()}/api/session-status"
+        # 本地測試伺服器的 http URL
+        with urllib.request.urlopen(url, timeout=5) as response:  # noqa: S310
+            assert response.status == 200
+
+        assert await prewarm.wait_for_prewarm() is True
+
+        metrics = prewarm.get_startup_metrics()
+        assert metrics["prewarm_enabled"] and metrics["prewarm_ready"]
+        assert set(metrics["phases"]) == {
+            "import_web_stack",
+            "build_app",
+            "load_assets",
+            "start_server",
+        }
+        assert metrics["first_call_wait_seconds"] < metrics["prewarm_seconds"]
+        assert metrics["time_saved_seconds"] > 0
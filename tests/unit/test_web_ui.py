@@ -3,6 +3,8 @@
 Web UI 單元測試
 """
 
+import json
+import re
 import time
 
 import pytest
@@ -188,6 +190,30 @@ class TestWebUIRoutes:
         assert response.status_code == 200
         assert TestData.SAMPLE_SESSION["summary"] in response.text
 
+    @pytest.mark.asyncio
+    async def test_index_route_bootstrap(self, web_ui_manager, test_project_dir):
+        """測試主頁內嵌的首次載入資料"""
+        from fastapi.testclient import TestClient
+
+        summary = "摘要 </script><script>alert(1)</script>"
+        session_id = web_ui_manager.create_session(str(test_project_dir), summary)
+
+        client = TestClient(web_ui_manager.app)
+        response = client.get("/")
+
+        assert response.status_code == 200
+        assert "</script><script>alert(1)" not in response.text
+        match = re.search(r"window\.MCPFeedbackBootstrap = (\{.*\});\n", response.text)
+        bootstrap = json.loads(match.group(1))
+
+        assert bootstrap["version"] == 1
+        assert bootstrap["session"]["session_id"] == session_id
+        assert bootstrap["session"]["summary"] == summary
+        assert [s["session_id"] for s in bootstrap["sessions"]] == [session_id]
+        language = bootstrap["language"]
+        assert list(bootstrap["translations"]) == [language]
+        assert bootstrap["translations"][language]["app"]["title"]
+
     @pytest.mark.asyncio
     async def test_api_current_session(self, web_ui_manager, test_project_dir):
         """測試當前會話 API"""